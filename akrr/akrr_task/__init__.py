@@ -2,9 +2,8 @@
 import os
 import sys
 import datetime
-import re
 
-from ..util import log
+from ..util import log, state_store
 from .. import cfg
 from .akrr_task_base import AkrrTaskHandlerBase
 from .akrr_task_appker import AkrrTaskHandlerAppKer
@@ -103,16 +102,9 @@ def get_task_handler_from_task_proc_dir(task_proc_dir):
     using `task_proc_dir` as reference
     """
     if os.path.isdir(task_proc_dir):
-        last_pickled_state = -1
-        for f in os.listdir(task_proc_dir):
-            m = re.match(r"(\d+).st", f, 0)
-            if m is not None:
-                i_state = int(m.group(1))
-                if i_state > last_pickled_state:
-                    last_pickled_state = i_state
-        if last_pickled_state < 0:
+        pickle_filename = state_store.get_latest_state(task_proc_dir)
+        if pickle_filename is None:
             raise IOError("Can not find pickled file (%s/*.st) for task handler" % task_proc_dir)
-        pickle_filename = os.path.join(task_proc_dir, "%06d.st" % last_pickled_state)
         log.info("Read pickled task handler from:\n\t%s\n" % pickle_filename)
         return get_task_handler_from_pkl(pickle_filename)
     else:
@@ -142,14 +134,7 @@ def get_task_handler_from_pkl(pickle_filename: str) -> AkrrTaskHandlerBase:
     Load task handle from pkl file
     """
 
-    def _unpickle_task_handler(filename: str) -> AkrrTaskHandlerBase:
-        import pickle
-        fin = open(filename, "rb")
-        m_task_handler = pickle.load(fin)
-        fin.close()
-        return m_task_handler
-
-    th = _unpickle_task_handler(pickle_filename)
+    th = state_store.read_state(pickle_filename)
 
     # import copy
     # renew and update some variables
@@ -162,10 +147,17 @@ def get_task_handler_from_pkl(pickle_filename: str) -> AkrrTaskHandlerBase:
     # Set old status and old method to run next to this one
     th.set_old_method_to_run_next_to_current()
 
+    # some variables to reset from app to resource
+    if 'batch_scheduler' in th.app:
+        th.resource = dict(th.resource)
+        th.resource['batch_scheduler'] = th.app['batch_scheduler']
+
     # if openstack set remote_access_node to instance ip
     if th.resource['batch_scheduler'].lower() == "openstack" and getattr(th, "openstack_server_ip", None) is not None:
+            th.resource = dict(th.resource)
             th.resource['remote_access_node'] = getattr(th, "openstack_server_ip", None)
     if th.resource['batch_scheduler'].lower() == "googlecloud" and getattr(th, "googlecloud_server_ip", None) is not None:
+            th.resource = dict(th.resource)
             th.resource['remote_access_node'] = getattr(th, "googlecloud_server_ip", None)
 
     return th
@@ -176,17 +168,16 @@ def dump_task_handler(th: AkrrTaskHandlerBase):
     Save task handler state
     """
     th.LastPickledState += 1
-    pickle_filename = os.path.join(th.taskDir, "proc/", "%06d.st" % th.LastPickledState)
-    import pickle
     resource = th.resource
     app = th.app
     th.resource = None
     th.app = None
 
-    fout = open(pickle_filename, "wb")
-    pickle.dump(th, fout, cfg.task_pickling_protocol)
-    fout.close()
+    try:
+        pickle_filename = state_store.write_state(
+            os.path.join(th.taskDir, "proc"), th.LastPickledState, th, cfg.task_pickling_protocol)
+    finally:
+        th.resource = resource
+        th.app = app
 
     log.info("Saved pickled task handler to:\n\t%s" % pickle_filename)
-    th.resource = resource
-    th.app = app
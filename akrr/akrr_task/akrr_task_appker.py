@@ -12,6 +12,8 @@ import akrr.util.log
 import akrr.util.ssh as ssh
 import akrr.util.openstack
 import akrr.util.googlecloud
+import akrr.parsers.registry
+import akrr.util.task_output
 
 from .. import cfg
 from ..util import log
@@ -19,7 +21,7 @@ from ..util import log
 from .akrr_task_base import AkrrTaskHandlerBase, submit_commands, job_id_extract_patterns, wait_expressions, \
     active_task_default_attempt_repeat, kill_expressions
 
-from akrr.parsers.akrrappkeroutputparser import AppKerOutputParser
+from akrr.parsers.akrrappkeroutputparser import AppKerOutputParser, AppKerResult
 
 from ..akrrerror import AkrrError
 
@@ -39,6 +41,8 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
 
         self.fails_to_submit_to_the_queue = 0  # type: int
         self.PushToDBAttemps = 0  # type: Optional[int]
+        # structured result from parser, passed from process_results to push_to_db
+        self.result = None  # type: Optional[AppKerResult]
 
         self.openstack_server_ip = None  # type: Optional[str]
         self.googlecloud_server_ip = None  # type: Optional[str]
@@ -65,6 +69,7 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
             openstack_server = akrr.util.openstack.OpenStackServer(resource=self.resource)
             openstack_server.create(delete_if_exists=True)
             self.openstack_server_ip = openstack_server.ip
+            self.resource = dict(self.resource)
             self.resource['remote_access_node'] = openstack_server.ip
             log.debug(f"remote_access_node: " + str(self.resource['remote_access_node']))
 
@@ -82,6 +87,7 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
             googlecloud_server = akrr.util.googlecloud.GoogleCloudServer(resource=self.resource, task_id=self.task_id)
             googlecloud_server.create(delete_if_exists=True)
             self.googlecloud_server_ip = googlecloud_server.ip
+            self.resource = dict(self.resource)
             self.resource['remote_access_node'] = googlecloud_server.ip
 
         self.set_method_to_run_next(
@@ -353,14 +359,10 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
                                   os.path.join(self.taskDir, "jobfiles"), "-r")
 
             # update DB time_submitted_to_queue
-            db, cur = akrr.db.get_akrr_db()
-
-            cur.execute('''UPDATE active_tasks
-            SET time_submitted_to_queue=%s
-            WHERE task_id=%s ;''', (datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S"), self.task_id))
-
-            cur.close()
-            del db
+            with akrr.db.akrr_db_transaction() as cur:
+                cur.execute('''UPDATE active_tasks
+                SET time_submitted_to_queue=%s
+                WHERE task_id=%s ;''', (datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S"), self.task_id))
 
             if 'masterTaskID' not in self.taskParam:
                 # i.e. independent task
@@ -415,31 +417,38 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
             print("### Checking the job status on remote machine")
             from string import Template
 
-            sh = ssh.ssh_resource(self.resource)
+            # try resource-level queue listing first
+            in_queue = self.check_the_job_in_queue_status_cache(self.RemoteJobID, self.TimeJobSubmetedToRemoteQueue)
+            msg = "Job %s is %s queue listing of %s" % (
+                self.RemoteJobID, "in" if in_queue else "not in", self.resourceName)
 
-            # if it is subtask get master task id from job.id file (it should be replaced by master task)
-            if self.RemoteJobID == 0:
-                try:
-                    self.RemoteJobID = int(
-                        ssh.ssh_command(sh, "cat %s" % (os.path.join(self.remoteTaskDir, "job.id"))))
-                except Exception as e:
-                    log.error("Can not get remote job ID: %s", str(e))
-                    self.RemoteJobID = 0
+            if in_queue is None:
+                sh = ssh.ssh_resource(self.resource)
 
-            m_wait_expression = wait_expressions[self.resource['batch_scheduler']]
-            cmd = Template(m_wait_expression[0]).substitute(jobId=str(self.RemoteJobID))
-            rege = Template(m_wait_expression[2]).substitute(jobId=str(self.RemoteJobID))
+                # if it is subtask get master task id from job.id file (it should be replaced by master task)
+                if self.RemoteJobID == 0:
+                    try:
+                        self.RemoteJobID = int(
+                            ssh.ssh_command(sh, "cat %s" % (os.path.join(self.remoteTaskDir, "job.id"))))
+                    except Exception as e:
+                        log.error("Can not get remote job ID: %s", str(e))
+                        self.RemoteJobID = 0
 
-            msg = ssh.ssh_command(sh, cmd)
-            sh.sendline("exit")
-            sh.close(force=True)
-            del sh
+                m_wait_expression = wait_expressions[self.resource['batch_scheduler']]
+                cmd = Template(m_wait_expression[0]).substitute(jobId=str(self.RemoteJobID))
+                rege = Template(m_wait_expression[2]).substitute(jobId=str(self.RemoteJobID))
 
-            if self.RemoteJobID == 0:
-                return active_task_default_attempt_repeat
+                msg = ssh.ssh_command(sh, cmd)
+                sh.sendline("exit")
+                sh.close(force=True)
+                del sh
+
+                if self.RemoteJobID == 0:
+                    return active_task_default_attempt_repeat
+
+                in_queue = m_wait_expression[1](rege, msg, m_wait_expression[3]) is not None
 
-            match_obj = m_wait_expression[1](rege, msg, m_wait_expression[3])
-            if match_obj:
+            if in_queue:
                 log.info("Still in queue. Either waiting or running")
                 if datetime.datetime.today() - self.TimeJobSubmetedToRemoteQueue > \
                         self.taskParam.get('MaxTimeInQueue', cfg.max_time_in_queue):
@@ -574,6 +583,7 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
 
         log.info("Processing the output")
         result_file = None
+        self.result = None
         try:
             jobfiles_dir = os.path.join(self.taskDir, "jobfiles")
             result_file = os.path.join(self.taskDir, "result.xml")
@@ -594,24 +604,20 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
             (batchJobDir, stdoutFile, stderrFile, appstdoutFile, taskexeclogFile) = self.get_result_files(
                 raise_error=True)
 
-            # get the performance data
-            parser_filename = os.path.join(cfg.akrr_mod_dir, "parsers", self.app['parser'])
-
-            import importlib.machinery
-            this_appker_parser = importlib.machinery.SourceFileLoader(
-                'this_app_ker_parser', parser_filename).load_module()
-
+            # app config is shared snapshot, update its shallow copy
             resource_appker_vars = {
                 'resource': self.resource,
-                'app': copy.deepcopy(self.app)
+                'app': dict(self.app)
             }
             if self.resourceName in self.app['appkernel_on_resource']:
-                resource_appker_vars['app'] = self.app['appkernel_on_resource'][self.resourceName]
+                resource_appker_vars['app'] = dict(self.app['appkernel_on_resource'][self.resourceName])
             elif 'default' in self.app['appkernel_on_resource']:
-                resource_appker_vars['app'] = self.app['appkernel_on_resource']['default']
+                resource_appker_vars['app'] = dict(self.app['appkernel_on_resource']['default'])
             resource_appker_vars['app'].update(self.appParam)
 
-            performance = this_appker_parser.process_appker_output(
+            # get the performance data, parser is imported once per worker
+            performance = akrr.parsers.registry.process_appker_output(
+                self.appName, self.app['parser'],
                 appstdout=appstdoutFile, stdout=stdoutFile, stderr=stderrFile,
                 geninfo=os.path.join(batchJobDir, "gen.info"), proclog=taskexeclogFile,
                 resource_appker_vars=resource_appker_vars)
@@ -619,6 +625,8 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
                 self.set_method_to_run_next("push_to_db", "ERROR: Job have not finished successfully", "")
                 self.write_error_xml(result_file)
             else:
+                # result.xml is kept for other consumers, push_to_db uses structured result
+                self.result = getattr(performance, 'result', None)
                 fout = open(result_file, "w")
                 fout.write(performance)
                 fout.close()
@@ -726,24 +734,19 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
 
     def push_to_db(self):
 
-        db, cur = akrr.db.get_akrr_db()
         try:
             if self.TimeJobPossiblyCompleted is not None:
                 time_finished = self.TimeJobPossiblyCompleted
             else:
                 time_finished = datetime.datetime.today()
-            self.push_to_db_raw(cur, self.task_id, time_finished)
-            db.commit()
-            cur.close()
-            del db
+            with akrr.db.akrr_db_transaction() as cur:
+                self.push_to_db_raw(cur, self.task_id, time_finished)
+            # result is in DB and result.xml now
+            self.result = None
             self.set_method_to_run_next("task_is_complete")
             return datetime.timedelta(seconds=3)
         except Exception as e:
             log.exception("Got exception in process_results_old: %s\n%s\n", e, traceback.format_exc())
-            db.rollback()
-            db.commit()
-            cur.close()
-            del db
             self.PushToDBAttemps += 1
 
             if self.PushToDBAttemps <= cfg.export_db_max_repeat_attempts:
@@ -757,13 +760,12 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
                     "task_is_complete", "ERROR: Can not push to external DB, will try again", traceback.format_exc())
                 return None
 
-    def push_to_db_raw(self, cur, task_id, time_finished):
+    def read_result_xml(self, result_file):
+        """
+        read and parse result.xml, if it can not be parsed it is replaced with error report,
+        return root element or None if file can not be parsed
+        """
         import xml.etree.ElementTree
-        log.info("Pushing to DB")
-
-        result_file = os.path.join(self.taskDir, "result.xml")
-        jobfiles_dir = os.path.join(self.taskDir, "jobfiles")
-        (batch_job_dir, stdout_file, stderr_file, appstdout_file, taskexeclog_file) = self.get_result_files()
 
         # sanity check
         fin = open(result_file, "r")
@@ -779,9 +781,7 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
             fout.close()
 
         try:
-
-            tree = xml.etree.ElementTree.parse(result_file)
-            tree.getroot()
+            return xml.etree.ElementTree.parse(result_file).getroot()
         except Exception as e:
             log.exception("Got exception in push_to_db_raw, during xml read: %s", e)
 
@@ -794,6 +794,31 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
                 traceback.format_exc())
             self.write_error_xml(result_file, cdata=True)
 
+        try:
+            return xml.etree.ElementTree.parse(result_file).getroot()
+        except Exception as e:
+            log.exception("Got exception in push_to_db_raw, during xml read: %s", e)
+            self.status_info = "(2)==Resulting XML file content==\n" + content + \
+                               "\n==Previous status==" + self.status + \
+                               "\n==Previous status info==" + self.status_info
+            self.status = "Cannot process final XML file"
+            return None
+
+    def push_to_db_raw(self, cur, task_id, time_finished):
+        import xml.etree.ElementTree
+        log.info("Pushing to DB")
+
+        result_file = os.path.join(self.taskDir, "result.xml")
+        jobfiles_dir = os.path.join(self.taskDir, "jobfiles")
+        (batch_job_dir, stdout_file, stderr_file, appstdout_file, taskexeclog_file) = self.get_result_files()
+
+        # structured result from process_results, result.xml is read only if it is not available
+        # (error reports and tasks processed by older versions)
+        result = getattr(self, "result", None)
+        root = None
+        if result is None:
+            root = self.read_result_xml(result_file)
+
         instance_id = task_id
         status = None
         message = None
@@ -807,6 +832,8 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
         if raw is not None:  # .i.e. not new entry
             (instance_id, collected, committed, resource, executionhost, reporter, reporternickname, status, message,
              stderr, body, memory, cputime, walltime, job_id) = raw
+            # updated results (e.g. reprocessed task) are committed again, so that ingestor picks them up
+            committed = datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S")
             if hasattr(self, "RemoteJobID"):
                 job_id = self.RemoteJobID
         else:
@@ -821,18 +848,6 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
             if hasattr(self, "RemoteJobID"):
                 job_id = self.RemoteJobID
 
-        # Process XML file
-        try:
-            tree = xml.etree.ElementTree.parse(result_file)
-            root = tree.getroot()
-        except Exception as e:
-            log.exception("Got exception in push_to_db_raw, during xml read: %s", e)
-            self.status_info = "(2)==Resulting XML file content==\n" + content + \
-                               "\n==Previous status==" + self.status + \
-                               "\n==Previous status info==" + self.status_info
-            self.status = "Cannot process final XML file"
-            root = None
-
         memory = 0.0
         cputime = 0.0
         walltime = 0.0
@@ -841,7 +856,32 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
 
         log.debug("%s %s", root, status)
 
-        if root is not None:
+        if result is not None:
+            completed = result.completed
+            status = 1 if completed else 0
+            self.set_method_to_run_next(None, "Task was completed successfully.", "Done")
+            if completed:
+                body = result.get_performance_xml()
+                for e in result.statistics:
+                    if e.group == "details":
+                        continue
+                    if e.name == 'Memory':
+                        memory = float(e.val)
+                    if e.name == 'Wall Clock Time':
+                        walltime = float(e.val)
+            else:
+                message = "ERROR: error caught by parser"
+                stderr = None
+                body = """<xdtas>
+      <batchJob>
+       <status>Error</status>
+       <errorCause>ERROR: error caught by parser</errorCause>
+       <reporter>%s</reporter>
+       <errorMsg></errorMsg>
+      </batchJob>
+     </xdtas>
+    """ % reporter
+        elif root is not None:
             if root.find('exitStatus') is not None and root.find('exitStatus').find('completed') is not None:
                 try:
                     t = root.find('exitStatus').find('completed').text
@@ -883,13 +923,9 @@ class AkrrTaskHandlerAppKer(AkrrTaskHandlerBase):
             if completed is not None:
                 if completed:
                     body_et = root.find('body').find('performance')
-                    body = xml.etree.ElementTree.tostring(body_et, encoding="unicode")
-                    import xml.dom.minidom
-                    xml = xml.dom.minidom.parseString(body)
-                    body = xml.toprettyxml(indent="    ")
-                    body = body.replace("""<?xml version="1.0" ?>\n""", "")
-
-                    body = akrr.util.strip_empty_lines(body)
+                    body_et.tail = None
+                    akrr.util.indent_xml(body_et, space="    ")
+                    body = xml.etree.ElementTree.tostring(body_et, encoding="unicode") + "\n"
 
                     statistics_et = root.find('body').find('performance').find('benchmark').find('statistics')
                     for e in statistics_et:
@@ -998,82 +1034,11 @@ VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""",
                         (instance_id, collected, committed, resource, executionhost, reporter, reporternickname, status,
                          message, stderr, body, memory, cputime, walltime, job_id, nodes, internal_failure_code))
 
-        if appstdout_file is not None:
-            with open(appstdout_file, "r", encoding="utf-8", errors='ignore') as fin:
-                appstdout_file_content = fin.read()
-        else:
-            appstdout_file_content = "Does Not Present"
-        if stdout_file is not None:
-            fin = open(stdout_file, "r", encoding="utf-8")
-            stdout_file_content = fin.read()
-            fin.close()
-        else:
-            stdout_file_content = "Does Not Present"
-        if stderr_file is not None:
-            fin = open(stderr_file, "r", encoding="utf-8")
-            stderr_file_content = fin.read()
-            fin.close()
-        else:
-            stderr_file_content = "Does Not Present"
-
-        if taskexeclog_file is not None:
-            fin = open(taskexeclog_file, "r", encoding="utf-8")
-            taskexeclog_file_content = fin.read()
-            fin.close()
-        else:
-            taskexeclog_file_content = "Does Not Present"
-
-        assert isinstance(appstdout_file_content, str)
-        assert isinstance(stdout_file_content, str)
-        assert isinstance(stderr_file_content, str)
-        assert isinstance(taskexeclog_file_content, str)
-
-        cur.execute("""SELECT task_id
-            FROM akrr_errmsg WHERE task_id=%s""", (task_id,))
-        raw = cur.fetchall()
-
-        cur.execute("""SELECT @@max_allowed_packet""")
-        max_allowed_packet = cur.fetchall()[0][0]
-
-        if (len(appstdout_file_content) + len(stderr_file_content) + len(stdout_file_content) + len(
-                taskexeclog_file_content)) > 0.9 * max_allowed_packet:
-            print("WARNING: length of files exceed max_allowed_packet will trancate files")
-
-            if len(appstdout_file_content) > 0.2 * max_allowed_packet:
-                appstdout_file_content = appstdout_file_content[:int(0.2 * max_allowed_packet)]
-                appstdout_file_content += \
-                    "\nWARNING: File was trancated because it length of files exceed max_allowed_packet\n"
-            if len(stderr_file_content) > 0.2 * max_allowed_packet:
-                stderr_file_content = stderr_file_content[:int(0.2 * max_allowed_packet)]
-                stderr_file_content += \
-                    "\nWARNING: File was trancated because it length of files exceed max_allowed_packet\n"
-            if len(stdout_file_content) > 0.2 * max_allowed_packet:
-                stdout_file_content = stdout_file_content[:int(0.2 * max_allowed_packet)]
-                stdout_file_content += \
-                    "\nWARNING: File was trancated because it length of files exceed max_allowed_packet\n"
-            if len(taskexeclog_file_content) > 0.2 * max_allowed_packet:
-                taskexeclog_file_content = taskexeclog_file_content[:int(0.2 * max_allowed_packet)]
-                taskexeclog_file_content += \
-                    "\nWARNING: File was trancated because it length of files exceed max_allowed_packet\n"
-
-        appstdout_file_content = akrr.util.clean_unicode(appstdout_file_content)
-        stderr_file_content = akrr.util.clean_unicode(stderr_file_content)
-        stdout_file_content = akrr.util.clean_unicode(stdout_file_content)
-        taskexeclog_file_content = akrr.util.clean_unicode(taskexeclog_file_content)
-
-        if len(raw) > 0:  # .i.e. updating existing entry
-            print("Updating", raw)
-            cur.execute("""UPDATE akrr_errmsg
-                SET appstdout=%s,stderr=%s,stdout=%s,taskexeclog=%s
-                WHERE task_id=%s""",
-                        (appstdout_file_content, stderr_file_content, stdout_file_content,
-                         taskexeclog_file_content, instance_id))
-        else:
-            cur.execute("""INSERT INTO akrr_errmsg
-                (task_id,appstdout,stderr,stdout,taskexeclog)
-                VALUES (%s,%s,%s,%s,%s)""",
-                        (instance_id, appstdout_file_content, stderr_file_content, stdout_file_content,
-                         taskexeclog_file_content))
+        akrr.util.task_output.store_task_output(
+            cur, instance_id,
+            {"appstdout": appstdout_file, "stderr": stderr_file, "stdout": stdout_file,
+             "taskexeclog": taskexeclog_file},
+            chunk_size=cfg.task_output_chunk_size, level=cfg.task_output_compression_level)
 
     def task_is_complete(self):
         log.info("Done")
@@ -8,6 +8,8 @@ import akrr.util.ssh
 from akrr import cfg
 from akrr.util import log
 from akrr.util import make_dirs
+from akrr.util.batch_queue import QueueStatusCache
+from akrr.util.task_param import parse_param
 import akrr.util.openstack
 import akrr.util.googlecloud
 from akrr.akrrerror import AkrrFileNotFoundError, AkrrNotADirectoryError, AkrrPermissionError
@@ -47,6 +49,10 @@ wait_expressions = {
     'googlecloud': [r"ps -p $jobId 2>&1", re.search, r"^ *$jobId ", re.M]
 }
 
+# Resource-level queue listings shared by all task handlers
+queue_status_cache = QueueStatusCache(
+    cache_dir=os.path.join(cfg.data_dir, "queue_status"), ttl=cfg.queue_status_ttl.total_seconds())
+
 kill_expressions = {
     # 'lsf': ["bkill $jobId"],
     'pbs': ["qdel $jobId"],
@@ -72,10 +78,10 @@ class AkrrTaskHandlerBase:
     def __init__(self, task_id, resource_name, app_name, resource_param, app_param, task_param):
         self.resourceName = resource_name
         self.appName = app_name
-        self.resourceParam = eval(resource_param)
-        self.appParam = eval(app_param)
+        self.resourceParam = parse_param(resource_param)
+        self.appParam = parse_param(app_param)
         self.taskParam = copy.deepcopy(cfg.default_task_params)
-        self.taskParam.update(eval(task_param))
+        self.taskParam.update(parse_param(task_param))
         self.timeToSubmit = None
         self.repetition = None
         self.task_id = task_id
@@ -88,6 +94,7 @@ class AkrrTaskHandlerBase:
         self.app = cfg.find_app_by_name(self.appName)
         # some variables to reset from app to resource
         if 'batch_scheduler' in self.app:
+            self.resource = dict(self.resource)
             self.resource['batch_scheduler'] = self.app['batch_scheduler']
 
         self.resourceDir = None
@@ -235,6 +242,21 @@ class AkrrTaskHandlerBase:
                 import shutil
                 shutil.rmtree(self.taskDir, True)
 
+    def check_the_job_in_queue_status_cache(self, job_id, submitted_time):
+        """
+        check the job status using resource-level queue listing.
+        return True if job is in queue, False if not and None if it can not be determined
+        (in that case the job should be checked individually)
+        """
+        if job_id == 0 or submitted_time is None:
+            return None
+        # listing should be done after job submission
+        in_queue = queue_status_cache.is_job_in_queue(self.resource, job_id, submitted_time.timestamp())
+        if in_queue is not None:
+            log.info("Job %s status from %s queue listing: %s", job_id, self.resourceName,
+                     "in queue" if in_queue else "not in queue")
+        return in_queue
+
     def delete_remote_folder(self):
         # trying to be carefull
         if self.remoteTaskDir == '/':
@@ -1,6 +1,9 @@
 import akrr.db
 import akrr.util
 import akrr.util.log as log
+import akrr.parsers.registry
+import akrr.util.task_output
+from akrr.util.task_param import parse_param
 from akrr.util.ssh import check_dir, ssh_resource, scp_from_resource, ssh_command, scp_to_resource
 from .. import cfg
 import os
@@ -38,6 +41,8 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
         self.ToDoNextString = None
 
         self.PushToDBAttemps = 0
+        # structured result from parser, passed from process_results to push_to_db
+        self.result = None
 
         self.RemoteJobID = None
 
@@ -48,15 +53,13 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
         db, cur = akrr.db.get_akrr_db()
 
         cur.execute('''SELECT task_id,status,datetime_stamp,resource,app,task_param FROM active_tasks
-                    WHERE task_param LIKE %s AND task_param LIKE '%%masterTaskID%%'
+                    WHERE master_task_id=%s
                     ORDER BY  task_id ASC 
-                    ''', ("%%%d%%" % (self.task_id,),))
+                    ''', (self.task_id,))
         raws = cur.fetchall()
         sub_task_info = []
         for task_id, status, datetime_stamp, resource, app, task_param in raws:
-            task_param = eval(task_param)
-            if task_param['masterTaskID'] == self.task_id:
-                sub_task_info.append([task_id, status, datetime_stamp, resource, app, task_param])
+            sub_task_info.append([task_id, status, datetime_stamp, resource, app, parse_param(task_param)])
 
         cur.close()
         del db
@@ -257,14 +260,10 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
                 self.resource, os.path.join(self.remoteTaskDir, "*"), os.path.join(self.taskDir, "jobfiles"), "-r")
 
             # update DB time_submitted_to_queue
-            db, cur = akrr.db.get_akrr_db()
-
-            cur.execute('''UPDATE active_tasks
-            SET time_submitted_to_queue=%s
-            WHERE task_id=%s ;''', (datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S"), self.task_id))
-
-            cur.close()
-            del db
+            with akrr.db.akrr_db_transaction() as cur:
+                cur.execute('''UPDATE active_tasks
+                SET time_submitted_to_queue=%s
+                WHERE task_id=%s ;''', (datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S"), self.task_id))
 
             self.set_method_to_run_next(
                 "check_the_job_on_remote_machine",
@@ -302,36 +301,38 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
         # stack the subtasks
         sub_task_info = self.get_sub_task_info()
 
-        db, cur = akrr.db.get_akrr_db()
-
-        for subtask_id, subtask_status, subtask_datetime_stamp, subtask_resource, \
-                subtask_app, subtask_task_param in sub_task_info:
-            cur.execute('''UPDATE active_tasks
-                            SET next_check_time=%s
-                            WHERE task_id=%s ;''', (datetime.datetime.today(), subtask_id))
-
-        db.commit()
-        cur.close()
-        del db
+        with akrr.db.akrr_db_transaction() as cur:
+            for subtask_id, subtask_status, subtask_datetime_stamp, subtask_resource, \
+                    subtask_app, subtask_task_param in sub_task_info:
+                cur.execute('''UPDATE active_tasks
+                                SET next_check_time=%s
+                                WHERE task_id=%s ;''', (datetime.datetime.today(), subtask_id))
 
     def check_the_job_on_remote_machine(self):
         sh = None
         try:
             print("### Checking the job status on remote machine")
             from string import Template
-            m_wait_expr = wait_expressions[self.resource['batch_scheduler']]
-            cmd = Template(m_wait_expr[0]).substitute(jobId=str(self.RemoteJobID))
-            rege = Template(m_wait_expr[2]).substitute(jobId=str(self.RemoteJobID))
+            # try resource-level queue listing first
+            in_queue = self.check_the_job_in_queue_status_cache(self.RemoteJobID, self.TimeJobSubmetedToRemoteQueue)
+            msg = "Job %s is %s queue listing of %s" % (
+                self.RemoteJobID, "in" if in_queue else "not in", self.resourceName)
+
+            if in_queue is None:
+                m_wait_expr = wait_expressions[self.resource['batch_scheduler']]
+                cmd = Template(m_wait_expr[0]).substitute(jobId=str(self.RemoteJobID))
+                rege = Template(m_wait_expr[2]).substitute(jobId=str(self.RemoteJobID))
+
+                sh = ssh_resource(self.resource)
+                msg = ssh_command(sh, cmd)
+                sh.sendline("exit")
+                sh.close(force=True)
+                del sh
+                sh = None
 
-            sh = ssh_resource(self.resource)
-            msg = ssh_command(sh, cmd)
-            sh.sendline("exit")
-            sh.close(force=True)
-            del sh
-            sh = None
+                in_queue = m_wait_expr[1](rege, msg, m_wait_expr[3]) is not None
 
-            match_obj = m_wait_expr[1](rege, msg, m_wait_expr[3])
-            if match_obj:
+            if in_queue:
                 print("Still in queue. Either waiting or running")
                 if datetime.datetime.today() - self.TimeJobSubmetedToRemoteQueue > self.taskParam.get(
                         'MaxTimeInQueue', cfg.max_time_in_queue):
@@ -466,6 +467,7 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
             print("Processing the output")
 
         result_file = None
+        self.result = None
 
         try:
             result_file = os.path.join(self.taskDir, "result.xml")
@@ -479,23 +481,19 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
             (batch_job_dir, stdout_file, stderr_file, appstdout_file, taskexeclog_file) = \
                 self.get_result_files(raise_error=True)
 
-            # get the performance data
-            parser_filename = os.path.join(cfg.akrr_mod_dir, "parsers", self.app['parser'])
-
-            import importlib.machinery
-            this_appker_parser = importlib.machinery.SourceFileLoader(
-                'this_app_ker_parser', parser_filename).load_module()
-
+            # resource and app configs are shared snapshots, update their shallow copies
             resource_appker_vars = {
-                'resource': self.resource,
-                'app': self.app,
+                'resource': dict(self.resource),
+                'app': dict(self.app),
                 'taskId': self.task_id,
                 'subTasksId': self.subTasksId
             }
             resource_appker_vars['resource'].update(self.resourceParam)
             resource_appker_vars['app'].update(self.appParam)
 
-            performance = this_appker_parser.process_appker_output(
+            # get the performance data, parser is imported once per worker
+            performance = akrr.parsers.registry.process_appker_output(
+                self.appName, self.app['parser'],
                 appstdout=appstdout_file, geninfo=os.path.join(batch_job_dir, "gen.info"),
                 resource_appker_vars=resource_appker_vars)
 
@@ -505,6 +503,8 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
                 self.ToDoNextString = "push_to_db"
                 self.write_error_xml(result_file)
             else:
+                # result.xml is kept for other consumers, push_to_db uses structured result
+                self.result = getattr(performance, 'result', None)
                 fout = open(result_file, "w")
                 fout.write(performance)
                 fout.close()
@@ -525,23 +525,18 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
             return datetime.timedelta(seconds=3)
 
     def push_to_db(self):
-        db, cur = akrr.db.get_akrr_db()
         try:
             if hasattr(self, 'TimeJobPossiblyCompleted'):
                 time_finished = self.TimeJobPossiblyCompleted
             else:
                 time_finished = datetime.datetime.today()
-            self.push_to_db_raw(cur, self.task_id, time_finished)
-            db.commit()
-            cur.close()
-            del db
+            with akrr.db.akrr_db_transaction() as cur:
+                self.push_to_db_raw(cur, self.task_id, time_finished)
+            # result is in DB and result.xml now
+            self.result = None
             self.ToDoNextString = "task_is_complete"
             return None
         except:
-            db.rollback()
-            db.commit()
-            cur.close()
-            del db
             self.PushToDBAttemps += 1
 
             if self.PushToDBAttemps <= cfg.export_db_max_repeat_attempts:
@@ -556,14 +551,12 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
                 self.ToDoNextString = "task_is_complete"
                 return None
 
-    def push_to_db_raw(self, cur, task_id, time_finished):
-        print("Pushing to DB")
+    def read_result_xml(self, result_file):
+        """
+        read and parse result.xml, if it can not be parsed it is replaced with error report,
+        return root element or None if file can not be parsed
+        """
         import xml.etree.ElementTree as ElementTree
-        import xml.dom.minidom
-
-        result_file = os.path.join(self.taskDir, "result.xml")
-        jobfiles_dir = os.path.join(self.taskDir, "jobfiles")
-        (batch_job_dir, stdout_file, stderr_file, appstdout_file, taskexeclog_file) = self.get_result_files()
 
         # sanity check
         fin = open(result_file, "r")
@@ -579,9 +572,7 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
             fout.close()
 
         try:
-
-            tree = ElementTree.parse(result_file)
-            tree.getroot()
+            return ElementTree.parse(result_file).getroot()
         except:
             self.status_info = "(1)==Resulting XML file content==\n" + content + \
                               "\n==Previous status==" + self.status + \
@@ -590,6 +581,30 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
             self.status = "Cannot process final XML file"
             self.write_error_xml(result_file, cdata=True)
 
+        try:
+            return ElementTree.parse(result_file).getroot()
+        except:
+            self.status_info = "(2)==Resulting XML file content==\n" + content + \
+                              "\n==Previous status==" + self.status + \
+                              "\n==Previous status info==" + self.status_info
+            self.status = "Cannot process final XML file"
+            return None
+
+    def push_to_db_raw(self, cur, task_id, time_finished):
+        print("Pushing to DB")
+        import xml.etree.ElementTree as ElementTree
+
+        result_file = os.path.join(self.taskDir, "result.xml")
+        jobfiles_dir = os.path.join(self.taskDir, "jobfiles")
+        (batch_job_dir, stdout_file, stderr_file, appstdout_file, taskexeclog_file) = self.get_result_files()
+
+        # structured result from process_results, result.xml is read only if it is not available
+        # (error reports and tasks processed by older versions)
+        result = getattr(self, "result", None)
+        root = None
+        if result is None:
+            root = self.read_result_xml(result_file)
+
         instance_id = task_id
         message = None
         stderr = None
@@ -602,6 +617,8 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
         if raw is not None:  # .i.e. not new entry
             (instance_id, collected, committed, resource, executionhost, reporter, reporternickname, status, message,
              stderr, body, memory, cputime, walltime, job_id) = raw
+            # updated results (e.g. reprocessed task) are committed again, so that ingestor picks them up
+            committed = datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S")
             if self.RemoteJobID is not None:
                 job_id = self.RemoteJobID
         else:
@@ -616,23 +633,36 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
             if hasattr(self, "RemoteJobID"):
                 job_id = self.RemoteJobID
 
-        # Process XML file
-        try:
-
-            tree = ElementTree.parse(result_file)
-            root = tree.getroot()
-        except:
-            self.status_info = "(2)==Resulting XML file content==\n" + content + \
-                              "\n==Previous status==" + self.status + \
-                              "\n==Previous status info==" + self.status_info
-            self.status = "Cannot process final XML file"
-            root = None
-
         memory = 0.0
         cputime = 0.0
         walltime = 0.0
 
-        if root is not None:
+        if result is not None:
+            status = 1 if result.completed else 0
+            self.status = "Task was completed successfully."
+            self.status_info = "Done"
+            if result.completed:
+                body = result.get_performance_xml(indent="\t")
+                for e in result.statistics:
+                    if e.group == "details":
+                        continue
+                    if e.name == 'Memory':
+                        memory = float(e.val)
+                    if e.name == 'Wall Clock Time':
+                        walltime = float(e.val)
+            else:
+                message = "ERROR: error caught by parser"
+                stderr = None
+                body = """<xdtas>
+      <batchJob>
+       <status>Error</status>
+       <errorCause>ERROR: error caught by parser</errorCause>
+       <reporter>%s</reporter>
+       <errorMsg></errorMsg>
+      </batchJob>
+     </xdtas>
+    """ % reporter
+        elif root is not None:
             try:
                 t = root.find('exitStatus').find('completed').text
 
@@ -666,11 +696,9 @@ class AkrrTaskHandlerBundle(AkrrTaskHandlerBase):
             if completed is not None:
                 if completed is True:
                     body_et = root.find('body').find('performance')
-                    body = ElementTree.tostring(body_et)
-
-                    xml = xml.dom.minidom.parseString(body)
-                    body = xml.toprettyxml()
-                    body = body.replace("""<?xml version="1.0" ?>\n""", "")
+                    body_et.tail = None
+                    akrr.util.indent_xml(body_et, space="\t")
+                    body = ElementTree.tostring(body_et, encoding="unicode") + "\n"
 
                     statistics_et = root.find('body').find('performance').find('benchmark').find('statistics')
                     for e in statistics_et:
@@ -769,37 +797,11 @@ WHERE instance_id=%s""",
 VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""",
                         (instance_id, collected, committed, resource, executionhost, reporter, reporternickname, status,
                          message, stderr, body, memory, cputime, walltime, job_id, nodes))
-        if appstdout_file is not None:
-            fin = open(appstdout_file, "r")
-            appstdout_file_content = fin.read()
-            fin.close()
-        else:
-            appstdout_file_content = "Does Not Present"
-        if stdout_file is not None:
-            fin = open(stdout_file, "r")
-            stdout_file_content = fin.read()
-            fin.close()
-        else:
-            stdout_file_content = "Does Not Present"
-        if stderr_file is not None:
-            fin = open(stderr_file, "r")
-            stderr_file_content = fin.read()
-            fin.close()
-        else:
-            stderr_file_content = "Does Not Present"
-
-        if taskexeclog_file is not None:
-            fin = open(taskexeclog_file, "r")
-            taskexeclog_file_content = fin.read()
-            fin.close()
-        else:
-            taskexeclog_file_content = "Does Not Present"
-
-        cur.execute("""INSERT INTO akrr_errmsg
-        (task_id,appstdout,stderr,stdout,taskexeclog)
-        VALUES (%s,%s,%s,%s,%s)""",
-                    (instance_id, appstdout_file_content, stderr_file_content, stdout_file_content,
-                     taskexeclog_file_content))
+        akrr.util.task_output.store_task_output(
+            cur, instance_id,
+            {"appstdout": appstdout_file, "stderr": stderr_file, "stdout": stdout_file,
+             "taskexeclog": taskexeclog_file},
+            chunk_size=cfg.task_output_chunk_size, level=cfg.task_output_compression_level)
 
     def task_is_complete(self):
         print("Done", self.taskDir)
@@ -8,6 +8,12 @@ import string
 import time
 import traceback
 import datetime
+import threading
+import io
+import select
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, ServerHandler
 
 import logging as log
 
@@ -15,6 +21,7 @@ import bottle
 from bottle import response, request
 
 import akrr.db
+import akrr.util.task_output
 from akrr.akrrerror import AkrrError
 from . import bottle_api_json_formatting
 
@@ -51,37 +58,181 @@ app.install(error_translation)
 # queue to exchange the orders with main akrr process
 proc_queue_to_master = None
 proc_queue_from_master = None
+# pipe to wake up main akrr process after tasks were changed
+proc_wakeup_master = None
+proc_wakeup_master_lock = threading.Lock()
+# requests are served by several threads, only one of them can wait for master response at a time
+proc_queue_master_lock = threading.Lock()
+
+
+def wake_up_master():
+    """
+    Wake up main akrr process, so that it reloads tasks timers and handles the requests
+    """
+    if proc_wakeup_master is None:
+        return
+    with proc_wakeup_master_lock:
+        try:
+            proc_wakeup_master.send_bytes(b"r")
+        except OSError as e:
+            log.warning("Can not wake up main akrr process: %s", str(e))
+
+
+def request_master(m_request):
+    """
+    Send request to main akrr process and return its response
+    """
+    with proc_queue_master_lock:
+        proc_queue_to_master.put(m_request)
+        wake_up_master()
+        return proc_queue_from_master.get()
 
 
 class SSLWSGIRefServer(bottle.ServerAdapter):
     """
-    HTTPS server
+    HTTPS server, requests are handled by bounded pool of threads,
+    connections are kept alive between requests
     """
 
-    def __init__(self, host='127.0.0.1', port=8090, certfile='server.pem', **options):
+    def __init__(self, host='127.0.0.1', port=8090, certfile='server.pem', max_threads=8, keep_alive_timeout=15.0,
+                 **options):
         self.certfile = certfile
+        self.max_threads = max_threads
+        self.keep_alive_timeout = keep_alive_timeout
         if not os.path.isfile(certfile):
             raise ValueError('Cannot locate certificate', certfile)
         super(SSLWSGIRefServer, self).__init__(host, port, **options)
 
     def run(self, handler):
-        from wsgiref.simple_server import make_server, WSGIRequestHandler
+        from wsgiref.simple_server import make_server
         import ssl
 
-        if self.quiet:
-            class QuietHandler(WSGIRequestHandler):
-                def log_request(self, *args, **kw):
-                    pass
-
-            self.options['handler_class'] = QuietHandler
-        srv = make_server(self.host, self.port, handler, **self.options)
-        srv.socket = ssl.wrap_socket(
-            srv.socket,
-            certfile=self.certfile,  # path to certificate
-            server_side=True)
+        handler_class = type("RequestHandler", (_KeepAliveRequestHandler,), {
+            'timeout': self.keep_alive_timeout, 'quiet': self.quiet})
+        server_class = type("Server", (_ThreadPoolWSGIServer,), {'max_threads': self.max_threads})
+
+        srv = make_server(self.host, self.port, handler, server_class=server_class, handler_class=handler_class)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile=self.certfile)
+        # handshake is done in worker thread, so that slow client do not block others
+        srv.socket = context.wrap_socket(srv.socket, server_side=True, do_handshake_on_connect=False)
         srv.serve_forever()
 
 
+class _ThreadPoolWSGIServer(WSGIServer):
+    """WSGI server handling connections by bounded pool of threads"""
+    max_threads = 8
+
+    def serve_forever(self, poll_interval=0.5):
+        self.executor = ThreadPoolExecutor(max_workers=self.max_threads)
+        self.queued_connections = 0
+        self.queued_connections_lock = threading.Lock()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def process_request(self, request, client_address):
+        with self.queued_connections_lock:
+            self.queued_connections += 1
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def has_queued_connections(self) -> bool:
+        """return True if there are connections waiting for free thread"""
+        return self.queued_connections > 0
+
+    def process_request_thread(self, request, client_address):
+        with self.queued_connections_lock:
+            self.queued_connections -= 1
+        try:
+            if hasattr(request, "do_handshake"):
+                request.settimeout(self.RequestHandlerClass.timeout)
+                request.do_handshake()
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class _KeepAliveServerHandler(ServerHandler):
+    """keep connection alive if response length is known"""
+    http_version = "1.1"
+    keep_alive = False
+
+    def cleanup_headers(self):
+        super().cleanup_headers()
+        self.keep_alive = 'Content-Length' in self.headers and not self.request_handler.close_connection
+        if not self.keep_alive:
+            self.headers['Connection'] = 'close'
+
+
+class _KeepAliveRequestHandler(WSGIRequestHandler):
+    """HTTP/1.1 request handler serving several requests over one connection"""
+    protocol_version = "HTTP/1.1"
+    quiet = False
+
+    def log_request(self, *args, **kw):
+        if not self.quiet:
+            super().log_request(*args, **kw)
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.wait_for_next_request():
+            self.handle_one_request()
+
+    def wait_for_next_request(self) -> bool:
+        """
+        wait for next request on kept alive connection,
+        give up after timeout or if other connections are waiting for free thread
+        """
+        deadline = time.time() + self.timeout
+        while time.time() < deadline:
+            if getattr(self.connection, "pending", None) is not None and self.connection.pending() > 0:
+                return True
+            readable, _, _ = select.select([self.connection], [], [], 0.2)
+            if len(readable) > 0:
+                return True
+            if self.server.has_queued_connections():
+                return False
+        return False
+
+    def handle_one_request(self):
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+        except (socket.timeout, OSError):
+            self.close_connection = True
+            return
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            self.close_connection = True
+            return
+        if not self.parse_request():
+            return
+
+        # read whole body so that next request on this connection starts at right place
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            self.close_connection = True
+            stdin = self.rfile
+        else:
+            content_length = int(self.headers.get('Content-Length', 0) or 0)
+            stdin = io.BytesIO(self.rfile.read(content_length) if content_length > 0 else b"")
+
+        handler = _KeepAliveServerHandler(stdin, self.wfile, self.get_stderr(), self.get_environ(), multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+        if not handler.keep_alive:
+            self.close_connection = True
+        self.wfile.flush()
+
+
 DEFAULT_PAGE = 0
 DEFAULT_PAGE_SIZE = 10
 
@@ -235,6 +386,7 @@ def create_scheduled_tasks():
     except Exception:
         raise bottle.HTTPError(400, 'Can not submit task to scheduled_tasks queue:' + traceback.format_exc())
     del sch
+    wake_up_master()
 
     return {
         "success": True,
@@ -243,6 +395,74 @@ def create_scheduled_tasks():
     }
 
 
+@app.post(apiroot + '/scheduled_tasks/bulk')
+@bottle.auth_basic(auth_by_token_for_write)
+def create_scheduled_tasks_bulk():
+    """
+    Create several new scheduled tasks in one transaction.
+    Tasks are passed as JSON {"tasks": [{...}, ...]}, each task has same parameters
+    as for creation of single task.
+    """
+    # parameters needed to create new task
+    must_params = ['resource',
+                   'app',
+                   'time_to_start',
+                   'repeat_in',
+                   'resource_param',
+                   'app_param',
+                   'task_param',
+                   'group_id']
+    # parameters which are validated once per value
+    validate_once_params = ('resource', 'app')
+
+    tasks_in = bottle.request.json.get('tasks', None) if bottle.request.json is not None else None
+    if not isinstance(tasks_in, list):
+        raise bottle.HTTPError(400, 'List of tasks should be passed as JSON {"tasks": [...]}')
+
+    validated = {}
+    tasks = []
+    for task_in in tasks_in:
+        # default values for some parameters
+        params = {'time_to_start': None,
+                  'repeat_in': None,
+                  'app_param': '{}',
+                  'task_param': '{}',
+                  'group_id': ''}
+        for k, v in task_in.items():
+            if k not in must_params:
+                raise bottle.HTTPError(400, 'Unknown parameter %s' % (k,))
+            if v is None:
+                continue
+            v = str(v)
+            if k in validate_once_params:
+                if (k, v) not in validated:
+                    validated[(k, v)] = validate_task_variable_value(k, v)
+                params[k] = validated[(k, v)]
+            else:
+                params[k] = validate_task_variable_value(k, v)
+
+        for k in must_params:
+            if k not in params:
+                raise bottle.HTTPError(400, 'Parameter %s is not set' % (k,))
+        tasks.append(params)
+
+    from . import daemon
+
+    sch = daemon.AkrrDaemon(adding_new_tasks=True)
+    try:
+        task_ids = sch.add_tasks(tasks)
+    except Exception:
+        raise bottle.HTTPError(400, 'Can not submit tasks to scheduled_tasks queue:' + traceback.format_exc())
+    del sch
+    wake_up_master()
+
+    return {
+        "success": True,
+        "message": "%d tasks successfully created!" % len(task_ids),
+        "data": {'task_ids': task_ids}
+    }
+
+
 # READ =========================================================================
 @app.route(apiroot + '/scheduled_tasks', method='options')
 @app.get(apiroot + '/scheduled_tasks')
@@ -343,6 +563,7 @@ def update_scheduled_tasks(task_id):
             # have time to update it
             try:
                 daemon.update_task_parameters(task_id, update_values, update_derived_task=True)
+                wake_up_master()
 
                 return {
                     "success": True,
@@ -357,10 +578,7 @@ def update_scheduled_tasks(task_id):
         'args': (task_id, update_values),
         'kargs': {'update_derived_task': True}
     }
-    proc_queue_to_master.put(m_request)
-    while not proc_queue_from_master.empty():
-        pass
-    m_response = proc_queue_from_master.get()
+    m_response = request_master(m_request)
 
     if ("success" in m_response) and (m_response["success"] is True):
         m_response["message"] = "Task successfully updated!"
@@ -396,6 +614,7 @@ def delete_scheduled_task_by_id(task_id):
             try:
                 daemon.delete_task(task_id, remove_from_scheduled_queue=True, remove_from_active_queue=True,
                                    remove_derived_task=True)
+                wake_up_master()
 
                 return {
                     "success": True,
@@ -410,10 +629,7 @@ def delete_scheduled_task_by_id(task_id):
         'args': (task_id,),
         'kargs': {'remove_from_scheduled_queue': True, 'remove_from_active_queue': True, 'remove_derived_task': True}
     }
-    proc_queue_to_master.put(m_request)
-    while not proc_queue_from_master.empty():
-        pass
-    m_response = proc_queue_from_master.get()
+    m_response = request_master(m_request)
 
     if ("success" in m_response) and (m_response["success"] is True):
         m_response["message"] = "Task successfully deleted!"
@@ -507,6 +723,8 @@ def update_active_tasks(task_id):
 
         time.sleep(cfg.scheduled_tasks_loop_sleep_time * 0.45)
 
+        # end transaction to see task_lock changes done by daemon
+        db.commit()
         cur.execute('''SELECT * FROM active_tasks
             WHERE task_id=%s''', (task_id,))
         task = cur.fetchall()
@@ -514,8 +732,10 @@ def update_active_tasks(task_id):
     cur.execute('''UPDATE active_tasks
             SET next_check_time=%s
             WHERE task_id=%s''', (update_values['next_check_time'], task_id))
+    db.commit()
     cur.close()
     db.close()
+    wake_up_master()
     return {
         "success": True,
         "message": "Task successfully updated!"
@@ -544,6 +764,7 @@ def delete_active_tasks(task_id):
             try:
                 daemon.delete_task(task_id, remove_from_scheduled_queue=True, remove_from_active_queue=True,
                                    remove_derived_task=True)
+                wake_up_master()
 
                 return {
                     "success": True,
@@ -562,10 +783,7 @@ def delete_active_tasks(task_id):
         'args': (task_id,),
         'kargs': {'removeFromScheduledQueue': False, 'removeFromActiveQueue': True, 'removeDerivedTask': False}
     }
-    proc_queue_to_master.put(m_request)
-    while not proc_queue_from_master.empty():
-        pass
-    m_response = proc_queue_from_master.get()
+    m_response = request_master(m_request)
 
     if ("success" in m_response) and (m_response["success"] is True):
         m_response["message"] = "Task successfully deleted!"
@@ -593,6 +811,8 @@ def get_completed_tasks(task_id):
     cur.execute('''SELECT * FROM akrr_errmsg
             WHERE task_id=%s''', (task_id,))
     task_errmsg = cur.fetchall()
+    if len(task_errmsg) == 1:
+        task_errmsg[0].update(akrr.util.task_output.load_task_output(cur, task_id))
 
     cur.close()
     db.close()
@@ -652,6 +872,33 @@ def get_tasks(task_id):
     raise bottle.HTTPError(404, 'No tasks found with that id.')
 
 
+@app.get(apiroot + '/tasks/bulk')
+@bottle.auth_basic(auth_by_token_for_read)
+def get_tasks_bulk():
+    """
+    Retrieve several tasks from any queue, task ids are passed as comma separated task_ids query parameter.
+    response is:
+    data:{task_id:{queue:scheduled_tasks/active_tasks/completed_tasks/None
+        data:{data from respective get}
+    }}
+    """
+    try:
+        task_ids = [int(v) for v in request.query.task_ids.split(",") if v.strip() != ""]
+    except ValueError:
+        raise bottle.HTTPError(400, 'task_ids should be comma separated list of integers')
+
+    tasks = {}
+    for task_id in task_ids:
+        try:
+            tasks[task_id] = get_tasks(task_id)
+        except bottle.HTTPError as e:
+            if e.status_code == 404:
+                tasks[task_id] = {'queue': None, 'data': None}
+            else:
+                raise e
+    return tasks
+
+
 def _get_resource_apps(resource, application):
     query = """
     SELECT DISTINCT
@@ -1277,7 +1524,9 @@ def turn_resource_on(resource):
         log.error(s)
         raise AkrrError(s)
 
-    return {'updated': _turn_resource_on(resource, application_filter)}
+    updated = _turn_resource_on(resource, application_filter)
+    wake_up_master()
+    return {'updated': updated}
 
 
 @app.put(apiroot + '/resources/<resource>/off')
@@ -1299,7 +1548,9 @@ def turn_resource_off(resource):
         log.error(s)
         raise AkrrError(s)
 
-    return {'updated': _turn_resource_off(resource, application_filter)}
+    updated = _turn_resource_off(resource, application_filter)
+    wake_up_master()
+    return {'updated': updated}
 
 
 @app.get(apiroot + '/walltime')
@@ -1577,17 +1828,20 @@ def delete_walltime(walltime_id):
     return {'deleted': False}
 
 
-def start_rest_api(m_proc_queue_to_master=None, m_proc_queue_from_master=None):
+def start_rest_api(m_proc_queue_to_master=None, m_proc_queue_from_master=None, m_proc_wakeup_master=None):
     print("Starting REST-API Service")
     # make sure that reloading is off and debugging is turned on.
     issued_tokens['test'] = {'token': 'test', 'expiration': int(time.time()) + cfg.restapi_token_expiration_time,
                              'read': True, 'write': True}
     global proc_queue_to_master
     global proc_queue_from_master
+    global proc_wakeup_master
     proc_queue_to_master = m_proc_queue_to_master
     proc_queue_from_master = m_proc_queue_from_master
+    proc_wakeup_master = m_proc_wakeup_master
 
-    srv = SSLWSGIRefServer(host=cfg.restapi_host, port=cfg.restapi_port, certfile=cfg.restapi_certfile)
+    srv = SSLWSGIRefServer(host=cfg.restapi_host, port=cfg.restapi_port, certfile=cfg.restapi_certfile,
+                           max_threads=cfg.restapi_max_threads, keep_alive_timeout=cfg.restapi_keep_alive_timeout)
     # bottle.run(app,server=srv, debug=True, reloader=False)
     print("Before bottle.run")
     bottle.run(app, server=srv, debug=True, reloader=False)
@@ -1599,16 +1853,12 @@ def scheduler_no_new_tasks():
     """
     Temporary stop new tasks start up
     """
-    global proc_queue_to_master
     m_request = {
         'fun': 'daemon_no_new_tasks',
         'args': tuple(),
         'kargs': {}
     }
-    proc_queue_to_master.put(m_request)
-    while not proc_queue_from_master.empty():
-        pass
-    m_response = proc_queue_from_master.get()
+    m_response = request_master(m_request)
 
     if ("success" in m_response) and (m_response["success"] is True):
         m_response["message"] = "Temporary stopped new tasks start up!"
@@ -1622,16 +1872,12 @@ def scheduler_no_active_tasks_check():
     """
     Allow new task to be started
     """
-    global proc_queue_to_master
     m_request = {
         'fun': 'daemon_new_tasks_on',
         'args': tuple(),
         'kargs': {}
     }
-    proc_queue_to_master.put(m_request)
-    while not proc_queue_from_master.empty():
-        pass
-    m_response = proc_queue_from_master.get()
+    m_response = request_master(m_request)
 
     if ("success" in m_response) and (m_response["success"] is True):
         m_response["message"] = "Allowed new task to be started!"
@@ -1639,5 +1885,14 @@ def scheduler_no_active_tasks_check():
     return m_response
 
 
+@app.get(apiroot + '/db_pool_stats')
+@bottle.auth_basic(auth_by_token_for_read)
+def get_db_pool_stats():
+    """
+    Retrieve usage statistics of REST API database connection pools.
+    """
+    return akrr.db.get_pools_stats()
+
+
 if __name__ == '__main__':
     start_rest_api()
@@ -80,6 +80,7 @@ def app_add(resource: str, appkernel: str, execution_method: str = "hpc", dry_ru
                     (appkernel, resource, cfg_template_filename, cfg_filename))
     else:
         shutil.copyfile(cfg_template_filename, cfg_filename)
+        cfg.invalidate_cfg_cache()
         if os.path.isfile(cfg_filename):
             log.info("Application kernel configuration for %s on %s is in: \n\t%s", appkernel, resource, cfg_filename)
 
@@ -22,6 +22,59 @@ import akrr.util.googlecloud
 pp = pprint.PrettyPrinter(indent=4)
 
 
+def add_app_to_db(app_name):
+    """add disabled app kernel entries to mod_appkernel.app_kernel_def and mod_akrr.app_kernels if missing"""
+    # add entry to mod_appkernel.resource
+    db_ak, cur_ak = akrr.db.get_ak_db(True)
+
+    cur_ak.execute('''SELECT * FROM app_kernel_def WHERE ak_base_name=%s''', (app_name,))
+    ak_in_akdb = cur_ak.fetchall()
+    if len(ak_in_akdb) == 0:
+        cur_ak.execute('''INSERT INTO app_kernel_def (name,ak_base_name,processor_unit,enabled, description, visible)
+                    VALUES(%s,%s,'node',0,%s,0);''', (app_name, app_name, app_name))
+        db_ak.commit()
+    cur_ak.execute('''SELECT * FROM app_kernel_def WHERE ak_base_name=%s''', (app_name,))
+    ak_in_akdb = cur_ak.fetchall()[0]
+    # add entry to mod_akrr.resource
+    db, cur = akrr.db.get_akrr_db(True)
+
+    cur.execute('''SELECT * FROM app_kernels WHERE name=%s''', (app_name,))
+    ak_in_db = cur.fetchall()
+    if len(ak_in_db) == 0:
+        cur.execute('''INSERT INTO app_kernels (id,name,enabled,nodes_list)
+                    VALUES(%s,%s,0,'1,2,4,8');''',
+                    (ak_in_akdb['ak_def_id'], app_name))
+        db.commit()
+
+
+def enable_app_on_resource(resource_name, app_name):
+    """turn on app kernel on resource and enable it in databases, return True on success"""
+    from akrr import akrrrestclient
+    try:
+        result = akrrrestclient.put(
+            '/resources/%s/on' % (resource_name,),
+            data={'application': app_name})
+        if result.status_code == 200:
+            log.info("Successfully enabled %s on %s" % (app_name, resource_name))
+        else:
+            log.error("Can not turn-on %s on %s\n%s" % (app_name, resource_name, result.text))
+            return False
+
+        add_app_to_db(app_name)
+
+        db_ak, cur_ak = akrr.db.get_ak_db(True)
+        cur_ak.execute('''UPDATE app_kernel_def SET enabled=1,visible=1  WHERE ak_base_name=%s''', (app_name,))
+        db_ak.commit()
+
+        db, cur = akrr.db.get_akrr_db(True)
+        cur.execute('''UPDATE app_kernels SET enabled=1  WHERE name=%s''', (app_name,))
+        db.commit()
+    except Exception:
+        log.exception("Can not turn-on %s on %s", app_name, resource_name)
+        return False
+    return True
+
+
 def app_validate(resource, appkernel, nnodes):
     from akrr.util.log import verbose
     resource_name = resource
@@ -92,28 +145,7 @@ def app_validate(resource, appkernel, nnodes):
     log.info("Syntax of %s is correct and all necessary parameters are present." % app_ker_param_filename)
 
     # check if AK is in DB
-    if True:
-        # add entry to mod_appkernel.resource
-        db_ak, cur_ak = akrr.db.get_ak_db(True)
-
-        cur_ak.execute('''SELECT * FROM app_kernel_def WHERE ak_base_name=%s''', (app_name,))
-        ak_in_akdb = cur_ak.fetchall()
-        if len(ak_in_akdb) == 0:
-            cur_ak.execute('''INSERT INTO app_kernel_def (name,ak_base_name,processor_unit,enabled, description, visible)
-                        VALUES(%s,%s,'node',0,%s,0);''', (app_name, app_name, app_name))
-            db_ak.commit()
-        cur_ak.execute('''SELECT * FROM app_kernel_def WHERE ak_base_name=%s''', (app_name,))
-        ak_in_akdb = cur_ak.fetchall()[0]
-        # add entry to mod_akrr.resource
-        db, cur = akrr.db.get_akrr_db(True)
-
-        cur.execute('''SELECT * FROM app_kernels WHERE name=%s''', (app_name,))
-        ak_in_db = cur.fetchall()
-        if len(ak_in_db) == 0:
-            cur.execute('''INSERT INTO app_kernels (id,name,enabled,nodes_list)
-                        VALUES(%s,%s,0,'1,2,4,8');''',
-                        (ak_in_akdb['ak_def_id'], app_name))
-            db.commit()
+    add_app_to_db(app_name)
 
     ###############################################################################################
     # connect to resource
@@ -377,45 +409,7 @@ def app_validate(resource, appkernel, nnodes):
     if error_count == 0:
         # enabling resource for execution
         log.info("\nEnabling %s on %s for execution\n" % (app_name, resource_name))
-        try:
-            result = akrrrestclient.put(
-                '/resources/%s/on' % (resource_name,),
-                data={'application': app_name})
-            if result.status_code == 200:
-                log.info("Successfully enabled %s on %s" % (app_name, resource_name))
-            else:
-                if result is not None:
-                    log.error("Can not turn-on %s on %s" % (app_name, resource_name), result.text)
-                else:
-                    log.error("Can not turn-on %s on %s" % (app_name, resource_name))
-                exit(1)
-            if True:
-                # add entry to mod_appkernel.resource
-                db_ak, cur_ak = akrr.db.get_ak_db(True)
-
-                cur_ak.execute('''SELECT * FROM app_kernel_def WHERE ak_base_name=%s''', (app_name,))
-                ak_in_akdb = cur_ak.fetchall()
-                if len(ak_in_akdb) == 0:
-                    cur_ak.execute(
-                        "INSERT INTO app_kernel_def (name,ak_base_name,processor_unit,enabled, description, visible)"
-                        "VALUES(%s,%s,'node',0,%s,0);", (app_name, app_name, app_name))
-                    db_ak.commit()
-                cur_ak.execute('''UPDATE app_kernel_def SET enabled=1,visible=1  WHERE ak_base_name=%s''', (app_name,))
-                db_ak.commit()
-                # add entry to mod_akrr.resource
-                db, cur = akrr.db.get_akrr_db(True)
-
-                cur.execute('''SELECT * FROM app_kernels WHERE name=%s''', (app_name,))
-                ak_in_db = cur.fetchall()
-                if len(ak_in_db) == 0:
-                    cur.execute('''INSERT INTO app_kernels (id,name,enabled,nodes_list)
-                                VALUES(%s,%s,0,'1,2,4,8');''',
-                                (ak_in_akdb['ak_def_id'], app_name))
-                    db.commit()
-                cur.execute('''UPDATE app_kernels SET enabled=1  WHERE name=%s''', (app_name,))
-                db.commit()
-        except Exception:
-            log.exception("Can not turn-on %s on %s", app_name, resource_name)
+        if not enable_app_on_resource(resource_name, app_name):
             exit(1)
 
     if error_count > 0:
@@ -427,3 +421,105 @@ def app_validate(resource, appkernel, nnodes):
     if error_count == 0 and warning_count == 0:
         log.info("\nDONE, you can move to next step!\n")
     os.remove(test_job_lock_filename)
+
+
+def app_validate_batch(resources, appkernels, nodes_list):
+    """
+    validate all combinations of app kernels, node counts and resources,
+    remote directories are checked once per resource (several resources at a time), test jobs are submitted together
+    and monitored with single poll
+    """
+    from akrr import get_akrr_dirs
+    akrr_dirs = get_akrr_dirs()
+
+    # check syntax of configuration files
+    for resource_name in resources:
+        resource_param_filename = os.path.abspath(
+            os.path.join(akrr_dirs['cfg_dir'], "resources", resource_name, "resource.conf"))
+        if not os.path.isfile(resource_param_filename):
+            log.error("resource parameters file (%s) do not exists!" % (resource_param_filename,))
+            exit(1)
+
+    from akrr import cfg
+    from akrr.cfg_util import load_app_default, load_app_on_resource
+    from akrr.cli import resource_deploy
+
+    try:
+        resources_cfg = [cfg.find_resource_by_name(resource_name) for resource_name in resources]
+        for app_name in appkernels:
+            cfg.find_app_by_name(app_name)
+            app_default = load_app_default(app_name)
+            for resource in resources_cfg:
+                load_app_on_resource(app_name, resource['name'], resource, app_default)
+    except Exception as e:  # pylint: disable=broad-except
+        log.exception("Exception occurred during resource or app loading:" + str(e))
+        exit(1)
+    log.info("Syntax of resources and application kernels configuration is correct.")
+
+    for resource in resources_cfg:
+        if resource['batch_scheduler'].lower() in ("openstack", "googlecloud"):
+            log.error("Cloud resource %s can not be validated in batch mode, validate it separately", resource['name'])
+            exit(1)
+
+    for app_name in appkernels:
+        add_app_to_db(app_name)
+
+    # one ssh session per resource, several resources at a time
+    resource_deploy.check_private_keys(resources_cfg)
+
+    def check_dirs(resource):
+        """return number of warnings"""
+        log.info("Checking directory locations on %s" % (resource['name'],))
+        rsh = resource_deploy.connect_to_resource(resource)
+        n_warnings = 0
+        for d, must_exist in ((resource['akrr_data'], True), (resource['appkernel_dir'], True),
+                              (resource['network_scratch'], False), (resource['local_scratch'], False)):
+            status, msg = check_dir(rsh, d, exit_on_fail=must_exist, try_to_create=must_exist)
+            if status is True:
+                log.info(msg)
+            else:
+                log.warning(msg)
+                n_warnings += 1
+        rsh.close(force=True)
+        return n_warnings
+
+    log.info("#" * 80)
+    warning_count = sum(resource_deploy.run_on_resources(check_dirs, resources_cfg))
+
+    # send test jobs to queue
+    log.info("#" * 80)
+    resource_deploy.check_connection_to_rest_api()
+
+    tests = [(resource, app_name, nodes)
+             for resource in resources_cfg for app_name in appkernels for nodes in nodes_list]
+    task_ids = resource_deploy.submit_test_jobs(tests)
+    tasks = resource_deploy.monitor_test_jobs(task_ids)
+
+    # analysing the output
+    results = []
+    error_count = 0
+    for (resource, app_name, nodes), task_id in zip(tests, task_ids):
+        success, message = resource_deploy.get_test_job_result(tasks.get(task_id, None))
+        if not success:
+            error_count += 1
+        results.append((resource['name'], app_name, nodes, task_id, success, message))
+        os.remove(resource_deploy.get_test_job_lock_filename(resource, app_name, nodes))
+
+    log.info("\nTest kernels execution summary:\n%s", resource_deploy.make_test_jobs_report(results))
+
+    # enable pairs on which all test jobs were successful
+    pairs_ok = {}
+    for resource_name, app_name, _, _, success, _ in results:
+        pairs_ok[(resource_name, app_name)] = pairs_ok.get((resource_name, app_name), True) and success
+    for (resource_name, app_name), ok in pairs_ok.items():
+        if ok:
+            log.info("Enabling %s on %s for execution" % (app_name, resource_name))
+            if not enable_app_on_resource(resource_name, app_name):
+                error_count += 1
+
+    if error_count > 0:
+        log.error("There are %d errors, fix them.", error_count)
+    if warning_count > 0:
+        log.warning("\nThere are %d warnings.\nif warnings have sense, you can move to next step!\n" % warning_count)
+    if error_count == 0 and warning_count == 0:
+        log.info("\nDONE, you can move to next step!\n")
@@ -1,26 +1,195 @@
 """
 AK runs output, logs, pickels and batch jobs script manipulation
+
+Archived task is tar-gzipped to <task_dir>.tar.gz. Old months are packed to
+resource/appkernel/year/<month>.tar which holds tasks archives (<time_stamp>.tar.gz)
+and is accompanied by <month>.tar.index with offsets of tasks archives, so that single task
+can be extracted without reading the whole pack.
 """
 import os
 import re
+import io
+import json
 import datetime
 import shutil
 import tarfile
+import multiprocessing
+from typing import Iterator, Iterable, Callable, Optional, Dict, List
 
-from akrr.util import log, get_list_from_comma_sep_values, progress_bar
+from akrr.akrrerror import AkrrError
+from akrr.util import log, get_list_from_comma_sep_values, state_store
 from akrr.util.time import time_stamp_to_datetime
 
 _digits_dots = re.compile('^[0-9.]+$')
 _digits = re.compile('^[0-9]+$')
 _state_dump = re.compile('^[0-9]+\.st$')
 
+# Suffixes of task archive, month pack and its index
+task_archive_suffix = ".tar.gz"
+month_pack_suffix = ".tar"
+month_index_suffix = ".tar.index"
+
+# Number of tasks between progress reports
+_progress_report_period = 10000
+
+
+def _iter_subdirs(path: str, pattern=None) -> Iterator[os.DirEntry]:
+    """yield sub-directories of path which names match pattern"""
+    with os.scandir(path) as it:
+        for entry in it:
+            if pattern is not None and pattern.match(entry.name) is None:
+                continue
+            if entry.is_dir():
+                yield entry
+
+
+def archive_task_dir(task_dir: str, compresslevel: int = 6) -> Optional[str]:
+    """
+    tar-gzip task directory to <task_dir>.tar.gz and remove the directory,
+    return error message or None on success
+    """
+    archive_path = task_dir + task_archive_suffix
+    tmp_path = archive_path + ".tmp"
+    try:
+        with tarfile.open(tmp_path, "w:gz", compresslevel=compresslevel) as out:
+            out.add(task_dir, os.path.basename(task_dir))
+        os.replace(tmp_path, archive_path)
+        shutil.rmtree(task_dir)
+        return None
+    except Exception as e:
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+        return "Cannot archive %s: %s" % (task_dir, str(e))
+
+
+def _archive_task_dir_star(args):
+    return archive_task_dir(*args)
+
+
+def read_month_index(pack_path: str) -> Dict[str, List[int]]:
+    """return index of month pack: task time stamp -> [offset, size] of its archive"""
+    index_path = pack_path[:-len(month_pack_suffix)] + month_index_suffix
+    if not os.path.isfile(index_path):
+        return {}
+    with open(index_path, "rt") as fin:
+        return json.load(fin)
+
+
+def _write_month_index(pack_path: str, index: Dict[str, List[int]]) -> None:
+    index_path = pack_path[:-len(month_pack_suffix)] + month_index_suffix
+    with open(index_path + ".tmp", "wt") as fout:
+        json.dump(index, fout, indent=0, sort_keys=True)
+    os.replace(index_path + ".tmp", index_path)
+
+
+def pack_month(month_dir: str) -> int:
+    """
+    append tasks archives from month_dir to <month_dir>.tar, update index and remove them,
+    month_dir is removed if nothing left in it. Return number of packed tasks.
+    """
+    pack_path = month_dir + month_pack_suffix
+    index = read_month_index(pack_path)
+    archives = sorted(f for f in os.listdir(month_dir) if f.endswith(task_archive_suffix))
+    if len(archives) == 0 and os.path.isfile(pack_path):
+        return 0
+
+    with tarfile.open(pack_path, "a" if os.path.isfile(pack_path) else "w") as pack:
+        for archive in archives:
+            archive_path = os.path.join(month_dir, archive)
+            tarinfo = pack.gettarinfo(archive_path, arcname=archive)
+            with open(archive_path, "rb") as fin:
+                pack.addfile(tarinfo, fin)
+            # data is padded to full blocks, newer entry replaces older one with same name
+            padded_size = -(-tarinfo.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            index[archive[:-len(task_archive_suffix)]] = [pack.offset - padded_size, tarinfo.size]
+    _write_month_index(pack_path, index)
+
+    for archive in archives:
+        os.remove(os.path.join(month_dir, archive))
+    if len(os.listdir(month_dir)) == 0:
+        os.rmdir(month_dir)
+    return len(archives)
+
+
+class _FileSlice(io.RawIOBase):
+    """read-only view of size bytes of file starting from offset"""
+    def __init__(self, fileobj, offset: int, size: int):
+        super().__init__()
+        self._fileobj = fileobj
+        self._fileobj.seek(offset)
+        self._left = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self._left)
+        if n <= 0:
+            return 0
+        data = self._fileobj.read(n)
+        b[:len(data)] = data
+        self._left -= len(data)
+        return len(data)
+
+
+def extract_task(task_dir: str, dest_dir: str = None) -> str:
+    """
+    return path to task directory, if task is archived extract it to dest_dir
+    (default is directory where it was before archiving). task_dir is
+    resource/appkernel/year/month/time_stamp path of not archived task.
+    """
+    if os.path.isdir(task_dir):
+        return task_dir
+    time_stamp = os.path.basename(task_dir)
+    month_dir = os.path.dirname(task_dir)
+    if dest_dir is None:
+        dest_dir = month_dir
+    os.makedirs(dest_dir, exist_ok=True)
+
+    # task archive
+    if os.path.isfile(task_dir + task_archive_suffix):
+        with tarfile.open(task_dir + task_archive_suffix, "r:gz") as targz:
+            targz.extractall(dest_dir)
+        return os.path.join(dest_dir, time_stamp)
+
+    # month pack
+    pack_path = month_dir + month_pack_suffix
+    index = read_month_index(pack_path)
+    if time_stamp in index:
+        offset, size = index[time_stamp]
+        with open(pack_path, "rb") as fin:
+            with tarfile.open(fileobj=io.BufferedReader(_FileSlice(fin, offset, size)), mode="r|gz") as targz:
+                targz.extractall(dest_dir)
+        return os.path.join(dest_dir, time_stamp)
+
+    # month archive from earlier versions, whole month is in one tar.gz
+    month = os.path.basename(month_dir)
+    if os.path.isfile(month_dir + task_archive_suffix):
+        prefix = month + "/" + time_stamp
+        with tarfile.open(month_dir + task_archive_suffix, "r|gz") as targz:
+            found = False
+            for member in targz:
+                if member.name == prefix or member.name.startswith(prefix + "/"):
+                    member.name = member.name[len(month) + 1:]
+                    targz.extract(member, dest_dir)
+                    found = True
+                elif found:
+                    break
+        if found:
+            return os.path.join(dest_dir, time_stamp)
+
+    raise AkrrError("Can not find task %s in archives" % task_dir)
+
 
 class Archive:
     """
     Class for manipulation with AK runs output, logs, pickels and batch jobs scripts
     """
-    def __init__(self, dry_run=False, comp_task_dir=None):
+    def __init__(self, dry_run=False, comp_task_dir=None, processes=None, compresslevel=6):
         self.dry_run = dry_run
+        # number of processes for compression, None for number of CPUs
+        self.processes = processes if processes is not None else os.cpu_count()
+        self.compresslevel = compresslevel
 
         if comp_task_dir is None:
             import akrr.cfg
@@ -28,101 +197,95 @@ class Archive:
         else:
             self.comp_task_dir = os.path.abspath(comp_task_dir)
 
+    @staticmethod
+    def iter_resources_dirs(comp_task_dir, resources):
+        """yield full path to resources directory with complete tasks"""
+        for entry in _iter_subdirs(comp_task_dir):
+            if resources is not None and entry.name not in resources:
+                continue
+            yield entry.path
+
     @staticmethod
     def get_resources_dir_list(comp_task_dir, resources):
         """get list with full path to resources directory with complete tasks"""
-        resources_dir_list = []
+        return list(Archive.iter_resources_dirs(comp_task_dir, resources))
 
-        for resource_dir in os.listdir(comp_task_dir):
-            resource_dir_fullpath = os.path.join(comp_task_dir, resource_dir)
-            if not os.path.isdir(resource_dir_fullpath):
-                continue
-            if resources is not None and resource_dir not in resources:
+    @staticmethod
+    def iter_appker_dirs(resource_dir_fullpath, appkernels):
+        """yield full path to resource/appker directory with complete tasks"""
+        for entry in _iter_subdirs(resource_dir_fullpath):
+            if appkernels is not None and entry.name not in appkernels:
                 continue
-            resources_dir_list.append(resource_dir_fullpath)
-        return resources_dir_list
+            yield entry.path
 
     @staticmethod
     def get_appker_dir_list(resource_dir_fullpath, appkernels):
         """get list with full path to resource/appker directory with complete tasks"""
-        appkers_dir_list = []
+        return list(Archive.iter_appker_dirs(resource_dir_fullpath, appkernels))
 
-        for appker_dir in os.listdir(resource_dir_fullpath):
-            appker_dir_fullpath = os.path.join(resource_dir_fullpath, appker_dir)
-            if not os.path.isdir(appker_dir_fullpath):
-                continue
-            if appkernels is not None and appker_dir not in appkernels:
-                continue
-            appkers_dir_list.append(appker_dir_fullpath)
-        return appkers_dir_list
+    @staticmethod
+    def iter_tasks_in_resource_app_dir(resource_app_dir, old_layout_only=False):
+        """
+        yield task directories in resource/appkernel directory
+        """
+        for entry in _iter_subdirs(resource_app_dir):
+            if _digits.match(entry.name):
+                if old_layout_only is False:
+                    # new layout, entry is year directory
+                    for month_entry in _iter_subdirs(entry.path, _digits):
+                        for task_entry in _iter_subdirs(month_entry.path):
+                            yield task_entry.path
+            elif _digits_dots.match(entry.name):
+                # old layout
+                yield entry.path
 
     @staticmethod
     def get_tasks_in_resource_app_dir(resource_app_dir, old_layout_only=False):
         """
         Get list of task directories in resource/appkernel directory
         """
-        tasks_dir_list = []
+        return list(Archive.iter_tasks_in_resource_app_dir(resource_app_dir, old_layout_only))
 
-        for task_dir in os.listdir(resource_app_dir):
-            task_dir_fullpath = os.path.join(resource_app_dir, task_dir)
-            if not os.path.isdir(task_dir_fullpath):
-                continue
-            if _digits.match(task_dir):
-                if old_layout_only is False:
-                    # new layout
-                    # task_dir is year_dir
-                    # task_dir_fullpath is year_dir_fullpath
-                    for month_dir in os.listdir(task_dir_fullpath):
-                        if _digits.match(month_dir) is None:
-                            continue
-                        month_dir_fullpath = os.path.join(task_dir_fullpath, month_dir)
-                        if not os.path.isdir(month_dir_fullpath):
-                            continue
-                        for real_task_dir in os.listdir(month_dir_fullpath):
-                            real_task_dir_fullpath = os.path.join(month_dir_fullpath, real_task_dir)
-                            if not os.path.isdir(real_task_dir_fullpath):
-                                continue
-                            tasks_dir_list.append(real_task_dir_fullpath)
-            elif _digits_dots.match(task_dir):
-                # old layout
-                tasks_dir_list.append(task_dir_fullpath)
-        return tasks_dir_list
+    def iter_tasks_dirs(self, resources=None, appkernels=None, old_layout_only=False):
+        """
+        yield task directories as they are found
+        """
+        for resource_dir in Archive.iter_resources_dirs(self.comp_task_dir, resources):
+            for resource_app_dir in Archive.iter_appker_dirs(resource_dir, appkernels):
+                yield from Archive.iter_tasks_in_resource_app_dir(resource_app_dir, old_layout_only)
 
     def get_tasks_dir_list(self, resources=None, appkernels=None, old_layout_only=False):
         """
         Get list of task directories
         """
-        tasks_dir_list = []
-
-        for resource_dir in Archive.get_resources_dir_list(self.comp_task_dir, resources):
-            for resource_app_dir in Archive.get_appker_dir_list(resource_dir, appkernels):
-                tasks_dir_list += Archive.get_tasks_in_resource_app_dir(resource_app_dir, old_layout_only)
+        return list(self.iter_tasks_dirs(resources, appkernels, old_layout_only))
 
-        return tasks_dir_list
+    def iter_tasks_month_dirs(self, resources=None, appkernels=None):
+        """
+        yield resource/appkernel/year/month directories as they are found
+        """
+        for resource_dir in Archive.iter_resources_dirs(self.comp_task_dir, resources):
+            for resource_app_dir in Archive.iter_appker_dirs(resource_dir, appkernels):
+                for year_entry in _iter_subdirs(resource_app_dir, _digits):
+                    for month_entry in _iter_subdirs(year_entry.path, _digits):
+                        yield month_entry.path
 
     def get_tasks_month_dir_list(self, resources=None, appkernels=None, old_layout_only=False):
         """
         Get list of task directories
         """
-        tasks_dir_list = []
+        return list(self.iter_tasks_month_dirs(resources, appkernels))
 
-        for resource_dir in Archive.get_resources_dir_list(self.comp_task_dir, resources):
-            for resource_app_dir in Archive.get_appker_dir_list(resource_dir, appkernels):
-                for year_dir in os.listdir(resource_app_dir):
-                    year_dir_fullpath = os.path.join(resource_app_dir, year_dir)
-                    if not os.path.isdir(year_dir_fullpath):
-                        continue
-                    if not _digits.match(year_dir):
-                        continue
-                    for month_dir in os.listdir(year_dir_fullpath):
-                        if _digits.match(month_dir) is None:
-                            continue
-                        month_dir_fullpath = os.path.join(year_dir_fullpath, month_dir)
-                        if not os.path.isdir(month_dir_fullpath):
-                            continue
-                        tasks_dir_list.append(month_dir_fullpath)
-
-        return tasks_dir_list
+    def _imap(self, func: Callable, iterable: Iterable) -> Iterator:
+        """
+        apply func to iterable items in self.processes processes (or in this process if it is 1),
+        results are yielded as they are ready
+        """
+        if self.processes is None or self.processes <= 1:
+            yield from map(func, iterable)
+            return
+        with multiprocessing.Pool(self.processes) as pool:
+            yield from pool.imap_unordered(func, iterable, chunksize=4)
 
     def remove_tasks_state_dumps(self, days_old: int, resources=None, appkernels=None) -> None:
         """
@@ -142,7 +305,7 @@ class Archive:
         timenow = datetime.datetime.now()
         seconds_in_day = 24*3600
         count = 0
-        for task_dir in self.get_tasks_dir_list(resources, appkernels):
+        for task_dir in self.iter_tasks_dirs(resources, appkernels):
             try:
                 time_stamp = os.path.basename(task_dir)
                 activate_time = time_stamp_to_datetime(time_stamp)
@@ -162,6 +325,9 @@ class Archive:
                     count += 1
                     if not self.dry_run:
                         os.remove(state_file_fullpath)
+                latest_pointer = os.path.join(proc_dir, state_store.latest_pointer_filename)
+                if os.path.isfile(latest_pointer) and not self.dry_run:
+                    os.remove(latest_pointer)
             except:
                 log.error("Cannot process: "+task_dir)
         log.info("Removed %d task state dumps" % count)
@@ -184,7 +350,7 @@ class Archive:
         timenow = datetime.datetime.now()
         seconds_in_day = 24*3600
         count = 0
-        for task_dir in self.get_tasks_dir_list(resources, appkernels):
+        for task_dir in self.iter_tasks_dirs(resources, appkernels):
             try:
                 time_stamp = os.path.basename(task_dir)
                 activate_time = time_stamp_to_datetime(time_stamp)
@@ -246,9 +412,41 @@ class Archive:
                 traceback.print_exc()
         log.info("Moved %d task dirs" % count)
 
+    def update_tasks_state_dumps(self, resources=None, appkernels=None, protocol: int = None) -> None:
+        """
+        convert tasks state dumps to binary pickle protocol and set latest state pointers
+        """
+        resources = get_list_from_comma_sep_values(resources)
+        appkernels = get_list_from_comma_sep_values(appkernels)
+        if protocol is None:
+            protocol = state_store.default_protocol
+
+        log.info("Updating tasks state dumps")
+        log.debug("resources filter: " + str(resources))
+        log.debug("appkernels filter: " + str(appkernels))
+        log.debug("protocol: " + str(protocol))
+        log.debug("dry_run: " + str(self.dry_run))
+        log.debug("comp_task_dir: "+str(self.comp_task_dir))
+
+        # state dumps refer to task handler classes, make sure they can be unpickled
+        import akrr.akrr_task  # pylint: disable=unused-import
+
+        count = 0
+        for task_dir in self.iter_tasks_dirs(resources, appkernels):
+            try:
+                proc_dir = os.path.join(task_dir, "proc")
+                if not os.path.isdir(proc_dir):
+                    continue
+                count += state_store.migrate_states(proc_dir, protocol, self.dry_run)
+            except:
+                log.error("Cannot process: "+task_dir)
+                import traceback
+                traceback.print_exc()
+        log.info("Converted %d task state dumps" % count)
+
     def archive_tasks(self, days_old: int, resources=None, appkernels=None) -> None:
         """
-        archive old task
+        archive old task, each task is tar-gzipped separately in pool of processes
         """
         resources = get_list_from_comma_sep_values(resources)
         appkernels = get_list_from_comma_sep_values(appkernels)
@@ -259,37 +457,38 @@ class Archive:
         log.debug("days: " + str(days_old))
         log.debug("dry_run: " + str(self.dry_run))
         log.debug("comp_task_dir: "+str(self.comp_task_dir))
+        log.debug("processes: " + str(self.processes))
 
         time_now = datetime.datetime.now()
         seconds_in_day = 24*3600
-        count = 0
-        task_dirs = self.get_tasks_dir_list(resources, appkernels)
-        n_task_dirs = len(task_dirs)
-        progress_update = max(int(round(n_task_dirs / 50)), 1)
-        for i in range(n_task_dirs):
-            task_dir = task_dirs[i]
-            if i % progress_update == 0:
-                progress_bar(i / n_task_dirs)
-            try:
-                time_stamp = os.path.basename(task_dir)
-                activate_time = time_stamp_to_datetime(time_stamp)
-                days_passed = (time_now-activate_time).total_seconds()/seconds_in_day
-                if days_passed < days_old:
+
+        def old_tasks():
+            for task_dir in self.iter_tasks_dirs(resources, appkernels):
+                try:
+                    activate_time = time_stamp_to_datetime(os.path.basename(task_dir))
+                except Exception:
+                    log.error("Cannot process: "+task_dir)
                     continue
+                if (time_now-activate_time).total_seconds()/seconds_in_day >= days_old:
+                    yield task_dir, self.compresslevel
 
-                out = tarfile.open(task_dir + '.tar.gz', mode='w|gz')
-                out.add(task_dir, time_stamp)
-                out.close()
-                shutil.rmtree(task_dir)
+        count = 0
+        if self.dry_run:
+            count = sum(1 for _ in old_tasks())
+        else:
+            for error in self._imap(_archive_task_dir_star, old_tasks()):
+                if error is not None:
+                    log.error(error)
+                    continue
                 count += 1
-            except:
-                log.error("Cannot process: "+task_dir)
-        progress_bar()
+                if count % _progress_report_period == 0:
+                    log.info("Archived %d tasks so far" % count)
         log.info("Archived %d tasks" % count)
 
     def archive_tasks_by_months(self, months_old: int, resources=None, appkernels=None) -> None:
         """
-        archive old task by months
+        archive old task by months: tasks are tar-gzipped separately (in pool of processes) and
+        packed to month pack with index
         """
         log.info("Archiving tasks by months")
 
@@ -298,38 +497,26 @@ class Archive:
         time_now = datetime.datetime.now()
         mega_month_now = time_now.month + time_now.year * 12
         count = 0
-        task_month_dirs = self.get_tasks_month_dir_list(resources, appkernels)
-        n_task_month_dirs = len(task_month_dirs)
-        progress_update = max(int(round(n_task_month_dirs/50)), 1)
-        for i in range(n_task_month_dirs):
-            task_month_dir = task_month_dirs[i]
-            if i % progress_update == 0:
-                progress_bar(i/n_task_month_dirs)
+        for task_month_dir in self.iter_tasks_month_dirs(resources, appkernels):
             month = os.path.basename(task_month_dir)
             year = os.path.basename(os.path.dirname(task_month_dir))
             mega_month = int(month) + int(year) * 12
 
             if mega_month_now - mega_month < months_old:
                 continue
+            if self.dry_run:
+                count += 1
+                continue
 
-            # unzip archives
-            for archive in [f for f in os.listdir(task_month_dir) if f.endswith(".tar.gz")]:
-                archive_path = os.path.join(task_month_dir, archive)
-                try:
-                    targz = tarfile.open(archive_path, "r|gz")
-                    targz.extractall(task_month_dir)
-                    targz.close()
-                    os.remove(archive_path)
-                except Exception as e:
-                    log.error("Can not extract %s:\n %s", archive_path, str(e))
-            # zip month
+            # tar-gzip tasks which are not archived yet
+            task_dirs = [(entry.path, self.compresslevel) for entry in _iter_subdirs(task_month_dir)]
+            for error in self._imap(_archive_task_dir_star, task_dirs):
+                if error is not None:
+                    log.error(error)
+            # pack month
             try:
-                targz = tarfile.open(task_month_dir + '.tar.gz', "w|gz")
-                targz.add(task_month_dir, month)
-                targz.close()
-                shutil.rmtree(task_month_dir)
+                pack_month(task_month_dir)
                 count += 1
             except Exception as e:
                 log.error("Can not archive %s\n %s", task_month_dir, str(e))
-        progress_bar()
         log.info("Archived %d task months" % count)
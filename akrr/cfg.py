@@ -4,6 +4,10 @@ AKRR configuration
 
 import os
 import re
+import time
+import glob
+
+_import_start_time = time.perf_counter()
 
 from akrr import get_akrr_dirs
 from akrr.util import log, clear_from_build_in_var
@@ -25,41 +29,123 @@ templates_dir = akrr_dirs['templates_dir']
 default_dir = akrr_dirs['default_dir']
 appker_repo_dir = akrr_dirs['appker_repo_dir']
 
-from akrr.cfg_util import load_resource, load_app
+from akrr.cfg_util import load_resource, load_app, LazyCfgDict, get_files_mtime, load_cached_cfg, save_cached_cfg
+
+# Time spent on configuration loading stages, seconds
+load_timing = {}
+
+
+def get_resources_names():
+    """return names of resources in configuration directory"""
+    return [resource_name for resource_name in os.listdir(os.path.join(cfg_dir, "resources"))
+            if resource_name not in ['notactive', 'templates']]
+
+
+def get_apps_names():
+    """return names of apps with default configuration"""
+    return [re.sub(r'\.app\.conf$', '', filename) for filename in os.listdir(os.path.join(akrr_mod_dir, 'default_conf'))
+            if filename != "default.app.conf" and filename.endswith(".app.conf") and filename.count(".") == 2]
+
+
+def _get_resource_cfg_files(resource_name):
+    return [os.path.join(default_dir, "default.resource.conf"),
+            os.path.join(cfg_dir, 'resources', resource_name, "resource.conf")]
+
+
+def _get_app_cfg_files(app_name):
+    files = [os.path.join(default_dir, "default.app.conf"), os.path.join(default_dir, app_name + ".app.conf")]
+    # execution methods defaults
+    files += sorted(glob.glob(os.path.join(default_dir, app_name + ".*.app.conf")))
+    for resource_name in sorted(get_resources_names()):
+        app_on_resource_cfg_filename = os.path.join(cfg_dir, "resources", resource_name, app_name + ".app.conf")
+        if os.path.isfile(app_on_resource_cfg_filename):
+            files.append(app_on_resource_cfg_filename)
+            files += _get_resource_cfg_files(resource_name)
+    return files
+
+
+# files which cached configurations depend on besides configuration files
+_cfg_cache_extra_files = [os.path.join(cfg_dir, "akrr.conf"),
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "cfg_util.py")]
+
+
+def _load_cfg_cached(kind, name, files, load):
+    """
+    load configuration using cache in data_dir/cfg_cache, cache is also invalidated by changes
+    of akrr.conf and of configuration post-processing code (cfg_util.py)
+    """
+    if not cfg_cache:
+        return load()
+    files = files + _cfg_cache_extra_files
+    cache_filename = os.path.join(data_dir, "cfg_cache", "%s.%s.pickle" % (kind, name))
+    cfg = load_cached_cfg(cache_filename, files)
+    if cfg is None:
+        files_mtime = get_files_mtime(files)
+        cfg = load()
+        save_cached_cfg(cache_filename, files_mtime, cfg)
+    return cfg
+
+
+def _load_resource(resource_name):
+    log.debug2("loading " + resource_name)
+    return _load_cfg_cached("resource", resource_name, _get_resource_cfg_files(resource_name),
+                            lambda: load_resource(resource_name))
+
+
+def _load_app(app_name):
+    return _load_cfg_cached("app", app_name, _get_app_cfg_files(app_name),
+                            lambda: load_app(app_name, resources))
+
 
 # Resource configurations are stored here
-resources = {}
+resources = LazyCfgDict(get_resources_names, _load_resource)
 
 # Application configurations are stored here
-apps = {}
+apps = LazyCfgDict(get_apps_names, _load_app)
+
+# Time of last check of configuration files modification for resources and apps
+_resources_check_time = {}
+_apps_check_time = {}
+
+
+def invalidate_cfg_cache():
+    """
+    force check of configuration files modification on next find_resource_by_name and
+    find_app_by_name calls
+    """
+    _resources_check_time.clear()
+    _apps_check_time.clear()
 
 
 def load_all_resources():
     """
     load all resources from configuration directory
     """
-    global resources  # pylint: disable=global-statement
-    for resource_name in os.listdir(os.path.join(cfg_dir, "resources")):
-        if resource_name not in ['notactive', 'templates']:
-            log.debug2("loading "+resource_name)
-            try:
-                resource = load_resource(resource_name)
-                resources[resource_name] = resource
-            except Exception as e:  # pylint: disable=broad-except
-                log.exception("Exception occurred during resources loading:"+str(e))
+    resources.load_all()
 
 
 def find_resource_by_name(resource_name):
     """
     return resource parameters
-    if resource configuration file was modified will reload it
+    if resource configuration file was modified will reload it,
+    files are checked not more often than once per cfg_files_check_period seconds.
+
+    Returned dict is shared snapshot, it is replaced on reload and should not be modified,
+    make a shallow copy for changes.
 
     raises error if can not find
     """
     global resources  # pylint: disable=global-statement
+    time_now = time.time()
     if resource_name not in resources:
         resource = load_resource(resource_name)
         resources[resource_name] = resource
+        _resources_check_time[resource_name] = time_now
+        return resource
+
+    if time_now - _resources_check_time.get(resource_name, 0.0) < cfg_files_check_period:
+        return resources[resource_name]
+    _resources_check_time[resource_name] = time_now
 
     resource = resources[resource_name]
     if os.path.getmtime(resource['default_resource_cfg_filename']) != \
@@ -73,40 +159,35 @@ def find_resource_by_name(resource_name):
 
 def load_all_app():
     """
-    load all resources from configuration directory
+    load all apps from configuration directory
     """
-    global apps
-    global resources  # pylint: disable=global-statement
-    for filename in os.listdir(os.path.join(akrr_mod_dir, 'default_conf')):
-        if filename == "default.app.conf":
-            continue
-        if not filename.endswith(".app.conf"):
-            continue
-        if filename.count(".") != 2:
-            continue
-
-        app_name = re.sub(r'\.app\.conf$', '', filename)
-        try:
-            app = load_app(app_name, resources)
-            apps[app_name] = app
-        except Exception as e:  # pylint: disable=broad-except
-            log.exception("Exception occurred during app kernel configuration loading: " + str(e))
+    apps.load_all()
 
 
 def find_app_by_name(app_name):
     """
     return apps parameters
-    if resource configuration file was modified will reload it
+    if app configuration files were modified will reload it,
+    files are checked not more often than once per cfg_files_check_period seconds.
+
+    Returned dict is shared snapshot, it is replaced on reload and should not be modified,
+    make a shallow copy for changes.
 
     raises error if can not find
     """
     global apps  # pylint: disable=global-statement
     global resources  # pylint: disable=global-statement
+    time_now = time.time()
     if app_name not in apps:
         app = load_app(app_name, resources)
         apps[app_name] = app
+        _apps_check_time[app_name] = time_now
         return apps[app_name]
 
+    if time_now - _apps_check_time.get(app_name, 0.0) < cfg_files_check_period:
+        return apps[app_name]
+    _apps_check_time[app_name] = time_now
+
     reload_app_cfg = False
     app = apps[app_name]
     #
@@ -185,13 +266,31 @@ def verify_akrr_conf(warnings_as_exceptions: bool = False):
                 raise DeprecationWarning(msg)
 
 
+def configure_ssh_pool():
+    """
+    Set ssh connection pool parameters
+    """
+    from akrr.util.ssh import ssh_pool
+    ssh_pool.configure(
+        enabled=ssh_multiplexing, persist=ssh_multiplexing_persist,
+        max_sessions=ssh_multiplexing_max_sessions, control_dir=ssh_multiplexing_control_dir)
+
+
 # load akrr parameters
 with open(cfg_dir + "/akrr.conf", "r") as file_in:
     exec(file_in.read())  # pylint: disable=exec-used
 
 
 verify_akrr_conf()
-
-
-load_all_resources()
-load_all_app()
+configure_ssh_pool()
+load_timing['akrr.conf'] = time.perf_counter() - _import_start_time
+
+if not lazy_cfg_loading:
+    _t = time.perf_counter()
+    load_all_resources()
+    load_timing['resources'] = time.perf_counter() - _t
+    _t = time.perf_counter()
+    load_all_app()
+    load_timing['apps'] = time.perf_counter() - _t
+
+load_timing['total'] = time.perf_counter() - _import_start_time
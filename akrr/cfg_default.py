@@ -74,6 +74,12 @@ ak_db_passwd = akrr_db_passwd
 # The name that has been chosen to represent the 'mod_appkernel' database. Note: CHANGE THIS AT YOUR OWN RISK.
 ak_db_name = "mod_appkernel"
 
+# Maximal number of idle connections kept in per-process pool for each database
+db_pool_max_idle = 4
+
+# Idle pooled connections older than this (in seconds) are checked with ping before reuse
+db_pool_check_interval = 30.0
+
 ###############################################################################
 # REST API
 ###############################################################################
@@ -96,6 +102,12 @@ restapi_certfile = 'server.pem'
 # Token expiration time in seconds
 restapi_token_expiration_time = 3600
 
+# Maximal number of threads serving REST API requests
+restapi_max_threads = 8
+
+# Time in seconds to keep idle REST API connection open for next request
+restapi_keep_alive_timeout = 15.0
+
 # User defined as having 'read / write' permission to the REST API
 restapi_rw_username = 'rw'
 
@@ -136,15 +148,50 @@ max_task_handlers = 4
 # redirect task processing to log file
 redirect_task_processing_to_log_file = True
 
-# The 'id' of the pickling protocol to use.
-task_pickling_protocol = 0
+# The 'id' of the pickling protocol to use for task states (binary protocol 4 is much more compact than 0).
+task_pickling_protocol = 4
+
+# Task output files are stored in DB gzip compressed and split to chunks of at most that many bytes
+# (chunks are also kept below half of max_allowed_packet of DB server)
+task_output_chunk_size = 4 * 1024 * 1024
+
+# zlib compression level (1-9) for task output stored in DB
+task_output_compression_level = 6
+
+# Minimal period in seconds between checks of resource and app configuration files for modifications
+cfg_files_check_period = 5.0
+
+# Load resource and app configurations on first access by name instead of loading all of them on start
+lazy_cfg_loading = True
+
+# Cache parsed resource and app configurations in data_dir/cfg_cache, entries are invalidated by files mtime
+cfg_cache = True
+
+# Expected time in seconds to import akrr.cfg, akrr --startup-time warns if it is exceeded
+cfg_import_time_limit = 0.2
 
 # The amount of time that the tasks loop should sleep in between loops.
 scheduled_tasks_loop_sleep_time = 1.0
 
+# Maximal time between reloading of tasks timers from DB, the daemon loop sleeps until next task is due
+# and this period limits how long it takes to notice changes made to DB directly (not through REST API)
+scheduled_tasks_resync_period = datetime.timedelta(minutes=5)
+
 # maximum number of active tasks for akrr TOTAL (-1 for unlimited)
 max_number_of_active_tasks_total = -1
 
+# Reuse ssh connections to resources through persistent OpenSSH ControlMaster sockets
+ssh_multiplexing = True
+
+# Time in seconds for which idle master ssh connection is kept open
+ssh_multiplexing_persist = 600
+
+# Maximal number of simultaneous ssh sessions per resource over master connection
+ssh_multiplexing_max_sessions = 8
+
+# Directory for ssh control sockets, None for temporary directory
+ssh_multiplexing_control_dir = None
+
 
 ###############################################################################
 # Error handling and repeat time
@@ -176,6 +223,9 @@ max_fails_to_submit_to_the_queue = 48  # i.e.2 days
 # amount of time to wait to submit the task back to the queue if it fails.
 repeat_after_fails_to_submit_to_the_queue = datetime.timedelta(hours=1)
 
+# Time for which single queue listing of resource is used to check status of all jobs on it
+queue_status_ttl = datetime.timedelta(minutes=5)
+
 # Maximum amount of time a task is allowed to stay in the queue.
 max_time_in_queue = datetime.timedelta(days=10)  # i.e. 10 days
 
@@ -190,3 +240,20 @@ default_task_params = {'test_run': False}
 
 # Encoding for conversion of bytes to sting. Default encoding is 'utf-8'
 encoding = "utf-8"
+
+# Number of resources checked over ssh at the same time by batch resource deploy and app validate
+deploy_max_parallel_resources = 4
+
+# Incremental ingestion to mod_appkernel starts this much before the last ingested committed time,
+# to catch results which were committed by transactions finished after the previous ingestion
+ingestor_watermark_lag = datetime.timedelta(minutes=30)
+
+# Number of first data points in default control region of resource and app kernel
+control_region_default_points = 20
+
+# Half-width of control band in standard deviations of control region,
+# used if control_criteria of app kernel is not set in mod_appkernel.app_kernel_def
+control_criteria = 2.0
+
+# Number of last successful runs used for rolling median (running_average of metrics)
+control_running_window = 5
@@ -7,11 +7,14 @@ Configuration utilities for AKRR, resources and app
 import copy
 import os
 import re
+import pickle
+from collections.abc import MutableMapping
 
-from typing import Optional, Dict
+from typing import Optional, Dict, Callable, Iterable, List, Tuple
 
 from akrr import get_akrr_dirs
 from akrr.akrrerror import AkrrError
+from akrr.akrrversion import akrrversion
 from akrr.util import log
 
 akrr_dirs = get_akrr_dirs()
@@ -418,3 +421,97 @@ def _get_app_execution_method(app_on_resource_cfg_filename: str, default: str =
                 return var['execution_method']
             line = fin.readline()
     return default
+
+
+class LazyCfgDict(MutableMapping):
+    """
+    Resources or apps configurations loaded on first access by name.
+    get_names returns names of all configurations, load loads single configuration.
+    Iteration loads all configurations. As with loading of all configurations on start, configurations
+    which failed to load are logged and are not present.
+    """
+    def __init__(self, get_names: Callable[[], Iterable[str]], load: Callable[[str], dict]):
+        self._get_names = get_names
+        self._load = load
+        self._cfgs = {}
+        self._failed = set()
+
+    def __getitem__(self, name):
+        if name not in self._cfgs:
+            if name in self._failed or name not in self._get_names():
+                raise KeyError(name)
+            try:
+                self._cfgs[name] = self._load(name)
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception("Exception occurred during %s configuration loading: %s", name, str(e))
+                self._failed.add(name)
+                raise KeyError(name)
+        return self._cfgs[name]
+
+    def __setitem__(self, name, value):
+        self._failed.discard(name)
+        self._cfgs[name] = value
+
+    def __delitem__(self, name):
+        del self._cfgs[name]
+
+    def __iter__(self):
+        for name in sorted(self._get_names()):
+            if name in self:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def load_all(self) -> None:
+        """load all configurations"""
+        for _ in self:
+            pass
+
+    def get_loaded(self) -> List[str]:
+        """return names of already loaded configurations"""
+        return list(self._cfgs)
+
+
+def get_files_mtime(files: Iterable[str]) -> List[Tuple[str, Optional[int]]]:
+    """return list of files and their modification times, None for missing files"""
+    files_mtime = []
+    for filename in files:
+        try:
+            files_mtime.append((filename, os.stat(filename).st_mtime_ns))
+        except OSError:
+            files_mtime.append((filename, None))
+    return files_mtime
+
+
+def load_cached_cfg(cache_filename: str, files: Iterable[str]) -> Optional[dict]:
+    """
+    return configuration from cache file if it was made by same akrr version from same files with
+    same modification times, otherwise return None
+    """
+    try:
+        with open(cache_filename, "rb") as fin:
+            cached = pickle.load(fin)
+    except Exception:  # pylint: disable=broad-except
+        return None
+    if cached.get("akrr_version") != akrrversion or cached.get("files_mtime") != get_files_mtime(files):
+        return None
+    return cached["cfg"]
+
+
+def save_cached_cfg(cache_filename: str, files_mtime: List[Tuple[str, Optional[int]]], cfg: dict) -> None:
+    """
+    store configuration to cache file, files_mtime should be obtained before configuration loading,
+    configurations which can not be pickled are not cached
+    """
+    tmp_filename = cache_filename + ".%d.tmp" % os.getpid()
+    try:
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        with open(tmp_filename, "wb") as fout:
+            pickle.dump({"akrr_version": akrrversion, "files_mtime": files_mtime, "cfg": cfg}, fout,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, cache_filename)
+    except Exception as e:  # pylint: disable=broad-except
+        log.debug("Can not cache configuration to %s: %s", cache_filename, str(e))
+        if os.path.isfile(tmp_filename):
+            os.remove(tmp_filename)
@@ -3,8 +3,11 @@ A script that will provide command line access to the Application Remote Runner
 functionality.
 
 """
+import time
 import argparse
 
+_cli_import_start_time = time.perf_counter()
+
 from akrr.util import log
 
 
@@ -81,6 +84,28 @@ def wall_time_parsed(args):
             print(traceback.print_exc())
 
 
+def report_startup_time(parser_time):
+    """
+    Report time spent on CLI setup and akrr.cfg import (akrr.conf execution and
+    resources and apps configurations loading if they are not loaded lazily)
+    """
+    import sys
+    imported_before = 'akrr.cfg' in sys.modules
+    start = time.perf_counter()
+    from akrr import cfg
+    cfg_import_time = cfg.load_timing['total'] if imported_before else time.perf_counter() - start
+
+    log.info("CLI setup: %.1f ms", parser_time * 1000.0)
+    log.info("akrr.cfg import: %.1f ms", cfg_import_time * 1000.0)
+    for stage, stage_time in cfg.load_timing.items():
+        if stage != 'total':
+            log.info("    %s: %.1f ms", stage, stage_time * 1000.0)
+    log.info("Resources/apps loading: %s", "lazy" if cfg.lazy_cfg_loading else "on import")
+    if parser_time + cfg_import_time > cfg.cfg_import_time_limit:
+        log.warning("Startup time %.1f ms exceeds %.1f ms", (parser_time + cfg_import_time) * 1000.0,
+                    cfg.cfg_import_time_limit * 1000.0)
+
+
 class CLI:
     """
     AKRR command line interface
@@ -110,6 +135,9 @@ class CLI:
         self.root_parser = argparse.ArgumentParser(description='command line interface to AKRR')
         self.root_parser.add_argument('-v', '--verbose', action='store_true', help="turn on verbose logging")
         self.root_parser.add_argument('-vv', '--very-verbose', action='store_true', help="turn on very verbose logging")
+        self.root_parser.add_argument(
+            '--startup-time', action='store_true',
+            help="report time spent on akrr modules and configuration import")
 
         self.subparsers = self.root_parser.add_subparsers(title='commands')
 
@@ -137,7 +165,11 @@ class CLI:
         from akrr.perf.cli import add_command_ingestor
         add_command_ingestor(self.subparsers)
 
+        from akrr.perf.cli import add_command_control
+        add_command_control(self.subparsers)
+
         self.verbose = False
+        self.parser_time = time.perf_counter() - _cli_import_start_time
 
     def process_common_args(self, cli_args):
         """
@@ -163,6 +195,9 @@ class CLI:
 
         self.process_common_args(cli_args)
 
+        if "startup_time" in cli_args and cli_args.startup_time:
+            report_startup_time(self.parser_time)
+
         # EXECUTE: the function provided in the '.set_defaults(func=...)'
         if hasattr(cli_args, "func"):
             return cli_args.func(cli_args)
@@ -267,7 +267,8 @@ def cli_resource_deploy(parent_parser):
     parser = parent_parser.add_parser('deploy',
                                       description=cli_resource_deploy.__doc__)
     parser.add_argument(
-        '-r', '--resource', required=True, help="name of resource for validation and deployment'")
+        '-r', '--resource', required=True,
+        help="name of resource for validation and deployment, comma separated list for batch deployment")
     parser.add_argument(
         '--overwrite', action='store_true', help="Overwrite input and appkernel utilities")
     parser.add_argument('-a', '--appkernel', default="test",
@@ -382,15 +383,22 @@ def cli_app_validate(parent_parser):
                                       description=cli_app_validate.__doc__)
 
     parser.add_argument(
-        '-r', '--resource', required=True, help="name of resource")
+        '-r', '--resource', required=True, help="name of resource, comma separated list for batch validation")
     parser.add_argument(
-        '-a', '--appkernel', required=True, help="name of app kernel")
+        '-a', '--appkernel', required=True, help="name of app kernel, comma separated list for batch validation")
     parser.add_argument(
-        '-n', '--nodes', required=True, help='Specify how many nodes the new task should be setup with.')
+        '-n', '--nodes', required=True,
+        help='Specify how many nodes the new task should be setup with, comma separated list for batch validation.')
 
     def handler(args):
-        from akrr.app_validate import app_validate
-        app_validate(args.resource, args.appkernel, int(args.nodes))
+        from akrr.app_validate import app_validate, app_validate_batch
+        resources = [v.strip() for v in args.resource.split(",") if v.strip() != ""]
+        appkernels = [v.strip() for v in args.appkernel.split(",") if v.strip() != ""]
+        nodes_list = [int(v) for v in args.nodes.split(",") if v.strip() != ""]
+        if len(resources) * len(appkernels) * len(nodes_list) > 1:
+            app_validate_batch(resources, appkernels, nodes_list)
+        else:
+            app_validate(resources[0], appkernels[0], nodes_list[0])
 
     parser.set_defaults(func=handler)
 
@@ -432,6 +440,7 @@ def add_command_task(parent_parser):
     cli_task_list(subparsers)
     cli_task_delete(subparsers)
     cli_task_active_delete(subparsers)
+    cli_task_reprocess(subparsers)
 
 
 def cli_task_new(parent_parser):
@@ -575,6 +584,39 @@ def cli_task_active_delete(parent_parser):
     parser.set_defaults(func=handler)
 
 
+def cli_task_reprocess(parent_parser):
+    """
+    Reprocess output of completed tasks with current parsers and update results in DB
+    """
+    parser = parent_parser.add_parser('reprocess', description=cli_task_reprocess.__doc__)
+
+    parser.add_argument(
+        '-r', '--resource', help="reprocess tasks from resource (SQL LIKE pattern)")
+    parser.add_argument(
+        '-a', '--appkernel', help="reprocess tasks of app kernel (SQL LIKE pattern)")
+    parser.add_argument(
+        '-t0', '--time-start', help="reprocess tasks finished after that time")
+    parser.add_argument(
+        '-t1', '--time-end', help="reprocess tasks finished before that time")
+    parser.add_argument(
+        '-p', '--processes', type=int,
+        help="number of worker processes, default is max_task_handlers from akrr.conf")
+    parser.add_argument(
+        '--batch-size', type=int, default=100,
+        help="number of tasks between DB commits and checkpoints. Default: 100.")
+    parser.add_argument(
+        '--restart', action='store_true', help="ignore checkpoint of interrupted run and start from beginning")
+
+    def handler(args):
+        from akrr import daemon
+        sch = daemon.AkrrDaemon(adding_new_tasks=True)
+        sch.reprocess_completed_tasks(
+            args.resource, args.appkernel, args.time_start, args.time_end, verbose=args.verbose,
+            processes=args.processes, batch_size=args.batch_size, restart=args.restart)
+
+    parser.set_defaults(func=handler)
+
+
 def add_command_archive(parent_parser):
     """
     tar-gzip old app kernels output and logs
@@ -589,8 +631,17 @@ def add_command_archive(parent_parser):
         '-am', '--archive-months', default=6, type=int,
         help="tar-gzip completed tasks run at same month together if more than <archive-months> months passed."
         "Default: 6.")
+    parser.add_argument(
+        '-p', '--processes', type=int,
+        help="number of processes used for compression. Default: number of CPUs.")
     parser.add_argument('-cron', action='store_true', help="for launching by cron, no output on normal operation")
 
+    subparsers = parser.add_subparsers(title='commands')
+    cli_archive_remove_state_dumps(subparsers)
+    cli_archive_remove_tasks_workdir(subparsers)
+    cli_archive_update_layout(subparsers)
+    cli_archive_update_state_dumps(subparsers)
+
     def handler(args):
         from akrr.util import log
         from akrr.daemon import get_daemon_pid, daemon_start, daemon_stop
@@ -606,9 +657,9 @@ def add_command_archive(parent_parser):
             if args.archive_months <1:
                 log.error("archive_months should be at least 1")
                 exit(1)
-            Archive().remove_tasks_state_dumps(days_old=args.pickle_days)
-            Archive().archive_tasks(days_old=args.archive_days)
-            Archive().archive_tasks_by_months(months_old=args.archive_months)
+            Archive(processes=args.processes).remove_tasks_state_dumps(days_old=args.pickle_days)
+            Archive(processes=args.processes).archive_tasks(days_old=args.archive_days)
+            Archive(processes=args.processes).archive_tasks_by_months(months_old=args.archive_months)
 
     parser.set_defaults(func=handler)
 
@@ -680,6 +731,30 @@ def cli_archive_update_layout(parent_parser):
     parser.set_defaults(func=handler)
 
 
+def cli_archive_update_state_dumps(parent_parser):
+    """
+    convert tasks state dumps to binary pickle protocol and set latest state pointers
+    """
+    parser = parent_parser.add_parser(
+        'update-state-dumps', description=cli_archive_update_state_dumps.__doc__)
+
+    parser.add_argument(
+        '-r', '--resource', help="comma separated names of resources")
+    parser.add_argument(
+        '-a', '--appkernel', help="comma separated names of app kernels")
+    parser.add_argument(
+        '-p', '--protocol', type=int, default=None, help="pickle protocol to use. Default: 4.")
+    parser.add_argument('--comp-task-dir', help="complete tasks directory")
+    parser.add_argument('-d', '--dry-run', action='store_true', help="dry run")
+
+    def handler(args):
+        from akrr.archive import Archive
+        Archive(args.dry_run, args.comp_task_dir).update_tasks_state_dumps(
+            args.resource, args.appkernel, args.protocol)
+
+    parser.set_defaults(func=handler)
+
+
 def add_command_update(parent_parser):
     """AKRR update routings"""
     parser = parent_parser.add_parser('update',  description=add_command_archive.__doc__)
@@ -717,6 +792,36 @@ def add_command_update(parent_parser):
 
     parser.set_defaults(func=handler)
 
+    subparsers = parser.add_subparsers(title="update subcommands")
+    cli_update_db_schema(subparsers)
+
+
+def cli_update_db_schema(parent_parser):
+    """
+    Migrate mod_akrr task tables to InnoDB with indexes for daemon and REST API queries
+    and show EXPLAIN report of these queries
+    """
+    parser = parent_parser.add_parser('db-schema', description=cli_update_db_schema.__doc__)
+    parser.add_argument(
+        "--batch-size", default=10000, type=int,
+        help="number of rows copied per transaction during migration")
+    parser.add_argument(
+        "--explain-only", action="store_true", help="only show EXPLAIN report")
+    parser.add_argument(
+        "--drop-backup", action="store_true",
+        help="drop old MyISAM tables if row counts match after migration")
+    parser.add_argument("--dry-run", action="store_true", help="Dry run, print commands if possible")
+
+    def handler(args):
+        import akrr
+        akrr.dry_run = args.dry_run
+        from akrr.db_schema import update_db_schema
+        update_db_schema(
+            batch_size=args.batch_size, dry_run=args.dry_run, drop_backup=args.drop_backup,
+            explain_only=args.explain_only)
+
+    parser.set_defaults(func=handler)
+
 
 def cli_update_db_compare(parent_parser):
     """Copy mod_akrr database"""
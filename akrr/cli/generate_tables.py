@@ -137,8 +137,8 @@ mod_akrr_create_tables_dict = OrderedDict(
         `task_lock` INT(11) DEFAULT NULL,
         `time_to_start` DATETIME DEFAULT NULL,
         `repeat_in` CHAR(20) DEFAULT NULL,
-        `resource` TEXT,
-        `app` TEXT,
+        `resource` VARCHAR(255),
+        `app` VARCHAR(255),
         `resource_param` TEXT,
         `app_param` TEXT,
         `task_param` TEXT,
@@ -146,10 +146,19 @@ mod_akrr_create_tables_dict = OrderedDict(
         `fatal_errors_count` INT(4) DEFAULT '0',
         `fails_to_submit_to_the_queue` INT(4) DEFAULT '0',
         `taskexeclog` LONGTEXT,
-        `master_task_id` INT(4) NOT NULL DEFAULT '0' COMMENT '0 - independent task, otherwise task_id of master task ',
+        `nnodes` INT(11) DEFAULT NULL,
+        `ncores` INT(11) DEFAULT NULL,
+        `test_run` TINYINT(1) NOT NULL DEFAULT '0',
+        `n_runs` INT(11) NOT NULL DEFAULT '1',
+        `master_task_id` INT(11) NOT NULL DEFAULT '0' COMMENT '0 - independent task, otherwise task_id of master task ',
         `parent_task_id` INT(11) DEFAULT NULL,
-        UNIQUE KEY `task_id` (`task_id`)
-        ) ENGINE=MyISAM DEFAULT CHARSET=utf8;
+        UNIQUE KEY `task_id` (`task_id`),
+        KEY `task_lock_next_check_time` (`task_lock`, `next_check_time`),
+        KEY `resource_app_nnodes` (`resource`, `app`, `nnodes`),
+        KEY `nnodes` (`nnodes`),
+        KEY `master_task_id` (`master_task_id`),
+        KEY `parent_task_id` (`parent_task_id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
         '''),
         ('ak_on_nodes', '''
         CREATE TABLE IF NOT EXISTS `ak_on_nodes` (
@@ -180,8 +189,38 @@ mod_akrr_create_tables_dict = OrderedDict(
         `stderr` LONGTEXT,
         `stdout` LONGTEXT,
         `taskexeclog` LONGTEXT,
-        UNIQUE KEY `task_id` (`task_id`)
-        ) ENGINE=MyISAM DEFAULT CHARSET=utf8;
+        UNIQUE KEY `task_id` (`task_id`),
+        KEY `err_regexp_id` (`err_regexp_id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+        '''),
+        ('akrr_output_blob', '''
+        CREATE TABLE IF NOT EXISTS `akrr_output_blob` (
+        `id` INT(11) NOT NULL AUTO_INCREMENT,
+        `sha256` CHAR(64) NOT NULL COMMENT 'sha256 of uncompressed content',
+        `size` BIGINT NOT NULL COMMENT 'uncompressed size',
+        `compressed_size` BIGINT NOT NULL,
+        `chunks` INT(11) NOT NULL,
+        `complete` TINYINT(1) NOT NULL DEFAULT '0' COMMENT 'all chunks are written',
+        PRIMARY KEY (`id`),
+        UNIQUE KEY `sha256` (`sha256`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+        '''),
+        ('akrr_output_chunk', '''
+        CREATE TABLE IF NOT EXISTS `akrr_output_chunk` (
+        `blob_id` INT(11) NOT NULL,
+        `seq` INT(11) NOT NULL,
+        `data` LONGBLOB NOT NULL COMMENT 'part of gzip compressed content',
+        PRIMARY KEY (`blob_id`, `seq`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+        '''),
+        ('akrr_task_output', '''
+        CREATE TABLE IF NOT EXISTS `akrr_task_output` (
+        `task_id` INT(11) NOT NULL,
+        `name` VARCHAR(32) NOT NULL COMMENT 'appstdout, stderr, stdout or taskexeclog',
+        `blob_id` INT(11) NOT NULL,
+        PRIMARY KEY (`task_id`, `name`),
+        KEY `blob_id` (`blob_id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
         '''),
         ('akrr_err_regexp', '''
         CREATE TABLE IF NOT EXISTS `akrr_err_regexp` (
@@ -242,8 +281,11 @@ mod_akrr_create_tables_dict = OrderedDict(
         `nodes` TEXT,
         `ncores` INT(11) DEFAULT NULL,
         `nnodes` INT(11) DEFAULT NULL,
-        UNIQUE KEY `instance_id` (`instance_id`)
-        ) ENGINE=MyISAM DEFAULT CHARSET=utf8;
+        UNIQUE KEY `instance_id` (`instance_id`),
+        KEY `resource_reporternickname_collected` (`resource`, `reporternickname`, `collected`),
+        KEY `status_collected` (`status`, `collected`),
+        KEY `committed` (`committed`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
         '''),
         ('completed_tasks', '''
         CREATE TABLE IF NOT EXISTS `completed_tasks` (
@@ -256,17 +298,25 @@ mod_akrr_create_tables_dict = OrderedDict(
         `time_activated` DATETIME DEFAULT NULL,
         `time_submitted_to_queue` DATETIME DEFAULT NULL,
         `repeat_in` CHAR(20) DEFAULT NULL,
-        `resource` TEXT,
-        `app` TEXT,
+        `resource` VARCHAR(255),
+        `app` VARCHAR(255),
         `resource_param` TEXT,
         `app_param` TEXT,
         `task_param` TEXT,
         `group_id` TEXT,
         `fatal_errors_count` INT(11) DEFAULT '0',
         `fails_to_submit_to_the_queue` INT(11) DEFAULT '0',
+        `nnodes` INT(11) DEFAULT NULL,
+        `ncores` INT(11) DEFAULT NULL,
+        `test_run` TINYINT(1) NOT NULL DEFAULT '0',
+        `n_runs` INT(11) NOT NULL DEFAULT '1',
+        `master_task_id` INT(11) NOT NULL DEFAULT '0',
         `parent_task_id` INT(11) DEFAULT NULL,
-        UNIQUE KEY `task_id` (`task_id`)
-        ) ENGINE=MyISAM DEFAULT CHARSET=utf8;
+        UNIQUE KEY `task_id` (`task_id`),
+        KEY `time_finished` (`time_finished`),
+        KEY `resource_app_time_finished` (`resource`, `app`, `time_finished`),
+        KEY `nnodes` (`nnodes`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
         '''),
         ('nodes', '''
         CREATE TABLE IF NOT EXISTS `nodes` (
@@ -281,15 +331,24 @@ mod_akrr_create_tables_dict = OrderedDict(
         `task_id` INT(11) NOT NULL AUTO_INCREMENT,
         `time_to_start` DATETIME DEFAULT NULL,
         `repeat_in` CHAR(20) DEFAULT NULL,
-        `resource` TEXT,
-        `app` TEXT,
+        `resource` VARCHAR(255),
+        `app` VARCHAR(255),
         `resource_param` TEXT,
         `app_param` TEXT,
         `task_param` TEXT,
         `group_id` TEXT,
+        `nnodes` INT(11) DEFAULT NULL,
+        `ncores` INT(11) DEFAULT NULL,
+        `test_run` TINYINT(1) NOT NULL DEFAULT '0',
+        `n_runs` INT(11) NOT NULL DEFAULT '1',
+        `master_task_id` INT(11) NOT NULL DEFAULT '0',
         `parent_task_id` INT(16) DEFAULT NULL,
-        PRIMARY KEY (`task_id`)
-        ) ENGINE=MyISAM AUTO_INCREMENT=3144529 DEFAULT CHARSET=utf8;
+        PRIMARY KEY (`task_id`),
+        KEY `time_to_start` (`time_to_start`),
+        KEY `resource_app_time_to_start` (`resource`, `app`, `time_to_start`),
+        KEY `nnodes` (`nnodes`),
+        KEY `parent_task_id` (`parent_task_id`)
+        ) ENGINE=InnoDB AUTO_INCREMENT=3144529 DEFAULT CHARSET=utf8;
         '''),
         ('resources', '''
         CREATE TABLE IF NOT EXISTS resources (
@@ -327,7 +386,9 @@ mod_akrr_create_tables_dict = OrderedDict(
         CREATE OR REPLACE VIEW `akrr_erran` AS select `c`.`task_id` AS `task_id`,`c`.`time_finished` AS `time_finished`,
         `c`.`resource` AS `resource`,`c`.`app` AS `app`,`c`.`resource_param` AS `resource_param`,
         `ii`.`status` AS `status`,`ii`.`walltime` AS `walltime`,`ii`.`body` AS `body`,`em`.`appstdout` AS `appstdout`,
-        `em`.`stderr` AS `stderr`,`em`.`stdout` AS `stdout` from ((`completed_tasks` `c` join 
+        `em`.`stderr` AS `stderr`,`em`.`stdout` AS `stdout`,
+        exists(select 1 from `akrr_task_output` `o` where `o`.`task_id` = `c`.`task_id`) AS `output_in_blobs`
+        from ((`completed_tasks` `c` join 
         `akrr_xdmod_instanceinfo` `ii`) join `akrr_errmsg` `em`) 
         where ((`c`.`task_id` = `ii`.`instance_id`) and (`c`.`task_id` = `em`.`task_id`));
         '''),
@@ -337,7 +398,8 @@ mod_akrr_create_tables_dict = OrderedDict(
         `ct`.`resource_param` AS `resource_param`,`ii`.`status` AS `status`,`em`.`err_regexp_id` AS `err_regexp_id`,
         `re`.`err_msg` AS `err_msg`,`ii`.`walltime` AS `walltime`,`ct`.`status` AS `akrr_status`,
         `ct`.`status` AS `akrr_status_info`,`em`.`appstdout` AS `appstdout`,`em`.`stderr` AS `stderr`,
-        `em`.`stdout` AS `stdout`,`ii`.`body` AS `ii_body`,`ii`.`message` AS `ii_msg` 
+        `em`.`stdout` AS `stdout`,`ii`.`body` AS `ii_body`,`ii`.`message` AS `ii_msg`,
+        exists(select 1 from `akrr_task_output` `o` where `o`.`task_id` = `ct`.`task_id`) AS `output_in_blobs`
         from (((`completed_tasks` `ct` join `akrr_xdmod_instanceinfo` `ii`) join `akrr_errmsg` `em`) 
         join `akrr_err_regexp` `re`) where ((`ct`.`task_id` = `ii`.`instance_id`) 
         and (`ct`.`task_id` = `em`.`task_id`) and (`re`.`id` = `em`.`err_regexp_id`));
@@ -1094,6 +1156,25 @@ def copy_mod_akrr_to_mod_akrr2(mod_akrr, mod_akrr2):
         "akrr_errmsg",
         "task_id,err_regexp_id,appstdout,stderr,stdout,taskexeclog",
         at_once=False)
+
+    # task output storage, absent in older versions
+    cur_akrr.execute("SHOW TABLES LIKE 'akrr_output_blob'")
+    if len(cur_akrr.fetchall()) > 0:
+        copy_table_with_rename(
+            cur_akrr, cur_akrr2,
+            "akrr_output_blob",
+            "id,sha256,size,compressed_size,chunks,complete",
+            at_once=False)
+        copy_table_with_rename(
+            cur_akrr, cur_akrr2,
+            "akrr_output_chunk",
+            "blob_id,seq,data",
+            at_once=False)
+        copy_table_with_rename(
+            cur_akrr, cur_akrr2,
+            "akrr_task_output",
+            "task_id,name,blob_id",
+            at_once=False)
     return
 
 
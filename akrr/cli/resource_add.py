@@ -129,6 +129,7 @@ def create_resource_config(file_path, queuing_system):
         with open(file_path, 'w') as fout:
             fout.write(template)
         fout.close()
+        cfg.invalidate_cfg_cache()
     else:
         log.info(
             'Dry Run Mode: Would have written to: {}'
@@ -22,6 +22,7 @@ import akrr.util.log as log
 import akrr.util.openstack
 import akrr.util.googlecloud
 from akrr.util.ssh import check_dir
+from akrr.util.task_param import parse_param
 from akrr.akrr_task import get_local_task_dir
 
 pp = pprint.PrettyPrinter(indent=4)
@@ -130,6 +131,29 @@ def connect_to_resource(resource):
         exit(1)
 
 
+def check_private_keys(resources):
+    """check that ssh private keys of all resources are accessible before connecting to any of them"""
+    for resource in resources:
+        if resource['ssh_private_key_file'] is not None and os.path.isfile(resource['ssh_private_key_file']) is False:
+            log.error("Can not access ssh private key (%s) of %s", resource['ssh_private_key_file'], resource['name'])
+            exit(1)
+
+
+def run_on_resources(func, resources, max_workers=None):
+    """
+    call func(resource) for each resource in bounded thread pool (cfg.deploy_max_parallel_resources
+    threads by default) and return results in resources order, exception of any call is re-raised
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if max_workers is None:
+        max_workers = cfg.deploy_max_parallel_resources
+    max_workers = max(1, min(max_workers, len(resources)))
+    if max_workers == 1:
+        return [func(resource) for resource in resources]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, resources))
+
+
 def check_shell(rsh, resource):
     log.info("Checking if shell is BASH\n")
     msg = akrr.util.ssh.ssh_command(rsh, "echo $BASH")
@@ -287,8 +311,10 @@ def check_connection_to_rest_api():
         raise e
 
 
-def get_test_job_lock_filename(resource, app_name="test"):
-    return os.path.join(cfg.data_dir, resource["name"] + "_" + app_name + "_task.dat")
+def get_test_job_lock_filename(resource, app_name="test", nodes=None):
+    if nodes is None:
+        return os.path.join(cfg.data_dir, resource["name"] + "_" + app_name + "_task.dat")
+    return os.path.join(cfg.data_dir, "%s_%s_%d_task.dat" % (resource["name"], app_name, nodes))
 
 
 def check_if_test_job_already_submitted(resource, app_name="test"):
@@ -562,7 +588,7 @@ def analyse_test_job_results(task_id, resource, app_name="test"):
 
         nodes = parameters['RunEnv:Nodes'].split()
 
-        requested_nodes = eval(completed_tasks['resource_param'])['nnodes']
+        requested_nodes = parse_param(completed_tasks['resource_param'])['nnodes']
 
         str_io = io.StringIO()
         try:
@@ -629,6 +655,137 @@ def run_test_job(resource, app_name="test", nodes=2):
     os.remove(get_test_job_lock_filename(resource, app_name))
 
 
+def submit_test_jobs(tests):
+    """
+    submit several test jobs in one request, tests is list of (resource, app_name, nodes),
+    return list of task ids in same order
+    """
+    tasks = [{
+        'resource': resource['name'],
+        'app': app_name,
+        'resource_param': "{'nnodes':%d}" % nodes,
+        'task_param': "{'test_run':True}"
+    } for resource, app_name, nodes in tests]
+
+    r = None
+    try:
+        r = akrrrestclient.post('/scheduled_tasks/bulk', json={'tasks': tasks})
+        if r.status_code != 200:
+            log.error(
+                "Can not submit tasks through AKRR REST API ( %s )\nSee server response below\n%s\n",
+                akrrrestclient.restapi_host, json.dumps(r.json(), indent=4))
+            exit(1)
+        task_ids = r.json()['data']['data']['task_ids']
+    except Exception as e:
+        log.critical(
+            "Can not submit tasks through AKRR REST API ( %s )\n"
+            "Is it still running?\nSee full error report below\n%s",
+            akrrrestclient.restapi_host, "" if r is None else r.text)
+        raise e
+
+    # write files with task_id
+    for (resource, app_name, nodes), task_id in zip(tests, task_ids):
+        with open(get_test_job_lock_filename(resource, app_name, nodes), "w") as fout:
+            print(task_id, file=fout)
+
+    log.info("\nSubmitted %d test jobs to AKRR, task_ids are %s\n", len(task_ids), ", ".join(map(str, task_ids)))
+    return task_ids
+
+
+def monitor_test_jobs(task_ids):
+    """
+    monitor progress of several jobs with one request per cycle, wait till all jobs are done,
+    return dict task_id->tasks record from REST API
+    """
+    status_prev = {}
+    tasks = {}
+    bad_cycles = 0
+    while True:
+        t = datetime.datetime.now()
+        try:
+            r = akrrrestclient.get('/tasks/bulk', params={'task_ids': ",".join(map(str, task_ids))})
+        except requests.RequestException as e:
+            bad_cycles += 1
+            if bad_cycles > 10:
+                log.error("Something wrong with REST API")
+                raise e
+            time.sleep(checking_frequency)
+            continue
+
+        if r.status_code == 200:
+            # json keys are strings
+            tasks = {int(k): v for k, v in r.json()['data']['data'].items()}
+            msg_body = ""
+            for task_id in task_ids:
+                task = tasks.get(task_id, {'queue': None, 'data': None})
+                if task['queue'] == "active_tasks":
+                    status = "active: " + str(task['data']['status'])
+                elif task['queue'] == "scheduled_tasks":
+                    status = "scheduled to start on " + str(task['data']['time_to_start'])
+                elif task['queue'] == "completed_tasks":
+                    status = "completed: " + str(task['data']['completed_tasks']['status'])
+                else:
+                    status = "not found"
+                if status_prev.get(task_id, None) != status:
+                    msg_body += "task %d is %s\n" % (task_id, status)
+                status_prev[task_id] = status
+
+            tail_msg = "time: " + t.strftime("%Y-%m-%d %H:%M:%S")
+            if msg_body != "":
+                print("\n\n" + msg_body)
+                print(tail_msg, end=' ')
+            else:
+                print("\r" + tail_msg, end=' ')
+            sys.stdout.flush()
+
+            if all(tasks.get(task_id, {'queue': None})['queue'] in ("completed_tasks", None) for task_id in task_ids):
+                break
+        else:
+            bad_cycles += 1
+            if bad_cycles > 3:
+                log.error("Something wrong, REST API said: %s", r.text)
+                break
+
+        time.sleep(checking_frequency)
+    print("\n\n")
+    return tasks
+
+
+def get_test_job_result(task):
+    """
+    quick evaluation of test job record from REST API,
+    return (success, message)
+    """
+    if task is None or task['queue'] is None:
+        return False, "task is not found"
+    if task['queue'] != "completed_tasks":
+        return False, "task is not completed"
+    completed_tasks = task['data']['completed_tasks']
+    akrr_xdmod_instance_info = task['data'].get('akrr_xdmod_instanceinfo', None)
+    if completed_tasks['status'].count("ERROR") > 0:
+        return False, completed_tasks['status']
+    if akrr_xdmod_instance_info is None:
+        return False, "akrr_xdmod_instance_info is not present"
+    if akrr_xdmod_instance_info['status'] == 0:
+        return False, "task execution was not successful: " + str(akrr_xdmod_instance_info['message'])
+    return True, completed_tasks['status_info']
+
+
+def make_test_jobs_report(results):
+    """
+    make consolidated report, results is list of (resource_name, app_name, nodes, task_id, success, message)
+    """
+    from prettytable import PrettyTable
+    pt = PrettyTable()
+    pt.field_names = ["Resource", "App", "Nodes", "Task Id", "Result", "Message"]
+    pt.align["Message"] = "l"
+    for resource_name, app_name, nodes, task_id, success, message in results:
+        message = str(message).strip().splitlines()
+        pt.add_row([resource_name, app_name, nodes, task_id, "OK" if success else "FAILED",
+                    message[0][:80] if len(message) > 0 else ""])
+    return str(pt)
+
+
 def append_to_bashrc(resource):
     # append environment variables to .bashrc
     log.info("\nAdding AKRR enviroment variables to resource's .bashrc!\n")
@@ -756,6 +913,10 @@ def resource_deploy(args):
     log.error_count = 0
     log.warning_count = 0
 
+    if "," in resource_name:
+        return resource_deploy_batch(
+            [r.strip() for r in resource_name.split(",") if r.strip() != ""], app_name, nodes, args.overwrite)
+
     # validate resource configuration and get config
     resource = validate_resource_parameter_file(resource_name)
 
@@ -846,3 +1007,67 @@ def resource_deploy(args):
         log.warning("There are %d warnings.\nif warnings have sense you can move to next step!\n", log.warning_count)
     if log.error_count == 0 and log.warning_count == 0:
         log.info("\nDONE, you can move to next step!\n")
+
+
+def resource_deploy_batch(resource_names, app_name="test", nodes=2, overwrite=False):
+    """
+    deploy several resources, remote checks are done for several resources at a time
+    while test jobs are submitted together and monitored with single poll
+    """
+    resources = []
+    for resource_name in resource_names:
+        resource = validate_resource_parameter_file(resource_name)
+        if resource['batch_scheduler'].lower() in ("openstack", "googlecloud"):
+            log.error("Cloud resource %s can not be deployed in batch mode, deploy it separately", resource_name)
+            exit(1)
+        resources.append(resource)
+
+    check_private_keys(resources)
+
+    def deploy(resource):
+        rsh = connect_to_resource(resource)
+        check_shell(rsh, resource)
+        check_create_dirs(rsh, resource)
+        copy_exec_sources_and_inputs(rsh, resource, overwrite=overwrite)
+        check_appsig(rsh, resource)
+        rsh.close(force=True)
+
+    run_on_resources(deploy, resources)
+
+    log.info("Will send test jobs to queue, wait till they executed and will analyze the output")
+    check_connection_to_rest_api()
+
+    if akrr.dry_run:
+        return
+
+    tests = [(resource, app_name, nodes) for resource in resources]
+    task_ids = submit_test_jobs(tests)
+    tasks = monitor_test_jobs(task_ids)
+
+    results = []
+    for (resource, _, _), task_id in zip(tests, task_ids):
+        success, message = get_test_job_result(tasks.get(task_id, None))
+        if success:
+            # detailed analysis, it can only add errors at this point
+            error_count = log.error_count
+            analyse_test_job_results(task_id, resource, app_name)
+            if log.error_count > error_count:
+                success = False
+                message = "%d errors in test job output analysis" % (log.error_count - error_count)
+        else:
+            log.error_count += 1
+        results.append((resource['name'], app_name, nodes, task_id, success, message))
+        os.remove(get_test_job_lock_filename(resource, app_name, nodes))
+
+        if success:
+            append_to_bashrc(resource)
+            enable_resource_for_execution(resource)
+
+    log.empty_line()
+    log.info("Result:\n%s", make_test_jobs_report(results))
+    if log.error_count > 0:
+        log.error("There are %d errors, fix them.", log.error_count)
+    if log.warning_count > 0:
+        log.warning("There are %d warnings.\nif warnings have sense you can move to next step!\n", log.warning_count)
+    if log.error_count == 0 and log.warning_count == 0:
+        log.info("\nDONE, you can move to next step!\n")
@@ -512,7 +512,7 @@ class AKRRSetup:
             'data_dir': "../log/data",
             'completed_tasks_dir': "../log/comptasks",
             'max_task_handlers': 4,
-            'task_pickling_protocol': 0,
+            'task_pickling_protocol': 4,
             'scheduled_tasks_loop_sleep_time': 1.0,
             'max_fatal_errors_for_task': 10,
             'active_task_default_attempt_repeat': 'datetime.timedelta(minutes=30)',
@@ -584,7 +584,7 @@ class AKRRSetup:
             #cfg['data_dir'] = self.update.old_cfg['data_dir']
             #cfg['completed_tasks_dir'] = self.update.old_cfg['completed_tasks_dir']
             cfg['max_task_handlers'] = self.update.old_cfg['max_task_handlers']
-            cfg['task_pickling_protocol'] = self.update.old_cfg['task_pickling_protocol']
+            cfg['task_pickling_protocol'] = max(self.update.old_cfg['task_pickling_protocol'], 4)
             cfg['scheduled_tasks_loop_sleep_time'] = self.update.old_cfg['scheduled_tasks_loop_sleep_time']
             cfg['max_fatal_errors_for_task'] = self.update.old_cfg['max_fatal_errors_for_task']
             cfg['active_task_default_attempt_repeat'] = repr(self.update.old_cfg['active_task_default_attempt_repeat'])
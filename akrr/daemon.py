@@ -5,8 +5,11 @@ import sys
 import datetime
 import re
 import multiprocessing
+import multiprocessing.connection
 import signal
+import heapq
 import copy
+import itertools
 import subprocess
 import socket
 from collections import OrderedDict
@@ -16,10 +19,16 @@ from akrr import cfg
 import akrr.db
 
 import akrr.util.time
+import akrr.util.sql
+import akrr.util.task_output
+from akrr.util.error_classifier import ErrorClassifier, unknown_error_id
+from akrr.util.progress_checkpoint import ProgressCheckpoint, get_status_summary
+from akrr.util.task_param import parse_param, get_param_columns, param_columns
 from akrr.util.time import time_stamp_to_datetime_str
 from akrr.util import log
 from akrr import akrr_task
 from akrr.util import make_dirs
+from akrr.util import state_store
 import akrr.akrrrestclient
 import akrr.util.openstack
 import akrr.util.googlecloud
@@ -32,18 +41,22 @@ akrr_scheduler = None
 class _FakeProcess:
     def __init__(self):
         self.exitcode = 0
-        self.is_alive = True
+        self.sentinel = None
+        self._is_alive = True
 
     def join(self, _):
-        self.is_alive = False
+        self._is_alive = False
         return
 
     def is_alive(self):
-        return self.is_alive
+        return self._is_alive
 
 
-def _start_the_task_step(resource_name, app_name, time_stamp, results_queue,
-                         fatal_errors_count=0, fails_to_submit_to_the_queue=0):
+def _run_the_task_step(resource_name, app_name, time_stamp,
+                       fatal_errors_count=0, fails_to_submit_to_the_queue=0):
+    """
+    Execute next step of the task, return results dict or None on failure
+    """
     try:
         # Redirect logging
         task_dir = akrr_task.get_local_task_dir(resource_name, app_name, time_stamp)
@@ -62,26 +75,303 @@ def _start_the_task_step(resource_name, app_name, time_stamp, results_queue,
             akrr_task.dump_task_handler(th)
 
         m_pid = os.getpid()
-        results_queue.put({
+        result = {
             'pid': m_pid,
             "status": th.status,
             "status_info": th.status_info,
             "repeat_in": repeat_in,
             "fatal_errors_count": th.fatal_errors_count,
             "fails_to_submit_to_the_queue": th.fails_to_submit_to_the_queue,
-        })
+        }
 
         # Redirect logging back
         if cfg.redirect_task_processing_to_log_file:
             akrr_task.redirect_stdout_back()
 
-        return 0
+        return result
     except Exception as e:
         log.exception("Exception was thrown during StartTheStep")
         log.log_traceback(str(e))
         if akrr_task.log_file is not None:
             akrr_task.redirect_stdout_back()
+        return None
+
+
+def _start_the_task_step(resource_name, app_name, time_stamp, results_queue,
+                         fatal_errors_count=0, fails_to_submit_to_the_queue=0):
+    """
+    Execute next step of the task and put results to results_queue
+    """
+    result = _run_the_task_step(resource_name, app_name, time_stamp, fatal_errors_count, fails_to_submit_to_the_queue)
+    if result is None:
         return 1
+    results_queue.put(result)
+    return 0
+
+
+def _task_step_worker_loop(conn):
+    """
+    Main function of task step worker process, execute task steps received
+    from conn and send back results until None is received
+    """
+    # termination is handled by master, workers just die on SIGTERM
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        result = _run_the_task_step(
+            request['resource_name'], request['app_name'], request['time_stamp'],
+            request['fatal_errors_count'], request['fails_to_submit_to_the_queue'])
+        conn.send({'task_id': request['task_id'], 'result': result})
+    conn.close()
+
+
+class _TaskStepWorker:
+    """
+    Long-lived worker process, it executes task steps one by one, so that
+    imported modules, connections and caches are reused between steps
+    """
+    def __init__(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_task_step_worker_loop, args=(child_conn,))
+        self.process.start()
+        child_conn.close()
+        self.pid = self.process.pid
+        self.task_id = None
+
+    def is_busy(self):
+        return self.task_id is not None
+
+    def submit(self, task_id, resource_name, app_name, time_stamp, fatal_errors_count=0,
+               fails_to_submit_to_the_queue=0):
+        """send task step for execution"""
+        self.conn.send({
+            'task_id': task_id,
+            'resource_name': resource_name,
+            'app_name': app_name,
+            'time_stamp': time_stamp,
+            'fatal_errors_count': fatal_errors_count,
+            'fails_to_submit_to_the_queue': fails_to_submit_to_the_queue
+        })
+        self.task_id = task_id
+
+    def has_result(self):
+        """return True if step is finished and result can be read without blocking"""
+        try:
+            return self.conn.poll()
+        except (EOFError, OSError):
+            return False
+
+    def get_result(self):
+        """
+        return step results dict, None if step has failed, should be called only if has_result
+        """
+        try:
+            r = self.conn.recv()
+        except (EOFError, OSError):
+            return None
+        finally:
+            self.task_id = None
+        return r['result']
+
+    def terminate(self):
+        self.process.terminate()
+
+    def discard(self, timeout=0.5):
+        """release worker which was terminated or died, its pipe is closed"""
+        self.process.join(timeout)
+        self.conn.close()
+
+    def stop(self, timeout=5.0):
+        """ask worker to exit, terminate it if it does not"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+
+
+# DB connection of reprocessing worker process
+_reprocess_db = None
+_reprocess_cur = None
+# True if tables written by reprocessing are InnoDB, i.e. changes of failed task can be rolled back
+_reprocess_innodb = None
+
+# tables with rows of task results (table, task id column) and blob storage of task output
+_reprocess_task_tables = (("akrr_xdmod_instanceinfo", "instance_id"), ("akrr_errmsg", "task_id"),
+                          ("akrr_task_output", "task_id"))
+_reprocess_tables = tuple(table for table, _ in _reprocess_task_tables) + ("akrr_output_blob", "akrr_output_chunk")
+
+
+def _reprocess_task(task, cur):
+    """
+    process results of completed task with current task handler and push them to DB with cur,
+    task is (task_id, time_finished, status, status_info, datetime_stamp, resource, app).
+    Return dict with old and new status.
+    """
+    task_id, time_finished, status, status_info, datetime_stamp, resource, app = task
+    r = {'task_id': task_id, 'status': status, 'status_info': status_info,
+         'new_status': None, 'new_status_info': None, 'error': None}
+    try:
+        task_dir = akrr_task.get_local_task_dir(resource, app, datetime_stamp, False)
+        proc_task_dir = os.path.join(task_dir, 'proc')
+        # only the latest state is needed, earlier states are kept in proc directory as history
+        pickle_filename = state_store.get_latest_state(proc_task_dir)
+        if pickle_filename is None:
+            raise AkrrError("Can not find pickled task handler in %s" % proc_task_dir)
+        th = akrr_task.get_task_handler_from_pkl(pickle_filename)
+        th.statefilename = os.path.basename(pickle_filename)
+        th.set_dir_names(cfg.completed_tasks_dir)
+
+        th.process_results()
+        th.push_to_db_raw(cur, task_id, time_finished)
+
+        r['new_status'] = th.status
+        r['new_status_info'] = th.status_info
+    except Exception as e:
+        r['error'] = str(e)
+    return r
+
+
+def _get_task_rows(cur, task_id):
+    """return {table: (columns, rows)} of task result rows"""
+    task_rows = {}
+    for table, column in _reprocess_task_tables:
+        cur.execute("SELECT * FROM %s WHERE %s=%%s" % (table, column), (task_id,))
+        rows = cur.fetchall()
+        columns = [d[0] for d in cur.description]
+        task_rows[table] = (columns, [[row[c] for c in columns] if isinstance(row, dict) else list(row)
+                                      for row in rows])
+    return task_rows
+
+
+def _restore_task_rows(cur, task_id, task_rows):
+    """
+    restore task result rows saved by _get_task_rows, used on MyISAM where failed task can not be
+    rolled back. Output blobs stored by failed attempt are deleted if they are not referenced.
+    """
+    cur.execute("SELECT blob_id FROM akrr_task_output WHERE task_id=%s", (task_id,))
+    blob_ids = akrr.util.task_output._first_column(cur.fetchall())
+    for table, column in _reprocess_task_tables:
+        cur.execute("DELETE FROM %s WHERE %s=%%s" % (table, column), (task_id,))
+        columns, rows = task_rows[table]
+        if len(rows) > 0:
+            cur.executemany("INSERT INTO %s (%s) VALUES (%s)" % (
+                table, ",".join(columns), ",".join(["%s"] * len(columns))), rows)
+    akrr.util.task_output._delete_unreferenced_blobs(cur, blob_ids)
+
+
+def _reprocess_tasks(tasks):
+    """
+    reprocess chunk of tasks (see _reprocess_task) and commit them in single transaction,
+    changes of failed task are rolled back to its savepoint (restored explicitly on MyISAM).
+    Return list of results.
+    """
+    global _reprocess_db, _reprocess_cur, _reprocess_innodb
+    if _reprocess_cur is None:
+        _reprocess_db, _reprocess_cur = akrr.db.get_akrr_db()
+    if _reprocess_innodb is None:
+        from akrr.db_schema import tables_support_transactions
+        _reprocess_innodb = tables_support_transactions(_reprocess_cur, _reprocess_tables)
+
+    results = []
+    for task in tasks:
+        task_rows = None if _reprocess_innodb else _get_task_rows(_reprocess_cur, task[0])
+        _reprocess_cur.execute("SAVEPOINT reprocess_task")
+        r = _reprocess_task(task, _reprocess_cur)
+        if r['error'] is not None:
+            _reprocess_cur.execute("ROLLBACK TO SAVEPOINT reprocess_task")
+            if task_rows is not None:
+                try:
+                    _restore_task_rows(_reprocess_cur, task[0], task_rows)
+                except Exception as e:
+                    r['error'] += "; can not restore previous results: " + str(e)
+        results.append(r)
+    try:
+        _reprocess_db.commit()
+    except Exception as e:
+        _reprocess_db.rollback()
+        for r in results:
+            if r['error'] is None:
+                r['error'] = "Can not commit: " + str(e)
+    return results
+
+
+def _classify_task_error(classifier, cur, task_id, resource, akrr_status, akrr_status_info):
+    """
+    return (task_id, err_regexp_id) for failed task, output of task is loaded with cur
+    """
+    fields = akrr.util.task_output.load_task_output(cur, task_id, names=("appstdout", "stderr", "stdout"))
+    fields["akrr_status"] = akrr_status
+    fields["akrr_status_info"] = akrr_status_info
+
+    match = classifier.classify(resource, fields)
+    if match is None:
+        log.debug("Task %s: unknown error", task_id)
+        return task_id, unknown_error_id
+    log.debug("Task %s: reg_exp_id=%s found in %s", task_id, match[0], match[1])
+    return task_id, match[0]
+
+
+# Error classifier and DB connection of error analysis worker process
+_error_analysis_classifier = None
+_error_analysis_db = None
+_error_analysis_cur = None
+
+
+def _error_analysis_worker_init(classifier, cur=None):
+    global _error_analysis_classifier, _error_analysis_cur
+    _error_analysis_classifier = classifier
+    _error_analysis_cur = cur
+
+
+def _error_analysis_worker(task):
+    """classify error of task (task_id, resource, akrr_status, akrr_status_info)"""
+    global _error_analysis_db, _error_analysis_cur
+    if _error_analysis_cur is None:
+        _error_analysis_db, _error_analysis_cur = akrr.db.get_akrr_db()
+    task_id, resource, akrr_status, akrr_status_info = task
+    return _classify_task_error(
+        _error_analysis_classifier, _error_analysis_cur, task_id, resource, akrr_status, akrr_status_info)
+
+
+def _update_err_regexp_ids(cur, updates):
+    """set err_regexp_id in akrr_errmsg, updates maps err_regexp_id to list of task_id"""
+    for reg_exp_id, task_ids in updates.items():
+        for i in range(0, len(task_ids), 1000):
+            batch = task_ids[i:i + 1000]
+            cur.execute(
+                "UPDATE akrr_errmsg SET err_regexp_id=%s WHERE task_id IN (" + ",".join(["%s"] * len(batch)) + ")",
+                [reg_exp_id] + list(batch))
+
+
+# set when mod_akrr schema is checked in this process
+_db_schema_checked = False
+
+
+def _check_db_schema(cur):
+    """
+    refuse to work with mod_akrr tables of older AKRR version, otherwise task activation
+    would fail on first INSERT with typed task parameters columns
+    """
+    global _db_schema_checked
+    if _db_schema_checked:
+        return
+    from akrr.db_schema import check_param_columns
+    check_param_columns(cur)
+    _db_schema_checked = True
 
 
 class AkrrDaemon:
@@ -93,16 +383,26 @@ class AkrrDaemon:
         self.restapi_proc = None
         # load Scheduled Tasks DB
         self.dbCon, self.dbCur = akrr.db.get_akrr_db()
+        _check_db_schema(self.dbCur)
+        # savepoints work only on InnoDB, on MyISAM changes of failed task activation are undone explicitly
+        from akrr.db_schema import tables_support_transactions
+        self.task_tables_innodb = tables_support_transactions(self.dbCur, ("scheduled_tasks", "active_tasks"))
 
         # Sanitizing, set task_lock to 0 in case if previous instance didn't exit properly
         if not adding_new_tasks:
             self.dbCur.execute("UPDATE active_tasks SET task_lock=0 WHERE task_lock>0 ;")
+            # InnoDB of older MySQL resets AUTO_INCREMENT on restart, do not reuse task ids
+            from akrr.db_schema import sync_task_id_counter
+            sync_task_id_counter(self.dbCur)
             self.dbCon.commit()
         #
         self.maxTaskHandlers = cfg.max_task_handlers
         self.max_wall_time_for_task_handlers = cfg.max_wall_time_for_task_handlers
 
+        # task steps in execution
         self.workers = []
+        # long-lived task step worker processes
+        self.worker_pool = []
         self.Results = {}
         self.ResultsQueue = multiprocessing.Queue()
 
@@ -120,6 +420,19 @@ class AkrrDaemon:
         self.timer_no_new_tasks = None
         self.timer_no_active_tasks_check = None
 
+        # heap of (time, event type, task_id) events, event type is 'scheduled' for activation of
+        # scheduled task and 'active' for next step of active task
+        self.timers = []
+        self.timers_seed_time = None
+        self.timers_need_reseed = True
+        # set if scheduled tasks were not activated due to limits on number of active tasks
+        self.scheduled_tasks_blocked = False
+        # set if active tasks were not started due to all workers are busy
+        self.active_tasks_pending = False
+        # pipe for waking up the main loop from REST API and signal handlers
+        self.wakeup_reader = None
+        self.wakeup_writer = None
+
     def __del__(self):
         if getattr(self, 'dbCon', None) is not None:
             self.dbCon.commit()
@@ -143,8 +456,12 @@ class AkrrDaemon:
     def run_scheduled_tasks(self):
         """
         Start task which are due for execution
+
+        Numbers of active tasks, maintenance windows and enabled flags are loaded once per pass,
+        limits are imposed in memory and all activated tasks are committed in one transaction.
         """
-        time_now_str = datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S")
+        time_now = datetime.datetime.today()
+        time_now_str = time_now.strftime("%Y-%m-%d %H:%M:%S")
         # get list of resource from db
         self.dbCur.execute('''SELECT id, name, enabled FROM resources''')
         raw = self.dbCur.fetchall()
@@ -158,6 +475,21 @@ class AkrrDaemon:
         for r in raw:
             appkernel_enabled[r[1]] = r[2]
 
+        # number of active tasks per resource and app
+        self.dbCur.execute(
+            '''SELECT resource, app, COUNT(*)
+               FROM mod_akrr.active_tasks
+               GROUP BY resource, app''')
+        active_tasks_count = {}
+        for r in self.dbCur.fetchall():
+            active_tasks_count[(r[0], r[1])] = int(r[2])
+
+        # maintenance windows in effect
+        self.dbCur.execute(
+            '''SELECT * FROM akrr_resource_maintenance
+               WHERE start<=%s AND %s<=end;''', (time_now_str, time_now_str))
+        maintenance_windows = self.dbCur.fetchall()
+
         self.dbCur.execute(
             '''SELECT task_id, time_to_start, repeat_in, resource, app, resource_param, 
                       app_param, task_param, group_id, parent_task_id
@@ -166,36 +498,95 @@ class AkrrDaemon:
                ORDER BY s.time_to_start ASC''', (time_now_str,))
 
         tasks_to_activate = self.dbCur.fetchall()
+        if len(tasks_to_activate) == 0:
+            return
 
-        for task_to_activate in tasks_to_activate:
-            (task_id, time_to_start, repeat_in, resource, app, resource_param, app_param, task_param_str, group_id,
-             parent_task_id) = task_to_activate
+        # Commit all what was pushed before but not committed
+        # so we can rollback if something will go wrong
+        self.dbCon.commit()
 
-            task_param = eval(task_param_str)
-            if task_param.get('test_run', False) is False:
-                if resource_enabled.get(resource, 0) == 0 or appkernel_enabled.get(app, 0) == 0:
-                    continue
-            if task_param.get('n_runs', 1) < 1:
-                # Now we need to delete it from ScheduledTasks
-                log.info("Task %d has 0 times to run left, deleting it from scheduled_tasks", task_param.get('n_runs', 1))
-                self.dbCur.execute('''DELETE FROM scheduled_tasks WHERE task_id=%s;''', (task_id,))
-                self.dbCon.commit()
+        resources_cfg = {}
+        apps_cfg = {}
+        try:
+            for task_to_activate in tasks_to_activate:
+                if not self._activate_scheduled_task(
+                        task_to_activate, time_now_str, resource_enabled, appkernel_enabled, active_tasks_count,
+                        maintenance_windows, resources_cfg, apps_cfg):
+                    break
+        finally:
+            self.dbCon.commit()
 
-            task_activated = False
-            task_handler = None
-            start_task_execution = True
+    def _activate_scheduled_task(self, task_to_activate, time_now_str, resource_enabled, appkernel_enabled,
+                                 active_tasks_count, maintenance_windows, resources_cfg, apps_cfg) -> bool:
+        """
+        Activate single scheduled task, changes are done within savepoint of pass transaction,
+        on MyISAM tables they are undone by _undo_task_activation.
+        active_tasks_count is updated on activation, resources_cfg and apps_cfg are
+        configurations cache for this pass.
+        Return False if no more tasks can be activated in this pass.
+        """
+        (task_id, time_to_start, repeat_in, resource, app, resource_param, app_param, task_param_str, group_id,
+         parent_task_id) = task_to_activate
+
+        task_param = parse_param(task_param_str)
+        if task_param.get('test_run', False) is False:
+            if resource_enabled.get(resource, 0) == 0 or appkernel_enabled.get(app, 0) == 0:
+                return True
+        if task_param.get('n_runs', 1) < 1:
+            # Now we need to delete it from ScheduledTasks
+            log.info("Task %d has 0 times to run left, deleting it from scheduled_tasks", task_param.get('n_runs', 1))
+            self.dbCur.execute('''DELETE FROM scheduled_tasks WHERE task_id=%s;''', (task_id,))
+            return True
+
+        task_activated = False
+        task_handler = None
+        start_task_execution = True
+        # changes to undo if activation fails on MyISAM tables
+        postponed = False
+        active_task_inserted = False
+        added_task_ids = []
+        self.dbCur.execute("SAVEPOINT activate_task")
+        try:
+            if resource not in resources_cfg:
+                resources_cfg[resource] = cfg.find_resource_by_name(resource)
+            resource_cfg = resources_cfg[resource]
+
+            # check limit for resource on max number of active tasks
+            max_number_of_active_tasks = resource_cfg.get('max_number_of_active_tasks', -1)
+            if max_number_of_active_tasks >= 0:
+                active_tasks_on_resource = sum(
+                    count for (r, _), count in active_tasks_count.items() if r == resource)
+                if active_tasks_on_resource >= max_number_of_active_tasks:
+                    log.debug2(
+                        "Can not activate Task too many active tasks on resource already\n" +
+                        "Task Number: %s\n\t" % task_id +
+                        "Start time: %s\n\t" % time_to_start +
+                        "Repeating period: %s\n\t" % repeat_in +
+                        "Resource: %s\n\t" % resource +
+                        "Resource parameters: %s\n\t" % resource_param +
+                        "Application kernel: %s\n\t" % app +
+                        "Application kernel parameters: %s\n\t" % app_param +
+                        "Task parameters: %s\n\t" % task_param_str +
+                        "Parent task id: %s" % parent_task_id)
+                    self.scheduled_tasks_blocked = True
+                    return True
             try:
-                # check limit for resource on max number of active tasks
-                if cfg.find_resource_by_name(resource).get('max_number_of_active_tasks', -1) >= 0:
-                    # get number of active tasks
-                    self.dbCur.execute(
-                        '''SELECT task_id, resource, app
-                           FROM mod_akrr.active_tasks
-                           WHERE resource like %s''', (resource,))
-                    activate_task = self.dbCur.fetchall()
-                    if len(activate_task) >= cfg.find_resource_by_name(resource).get('max_number_of_active_tasks', -1):
+                max_number_of_app_active_tasks = -1
+                if app not in apps_cfg:
+                    apps_cfg[app] = cfg.find_app_by_name(app)
+                appcfg = apps_cfg[app]
+                if appcfg != None:
+                    if 'max_number_of_app_active_tasks' in appcfg:
+                        max_number_of_app_active_tasks = appcfg['max_number_of_app_active_tasks']
+                    if 'appkernel_on_resource' in appcfg:
+                        if resource in appcfg['appkernel_on_resource']:
+                            max_number_of_app_active_tasks=appcfg['appkernel_on_resource'][resource].get(
+                                'max_number_of_app_active_tasks', max_number_of_app_active_tasks)
+
+                if max_number_of_app_active_tasks >= 0:
+                    if active_tasks_count.get((resource, app), 0) >= max_number_of_app_active_tasks:
                         log.debug2(
-                            "Can not activate Task too many active tasks on resource already\n" +
+                            "Can not activate Task too many active tasks on resource for this app already\n" +
                             "Task Number: %s\n\t" % task_id +
                             "Start time: %s\n\t" % time_to_start +
                             "Repeating period: %s\n\t" % repeat_in +
@@ -205,161 +596,140 @@ class AkrrDaemon:
                             "Application kernel parameters: %s\n\t" % app_param +
                             "Task parameters: %s\n\t" % task_param_str +
                             "Parent task id: %s" % parent_task_id)
-                        continue
-                try:
-                    max_number_of_app_active_tasks = -1
-                    appcfg = cfg.find_app_by_name(app)
-                    if appcfg != None:
-                        if 'max_number_of_app_active_tasks' in appcfg:
-                            max_number_of_app_active_tasks = appcfg['max_number_of_app_active_tasks']
-                        if 'appkernel_on_resource' in appcfg:
-                            if resource in appcfg['appkernel_on_resource']:
-                                max_number_of_app_active_tasks=appcfg['appkernel_on_resource'][resource].get(
-                                    'max_number_of_app_active_tasks', max_number_of_app_active_tasks)
-
-                    if max_number_of_app_active_tasks >= 0:
-                        # get number of active tasks
-                        self.dbCur.execute(
-                            '''SELECT task_id, resource, app
-                               FROM mod_akrr.active_tasks
-                               WHERE resource=%s AND app=%s''', (resource, app))
-                        activate_task = self.dbCur.fetchall()
-                        if len(activate_task) >= max_number_of_app_active_tasks:
-                            log.debug2(
-                                "Can not activate Task too many active tasks on resource for this app already\n" +
-                                "Task Number: %s\n\t" % task_id +
-                                "Start time: %s\n\t" % time_to_start +
-                                "Repeating period: %s\n\t" % repeat_in +
-                                "Resource: %s\n\t" % resource +
-                                "Resource parameters: %s\n\t" % resource_param +
-                                "Application kernel: %s\n\t" % app +
-                                "Application kernel parameters: %s\n\t" % app_param +
-                                "Task parameters: %s\n\t" % task_param_str +
-                                "Parent task id: %s" % parent_task_id)
-                            continue
-
-                except Exception as e:
-                    log.exception("Troubles with checking/imposing limits on number of apps running on resource")
-                    log.log_traceback(str(e))
+                        self.scheduled_tasks_blocked = True
+                        return True
 
-                log.info(
-                    "Activating Task\n" +
-                    "Task Number: %s\n\t" % task_id +
-                    "Start time: %s\n\t" % time_to_start +
-                    "Repeating period: %s\n\t" % repeat_in +
-                    "Resource: %s\n\t" % resource +
-                    "Resource parameters: %s\n\t" % resource_param +
-                    "Application kernel: %s\n\t" % app +
-                    "Application kernel parameters: %s\n\t" % app_param +
-                    "Task parameters: %s\n\t" % task_param_str +
-                    "Parent task id: %s" % parent_task_id)
-
-                # checks if there is a limit to the number of active tasks akrr can have
-                if cfg.max_number_of_active_tasks_total >= 0:
-                    # checks list of all active tasks
-                    self.dbCur.execute(
-                        '''SELECT task_id, resource, app
-                           FROM mod_akrr.active_tasks''')
-                    active_tasks_total = self.dbCur.fetchall()
-                    # if there's too many active tasks, break out of the loop
-                    if len(active_tasks_total) >= cfg.max_number_of_active_tasks_total:
-                        return
+            except Exception as e:
+                log.exception("Troubles with checking/imposing limits on number of apps running on resource")
+                log.log_traceback(str(e))
 
-                if cfg.find_resource_by_name(resource).get('active', True) is False:
-                    raise AkrrError("%s is marked as inactive in AKRR" % resource)
+            log.info(
+                "Activating Task\n" +
+                "Task Number: %s\n\t" % task_id +
+                "Start time: %s\n\t" % time_to_start +
+                "Repeating period: %s\n\t" % repeat_in +
+                "Resource: %s\n\t" % resource +
+                "Resource parameters: %s\n\t" % resource_param +
+                "Application kernel: %s\n\t" % app +
+                "Application kernel parameters: %s\n\t" % app_param +
+                "Task parameters: %s\n\t" % task_param_str +
+                "Parent task id: %s" % parent_task_id)
+
+            # checks if there is a limit to the number of active tasks akrr can have
+            if cfg.max_number_of_active_tasks_total >= 0:
+                # if there's too many active tasks, break out of the loop
+                if sum(active_tasks_count.values()) >= cfg.max_number_of_active_tasks_total:
+                    self.scheduled_tasks_blocked = True
+                    return False
+
+            if resource_cfg.get('active', True) is False:
+                raise AkrrError("%s is marked as inactive in AKRR" % resource)
+
+            # Check If resource is on maintenance
+            resources_on_maintenance = [
+                m for m in maintenance_windows if m[1] == "*" or akrr.util.sql.like_match(m[1], resource)]
+            if len(resources_on_maintenance) > 0:
+                start_task_execution = False
+                log.warning("Resource (%s) is under maintenance:" % resource)
+                for resource_on_maintenance in resources_on_maintenance:
+                    log.warning(resource_on_maintenance)
+                if repeat_in is not None:
+                    log.warning("This app. kernel is scheduled for repeat run, thus will skip this run")
+                else:
+                    log.warning("Will postpone the execution by one day")
+                    self.dbCur.execute('''UPDATE scheduled_tasks
+                        SET time_to_start=%s
+                        WHERE task_id=%s ;''', (time_to_start + datetime.timedelta(days=1), task_id))
+                    postponed = True
+                    self.push_timer(time_to_start + datetime.timedelta(days=1), 'scheduled', task_id)
+
+            # if a bundle task send subtask to  scheduled_tasks
+            if app.count("bundle") > 0:
+                if 'AppKers' in task_param:
+                    for subtask_app in task_param['AppKers']:
+                        subtask_task_param = "{'masterTaskID':%d}" % (task_id,)
+                        added_task_ids.append(self.add_task(
+                            time_to_start, None, resource, subtask_app, resource_param, app_param,
+                            subtask_task_param, group_id, parent_task_id, commit=False))
+
+            if start_task_execution:
+                task_handler = akrr_task.get_new_task_handler(
+                    task_id, resource, app, resource_param, app_param, task_param_str)
+                akrr_task.dump_task_handler(task_handler)
+                next_check_time = (datetime.datetime.today() + datetime.timedelta(minutes=1)).strftime(
+                    "%Y-%m-%d %H:%M:%S")
+                self.push_timer(datetime.datetime.today() + datetime.timedelta(minutes=1), 'active', task_id)
+                # First we'll copy it to ActiveTasks
+                self.dbCur.execute(
+                    '''INSERT INTO active_tasks 
+                       (task_id,next_check_time,datetime_stamp,time_activated,time_to_start,repeat_in,
+                        resource,app,resource_param,app_param,task_lock,task_param,group_id,parent_task_id,
+                        nnodes,ncores,test_run,n_runs,master_task_id)
+                       VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,0,%s,%s,%s,%s,%s,%s,%s,%s);''',
+                    (task_id, next_check_time, task_handler.timeStamp,
+                     time_stamp_to_datetime_str(task_handler.timeStamp),
+                     time_to_start, repeat_in, resource, app, resource_param, app_param, task_param_str,
+                     group_id, parent_task_id) + get_param_columns(resource_param, task_param_str))
+                active_task_inserted = True
+                # Sanity check on repeat
+                repeat_in = akrr.util.time.verify_repeat_in(repeat_in)
+
+                # Schedule next
+                if repeat_in is not None:
+                    next_time = akrr.util.time.get_next_time(time_to_start.strftime("%Y-%m-%d %H:%M:%S"), repeat_in)
+                    log.info("Schedule another task for %s" % next_time)
+                    added_task_ids.append(self.add_task(
+                        next_time, repeat_in, resource, app, resource_param, app_param, task_param_str,
+                        group_id, parent_task_id, commit=False))
+                if task_param.get('n_runs', 1) > 1:
+                    task_param['n_runs'] = task_param['n_runs'] - 1
+                    task_param_str = re.sub(r"[\"']n_runs[\"']\s*:\s*[0-9]+", "'n_runs':%d" % task_param['n_runs'], task_param_str)
+                    # give it couple minutes for next run
+                    next_time = akrr.util.time.get_next_time(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "0-00-000 00:02:00")
+                    added_task_ids.append(self.add_task(
+                        next_time, repeat_in, resource, app, resource_param, app_param, task_param_str,
+                        group_id, parent_task_id, commit=False))
+
+            if self.bRunScheduledTasks is False:
+                # means that the termination signal was send while this function is already running
+                raise IOError("Can not activate task because got a massage to postpone activation")
+            task_activated = True
+        except Exception as e:
+            log.exception("Can not submit job to active tasks")
+            log.log_traceback(str(e))
+            self.dbCur.execute("ROLLBACK TO SAVEPOINT activate_task")
+            if not self.task_tables_innodb:
+                self._undo_task_activation(task_id, time_to_start, postponed, active_task_inserted, added_task_ids)
+            if task_handler is not None:
+                task_handler.DeleteLocalFolder()
+        del task_handler
+        if task_activated is True:
+            if start_task_execution:
+                active_tasks_count[(resource, app)] = active_tasks_count.get((resource, app), 0) + 1
+            # Now we need to delete it from ScheduledTasks
+            self.dbCur.execute('''DELETE FROM scheduled_tasks
+                WHERE task_id=%s;''', (task_id,))
 
-                # Commit all what was pushed before but not committed
-                # so we can rollback if something will go wrong
-                self.dbCon.commit()
-                self.dbCon.commit()
+        return True
 
-                # Check If resource is on maintenance
+    def _undo_task_activation(self, task_id, time_to_start, postponed, active_task_inserted, added_task_ids):
+        """
+        undo changes of failed task activation, savepoint rollback does not work on MyISAM tables,
+        otherwise task left in both scheduled_tasks and active_tasks would be executed twice
+        """
+        try:
+            if active_task_inserted:
+                self.dbCur.execute('''DELETE FROM active_tasks WHERE task_id=%s;''', (task_id,))
+            if len(added_task_ids) > 0:
                 self.dbCur.execute(
-                    '''SELECT * FROM akrr_resource_maintenance
-                       WHERE (resource="*" OR resource=%s OR resource LIKE %s OR resource LIKE %s OR resource LIKE %s)
-                       AND start<=%s AND %s<=end;''',
-                    (resource, resource, resource, resource, time_now_str, time_now_str))
-
-                resources_on_maintenance = self.dbCur.fetchall()
-                if len(resources_on_maintenance) > 0:
-                    start_task_execution = False
-                    log.warning("Resource (%s) is under maintenance:" % resource)
-                    for resource_on_maintenance in resources_on_maintenance:
-                        log.warning(resource_on_maintenance)
-                    if repeat_in is not None:
-                        log.warning("This app. kernel is scheduled for repeat run, thus will skip this run")
-                    else:
-                        log.warning("Will postpone the execution by one day")
-                        self.dbCur.execute('''UPDATE scheduled_tasks
-                            SET time_to_start=%s
-                            WHERE task_id=%s ;''', (time_to_start + datetime.timedelta(days=1), task_id))
-                        self.dbCon.commit()
-
-                # if a bundle task send subtask to  scheduled_tasks
-                if app.count("bundle") > 0:
-                    task_param = eval(task_param_str)
-                    if 'AppKers' in task_param:
-                        for subtask_app in task_param['AppKers']:
-                            subtask_task_param = "{'masterTaskID':%d}" % (task_id,)
-                            self.add_task(time_to_start, None, resource, subtask_app, resource_param, app_param,
-                                          subtask_task_param, group_id, parent_task_id)
-
-                if start_task_execution:
-                    task_handler = akrr_task.get_new_task_handler(
-                        task_id, resource, app, resource_param, app_param, task_param_str)
-                    akrr_task.dump_task_handler(task_handler)
-                    next_check_time = (datetime.datetime.today() + datetime.timedelta(minutes=1)).strftime(
-                        "%Y-%m-%d %H:%M:%S")
-                    # First we'll copy it to ActiveTasks
-                    self.dbCur.execute(
-                        '''INSERT INTO active_tasks 
-                           (task_id,next_check_time,datetime_stamp,time_activated,time_to_start,repeat_in,
-                            resource,app,resource_param,app_param,task_lock,task_param,group_id,parent_task_id)
-                           VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,0,%s,%s,%s);''',
-                        (task_id, next_check_time, task_handler.timeStamp,
-                         time_stamp_to_datetime_str(task_handler.timeStamp),
-                         time_to_start, repeat_in, resource, app, resource_param, app_param, task_param_str,
-                         group_id, parent_task_id))
-                    # Sanity check on repeat
-                    repeat_in = akrr.util.time.verify_repeat_in(repeat_in)
-
-                    # Schedule next
-                    if repeat_in is not None:
-                        next_time = akrr.util.time.get_next_time(time_to_start.strftime("%Y-%m-%d %H:%M:%S"), repeat_in)
-                        log.info("Schedule another task for %s" % next_time)
-                        self.add_task(next_time, repeat_in, resource, app, resource_param, app_param, task_param_str,
-                                      group_id, parent_task_id)
-                    if task_param.get('n_runs', 1) > 1:
-                        task_param['n_runs'] = task_param['n_runs'] - 1
-                        task_param_str = re.sub(r"[\"']n_runs[\"']\s*:\s*[0-9]+", "'n_runs':%d" % task_param['n_runs'], task_param_str)
-                        # give it couple minutes for next run
-                        next_time = akrr.util.time.get_next_time(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "0-00-000 00:02:00")
-                        self.add_task(next_time, repeat_in, resource, app, resource_param, app_param, task_param_str,
-                                      group_id, parent_task_id)
-
-
-
-                if self.bRunScheduledTasks is False:
-                    # means that the termination signal was send while this function is already running
-                    raise IOError("Can not activate task because got a massage to postpone activation")
-                task_activated = True
-            except Exception as e:
-                log.exception("Can not submit job to active tasks")
-                log.log_traceback(str(e))
-                self.dbCon.rollback()
-                self.dbCon.rollback()
-                if task_handler is not None:
-                    task_handler.DeleteLocalFolder()
-            del task_handler
-            if task_activated is True:
-                # Now commit the changes
-                self.dbCon.commit()
-                # Now we need to delete it from ScheduledTasks
-                self.dbCur.execute('''DELETE FROM scheduled_tasks
-                    WHERE task_id=%s;''', (task_id,))
-                self.dbCon.commit()
-
-            print("<" * 120)
+                    "DELETE FROM scheduled_tasks WHERE task_id IN (" + ",".join(["%s"] * len(added_task_ids)) + ")",
+                    added_task_ids)
+            if postponed:
+                self.dbCur.execute('''UPDATE scheduled_tasks SET time_to_start=%s WHERE task_id=%s ;''',
+                                   (time_to_start, task_id))
+        except Exception as e:
+            log.exception("Can not undo activation of task %s", task_id)
+            log.log_traceback(str(e))
 
     def run_active_tasks__start_the_step(self):
         """
@@ -392,25 +762,25 @@ class AkrrDaemon:
                 self.dbCon.commit()
                 continue
 
-            if len(self.workers) >= self.maxTaskHandlers:
+            worker = self.get_free_worker()
+            if worker is None:
                 # all workers are busy skipping the
+                self.active_tasks_pending = True
                 return
 
             (task_id, resource_name, app_name, time_stamp, fatal_errors_count, fails_to_submit_to_the_queue) = row
             log.info("Working on:\n\t%s" % (akrr_task.get_local_task_dir(resource_name, app_name, time_stamp)))
             try:
-                p = multiprocessing.Process(
-                    target=_start_the_task_step,
-                    args=(resource_name, app_name, time_stamp, self.ResultsQueue, 0, fails_to_submit_to_the_queue))
-                p.start()
-                pid = p.pid
+                worker.submit(task_id, resource_name, app_name, time_stamp, 0, fails_to_submit_to_the_queue)
+                pid = worker.pid
                 self.dbCur.execute('''UPDATE active_tasks SET task_lock=%s WHERE task_id=%s ;''', (pid, task_id))
 
                 self.workers.append({
                     "task_id": task_id,
                     "pid": pid,
                     "start_time": datetime.datetime.today(),
-                    "process": p,
+                    "process": worker.process,
+                    "worker": worker,
                 })
 
                 i_tasks_send += 1
@@ -422,53 +792,98 @@ class AkrrDaemon:
         if i_tasks_send > 0:
             self.dbCon.commit()
 
-    def run_active_tasks__check_the_step(self):
+    def get_free_worker(self):
         """
-        check the task's step state
+        Return idle worker from pool, start new one if pool is not full yet.
+        Return None if all workers are busy.
         """
-        # Get all tasks which should be started
+        # drop idle workers which died
+        for worker in [w for w in self.worker_pool if not w.is_busy() and not w.process.is_alive()]:
+            worker.discard()
+            self.worker_pool.remove(worker)
+        for worker in self.worker_pool:
+            if not worker.is_busy():
+                return worker
+        if len(self.worker_pool) < self.maxTaskHandlers:
+            worker = _TaskStepWorker()
+            self.worker_pool.append(worker)
+            return worker
+        return None
+
+    def stop_worker_pool(self):
+        """
+        Stop all workers
+        """
+        for worker in self.worker_pool:
+            worker.stop()
+        self.worker_pool = []
 
-        i_worker = 0
-        init_workers_num = len(self.workers)
-        workers_num = len(self.workers)
-        if workers_num == 0:
+    def run_active_tasks__check_the_step(self):
+        """
+        check the task's step state, finished steps are processed together:
+        task records are loaded with single query and updated in single transaction
+        """
+        if len(self.workers) == 0:
             return
 
-        while i_worker < workers_num:
+        # load records of all tasks in work
+        task_ids = [w['task_id'] for w in self.workers]
+        self.dbCon.commit()
+        self.dbCur.execute(
+            '''SELECT task_id,fatal_errors_count,fails_to_submit_to_the_queue,
+                status_update_time,time_to_start,repeat_in,resource,app,datetime_stamp,time_activated,
+                time_submitted_to_queue,resource_param,app_param,task_param,group_id,parent_task_id
+            FROM active_tasks
+            WHERE task_id IN (%s);''' % ",".join(["%s"] * len(task_ids)), task_ids)
+        active_tasks = {row[0]: row for row in self.dbCur.fetchall()}
+
+        finished_steps = []
+        i_worker = 0
+        while i_worker < len(self.workers):
             p = self.workers[i_worker]['process']
             task_id = self.workers[i_worker]['task_id']
             pid = self.workers[i_worker]['pid']
+            worker = self.workers[i_worker].get('worker', None)
 
-            self.dbCur.execute('''SELECT fatal_errors_count,fails_to_submit_to_the_queue FROM active_tasks
-                WHERE task_id=%s;''', (task_id,))
-            query_result = self.dbCur.fetchall()
-            if len(query_result) == 0:
+            if task_id not in active_tasks:
                 # i.e. task were removed from db while daemon was working on it, need to free worker
                 while p.is_alive():
                     p.terminate()
                     time.sleep(0.1)
                 p.join(0.5)
+                if worker in self.worker_pool:
+                    worker.discard()
+                    self.worker_pool.remove(worker)
                 # remove worker from list
                 self.workers.pop(i_worker)
-                workers_num = len(self.workers)
                 continue
 
-            (fatal_errors_count, fails_to_submit_to_the_queue) = query_result[0]
-
-            while not self.ResultsQueue.empty():
-                r = self.ResultsQueue.get()
-                self.Results[r['pid']] = r
-
-            p.join(0.5)
-
-            if p.is_alive():
-                dt = datetime.datetime.today() - self.workers[i_worker]['start_time']
-                if dt > self.max_wall_time_for_task_handlers:
-                    p.terminate()  # will handle it next round
-                i_worker += 1
-                continue
+            fatal_errors_count, fails_to_submit_to_the_queue = active_tasks[task_id][1:3]
+
+            if worker is not None:
+                # step executed by worker from pool
+                step_finished = worker.has_result()
+                if step_finished:
+                    self.Results[pid] = worker.get_result()
+                elif p.is_alive():
+                    dt = datetime.datetime.today() - self.workers[i_worker]['start_time']
+                    if dt > self.max_wall_time_for_task_handlers:
+                        p.terminate()  # will handle it next round
+                    i_worker += 1
+                    continue
+                else:
+                    # worker died during step execution, it will be replaced by new one
+                    worker.discard(0.1)
+                    self.worker_pool.remove(worker)
+            else:
+                # step executed by main thread
+                while not self.ResultsQueue.empty():
+                    r = self.ResultsQueue.get()
+                    self.Results[r['pid']] = r
+                p.join(0.5)
+                step_finished = True
 
-            if p.exitcode == -signal.SIGTERM:
+            if not step_finished and p.exitcode == -signal.SIGTERM:
                 # process the case when process was terminated
                 dt = datetime.datetime.today() - self.workers[i_worker]['start_time']
                 if dt > self.max_wall_time_for_task_handlers:
@@ -486,10 +901,8 @@ class AkrrDaemon:
             else:
                 # process normal exit of process
                 # Process the results
-                while not self.ResultsQueue.empty():  # organized results in dict with pid keys
-                    r = self.ResultsQueue.get()
-                    self.Results[r['pid']] = r
-                if pid not in self.Results:  # process finished abnormally
+                if self.Results.get(pid, None) is None:  # process finished abnormally
+                    self.Results.pop(pid, None)
                     log.error(
                         "the process was finished but results was not sent."
                         "\n\tat this point treat it as forcibly terminated"
@@ -508,16 +921,27 @@ class AkrrDaemon:
                     fails_to_submit_to_the_queue = r['fails_to_submit_to_the_queue']
                     del self.Results[pid]
 
-            time_now = datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S")
-            if fatal_errors_count > self.max_fatal_errors_for_task:
+            finished_steps.append({
+                "task_id": task_id,
+                "status": status,
+                "status_info": status_info,
+                "repeat_in": repeat_in,
+                "fatal_errors_count": fatal_errors_count,
+                "fails_to_submit_to_the_queue": fails_to_submit_to_the_queue,
+                "record": active_tasks[task_id]
+            })
+            # remove worker from list
+            self.workers.pop(i_worker)
+
+        if len(finished_steps) == 0:
+            return
+
+        for step in finished_steps:
+            if step['fatal_errors_count'] > self.max_fatal_errors_for_task:
                 # if too much errors terminate the execution
-                repeat_in = None
+                step['repeat_in'] = None
                 log.error("Number of errors exceeded allowed maximum and task was terminated.")
-                self.dbCon.commit()
-                self.dbCon.commit()
-                self.dbCur.execute(
-                    '''SELECT resource,app,datetime_stamp FROM active_tasks WHERE task_id=%s;''', (task_id,))
-                (resource, app, datetime_stamp) = self.dbCur.fetchone()
+                (resource, app, datetime_stamp) = step['record'][6:9]
                 th = akrr_task.get_task_handler(resource, app, datetime_stamp)
                 th.status = "Error: Number of errors exceeded allowed maximum and task was terminated." + th.status
                 th.ReportFormat = "Error"
@@ -525,96 +949,112 @@ class AkrrDaemon:
                 if th.push_to_db() is not None:
                     log.error("Can not push to DB")
                 akrr_task.dump_task_handler(th)
-                status = copy.deepcopy(th.status)
-                status_info = copy.deepcopy(th.status_info)
+                step['status'] = copy.deepcopy(th.status)
+                step['status_info'] = copy.deepcopy(th.status_info)
                 del th
 
-            # Update error counters on DB
-            self.dbCur.execute('''UPDATE active_tasks
-                SET fatal_errors_count=%s,fails_to_submit_to_the_queue=%s
-                WHERE task_id=%s ;''', (fatal_errors_count, fails_to_submit_to_the_queue, task_id))
+        # update DB, all steps in single transaction
+        time_now = datetime.datetime.today()
+        try:
+            for step in finished_steps:
+                self._update_task_after_step(step, time_now)
             self.dbCon.commit()
-            # update DB
-            if status == "Done" or repeat_in is None:
-                # we need to remove it from active_tasks and add to completed_tasks
-                resource = None
-                app = None
-                datetime_stamp = None
+        except Exception as e:
+            log.exception("Exception occurred during updating tasks records, will update them one by one")
+            log.log_traceback(str(e))
+            self.dbCon.rollback()
+            for step in finished_steps:
                 try:
+                    self._update_task_after_step(step, time_now)
                     self.dbCon.commit()
-                    self.dbCon.commit()
-                    self.dbCur.execute(
-                        '''SELECT status_update_time,status,status_info,time_to_start,repeat_in,resource,app,
-                            datetime_stamp,time_activated,
-                            time_submitted_to_queue,resource_param,app_param,task_param,group_id,
-                            fatal_errors_count,fails_to_submit_to_the_queue,
-                            parent_task_id 
-                        FROM active_tasks
-                        WHERE task_id=%s;''', (task_id,))
-                    (status_update_time, status_prev, status_info_prev, time_to_start, repeat_in, resource, app,
-                     datetime_stamp, time_activated, time_submitted_to_queue, resource_param, app_param, task_param,
-                     group_id, fatal_errors_count, fails_to_submit_to_the_queue, parent_task_id) = self.dbCur.fetchone()
-
-                    self.dbCur.execute(
-                        '''INSERT INTO completed_tasks
-                           (task_id,time_finished,status,status_info,time_to_start,repeat_in,
-                           resource,app,datetime_stamp,
-                           time_activated,time_submitted_to_queue,resource_param,app_param,task_param,
-                           group_id,fatal_errors_count,fails_to_submit_to_the_queue,parent_task_id)
-                           VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);''',
-                        (task_id, status_update_time, status, status_info, time_to_start, repeat_in,
-                         resource, app, datetime_stamp, time_activated, time_submitted_to_queue,
-                         resource_param, app_param, task_param, group_id, fatal_errors_count,
-                         fails_to_submit_to_the_queue, parent_task_id))
-                    self.dbCur.execute('''DELETE FROM active_tasks WHERE task_id=%s;''', (task_id,))
                 except Exception as e:
                     log.exception(
                         "Exception occurred during moving task record from active_tasks to completed_tasks table")
                     log.log_traceback(str(e))
                     self.dbCon.rollback()
-                    self.dbCon.rollback()
 
-                    fatal_errors_count += 1
+                    step['repeat_in'] = self.repeat_after_forcible_termination
+                    step['status'] = None
                     self.dbCur.execute('''UPDATE active_tasks
                         SET task_lock=0,fatal_errors_count=%s
-                        WHERE task_id=%s ;''', (fatal_errors_count, task_id))
-
-                self.dbCon.commit()
-                self.dbCon.commit()
+                        WHERE task_id=%s ;''', (step['fatal_errors_count'] + 1, step['task_id']))
+                    self.dbCon.commit()
 
-                # now the last thing moving the directory to complete dir
-                # complete dir structure is <completed_tasks_dir>/<resource>/<app>/<year>/<month>/<this task>
-                task_dir = os.path.join(cfg.data_dir, resource, app, datetime_stamp)
-                datetime_stamp_split = datetime_stamp.split(".")
-                if len(datetime_stamp_split) > 2:
-                    year = datetime_stamp_split[0]
-                    month = datetime_stamp_split[1]
-                    comp_tasks_dir = os.path.join(cfg.completed_tasks_dir, resource, app, year, month)
-                else:
-                    comp_tasks_dir = os.path.join(cfg.completed_tasks_dir, resource, app)
-                make_dirs(comp_tasks_dir)
-                log.info(
-                    "Task is completed. Moving its' working directory\n" +
-                    "\tfrom %s" % task_dir + "\n" +
-                    "\tto %s" % (os.path.join(comp_tasks_dir, datetime_stamp))
-                )
-                import shutil
-                shutil.move(task_dir, comp_tasks_dir)
+        for step in finished_steps:
+            if step['status'] == "Done" or step['repeat_in'] is None:
+                self._move_task_dir_to_completed(step['record'][6], step['record'][7], step['record'][8])
 
+                # free slot for tasks postponed due to limits on number of active tasks
+                if self.scheduled_tasks_blocked:
+                    self.scheduled_tasks_blocked = False
+                    self.push_timer(None, 'scheduled')
+            elif step['status'] is not None:
+                self.push_timer(time_now + step['repeat_in'], 'active', step['task_id'])
             else:
-                # we need to resubmit and update
-                next_round = datetime.datetime.today() + repeat_in
-                next_round = next_round.strftime("%Y-%m-%d %H:%M:%S")
-                self.dbCur.execute('''UPDATE active_tasks
-                    SET task_lock=0, status=%s,status_info=%s,next_check_time=%s,status_update_time=%s
-                    WHERE task_id=%s ;''', (status, status_info, next_round, time_now, task_id))
-                self.dbCon.commit()
+                # failed to update, will retry
+                self.push_timer(None, 'active', step['task_id'])
 
-            # remove worker from list
-            self.workers.pop(i_worker)
-            workers_num = len(self.workers)
-        if init_workers_num != len(self.workers):
-            self.dbCon.commit()
+        # worker is freed, start tasks waiting for it
+        if self.active_tasks_pending:
+            self.active_tasks_pending = False
+            self.push_timer(None, 'active')
+
+    def _update_task_after_step(self, step, time_now):
+        """
+        Update task record after step execution: move it to completed_tasks if
+        it is done or set next check time. Changes are not committed.
+        """
+        task_id = step['task_id']
+        if step['status'] == "Done" or step['repeat_in'] is None:
+            # we need to remove it from active_tasks and add to completed_tasks
+            (status_update_time, time_to_start, repeat_in, resource, app, datetime_stamp, time_activated,
+             time_submitted_to_queue, resource_param, app_param, task_param, group_id,
+             parent_task_id) = step['record'][3:]
+            self.dbCur.execute(
+                '''INSERT INTO completed_tasks
+                   (task_id,time_finished,status,status_info,time_to_start,repeat_in,
+                   resource,app,datetime_stamp,
+                   time_activated,time_submitted_to_queue,resource_param,app_param,task_param,
+                   group_id,fatal_errors_count,fails_to_submit_to_the_queue,parent_task_id,
+                   nnodes,ncores,test_run,n_runs,master_task_id)
+                   VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);''',
+                (task_id, status_update_time, step['status'], step['status_info'], time_to_start, repeat_in,
+                 resource, app, datetime_stamp, time_activated, time_submitted_to_queue,
+                 resource_param, app_param, task_param, group_id, step['fatal_errors_count'],
+                 step['fails_to_submit_to_the_queue'], parent_task_id) + get_param_columns(resource_param, task_param))
+            self.dbCur.execute('''DELETE FROM active_tasks WHERE task_id=%s;''', (task_id,))
+        else:
+            # we need to resubmit and update
+            next_round = (time_now + step['repeat_in']).strftime("%Y-%m-%d %H:%M:%S")
+            self.dbCur.execute('''UPDATE active_tasks
+                SET task_lock=0, status=%s,status_info=%s,next_check_time=%s,status_update_time=%s,
+                    fatal_errors_count=%s,fails_to_submit_to_the_queue=%s
+                WHERE task_id=%s ;''', (
+                    step['status'], step['status_info'], next_round, time_now.strftime("%Y-%m-%d %H:%M:%S"),
+                    step['fatal_errors_count'], step['fails_to_submit_to_the_queue'], task_id))
+
+    @staticmethod
+    def _move_task_dir_to_completed(resource, app, datetime_stamp):
+        """
+        Move task directory to completed tasks directory,
+        complete dir structure is <completed_tasks_dir>/<resource>/<app>/<year>/<month>/<this task>
+        """
+        task_dir = os.path.join(cfg.data_dir, resource, app, datetime_stamp)
+        datetime_stamp_split = datetime_stamp.split(".")
+        if len(datetime_stamp_split) > 2:
+            year = datetime_stamp_split[0]
+            month = datetime_stamp_split[1]
+            comp_tasks_dir = os.path.join(cfg.completed_tasks_dir, resource, app, year, month)
+        else:
+            comp_tasks_dir = os.path.join(cfg.completed_tasks_dir, resource, app)
+        make_dirs(comp_tasks_dir)
+        log.info(
+            "Task is completed. Moving its' working directory\n" +
+            "\tfrom %s" % task_dir + "\n" +
+            "\tto %s" % (os.path.join(comp_tasks_dir, datetime_stamp))
+        )
+        import shutil
+        shutil.move(task_dir, comp_tasks_dir)
 
     def no_new_tasks(self):
         log.info("Activation of new tasks is postponed.")
@@ -630,6 +1070,116 @@ class AkrrDaemon:
         self.bRunActiveTasks_StartTheStep = True
         self.bRunActiveTasks_CheckTheStep = True
         self.LastOpSignal = "Run"
+        # events skipped while activation was off should be reloaded
+        self.timers_need_reseed = True
+        self.wake_up()
+
+    def push_timer(self, event_time, event_type, task_id=0):
+        """
+        Add event to timers heap, event_type is 'scheduled' for scheduled task activation
+        and 'active' for active task next step. event_time None means now.
+        """
+        if event_time is None:
+            event_time = datetime.datetime.today()
+        heapq.heappush(self.timers, (event_time, event_type, task_id))
+
+    def seed_timers(self):
+        """
+        (Re)load timers heap from DB
+        """
+        # commit to get fresh snapshot
+        self.dbCon.commit()
+        time_now = datetime.datetime.today()
+        timers = []
+        self.dbCur.execute('''SELECT task_id, time_to_start FROM scheduled_tasks''')
+        for task_id, time_to_start in self.dbCur.fetchall():
+            timers.append((time_to_start if time_to_start is not None else time_now, 'scheduled', task_id))
+        self.dbCur.execute('''SELECT task_id, next_check_time FROM active_tasks WHERE task_lock=0''')
+        for task_id, next_check_time in self.dbCur.fetchall():
+            timers.append((next_check_time if next_check_time is not None else time_now, 'active', task_id))
+        self.dbCon.commit()
+
+        heapq.heapify(timers)
+        self.timers = timers
+        self.timers_seed_time = time_now
+        self.timers_need_reseed = False
+
+    def pop_due_timers(self):
+        """
+        Pop due events from timers heap, return set of due event types
+        """
+        time_now = datetime.datetime.today()
+        due = set()
+        while len(self.timers) > 0 and self.timers[0][0] <= time_now:
+            due.add(heapq.heappop(self.timers)[1])
+        return due
+
+    def workers_need_check(self):
+        """
+        Return True if some of the workers are finished or exceeded wall time
+        """
+        time_now = datetime.datetime.today()
+        for worker in self.workers:
+            if worker['process'].sentinel is None or not worker['process'].is_alive():
+                return True
+            if 'worker' in worker and worker['worker'].has_result():
+                return True
+            if time_now - worker['start_time'] > self.max_wall_time_for_task_handlers:
+                return True
+        return False
+
+    def get_time_to_next_event(self):
+        """
+        Return time in seconds till next due event
+        """
+        time_now = datetime.datetime.today()
+        next_event = self.timers_seed_time + cfg.scheduled_tasks_resync_period
+        if len(self.timers) > 0:
+            next_event = min(next_event, self.timers[0][0])
+        # workers wall time limits, passed ones are already handled
+        for worker in self.workers:
+            wall_time_limit = worker['start_time'] + self.max_wall_time_for_task_handlers
+            if wall_time_limit > time_now:
+                next_event = min(next_event, wall_time_limit)
+        for timer in (self.timer_no_new_tasks, self.timer_no_active_tasks_check):
+            if timer is not None:
+                next_event = min(next_event, timer + datetime.timedelta(minutes=30))
+        return max((next_event - time_now).total_seconds(), 0.0)
+
+    def wake_up(self):
+        """
+        Wake up main loop
+        """
+        if self.wakeup_writer is not None:
+            try:
+                self.wakeup_writer.send_bytes(b"w")
+            except OSError:
+                pass
+
+    def wait_for_events(self):
+        """
+        Sleep until next due event, worker exit or wake up from REST API or signal handlers
+        """
+        timeout = self.get_time_to_next_event()
+        if timeout <= 0.0:
+            return
+        wait_list = []
+        if self.bRunActiveTasks_CheckTheStep:
+            # results from workers and their termination
+            wait_list += [w['worker'].conn for w in self.workers if 'worker' in w]
+            wait_list += [w['process'].sentinel for w in self.workers if w['process'].sentinel is not None]
+        if self.wakeup_reader is not None:
+            wait_list.append(self.wakeup_reader)
+        if len(wait_list) == 0:
+            time.sleep(timeout)
+            return
+
+        ready = multiprocessing.connection.wait(wait_list, timeout)
+        if self.wakeup_reader is not None and self.wakeup_reader in ready:
+            # something was changed outside, reload timers
+            while self.wakeup_reader.poll():
+                self.wakeup_reader.recv_bytes()
+            self.timers_need_reseed = True
 
     def run(self):
         self.bRunScheduledTasks = True
@@ -648,6 +1198,9 @@ class AkrrDaemon:
             fout.write("%s\n" % os.getpid())
         fout.close()
 
+        # pipe to wake up main loop
+        self.wakeup_reader, self.wakeup_writer = multiprocessing.Pipe(duplex=False)
+
         # set signal handling
         def sigterm_handler(signum, _):
             log.info("Received termination signal. Actual signal is %s." % signum)
@@ -656,9 +1209,11 @@ class AkrrDaemon:
             self.bRunActiveTasks_StartTheStep = False
             self.bRunActiveTasks_CheckTheStep = True
             self.LastOpSignal = "SEGTERM"
+            self.wake_up()
 
         def gotsignal_no_new_tasks(_signum, _):
             self.no_new_tasks()
+            self.wake_up()
 
         def gotsignal_new_tasks_on(_signum, _):
             self.new_tasks_on()
@@ -673,8 +1228,9 @@ class AkrrDaemon:
         log.info("Starting REST-API Service")
         self.proc_queue_to_master = multiprocessing.Queue(1)
         self.proc_queue_from_master = multiprocessing.Queue(1)
-        self.restapi_proc = multiprocessing.Process(target=akrrrestapi.start_rest_api,
-                                                    args=(self.proc_queue_to_master, self.proc_queue_from_master))
+        self.restapi_proc = multiprocessing.Process(
+            target=akrrrestapi.start_rest_api,
+            args=(self.proc_queue_to_master, self.proc_queue_from_master, self.wakeup_writer))
         self.restapi_proc.start()
 
         # go to the loop
@@ -684,6 +1240,10 @@ class AkrrDaemon:
         signal.signal(signal.SIGTERM, signal.SIG_DFL)
         signal.signal(signal.SIGINT, signal.SIG_DFL)
 
+        # close persistent ssh connections
+        from akrr.util.ssh import ssh_pool
+        ssh_pool.shutdown()
+
         if os.path.isfile(os.path.join(cfg.data_dir, "akrr.pid")):
             os.remove(os.path.join(cfg.data_dir, "akrr.pid"))
 
@@ -693,8 +1253,7 @@ class AkrrDaemon:
         while True:
             db_connected = False
             try:
-                self.dbCur.execute('''SELECT * FROM  `resources`  ''')
-                self.dbCur.fetchall()
+                self.dbCon.ping()
                 db_connected = True
             except Exception as e:
                 log.exception("Exception occurred during DB connection checking.")
@@ -715,7 +1274,12 @@ class AkrrDaemon:
                 time.sleep(10)
 
             log.info("Trying to reconnect to DB.")
-            self.dbCon, self.dbCur = akrr.db.get_akrr_db()
+            try:
+                self.dbCon.discard()
+                self.dbCon, self.dbCur = akrr.db.get_akrr_db()
+            except Exception as e:
+                log.exception("Exception occurred during DB reconnection.")
+                log.log_traceback(str(e))
             attempts_to_reconnect += 1
 
     def run_loop(self):
@@ -728,11 +1292,16 @@ class AkrrDaemon:
             try:
                 self.check_db_and_reconnect()
 
-                if self.bRunScheduledTasks:
+                if self.timers_need_reseed or self.timers_seed_time is None or \
+                        datetime.datetime.today() - self.timers_seed_time >= cfg.scheduled_tasks_resync_period:
+                    self.seed_timers()
+                due_events = self.pop_due_timers()
+
+                if self.bRunScheduledTasks and 'scheduled' in due_events:
                     self.run_scheduled_tasks()
-                if self.bRunActiveTasks_StartTheStep:
+                if self.bRunActiveTasks_StartTheStep and 'active' in due_events:
                     self.run_active_tasks__start_the_step()
-                if self.bRunActiveTasks_CheckTheStep:
+                if self.bRunActiveTasks_CheckTheStep and self.workers_need_check():
                     self.run_active_tasks__check_the_step()
 
                 self.run_rest_api_requests()
@@ -755,6 +1324,7 @@ class AkrrDaemon:
                         log.info("REST API PID %s", self.restapi_proc.pid)
                         os.kill(self.restapi_proc.pid, signal.SIGKILL)
                     if len(self.workers) == 0 and not self.restapi_proc.is_alive():
+                        self.stop_worker_pool()
                         log.info(
                             "There is no active processes handling the task"
                             "REST API is down"
@@ -766,7 +1336,7 @@ class AkrrDaemon:
                         return
                     time.sleep(0.05)
                 else:
-                    time.sleep(cfg.scheduled_tasks_loop_sleep_time)
+                    self.wait_for_events()
             except Exception as e:
                 log.exception("Exception occurred in main loop!")
                 log.log_traceback(str(e))
@@ -780,10 +1350,11 @@ class AkrrDaemon:
                         log.debug("REST API PID", self.restapi_proc.pid)
                         os.kill(self.restapi_proc.pid, signal.SIGKILL)
                     for w in self.workers:
-                        if w['p'].is_alive():
-                            w['p'].terminate()
-                        if w['p'].is_alive():
-                            os.kill(w['p'].pid, signal.SIGKILL)
+                        if w['process'].is_alive():
+                            w['process'].terminate()
+                        if w['process'].is_alive():
+                            os.kill(w['process'].pid, signal.SIGKILL)
+                    self.stop_worker_pool()
                     exit(1)
 
     def run_rest_api_requests(self):
@@ -931,109 +1502,116 @@ class AkrrDaemon:
         else:
             log.info("There were no tasks completed with errors.")
 
-    def reprocess_completed_tasks(self, resource, appkernel, time_start, time_end, verbose=False):
+    def reprocess_completed_tasks(self, resource, appkernel, time_start, time_end, verbose=False,
+                                  processes=None, batch_size=100, restart=False, chunk_size=16):
         """
         reprocess the output from Completed task one more time with hope that new task handlers have a
-        better implementation of error handling
-        """
+        better implementation of error handling.
 
-        log.info("""Reprocess the output from Completed task one more time with hope that new task handlers 
-        have a better implementation of error handling""")
+        Tasks are processed by `processes` worker processes (default is cfg.max_task_handlers, 0 or 1
+        means in this process) in chunks of chunk_size tasks, each chunk is committed by worker at once.
+        Status changes are written in batches of batch_size tasks. Progress is checkpointed after each
+        batch and interrupted run resumes from the checkpoint unless restart is True.
+        """
+        log.info("Reprocess the output from Completed task one more time with hope that new task handlers "
+                 "have a better implementation of error handling")
         log.info("Current time: %s" % (str(datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S"))))
-        log.info("Resource:", resource)
-        log.info("Application kernel:", appkernel)
-        if time_start is not None and time_end is not None:
-            log.info("Time frame: from ", time_start, "till", time_end)
-        if time_start is None and time_end is not None:
-            log.info("Time frame: till", time_end)
-        if time_start is not None and time_end is None:
-            log.info("Time frame: from ", time_start)
-
-        sql_quote = "SELECT task_id,time_finished,status, status_info,time_to_start,datetime_stamp,repeat_in," \
-                    "resource,app,resource_param,app_param,task_param,group_id" \
-                    "FROM completed_tasks\n"
+        log.info("Resource: %s", resource)
+        log.info("Application kernel: %s", appkernel)
+        if time_start is not None or time_end is not None:
+            log.info("Time frame: from %s till %s", time_start, time_end)
+
+        checkpoint = ProgressCheckpoint(
+            os.path.join(cfg.data_dir, "reprocess_checkpoint.json"),
+            [resource, appkernel, time_start, time_end], restart=restart)
+        if checkpoint.resumed:
+            log.info("Resuming from checkpoint: %d tasks are already processed, last task_id %s, "
+                     "%d failed tasks will be retried",
+                     checkpoint.processed, checkpoint.last_task_id, len(checkpoint.failed_task_ids))
+
+        sql = "SELECT task_id,time_finished,status,status_info,datetime_stamp,resource,app\n" \
+              "FROM completed_tasks\n"
         cond = []
+        values = []
         if resource is not None:
-            cond.append("resource LIKE \"" + resource + "\"\n")
+            cond.append("resource LIKE %s")
+            values.append(resource)
         if appkernel is not None:
-            cond.append("app LIKE \"" + appkernel + "\"\n")
+            cond.append("app LIKE %s")
+            values.append(appkernel)
         if time_start is not None:
-            cond.append("time_finished >= \"" + time_start + "\"\n")
+            cond.append("time_finished >= %s")
+            values.append(time_start)
         if time_end is not None:
-            cond.append("time_finished <= \"" + time_end + "\"\n")
+            cond.append("time_finished <= %s")
+            values.append(time_end)
+        if checkpoint.last_task_id is not None:
+            # tasks failed in interrupted run are retried
+            if len(checkpoint.failed_task_ids) > 0:
+                cond.append("(task_id > %%s OR task_id IN (%s))" % ",".join(["%s"] * len(checkpoint.failed_task_ids)))
+                values.append(checkpoint.last_task_id)
+                values.extend(checkpoint.failed_task_ids)
+            else:
+                cond.append("task_id > %s")
+                values.append(checkpoint.last_task_id)
         if len(cond) > 0:
-            sql_quote += "WHERE\n" + " AND ".join(cond)
-        sql_quote += "ORDER BY task_id ASC;"
-
-        self.dbCur.execute(sql_quote)
+            sql += "WHERE " + " AND ".join(cond) + "\n"
+        sql += "ORDER BY task_id ASC;"
 
+        self.dbCur.execute(sql, values)
         tasks = self.dbCur.fetchall()
+        log.info("Number of tasks to reprocess: %d", len(tasks))
 
-        db, cur = akrr.db.get_akrr_db()
-        for row in tasks:
-            (task_id, time_finished, status, status_info, time_to_start, datetime_stamp, repeat_in, resource, app,
-             resource_param, app_param, task_param, group_id) = row
-            task_dir = akrr_task.get_local_task_dir(resource, app, datetime_stamp, False)
-            if verbose:
-                log.info("task_id:  %-10d     started:      %s    finished: %s    group_id: %s" % (
-                         task_id, time_to_start, time_finished, group_id))
-                log.info("resource: %-14s application: %-40s timestamp: %s" % (resource, app, datetime_stamp))
-                log.info("resource_param: %s    app_param: %s    task_param: %s    " % (
-                         resource_param, app_param, task_param))
-                log.info("TaskDir:", task_dir)
-                log.info("-" * 120)
-                log.info("status: %s" % status)
-
-            # Get All States
-            ths = []
-
-            proc_task_dir = os.path.join(task_dir, 'proc')
-            task_states = []
-            for f in os.listdir(proc_task_dir):
-                if re.match("(\d+).st", f, 0) is not None:
-                    task_states.append(f)
-            task_states = sorted(task_states)
-            for task_state in task_states:
-                pickle_filename = os.path.join(proc_task_dir, task_state)
-                th = akrr_task.get_task_handler_from_pkl(pickle_filename)
-                th.statefilename = task_state
-                th.set_dir_names(cfg.completed_tasks_dir)
-
-                ths.append(th)
-
-            ths[-1].process_results()
-            ths[-1].push_to_db_raw(cur, task_id, time_finished)
-
-            if re.match("ERROR:", ths[-1].status, re.M):
-                log.info("Done with errors:", task_dir, ths[-1].status)
-            if ths[-1].status != status or ths[-1].status_info != status_info:
-                log.info("status changed")
-                log.info(status)
-                log.info(ths[-1].status)
-                self.dbCur.execute('''UPDATE completed_tasks
-                    SET status=%s,status_info=%s
-                    WHERE task_id=%s ;''', (ths[-1].status, ths[-1].status_info, task_id))
-                self.dbCon.commit()
-        db.commit()
-        cur.close()
-        log.info("Reprocessing complete")
-
-    def error_analysis__task(self, task_id, resource, app):
-        # Get applicable reg_exp
-        print(task_id, resource, app)
+        if processes is None:
+            processes = cfg.max_task_handlers
 
-        # Get appstdout,stderr,stdout
-        self.dbCur.execute('''SELECT appstdout,stderr,stdout
-            FROM akrr_errmsg
-            WHERE task_id=%s;''', (task_id,))
+        chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        pool = None
+        if processes > 1 and len(chunks) > 1:
+            pool = multiprocessing.Pool(processes)
+            # ordered results, so that checkpoint covers all tasks up to last_task_id
+            results = itertools.chain.from_iterable(pool.imap(_reprocess_tasks, chunks))
+        else:
+            results = itertools.chain.from_iterable(_reprocess_tasks(chunk) for chunk in chunks)
 
-        rows = self.dbCur.fetchall()
+        status_updates = []
+        try:
+            for r in results:
+                if r['error'] is not None:
+                    log.error("Can not reprocess task %s: %s", r['task_id'], r['error'])
+                changed = checkpoint.record(r['task_id'], r['status'], r['new_status'], failed=r['error'] is not None)
+                if verbose or changed:
+                    log.info("task_id: %-10d status: %s -> %s", r['task_id'],
+                             get_status_summary(r['status']), get_status_summary(r['new_status']))
+                if r['error'] is None and (r['new_status'] != r['status'] or r['new_status_info'] != r['status_info']):
+                    status_updates.append((r['new_status'], r['new_status_info'], r['task_id']))
+                if checkpoint.processed % batch_size == 0:
+                    self._reprocess_commit(status_updates, checkpoint)
+                    status_updates = []
+            self._reprocess_commit(status_updates, checkpoint)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        log.info("Reprocessing complete\n%s", checkpoint.get_summary())
+        checkpoint.remove()
+        return checkpoint
+
+    def _reprocess_commit(self, status_updates, checkpoint):
+        """write status changes and save progress"""
+        if len(status_updates) > 0:
+            self.dbCur.executemany('''UPDATE completed_tasks
+                SET status=%s,status_info=%s
+                WHERE task_id=%s ;''', status_updates)
+        self.dbCon.commit()
+        checkpoint.save()
 
-        appstdout, stderr, stdout = (None, None, None)
-        if len(rows) > 0:
-            appstdout, stderr, stdout = rows[0]
+    def error_analysis__task(self, task_id, resource, app):
+        """classify error of single task and store err_regexp_id"""
+        log.info("Analysing task %s (%s on %s)", task_id, app, resource)
+        classifier = ErrorClassifier.from_db(self.dbCur)
 
-        # Get akrr_status_info and  akrr_status
         self.dbCur.execute('''SELECT status,status_info
             FROM completed_tasks
             WHERE task_id=%s;''', (task_id,))
@@ -1042,71 +1620,64 @@ class AkrrDaemon:
         if len(rows) > 0:
             akrr_status, akrr_status_info = rows[0]
 
-        # Get reg_exps
-        self.dbCur.execute('''SELECT id,reg_exp,reg_exp_opt,source
-            FROM akrr_err_regexp
-            WHERE active=1 AND (resource="*" OR resource=%s OR resource LIKE %s OR resource LIKE %s OR resource LIKE %s)
-            ORDER BY id ASC;''',
-                           (resource, resource + ',%', "%," + resource + ',%', '%,' + resource))
-        raw = self.dbCur.fetchall()
-
-        # strings where to look for match
-        strings_to_comp = [
-            ['appstdout', appstdout],
-            ['stderr', stderr],
-            ['stdout', stdout],
-            ['akrr_status_info', akrr_status_info],
-            ['akrr_status', akrr_status],
-        ]
-        # apply reg. exp.
-        rslt = None
-        for reg_exp_id, reg_exp, reg_exp_opt, source in raw:
-            source = source.split(',')
-            for stc_name, stc in strings_to_comp:
-                if (source == "*" or source.count(stc_name) > 0) and stc is not None:
-                    rslt = re.search(reg_exp, stc, eval(reg_exp_opt))
-                    if rslt is not None:
-                        rslt = [rslt, stc_name, reg_exp_id, reg_exp, reg_exp_opt]
-                        break
-            if rslt is not None:
-                break
-        # push results to db
-        if rslt is not None:
-            regres, stc_name, reg_exp_id, reg_exp, reg_exp_opt = rslt
-            log.info("\treg_exp_id=", reg_exp_id)
-            log.info("\treg_exp=", reg_exp)
-            log.info("\tfound_in=", stc_name)
-            self.dbCur.execute('''UPDATE  akrr_errmsg
-            SET err_regexp_id=%s
-            WHERE task_id=%s;''', (reg_exp_id, task_id))
-        else:
-            log.error("\tUnknown Error")
-            self.dbCur.execute('''UPDATE  akrr_errmsg
-            SET err_regexp_id=%s
-            WHERE task_id=%s;''', (1000, task_id))
+        _, reg_exp_id = _classify_task_error(
+            classifier, self.dbCur, task_id, resource, akrr_status, akrr_status_info)
+        _update_err_regexp_ids(self.dbCur, {reg_exp_id: [task_id]})
         self.dbCon.commit()
 
-    def error_analysis(self, date_from, date_to):
+    def error_analysis(self, date_from, date_to, processes=None, batch_size=500):
         """
-        reprocess the output from Completed task one more time with hope that new task handlers have a better
-        implementation of error handling
+        classify errors of failed tasks collected between date_from and date_to with
+        akrr_err_regexp rules. Tasks are classified by `processes` worker processes
+        (default is cfg.max_task_handlers, 0 or 1 means in this process) and err_regexp_id
+        are updated in batches of batch_size tasks.
         """
-
-        log.info("""Reprocess the output from Completed task""")
+        log.info("Error analysis of failed tasks")
         log.info("Time: %s" % (str(datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S"))))
 
-        log.info("Analysing period:", date_from, date_to)
-        self.dbCur.execute('''SELECT instance_id,resource,reporter
-            FROM akrr_xdmod_instanceinfo
-            WHERE status=0 AND collected >= %s AND collected < %s
-            ORDER BY collected ASC;''', (date_from, date_to))
-
+        log.info("Analysing period: %s - %s", date_from, date_to)
+        self.dbCur.execute('''SELECT ii.instance_id,ii.resource,ct.status,ct.status_info
+            FROM akrr_xdmod_instanceinfo ii
+            LEFT JOIN completed_tasks ct ON ct.task_id=ii.instance_id
+            WHERE ii.status=0 AND ii.collected >= %s AND ii.collected < %s
+            ORDER BY ii.collected ASC;''', (date_from, date_to))
         tasks = self.dbCur.fetchall()
-        log.info("Total number of task to process:", len(tasks))
-        for raw in tasks:
-            task_id, resource, app = raw
-            self.error_analysis__task(task_id, resource, app)
-            log.info("Done")
+        log.info("Total number of task to process: %d", len(tasks))
+
+        classifier = ErrorClassifier.from_db(self.dbCur)
+        if processes is None:
+            processes = cfg.max_task_handlers
+
+        pool = None
+        if processes > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(
+                processes, initializer=_error_analysis_worker_init, initargs=(classifier,))
+            results = pool.imap_unordered(_error_analysis_worker, tasks, chunksize=16)
+        else:
+            _error_analysis_worker_init(classifier, cur=self.dbCur)
+            results = (_error_analysis_worker(task) for task in tasks)
+
+        updates = {}
+        n_pending = 0
+        n_unknown = 0
+        try:
+            for task_id, reg_exp_id in results:
+                updates.setdefault(reg_exp_id, []).append(task_id)
+                n_pending += 1
+                if reg_exp_id == unknown_error_id:
+                    n_unknown += 1
+                if n_pending >= batch_size:
+                    _update_err_regexp_ids(self.dbCur, updates)
+                    self.dbCon.commit()
+                    updates = {}
+                    n_pending = 0
+            _update_err_regexp_ids(self.dbCur, updates)
+            self.dbCon.commit()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        log.info("Done, %d tasks analysed, %d of them with unknown error", len(tasks), n_unknown)
 
     def add_task_noraise(self, time_to_start, repeat_in, resource, app,
                          resource_param="{}", app_param="{}", task_param="{}",
@@ -1126,21 +1697,16 @@ class AkrrDaemon:
                  time_to_start: Union[None, str, datetime.datetime], repeat_in: Union[None, str],
                  resource, app, resource_param,
                  app_param, task_param,
-                 group_id, parent_task_id, dry_run=False):
-        """Check the format and add task to schedule"""
+                 group_id, parent_task_id, dry_run=False, commit=True):
+        """
+        Check the format and add task to schedule,
+        if commit is False the changes are left for the caller to commit
+        """
         log.info(">" * 100)
         log.info("Adding new task")
 
         # determine timeToStart
-        if time_to_start is None or time_to_start == "":
-            # i.e. start now
-            time_to_start = datetime.datetime.today()
-        elif isinstance(time_to_start, datetime.datetime):
-            # if got datetime
-            time_to_start = copy.deepcopy(time_to_start)
-        else:
-            # if got string
-            time_to_start = akrr.util.time.get_datetime_time_to_start(time_to_start)
+        time_to_start = self._get_datetime_time_to_start(time_to_start)
 
         # determine repeat_in
         repeat_in = akrr.util.time.get_formatted_repeat_in(repeat_in)
@@ -1164,24 +1730,105 @@ class AkrrDaemon:
         if not dry_run:
             self.dbCur.execute(
                 '''INSERT INTO scheduled_tasks (time_to_start,repeat_in,resource,app,
-                resource_param,app_param,task_param,group_id,parent_task_id)
-                VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s)''', (
+                resource_param,app_param,task_param,group_id,parent_task_id,
+                nnodes,ncores,test_run,n_runs,master_task_id)
+                VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)''', (
                  time_to_start.strftime("%Y-%m-%d %H:%M:%S"), repeat_in, resource, app, resource_param, app_param,
-                 task_param, group_id, parent_task_id))
+                 task_param, group_id, parent_task_id) + get_param_columns(resource_param, task_param))
             task_id = self.dbCur.lastrowid
 
-            self.dbCon.commit()
+            if commit:
+                self.dbCon.commit()
             if parent_task_id is None:
                 self.dbCur.execute("""UPDATE scheduled_tasks
                         SET parent_task_id=%s
                         WHERE task_id=%s""",
                                    (task_id, task_id))
-                self.dbCon.commit()
+                if commit:
+                    self.dbCon.commit()
+            self.push_timer(time_to_start, 'scheduled', task_id)
 
         log.info("task id: %s", task_id)
         log.info("<" * 120)
         return task_id
 
+    @staticmethod
+    def _get_datetime_time_to_start(time_to_start: Union[None, str, datetime.datetime]) -> datetime.datetime:
+        """return time to start as datetime, None or empty string means now"""
+        if time_to_start is None or time_to_start == "":
+            # i.e. start now
+            return datetime.datetime.today()
+        elif isinstance(time_to_start, datetime.datetime):
+            # if got datetime
+            return copy.deepcopy(time_to_start)
+        else:
+            # if got string
+            return akrr.util.time.get_datetime_time_to_start(time_to_start)
+
+    def add_tasks(self, tasks, dry_run=False):
+        """
+        Check the format and add several tasks to schedule in one transaction.
+        tasks is list of dicts with add_task arguments, resources and apps are checked once.
+        Return list of new tasks ids.
+        """
+        log.info(">" * 100)
+        log.info("Adding %d new tasks" % len(tasks))
+
+        checked_resources = set()
+        checked_apps = set()
+        rows = []
+        for task in tasks:
+            time_to_start = self._get_datetime_time_to_start(task.get('time_to_start', None))
+            repeat_in = akrr.util.time.get_formatted_repeat_in(task.get('repeat_in', None))
+            resource = task['resource']
+            app = task['app']
+            # check if resource and app exist
+            if resource not in checked_resources:
+                cfg.find_resource_by_name(resource)
+                checked_resources.add(resource)
+            if app not in checked_apps:
+                cfg.find_app_by_name(app)
+                checked_apps.add(app)
+            resource_param = task.get('resource_param', "{}")
+            task_param = task.get('task_param', "{}")
+            rows.append((
+                time_to_start, repeat_in, resource, app, resource_param,
+                task.get('app_param', "{}"), task_param, task.get('group_id', "None"),
+                task.get('parent_task_id', None)) + get_param_columns(resource_param, task_param))
+
+        if dry_run or len(rows) == 0:
+            return [None] * len(rows)
+
+        try:
+            # ids of rows inserted by multi-row statement are not always consecutive (auto_increment_increment,
+            # interleaved auto-increment lock mode and REST API inserting concurrently), so rows are inserted
+            # one by one within single transaction
+            task_ids = []
+            for row in rows:
+                self.dbCur.execute(
+                    '''INSERT INTO scheduled_tasks (time_to_start,repeat_in,resource,app,
+                    resource_param,app_param,task_param,group_id,parent_task_id,
+                    nnodes,ncores,test_run,n_runs,master_task_id)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)''',
+                    (row[0].strftime("%Y-%m-%d %H:%M:%S"),) + row[1:])
+                task_ids.append(self.dbCur.lastrowid)
+            self.dbCur.execute(
+                '''UPDATE scheduled_tasks
+                SET parent_task_id=task_id
+                WHERE task_id IN (''' + ",".join(["%s"] * len(task_ids)) + ''') AND parent_task_id IS NULL''',
+                task_ids)
+            self.dbCon.commit()
+        except Exception:
+            self.dbCon.rollback()
+            raise
+
+        for task_id, row in zip(task_ids, rows):
+            self.push_timer(row[0], 'scheduled', task_id)
+
+        log.info("tasks ids: %s", ", ".join(str(task_id) for task_id in task_ids))
+        log.info("<" * 120)
+        return task_ids
+
 
 def validate_task_parameters(k, v):
     """
@@ -1199,14 +1846,12 @@ def validate_task_parameters(k, v):
 
     if k == 'task_param' or k == 'resource_param' or k == 'app_param':
         try:
-            v2 = eval(v)
-        except Exception:
-            raise ValueError('Unknown format for ' + k)
-        if not isinstance(v2, dict):
+            v2 = parse_param(v)
+        except ValueError:
             raise ValueError('Unknown format for ' + k + '. Must be dict.')
 
     if k == 'resource_param':
-        v2 = eval(v)
+        v2 = parse_param(v)
         if 'nnodes' not in v2:
             raise ValueError('nnodes must be present in ' + k)
         if not isinstance(v2['nnodes'], int):
@@ -1290,6 +1935,8 @@ def delete_task(task_id, remove_from_scheduled_queue=True, remove_from_active_qu
                 # i.e. it is master
                 akrr_scheduler.runActiveTasks_CheckTheStep()
 
+            # end transaction to see task_lock changes done by daemon
+            db.commit()
             cur.execute('''SELECT * FROM active_tasks
                 WHERE task_id=%s''', (task_id,))
             active_task = cur.fetchone()
@@ -1398,6 +2045,8 @@ def update_task_parameters(task_id, new_param, update_derived_task=True):
         possible_keys_to_change.remove('parent_task_id')
         possible_keys_to_change.remove('app')
         possible_keys_to_change.remove('resource')
+        # typed columns follow resource_param and task_param
+        possible_keys_to_change = [k for k in possible_keys_to_change if k not in param_columns]
 
         log.info("Scheduled Task Keys: %r" % (list(scheduled_task.keys()),))
         log.info("Possible Keys: %r" % (possible_keys_to_change,))
@@ -1411,6 +2060,11 @@ def update_task_parameters(task_id, new_param, update_derived_task=True):
                 update_set_value.append(validate_task_parameters(k, new_param[k]))
             else:
                 raise IOError('Can not update %s' % k)
+        if 'resource_param' in new_param or 'task_param' in new_param:
+            update_set_var += [k + "=%s" for k in param_columns]
+            update_set_value += get_param_columns(
+                new_param.get('resource_param', scheduled_task['resource_param']),
+                new_param.get('task_param', scheduled_task['task_param']))
 
         update_set_value.append(scheduled_task['task_id'])
 
@@ -1481,6 +2135,14 @@ def daemon_start():
         raise AkrrError(
             "Can not start AKRR server because another service listening on %s:%d!" % (restapi_host, cfg.restapi_port))
 
+    # check DB schema before going to background, so that error is reported here
+    con, cur = akrr.db.get_akrr_db()
+    try:
+        _check_db_schema(cur)
+    finally:
+        cur.close()
+        con.close()
+
     def kill_child_processes(parent_pid, sig=signal.SIGTERM):
         ps_command = subprocess.Popen("ps -o pid --ppid %d --noheaders" % parent_pid, shell=True,
                                       stdout=subprocess.PIPE)
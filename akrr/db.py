@@ -1,38 +1,66 @@
 """DB routines"""
-from akrr.util.sql import get_con_to_db
+from akrr.util.sql import ConnectionPool
+
+# Per-process connection pools, key is database name in akrr (akrr, ak, xd)
+_pools = {}
+
+
+def _get_pool(name: str) -> ConnectionPool:
+    """
+    return connection pool for akrr, ak or xd database
+    """
+    if name not in _pools:
+        from akrr import cfg
+        host, port, user, passwd, db_name = (
+            getattr(cfg, name + "_db_" + v) for v in ("host", "port", "user", "passwd", "name"))
+        _pools[name] = ConnectionPool(
+            user=user, password=passwd, host=host, port=port, db_name=db_name,
+            max_idle=cfg.db_pool_max_idle, check_interval=cfg.db_pool_check_interval)
+    return _pools[name]
 
 
 def get_akrr_db(dict_cursor=False):
     """
     Get connector and cursor to mod_akrr database
     """
-    from akrr.cfg import akrr_db_host, akrr_db_port, akrr_db_user, akrr_db_passwd, akrr_db_name
-
-    return get_con_to_db(
-        user=akrr_db_user, password=akrr_db_passwd, host=akrr_db_host, port=akrr_db_port,
-        db_name=akrr_db_name, dict_cursor=dict_cursor)
+    return _get_pool("akrr").get_con(dict_cursor=dict_cursor)
 
 
 def get_ak_db(dict_cursor=False):
     """
     Get connector and cursor to mod_appkernel database
     """
-    from akrr.cfg import ak_db_host, ak_db_port, ak_db_user, ak_db_passwd, ak_db_name
-
-    return get_con_to_db(
-        user=ak_db_user, password=ak_db_passwd, host=ak_db_host, port=ak_db_port,
-        db_name=ak_db_name, dict_cursor=dict_cursor)
+    return _get_pool("ak").get_con(dict_cursor=dict_cursor)
 
 
 def get_xd_db(dict_cursor=False):
     """
     Get connector and cursor to modw database
     """
-    from akrr.cfg import xd_db_host, xd_db_port, xd_db_user, xd_db_passwd, xd_db_name
+    from akrr.cfg import xd_db_host
 
     if xd_db_host is None:
         return None, None
 
-    return get_con_to_db(
-        user=xd_db_user, password=xd_db_passwd, host=xd_db_host, port=xd_db_port,
-        db_name=xd_db_name, dict_cursor=dict_cursor)
+    return _get_pool("xd").get_con(dict_cursor=dict_cursor)
+
+
+def akrr_db_transaction(dict_cursor=False):
+    """
+    Context manager returning cursor to mod_akrr database within transaction
+    """
+    return _get_pool("akrr").transaction(dict_cursor=dict_cursor)
+
+
+def ak_db_transaction(dict_cursor=False):
+    """
+    Context manager returning cursor to mod_appkernel database within transaction
+    """
+    return _get_pool("ak").transaction(dict_cursor=dict_cursor)
+
+
+def get_pools_stats():
+    """
+    return connection pools usage statistics for this process
+    """
+    return {name: dict(pool.stats) for name, pool in _pools.items()}
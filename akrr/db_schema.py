@@ -0,0 +1,505 @@
+"""
+Online migration of mod_akrr task tables to InnoDB with indexes for daemon and REST API queries
+and EXPLAIN based verification of these queries.
+
+Table is migrated through shadow table: new table is created from mod_akrr_create_tables_dict,
+triggers on old table replay inserts, updates and deletes in shadow table, rows are copied in batches
+by key while AKRR is running, the rest is copied under short table lock and tables are swapped with
+RENAME TABLE. Old table is kept as <table>_myisam_backup. If triggers can not be created (e.g. no
+TRIGGER privilege) table is migrated only if AKRR daemon is not running.
+Task output storage tables are migrated as well, their blobs copied from MyISAM are not marked
+complete, so they are rewritten when the same content is stored again.
+After migration typed task parameters columns are backfilled from resource_param and task_param.
+"""
+import re
+import datetime
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+from akrr.akrrerror import AkrrError
+from akrr.util import log
+from akrr.util.sql import cursor_execute
+from akrr.util.task_param import param_columns, get_param_columns
+
+# Migrated tables and columns used for batched copying
+innodb_tables = OrderedDict((
+    ("active_tasks", "task_id"),
+    ("scheduled_tasks", "task_id"),
+    ("completed_tasks", "task_id"),
+    ("akrr_xdmod_instanceinfo", "instance_id"),
+    ("akrr_errmsg", "task_id"),
+    ("akrr_output_blob", "id"),
+    ("akrr_output_chunk", "blob_id"),
+    ("akrr_task_output", "task_id"),
+))
+
+# Tables with typed task parameters columns (akrr.util.task_param.param_columns)
+param_columns_tables = ("scheduled_tasks", "active_tasks", "completed_tasks")
+
+# Columns converted from TEXT to VARCHAR(255) so that they can be indexed
+varchar_columns = ("resource", "app")
+
+backup_suffix = "_myisam_backup"
+shadow_suffix = "_innodb"
+
+# Triggers replaying changes of migrated table in shadow table: suffix -> event
+trigger_events = OrderedDict((("_mig_ins", "INSERT"), ("_mig_upd", "UPDATE"), ("_mig_del", "DELETE")))
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# Daemon and REST API queries which should use indexes: (description, query, parameters)
+hot_queries = (
+    ("daemon: active tasks to check",
+     "SELECT task_id,resource,app,datetime_stamp,fatal_errors_count,fails_to_submit_to_the_queue "
+     "FROM active_tasks WHERE next_check_time<=%s AND task_lock=0 ORDER BY next_check_time ASC",
+     (_now,)),
+    ("daemon: scheduled tasks to activate",
+     "SELECT task_id,time_to_start,repeat_in,resource,app,resource_param,app_param,task_param,group_id,"
+     "parent_task_id FROM scheduled_tasks WHERE time_to_start<=%s ORDER BY time_to_start ASC",
+     (_now,)),
+    ("daemon: derived scheduled tasks",
+     "SELECT * FROM scheduled_tasks WHERE parent_task_id=%s", (1,)),
+    ("daemon: derived active tasks",
+     "SELECT * FROM active_tasks WHERE parent_task_id=%s", (1,)),
+    ("daemon: last completed tasks",
+     "SELECT * FROM completed_tasks ORDER BY time_finished DESC LIMIT 5", ()),
+    ("daemon: last failed tasks",
+     "SELECT * FROM akrr_xdmod_instanceinfo WHERE status=0 ORDER BY collected DESC LIMIT 5", ()),
+    ("daemon: error analysis",
+     "SELECT ii.instance_id,ii.resource,ct.status,ct.status_info FROM akrr_xdmod_instanceinfo ii "
+     "LEFT JOIN completed_tasks ct ON ct.task_id=ii.instance_id "
+     "WHERE ii.status=0 AND ii.collected >= %s AND ii.collected < %s ORDER BY ii.collected ASC",
+     ("2020-01-01", "2020-02-01")),
+    ("daemon: reprocess completed tasks",
+     "SELECT task_id,time_finished,status,status_info,datetime_stamp,resource,app FROM completed_tasks "
+     "WHERE resource LIKE %s AND app LIKE %s AND time_finished >= %s ORDER BY task_id ASC",
+     ("resource", "app", "2020-01-01")),
+    ("task handler: auto walltime limit",
+     "SELECT resource,reporter,reporternickname,collected,status,walltime FROM akrr_xdmod_instanceinfo "
+     "WHERE `resource`=%s AND `reporternickname`=%s ORDER BY `collected` DESC LIMIT 0, 20",
+     ("resource", "app.1")),
+    ("ingestor: instances committed since watermark",
+     "SELECT instance_id,committed FROM akrr_xdmod_instanceinfo WHERE committed>=%s "
+     "ORDER BY committed,instance_id LIMIT 500", ("2020-01-01",)),
+    ("task handler: task output",
+     "SELECT task_id FROM akrr_errmsg WHERE task_id=%s", (1,)),
+    ("REST: scheduled tasks of resource and app",
+     "SELECT * FROM scheduled_tasks WHERE app=%s AND resource=%s ORDER BY time_to_start ASC",
+     ("app", "resource")),
+    ("REST: scheduled task",
+     "SELECT * FROM scheduled_tasks WHERE task_id=%s", (1,)),
+    ("REST: active task",
+     "SELECT * FROM active_tasks WHERE task_id=%s", (1,)),
+    ("REST: completed task",
+     "SELECT * FROM completed_tasks WHERE task_id=%s", (1,)),
+    ("REST: completed task instance info",
+     "SELECT * FROM akrr_xdmod_instanceinfo WHERE instance_id=%s", (1,)),
+    ("REST: completed task errmsg",
+     "SELECT * FROM akrr_errmsg WHERE task_id=%s", (1,)),
+    ("task api: active tasks of resource, app and nodes",
+     "SELECT task_id FROM active_tasks WHERE resource=%s AND app IN (%s) AND nnodes IN (%s)",
+     ("resource", "app", 2)),
+    ("task api: scheduled tasks on nodes",
+     "SELECT task_id FROM scheduled_tasks WHERE nnodes IN (%s,%s)", (2, 4)),
+    ("bundle: subtasks",
+     "SELECT task_id,status,datetime_stamp,resource,app,task_param FROM active_tasks "
+     "WHERE master_task_id=%s ORDER BY task_id ASC", (1,)),
+)
+
+
+def get_table_engine(cur, table: str) -> Optional[str]:
+    """return storage engine of table or None if table does not exist"""
+    cur.execute("SELECT ENGINE FROM information_schema.TABLES WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s",
+                (table,))
+    rows = cur.fetchall()
+    if len(rows) == 0:
+        return None
+    return rows[0]["ENGINE"] if isinstance(rows[0], dict) else rows[0][0]
+
+
+def tables_support_transactions(cur, tables) -> bool:
+    """return True if all tables are InnoDB, i.e. their changes can be rolled back"""
+    return all((get_table_engine(cur, table) or "").lower() == "innodb" for table in tables)
+
+
+def get_table_indexes(cur, table: str) -> set:
+    """return names of table indexes"""
+    cur.execute("SHOW INDEX FROM `%s`" % table)
+    return {row["Key_name"] if isinstance(row, dict) else row[2] for row in cur.fetchall()}
+
+
+def get_table_columns(cur, table: str) -> List[str]:
+    cur.execute("SHOW COLUMNS FROM `%s`" % table)
+    return [row["Field"] if isinstance(row, dict) else row[0] for row in cur.fetchall()]
+
+
+def get_expected_indexes(create_statement: str) -> set:
+    """return names of indexes in CREATE TABLE statement"""
+    indexes = set(re.findall(r"KEY\s+`(\w+)`", create_statement))
+    if re.search(r"PRIMARY\s+KEY", create_statement):
+        indexes.add("PRIMARY")
+    return indexes
+
+
+def get_shadow_create_statement(table: str, create_statement: str) -> str:
+    """return CREATE TABLE statement for shadow table"""
+    return create_statement.replace(
+        "CREATE TABLE IF NOT EXISTS `%s`" % table, "CREATE TABLE `%s`" % (table + shadow_suffix), 1)
+
+
+def get_unique_key_columns(create_statement: str) -> List[str]:
+    """return columns of primary key or first unique key in CREATE TABLE statement"""
+    m = re.search(r"PRIMARY\s+KEY\s*\(([^)]*)\)", create_statement)
+    if m is None:
+        m = re.search(r"UNIQUE\s+KEY\s+`\w+`\s*\(([^)]*)\)", create_statement)
+    if m is None:
+        raise AkrrError("Can not find primary or unique key in:\n" + create_statement)
+    return re.findall(r"`(\w+)`", m.group(1))
+
+
+def get_trigger_statements(table: str, columns: List[str], unique_columns: List[str]) -> List[str]:
+    """return CREATE TRIGGER statements which replay changes of table in its shadow table"""
+    shadow = table + shadow_suffix
+    cols = ",".join("`%s`" % c for c in columns)
+    new_values = ",".join("NEW.`%s`" % c for c in columns)
+    old_key = " AND ".join("`%s`=OLD.`%s`" % (c, c) for c in unique_columns)
+    statements = []
+    for suffix, event in trigger_events.items():
+        if event == "DELETE":
+            action = "DELETE FROM `%s` WHERE %s" % (shadow, old_key)
+        else:
+            action = "REPLACE INTO `%s` (%s) VALUES (%s)" % (shadow, cols, new_values)
+        statements.append("CREATE TRIGGER `%s` AFTER %s ON `%s` FOR EACH ROW %s" % (
+            table + suffix, event, table, action))
+    return statements
+
+
+def _scalar(cur, query, args=None):
+    cur.execute(query, args)
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return list(row.values())[0] if isinstance(row, dict) else row[0]
+
+
+def sync_task_id_counter(cur, dry_run: bool = False) -> None:
+    """
+    make sure that scheduled_tasks AUTO_INCREMENT is above all used task ids,
+    InnoDB of older MySQL versions resets it to max(task_id)+1 on server restart
+    """
+    max_task_id = 0
+    for table in ("scheduled_tasks", "active_tasks", "completed_tasks"):
+        v = _scalar(cur, "SELECT MAX(task_id) FROM `%s`" % table)
+        if v is not None:
+            max_task_id = max(max_task_id, int(v))
+    auto_increment = _scalar(
+        cur, "SELECT AUTO_INCREMENT FROM information_schema.TABLES "
+             "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='scheduled_tasks'")
+    if auto_increment is not None and int(auto_increment) <= max_task_id:
+        log.info("Setting scheduled_tasks AUTO_INCREMENT to %d", max_task_id + 1)
+        cursor_execute(cur, "ALTER TABLE scheduled_tasks AUTO_INCREMENT=%d" % (max_task_id + 1), dry_run=dry_run)
+
+
+def get_missing_param_columns(cur) -> Dict[str, List[str]]:
+    """
+    return {table: missing columns} for task tables which do not have some of typed task parameters
+    columns, i.e. they were created by older AKRR version and were not updated yet
+    """
+    cur.execute(
+        "SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME IN (%s)" % ",".join(["%s"] * len(param_columns_tables)),
+        param_columns_tables)
+    columns = {}
+    for row in cur.fetchall():
+        table, column = (row["TABLE_NAME"], row["COLUMN_NAME"]) if isinstance(row, dict) else row[:2]
+        columns.setdefault(table, set()).add(column)
+    missing = OrderedDict()
+    for table in param_columns_tables:
+        missing_columns = [c for c in param_columns if c not in columns.get(table, set())]
+        if len(missing_columns) > 0:
+            missing[table] = missing_columns
+    return missing
+
+
+def check_param_columns(cur) -> None:
+    """raise AkrrError if task tables do not have typed task parameters columns"""
+    missing = get_missing_param_columns(cur)
+    if len(missing) > 0:
+        raise AkrrError(
+            "mod_akrr tables are not updated to this AKRR version, missing columns: %s. "
+            "Run 'akrr update db-schema' to update them." % "; ".join(
+                "%s (%s)" % (table, ", ".join(columns)) for table, columns in missing.items()))
+
+
+class InnoDBMigration:
+    """
+    Migration of mod_akrr task tables to InnoDB with indexes
+    """
+    def __init__(self, con, cur, batch_size: int = 10000, dry_run: bool = False, drop_backup: bool = False):
+        from akrr.cli.generate_tables import mod_akrr_create_tables_dict
+        self.con = con
+        self.cur = cur
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.drop_backup = drop_backup
+        self.create_tables_dict = mod_akrr_create_tables_dict
+
+    def _execute(self, query, args=None):
+        cursor_execute(self.cur, query, args, dry_run=self.dry_run)
+
+    def table_needs_migration(self, table: str) -> bool:
+        engine = get_table_engine(self.cur, table)
+        if engine is None:
+            return False
+        if engine.lower() != "innodb":
+            return True
+        return not get_expected_indexes(self.create_tables_dict[table]) <= get_table_indexes(self.cur, table)
+
+    def _check_varchar_columns(self, table: str, columns: List[str]) -> None:
+        for col in varchar_columns:
+            if col not in columns:
+                continue
+            n = _scalar(self.cur, "SELECT COUNT(*) FROM `%s` WHERE CHAR_LENGTH(`%s`)>255" % (table, col))
+            if n > 0:
+                raise AkrrError("%d rows of %s have %s longer than 255 characters, can not convert it to VARCHAR" %
+                                (n, table, col))
+
+    def _drop_triggers(self, table: str) -> None:
+        for suffix in trigger_events:
+            self._execute("DROP TRIGGER IF EXISTS `%s`" % (table + suffix))
+
+    def _create_triggers(self, table: str, columns: List[str]) -> bool:
+        """
+        create triggers replaying changes in shadow table, return False if they can not be created
+        and daemon is not running, so that nothing modifies the table
+        """
+        unique_columns = get_unique_key_columns(self.create_tables_dict[table])
+        try:
+            for statement in get_trigger_statements(table, columns, unique_columns):
+                self._execute(statement)
+        except Exception as e:
+            self._drop_triggers(table)
+            if self._daemon_is_running():
+                raise AkrrError("Can not create triggers on %s (%s), stop AKRR daemon to migrate it" %
+                                (table, str(e)))
+            log.warning("Can not create triggers on %s (%s), migrating it while AKRR daemon is stopped",
+                        table, str(e))
+            return False
+        return True
+
+    @staticmethod
+    def _daemon_is_running() -> bool:
+        import os
+        from akrr import cfg
+        from akrr.util.daemon import get_daemon_pid
+        return get_daemon_pid(os.path.join(cfg.data_dir, "akrr.pid"), delete_pid_file_if_daemon_down=True) \
+            is not None
+
+    def _copy_rows(self, table: str, shadow: str, key: str, cols: str, last_key, upper_key=None) -> int:
+        """copy rows with last_key < key <= upper_key (no upper limit if upper_key is None)"""
+        query = "INSERT IGNORE INTO `%s` (%s) SELECT %s FROM `%s` WHERE `%s`>%%s" % (shadow, cols, cols, table, key)
+        args = [last_key]
+        if upper_key is not None:
+            query += " AND `%s`<=%%s" % key
+            args.append(upper_key)
+        self._execute(query, args)
+        return self.cur.rowcount if not self.dry_run else 0
+
+    def _copy_batches(self, table: str, shadow: str, key: str, cols: str):
+        """copy rows in batches by key, return last copied key"""
+        n_rows = _scalar(self.cur, "SELECT COUNT(*) FROM `%s`" % table)
+        last_key = -1
+        copied = 0
+        while True:
+            upper_key = _scalar(
+                self.cur, "SELECT `%s` FROM `%s` WHERE `%s`>%%s ORDER BY `%s` LIMIT 1 OFFSET %d" % (
+                    key, table, key, key, self.batch_size - 1), (last_key,))
+            if upper_key is None:
+                break
+            copied += self._copy_rows(table, shadow, key, cols, last_key, upper_key)
+            self.con.commit()
+            last_key = upper_key
+            log.info("%s: copied %d of about %d rows", table, copied, n_rows)
+        return last_key
+
+    def migrate_table(self, table: str) -> None:
+        """migrate single table"""
+        key = innodb_tables[table]
+        shadow = table + shadow_suffix
+        backup = table + backup_suffix
+
+        if not self.table_needs_migration(table):
+            log.info("%s is already InnoDB with all indexes", table)
+            return
+        if get_table_engine(self.cur, backup) is not None:
+            raise AkrrError("Backup table %s exists, remove it after checking that migration was successful" % backup)
+
+        log.info("Migrating %s to InnoDB", table)
+        old_columns = get_table_columns(self.cur, table)
+        self._check_varchar_columns(table, old_columns)
+
+        self._drop_triggers(table)
+        self._execute("DROP TABLE IF EXISTS `%s`" % shadow)
+        self._execute(get_shadow_create_statement(table, self.create_tables_dict[table]))
+        self.con.commit()
+        if self.dry_run:
+            return
+
+        new_columns = get_table_columns(self.cur, shadow)
+        common_columns = [c for c in old_columns if c in new_columns]
+        cols = ",".join("`%s`" % c for c in common_columns)
+
+        # changes made during copying are replayed by triggers, batched copy does not overwrite them
+        self._create_triggers(table, common_columns)
+        try:
+            last_key = self._copy_batches(table, shadow, key, cols)
+
+            # the rest under the lock, rows without key are copied here as well
+            self._execute("LOCK TABLES `%s` WRITE, `%s` WRITE" % (table, shadow))
+        except Exception:
+            self._drop_triggers(table)
+            raise
+        try:
+            self._copy_rows(table, shadow, key, cols, last_key)
+            self._execute("DELETE FROM `%s` WHERE `%s` IS NULL" % (shadow, key))
+            self._execute("INSERT INTO `%s` (%s) SELECT %s FROM `%s` WHERE `%s` IS NULL" % (
+                shadow, cols, cols, table, key))
+            # triggers reference shadow table by name and would move with renamed table
+            self._drop_triggers(table)
+            auto_increment = _scalar(
+                self.cur, "SELECT AUTO_INCREMENT FROM information_schema.TABLES "
+                          "WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s", (table,))
+            if auto_increment is not None:
+                self._execute("ALTER TABLE `%s` AUTO_INCREMENT=%d" % (shadow, int(auto_increment)))
+            self.con.commit()
+            renamed_under_lock = True
+            try:
+                self._execute("RENAME TABLE `%s` TO `%s`, `%s` TO `%s`" % (table, backup, shadow, table))
+            except Exception as e:
+                # older servers do not allow RENAME TABLE under LOCK TABLES
+                log.debug("Can not rename under lock: %s", str(e))
+                renamed_under_lock = False
+        except Exception:
+            self._drop_triggers(table)
+            raise
+        finally:
+            self._execute("UNLOCK TABLES")
+        if not renamed_under_lock:
+            self._execute("RENAME TABLE `%s` TO `%s`, `%s` TO `%s`" % (table, backup, shadow, table))
+            # rows inserted between unlocking and renaming
+            self._copy_rows(backup, table, key, cols, last_key)
+        self.con.commit()
+
+        n_old = _scalar(self.cur, "SELECT COUNT(*) FROM `%s`" % backup)
+        n_new = _scalar(self.cur, "SELECT COUNT(*) FROM `%s`" % table)
+        if n_old != n_new:
+            log.warning("%s: %d rows in old table and %d in new one, old table is kept as %s",
+                        table, n_old, n_new, backup)
+        elif self.drop_backup:
+            self._execute("DROP TABLE `%s`" % backup)
+            self.con.commit()
+        log.info("%s is migrated, %d rows", table, n_new)
+
+    def migrate(self, tables: List[str] = None) -> None:
+        """migrate tables (default all from innodb_tables)"""
+        for table in tables if tables is not None else innodb_tables:
+            self.migrate_table(table)
+        if not self.dry_run:
+            sync_task_id_counter(self.cur)
+            self.con.commit()
+
+
+def backfill_param_columns(con, cur, batch_size: int = 10000, dry_run: bool = False) -> None:
+    """
+    fill typed task parameters columns (nnodes and others) of rows added before these columns were
+    introduced, these rows have NULL nnodes
+    """
+    update = "UPDATE `%s` SET " + ",".join("`%s`=%%s" % c for c in param_columns) + " WHERE task_id=%%s"
+    for table in ("scheduled_tasks", "active_tasks", "completed_tasks"):
+        last_key = -1
+        updated = 0
+        while True:
+            cur.execute(
+                "SELECT task_id,resource_param,task_param FROM `%s` WHERE nnodes IS NULL AND task_id>%%s "
+                "ORDER BY task_id LIMIT %d" % (table, batch_size), (last_key,))
+            rows = cur.fetchall()
+            if len(rows) == 0:
+                break
+            if isinstance(rows[0], dict):
+                rows = [(r["task_id"], r["resource_param"], r["task_param"]) for r in rows]
+            values = [get_param_columns(resource_param, task_param) + (task_id,)
+                      for task_id, resource_param, task_param in rows]
+            if dry_run:
+                log.dry_run("%s: would update %d rows" % (table, len(values)))
+            else:
+                cur.executemany(update % table, values)
+                con.commit()
+            updated += len(values)
+            last_key = rows[-1][0]
+        if updated > 0:
+            log.info("%s: typed task parameters columns are set for %d rows", table, updated)
+
+
+def explain_hot_queries(cur) -> List[Dict]:
+    """
+    run EXPLAIN on hot_queries, return list of plans rows with query description and
+    issue (full table scan or filesort) if any
+    """
+    report = []
+    for description, query, args in hot_queries:
+        args = tuple(v() if callable(v) else v for v in args)
+        cur.execute("EXPLAIN " + query, args)
+        for row in cur.fetchall():
+            if not isinstance(row, dict):
+                row = dict(zip([d[0] for d in cur.description], row))
+            issues = []
+            if row.get("type") == "ALL" and row.get("table") is not None:
+                issues.append("full scan")
+            if "filesort" in str(row.get("Extra") or ""):
+                issues.append("filesort")
+            report.append({
+                "query": description,
+                "table": row.get("table"),
+                "type": row.get("type"),
+                "key": row.get("key"),
+                "rows": row.get("rows"),
+                "extra": row.get("Extra"),
+                "issues": ", ".join(issues)
+            })
+    return report
+
+
+def format_explain_report(report: List[Dict]) -> Tuple[str, int]:
+    """return report as text table and number of plan rows with issues"""
+    from prettytable import PrettyTable
+    table = PrettyTable(["Query", "Table", "Type", "Key", "Rows", "Extra", "Issues"])
+    table.align = "l"
+    n_issues = 0
+    for r in report:
+        table.add_row([r["query"], r["table"], r["type"], r["key"], r["rows"], r["extra"], r["issues"]])
+        if r["issues"]:
+            n_issues += 1
+    return str(table), n_issues
+
+
+def update_db_schema(batch_size: int = 10000, dry_run: bool = False, drop_backup: bool = False,
+                     explain_only: bool = False) -> int:
+    """
+    migrate mod_akrr task tables to InnoDB and print EXPLAIN report of hot queries,
+    return number of query plans with issues
+    """
+    import akrr.db
+    con, cur = akrr.db.get_akrr_db(dict_cursor=True)
+    if not explain_only:
+        InnoDBMigration(con, cur, batch_size=batch_size, dry_run=dry_run, drop_backup=drop_backup).migrate()
+        backfill_param_columns(con, cur, batch_size=batch_size, dry_run=dry_run)
+    text, n_issues = format_explain_report(explain_hot_queries(cur))
+    log.info("Query plans of daemon and REST API queries:\n%s", text)
+    if n_issues > 0:
+        log.warning("%d query plans use full table scan or filesort (it is expected on small tables)", n_issues)
+    cur.close()
+    con.close()
+    return n_issues
@@ -24,65 +24,60 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Inference Score')
     parser.add_must_have_statistic('Training Score')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
+    # set app kernel output handlers
+    # Global parameters
+    parser.add_appstdout_parameter("App:Version", r'>>   AI-Benchmark-v\.(.+)$')
+    parser.add_appstdout_parameter("TF Version", r'\*  TF Version: (.+)$')
+    parser.add_appstdout_parameter("Platform", r'\*  Platform: (.+)$')
+    parser.add_appstdout_parameter("CPU", r'\*  CPU: (.+)$')
+    parser.add_appstdout_parameter("CPU RAM", r'\*  CPU RAM: (.+)$')
+    parser.add_appstdout_parameter("GPU", r'\*  GPU/0: (.+)$')
+    parser.add_appstdout_parameter("GPU RAM", r'\*  GPU RAM: (.+)$')
+
+    # Summary statistics
+    parser.add_appstdout_statistic("Inference Score", r'Device Inference Score: ([0-9.]+)$')
+    parser.add_appstdout_statistic("Training Score", r'Device Training Score: ([0-9.]+)$')
+    parser.add_appstdout_statistic("AI Score", r'Device AI Score: ([0-9.]+)$')
+
+    state = {'successful_run': False, 'subtest': None, 'subtest_line': 0}
+
+    def successful_run(m):
+        state['successful_run'] = True
+
+    parser.add_appstdout_handler(r'^For more information and results', successful_run)
+
+    # detailed metrics, results follow subtest header after one line
+    subtest_result_pattern = re.compile(
+        r'\d+.\d+ - (inference|training)\s+[|] batch=(\d+), (size=\S+): (\d+) ± (\d+) ms')
+
+    def subtest_result(line):
+        if state['subtest'] is None:
+            return
+        state['subtest_line'] += 1
+        if state['subtest_line'] < 2:
+            return
+        m = subtest_result_pattern.match(line)
+        if m:
+            parser.set_statistic(f"{state['subtest']}, {m.group(1)}, {m.group(3)}",
+                                 {'mean': int(m.group(4)), 'stdev': int(m.group(5)), 'n': int(m.group(2))},
+                                 units="ms", group="details")
+        if m is None or state['subtest_line'] == 5:
+            state['subtest'] = None
 
-    if parser.appKerWallClockTime is not None:
-        parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
+    def subtest(m):
+        state['subtest'] = m.group(1)
+        state['subtest_line'] = 0
 
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
+    parser.add_appstdout_handler(None, subtest_result)
+    parser.add_appstdout_handler(r'\d+/\d+[.]\s+(\S+)', subtest)
 
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
+    if parser.appKerWallClockTime is not None:
+        parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
 
-    # process the output
-    successful_run = False
-    j = 0
-    def process_subtest(test_name):
-        m = re.match(r'\d+/\d+\.\s+'+test_name, lines[j])
-        if m:
-            print("DSF")
-
-    while j < len(lines):
-        # Global parameters
-        parser.match_set_parameter("App:Version", r'>>   AI-Benchmark-v\.(.+)$', lines[j])
-        parser.match_set_parameter("TF Version", r'\*  TF Version: (.+)$', lines[j])
-        parser.match_set_parameter("Platform", r'\*  Platform: (.+)$', lines[j])
-        parser.match_set_parameter("CPU", r'\*  CPU: (.+)$', lines[j])
-        parser.match_set_parameter("CPU RAM", r'\*  CPU RAM: (.+)$', lines[j])
-        parser.match_set_parameter("GPU", r'\*  GPU/0: (.+)$', lines[j])
-        parser.match_set_parameter("GPU RAM", r'\*  GPU RAM: (.+)$', lines[j])
-
-        # Summary statistics
-        parser.match_set_statistic("Inference Score", r'Device Inference Score: ([0-9.]+)$', lines[j])
-        parser.match_set_statistic("Training Score", r'Device Training Score: ([0-9.]+)$', lines[j])
-        parser.match_set_statistic("AI Score", r'Device AI Score: ([0-9.]+)$', lines[j])
-
-        m = re.match(r'^For more information and results', lines[j])
-        if m:
-            successful_run = True
-
-        # detailed metrics
-        m_subtest = re.match(r'\d+/\d+[.]\s+(\S+)', lines[j])
-        if m_subtest :
-            for k in range(2,6):
-                if j + k >= len(lines):
-                    break
-                m_subtest2 = re.match(r'\d+.\d+ - (inference|training)\s+[|] batch=(\d+), (size=\S+): (\d+) ± (\d+) ms', lines[j+k])
-                if m_subtest2:
-                    parser.set_statistic(f"{m_subtest.group(1)}, {m_subtest2.group(1)}, {m_subtest2.group(3)}",
-                                         {'mean': int(m_subtest2.group(4)), 'stdev': int(m_subtest2.group(5)), 'n': int(m_subtest2.group(2))},
-                                         units="ms", group="details")
-                else:
-                    break
-
-        j += 1
-
-    parser.successfulRun = successful_run
+    parser.successfulRun = state['successful_run']
     # return
     if __name__ == "__main__":
         # output for testing purpose
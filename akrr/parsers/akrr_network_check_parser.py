@@ -27,7 +27,22 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     # set app kernel custom sets
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
+    # set app kernel output handlers
+    # results are json between last "AKRR Network Check Results:" and last "Done"
+    state = {'results_lines': None, 'json_lines': None}
+
+    def results_line(line):
+        if line.strip() == "Done" and state['json_lines'] is not None:
+            state['results_lines'] = list(state['json_lines'])
+        if state['json_lines'] is not None:
+            state['json_lines'].append(line)
+        if line.strip() == "AKRR Network Check Results:":
+            state['json_lines'] = []
+            state['results_lines'] = None
+
+    parser.add_appstdout_handler(None, results_line)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
     parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if hasattr(parser, 'wallClockTime') and parser.wallClockTime is not None:
@@ -35,27 +50,11 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     if hasattr(parser, 'appKerWallClockTime') and parser.appKerWallClockTime is not None:
         parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
 
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
     # process the output
     successful_run = False
-    j = 0
-
-    start = None
-    while j < len(lines):
-        if lines[j].strip() == "AKRR Network Check Results:":
-            start = j
-        if lines[j].strip() == "Done":
-            end = j
-        j += 1
-
-    if start is not None and end is not None:
-        r = json.loads(" ".join(lines[(start+1):end]))
+
+    if state['results_lines'] is not None:
+        r = json.loads(" ".join(state['results_lines']))
         successful_run = True
         if 'ping' in r:
             count = 0
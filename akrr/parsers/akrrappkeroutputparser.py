@@ -8,11 +8,10 @@ import re
 import os
 import datetime
 import xml.etree.ElementTree as ElementTree
-import xml.dom.minidom
 import traceback
 import akrr.util.log as log
 import json
-from akrr.util import base_gzip_encode, get_float_or_int
+from akrr.util import base_gzip_encode, get_float_or_int, indent_xml
 
 
 # add total_seconds function to datetime.timedelta if python is old
@@ -20,6 +19,252 @@ def total_seconds(d):
     return d.days * 3600 * 24 + d.seconds + d.microseconds / 1000000.0
 
 
+def iter_lines(filename):
+    """
+    yield lines of text file one at a time, yield nothing if file does not exist
+    """
+    if filename is None or not os.path.isfile(filename):
+        return
+    with open(filename, "rt") as fin:
+        for line in fin:
+            yield line
+
+
+class LinePipeline:
+    """
+    Single pass line processing.
+
+    Handlers are registered with patterns which are compiled once. Each line is checked
+    against all patterns in order of registration and handler of every matching pattern
+    is called with match object. Handlers registered without pattern are called with
+    line itself, they are useful for keeping state between lines (i.e. sections).
+    Handler returning True stops dispatching of current line to following handlers.
+
+    Sections are blocks of lines following a header line, while section is active
+    its lines are passed only to section handler.
+    """
+    def __init__(self):
+        self.handlers = []
+        # active section: [line_handler, lines_to_skip, lines_left, end_matcher, on_end]
+        self._section = None
+
+    def add(self, pattern, handler, search=False, flags=0):
+        """
+        register handler, pattern can be string, compiled regular expression or None,
+        by default pattern is matched at the beginning of line (re.match) and
+        with search=True anywhere in the line (re.search)
+        """
+        if pattern is None:
+            self.handlers.append((None, handler))
+            return
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern, flags)
+        self.handlers.append((pattern.search if search else pattern.match, handler))
+
+    def add_section(self, pattern, line_handler, skip=0, max_lines=None, end_pattern=None, on_end=None,
+                    search=False):
+        """
+        register section started by line matching pattern. First skip lines after the header are ignored,
+        following lines are passed to line_handler till end_pattern is matched, max_lines are processed
+        or line_handler returns True. on_end is called without arguments when section is over.
+        """
+        if isinstance(end_pattern, str):
+            end_pattern = re.compile(end_pattern)
+        end_matcher = end_pattern.match if end_pattern is not None else None
+
+        def start_section(_):
+            self._section = [line_handler, skip, max_lines, end_matcher, on_end]
+        self.add(pattern, start_section, search=search)
+
+    def _end_section(self):
+        on_end = self._section[4]
+        self._section = None
+        if on_end is not None:
+            on_end()
+
+    def _process_section_line(self, line):
+        section = self._section
+        if section[1] > 0:
+            section[1] -= 1
+            return
+        if section[3] is not None and section[3](line):
+            self._end_section()
+            return
+        stop = section[0](line)
+        if section[2] is not None:
+            section[2] -= 1
+        if stop is True or section[2] == 0:
+            self._end_section()
+
+    def process_line(self, line):
+        if self._section is not None:
+            self._process_section_line(line)
+            return
+        for matcher, handler in self.handlers:
+            if matcher is None:
+                stop = handler(line)
+            else:
+                m = matcher(line)
+                if m is None:
+                    continue
+                stop = handler(m)
+            if stop is True:
+                break
+
+    def process(self, lines):
+        """process all lines from iterable"""
+        process_line = self.process_line
+        for line in lines:
+            process_line(line)
+        if self._section is not None:
+            self._end_section()
+
+    def process_file(self, filename):
+        """stream file through the pipeline"""
+        self.process(iter_lines(filename))
+
+
+class Metric:
+    """
+    Parameter or statistic record, also accessible by index (see AppKerOutputParser.METRIC_*)
+    """
+    __slots__ = ("name", "val", "units", "better", "group", "metric_type")
+
+    def __init__(self, name, val, units=None, better=None, group="summary", metric_type=None):
+        self.name = name
+        self.val = val
+        self.units = units
+        self.better = better
+        self.group = group
+        self.metric_type = metric_type
+
+    def __getitem__(self, i):
+        return getattr(self, Metric.__slots__[i])
+
+    def __len__(self):
+        return len(Metric.__slots__)
+
+    def __iter__(self):
+        return (getattr(self, slot) for slot in Metric.__slots__)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return "Metric(%s)" % ", ".join(repr(v) for v in self)
+
+
+class MetricStore:
+    """
+    Parameters or statistics indexed by name, last set value wins
+    """
+    def __init__(self):
+        self._metrics = {}
+
+    def set(self, name, val, units=None, better=None, group="summary", metric_type=None):
+        self._metrics[name] = Metric(name, val, units, better, group, metric_type)
+
+    def get(self, name):
+        """return metric record or None"""
+        return self._metrics.get(name)
+
+    def append(self, metric):
+        """add metric in list form [name, val, units, better, group, metric_type]"""
+        self.set(*metric)
+
+    def unique(self):
+        """return metrics sorted by name"""
+        return sorted(self._metrics.values(), key=lambda m: m.name)
+
+    def __contains__(self, name):
+        return name in self._metrics
+
+    def __iter__(self):
+        return iter(self._metrics.values())
+
+    def __len__(self):
+        return len(self._metrics)
+
+
+class AppKerResult:
+    """
+    Structured result of app kernel output processing.
+    It is passed to DB writer as is and XML is generated from it only when needed.
+    """
+    def __init__(self, measurement_name, parameters, statistics, completed):
+        self.measurement_name = measurement_name
+        # lists of Metric sorted by name
+        self.parameters = parameters
+        self.statistics = statistics
+        self.completed = completed
+
+    def get_statistic(self, name):
+        for p in self.statistics:
+            if p.name == name:
+                return p.val
+        return None
+
+    def get_performance_element(self):
+        """return performance element of report"""
+        performance = ElementTree.Element('performance')
+        ElementTree.SubElement(performance, 'ID').text = self.measurement_name
+        benchmark = ElementTree.SubElement(performance, 'benchmark')
+        ElementTree.SubElement(benchmark, 'ID').text = self.measurement_name
+        parameters = ElementTree.SubElement(benchmark, 'parameters')
+        statistics = ElementTree.SubElement(benchmark, 'statistics')
+
+        details = ElementTree.Element('details')
+        parameters_details = ElementTree.Element('parameters')
+        statistics_details = ElementTree.Element('statistics')
+
+        for metrics, tag, summary_parent, details_parent in (
+                (self.parameters, 'parameter', parameters, parameters_details),
+                (self.statistics, 'statistic', statistics, statistics_details)):
+            for par in metrics:
+                e = ElementTree.SubElement(details_parent if par.group == "details" else summary_parent, tag)
+                ElementTree.SubElement(e, 'ID').text = par.name
+                ElementTree.SubElement(e, 'value').text = str(par.val)
+                if par.units:
+                    ElementTree.SubElement(e, 'units').text = par.units
+
+        if len(parameters_details) > 0:
+            details.append(parameters_details)
+        if len(statistics_details) > 0:
+            details.append(statistics_details)
+        if len(details) > 0:
+            performance.append(details)
+        return performance
+
+    def get_performance_xml(self, indent="    "):
+        """return pretty printed performance element, it is stored in DB as body"""
+        performance = self.get_performance_element()
+        indent_xml(performance, space=indent)
+        return ElementTree.tostring(performance, encoding="unicode") + "\n"
+
+    def get_xml(self, indent="  "):
+        """return pretty printed report"""
+        root = ElementTree.Element('rep:report')
+        root.attrib['xmlns:rep'] = 'report'
+        body = ElementTree.SubElement(root, 'body')
+        body.append(self.get_performance_element())
+        exit_status = ElementTree.SubElement(root, 'exitStatus')
+        ElementTree.SubElement(exit_status, 'completed').text = str(self.completed).lower()
+        indent_xml(root, space=indent)
+        return '<?xml version="1.0" ?>\n' + ElementTree.tostring(root, encoding="unicode") + "\n"
+
+
+class AppKerResultXML(str):
+    """
+    Report XML text with structured result attached as result attribute
+    """
+    result = None
+
+
+# precompiled patterns for common parameters and statistics
+_exe_bin_signature_pattern = re.compile(r'===ExeBinSignature===(.+)')
+_akrr_error_pattern = re.compile(r'AKRR:ERROR: (.+?) (is not writable|does not exists)')
+
+
 class AppKerOutputParser:
     METRIC_NAME = 0
     METRIC_VAL = 1
@@ -36,8 +281,8 @@ class AppKerOutputParser:
             self.measurement_name = measurement_name
         else:
             self.measurement_name = name
-        self.parameters = []
-        self.statistics = []
+        self.parameters = MetricStore()
+        self.statistics = MetricStore()
         self.mustHaveParameters = []
         self.mustHaveStatistics = []
         # complete
@@ -54,13 +299,16 @@ class AppKerOutputParser:
         self.filesExistance = {}
         self.dirAccess = {}
 
+        # handlers for appstdout, executed in same pass as common parameters
+        self.appstdout_pipeline = LinePipeline()
+
     def set_parameter(self, name, val, units=None, set_none_value=False, better=None, group="summary", metric_type=None):
         if val is None and set_none_value is False:
             return
 
         #if not isinstance(val, str):
         #    val = str(val)
-        self.parameters.append([name, val, units, better, group, metric_type])
+        self.parameters.set(name, val, units, better, group, metric_type)
 
     def set_statistic(self, name, val, units=None, set_none_value=False, better=None, group="summary", metric_type=None):
         """
@@ -86,7 +334,7 @@ class AppKerOutputParser:
             return
         #if not isinstance(val, str):
         #    val = str(val)
-        self.statistics.append([name, val, units, better, group, metric_type])
+        self.statistics.set(name, val, units, better, group, metric_type)
 
     def match_set_parameter(self, name, pattern, line, units=None, set_none_value=False, better=None, group="summary"):
         """
@@ -130,17 +378,45 @@ class AppKerOutputParser:
             return True
         return False
 
+    def add_appstdout_handler(self, pattern, handler, search=False, flags=0):
+        """
+        Register handler for appstdout lines, see LinePipeline.add.
+        Handlers are executed during parse_common_params_and_stats in single pass over appstdout.
+        """
+        self.appstdout_pipeline.add(pattern, handler, search=search, flags=flags)
+
+    def add_appstdout_section(self, pattern, line_handler, skip=0, max_lines=None, end_pattern=None, on_end=None,
+                              search=False):
+        """
+        Register handler for section of appstdout, see LinePipeline.add_section
+        """
+        self.appstdout_pipeline.add_section(
+            pattern, line_handler, skip=skip, max_lines=max_lines, end_pattern=end_pattern, on_end=on_end,
+            search=search)
+
+    def add_appstdout_parameter(self, name, pattern, units=None, search=False, group="summary"):
+        """
+        Set parameter from first group of pattern matched in appstdout
+        """
+        def handler(m):
+            self.set_parameter(name, m.group(1).strip(), units=units, group=group)
+        self.appstdout_pipeline.add(pattern, handler, search=search)
+
+    def add_appstdout_statistic(self, name, pattern, units=None, search=False, group="summary"):
+        """
+        Set statistic from first group of pattern matched in appstdout
+        """
+        def handler(m):
+            self.set_statistic(name, m.group(1).strip(), units=units, group=group)
+        self.appstdout_pipeline.add(pattern, handler, search=search)
+
     def get_parameter(self, name):
-        for p in self.parameters:
-            if p[0] == name:
-                return p[1]
-        return None
+        p = self.parameters.get(name)
+        return p.val if p is not None else None
 
     def get_statistic(self, name):
-        for p in self.statistics:
-            if p[0] == name:
-                return p[1]
-        return None
+        p = self.statistics.get(name)
+        return p.val if p is not None else None
 
     def __str__(self):
         s = ""
@@ -151,32 +427,18 @@ class AppKerOutputParser:
 
         s += "parameters:\n"
         for p in self.parameters:
-            s += "\t%s: %s %s\n" % (p[0], str(p[1]), str(p[2]))
+            s += "\t%s: %s %s\n" % (p.name, str(p.val), str(p.units))
         s += "statistics:\n"
         for p in self.statistics:
-            s += "\t%s: %s %s\n" % (p[0], str(p[1]), str(p[2]))
+            s += "\t%s: %s %s\n" % (p.name, str(p.val), str(p.units))
 
         return s
 
     def get_unique_parameters(self):
-        r = []
-        names = []
-        for i in range(len(self.parameters) - 1, -1, -1):
-            if names.count(self.parameters[i][0]) == 0:
-                r.append(self.parameters[i])
-                names.append(self.parameters[i][0])
-        r.sort(key=lambda x: x[0])
-        return r
+        return self.parameters.unique()
 
     def get_unique_statistic(self):
-        r = []
-        names = []
-        for i in range(len(self.statistics) - 1, -1, -1):
-            if names.count(self.statistics[i][0]) == 0:
-                r.append(self.statistics[i])
-                names.append(self.statistics[i][0])
-        r.sort(key=lambda x: x[0])
-        return r
+        return self.statistics.unique()
 
     def add_must_have_parameter(self, name: str) -> None:
         """
@@ -263,38 +525,26 @@ class AppKerOutputParser:
         self.set_parameter("RunEnv:Nodes", self.nodesList)
 
         if appstdout is not None:
-            # read output
-            lines = []
-            if os.path.isfile(appstdout):
-                fin = open(appstdout, "rt")
-                lines = fin.readlines()
-                fin.close()
+            # process the output, common and app kernel specific handlers in single pass
+            exe_bin_signature = []
 
-            # process the output
-            exe_bin_signature = ''
-
-            j = 0
-            while j < len(lines):
-                m = re.search(r'===ExeBinSignature===(.+)', lines[j])
-                if m:
-                    exe_bin_signature += m.group(1).strip() + '\n'
-                j += 1
-            if exe_bin_signature != '':
-                exe_bin_signature = base_gzip_encode(exe_bin_signature)
+            def appstdout_lines():
+                for line in iter_lines(appstdout):
+                    if '===ExeBinSignature===' in line:
+                        m = _exe_bin_signature_pattern.search(line)
+                        if m:
+                            exe_bin_signature.append(m.group(1).strip() + '\n')
+                    yield line
+
+            self.appstdout_pipeline.process(appstdout_lines())
+
+            if len(exe_bin_signature) > 0:
+                exe_bin_signature = base_gzip_encode("".join(exe_bin_signature))
             else:
                 exe_bin_signature = None
             self.set_parameter("App:ExeBinSignature", exe_bin_signature)
 
         if stdout is not None and os.path.isfile(stdout):
-            # read output
-            lines = ""
-            if os.path.isfile(stdout):
-                with open(stdout, "rt") as fin:
-                    lines = fin.read()
-            if stderr is not None and os.path.isfile(stderr):
-                with open(stdout, "rt") as fin:
-                    lines += fin.read()
-
             # process the output
             files_desc = ["App kernel executable",
                           "App kernel input",
@@ -305,16 +555,23 @@ class AppKerOutputParser:
                          "Network scratch directory",
                          "local scratch directory"]
 
+            not_writable = set()
+            not_exists = set()
+            for filename in (stdout, stderr):
+                for line in iter_lines(filename):
+                    if 'AKRR:ERROR: ' not in line:
+                        continue
+                    for m in _akrr_error_pattern.finditer(line):
+                        if m.group(2) == 'is not writable':
+                            not_writable.add(m.group(1))
+                        else:
+                            not_exists.add(m.group(1))
+
             for dir_desc in dirs_desc:
-                m = re.search(r'AKRR:ERROR: ' + dir_desc + ' is not writable', lines)
-                if m:
-                    self.dirAccess[dir_desc] = False
-                else:
-                    self.dirAccess[dir_desc] = True
+                self.dirAccess[dir_desc] = dir_desc not in not_writable
 
             for file_desc in files_desc:
-                m = re.search(r'AKRR:ERROR: ' + file_desc + ' does not exists', lines)
-                if m:
+                if file_desc in not_exists:
                     self.filesExistance[file_desc] = False
                     if file_desc in dirs_desc:
                         self.dirAccess[file_desc] = False
@@ -338,19 +595,13 @@ class AppKerOutputParser:
         """i.e. app output was having all mandatory parameters and statistics"""
         complete = True
 
-        p = []
-        for v in self.parameters:
-            p.append(v[0])
         for v in self.mustHaveParameters:
-            if p.count(v) == 0:
+            if v not in self.parameters:
                 if verbose:
                     print(("Must have parameter, %s, is not present" % (v,)))
                 complete = False
-        p = []
-        for v in self.statistics:
-            p.append(v[0])
         for v in self.mustHaveStatistics:
-            if p.count(v) == 0:
+            if v not in self.statistics:
                 if verbose:
                     print(("Must have statistic, %s, is not present" % (v,)))
                 complete = False
@@ -380,56 +631,17 @@ class AppKerOutputParser:
             else:
                 return False
 
-    def get_xml(self):
-        root = ElementTree.Element('rep:report')
-        root.attrib['xmlns:rep'] = 'report'
-        body = ElementTree.SubElement(root, 'body')
-        performance = ElementTree.SubElement(body, 'performance')
-        performance_id = ElementTree.SubElement(performance, 'ID')
-        performance_id.text = self.measurement_name
-        benchmark = ElementTree.SubElement(performance, 'benchmark')
-        benchmark_id = ElementTree.SubElement(benchmark, 'ID')
-        benchmark_id.text = self.measurement_name
-        parameters = ElementTree.SubElement(benchmark, 'parameters')
-        statistics = ElementTree.SubElement(benchmark, 'statistics')
-
-        details = ElementTree.SubElement(performance, 'details')
-        parameters_details = ElementTree.SubElement(details, 'parameters')
-        statistics_details = ElementTree.SubElement(details, 'statistics')
+    def get_result(self):
+        """return structured result"""
+        return AppKerResult(self.measurement_name, self.get_unique_parameters(), self.get_unique_statistic(),
+                            self.is_successfully_completed())
 
-        pars = self.get_unique_parameters()
-        for par in pars:
-            if par[AppKerOutputParser.METRIC_GROUP] == "details":
-                e = ElementTree.SubElement(parameters_details, 'parameter')
-            else:
-                e = ElementTree.SubElement(parameters, 'parameter')
-            ElementTree.SubElement(e, 'ID').text = par[0]
-            ElementTree.SubElement(e, 'value').text = str(par[1])
-            if par[2]:
-                ElementTree.SubElement(e, 'units').text = par[2]
-
-        pars = self.get_unique_statistic()
-        for par in pars:
-            if par[AppKerOutputParser.METRIC_GROUP] == "details":
-                e = ElementTree.SubElement(statistics_details, 'statistic')
-            else:
-                e = ElementTree.SubElement(statistics, 'statistic')
-            ElementTree.SubElement(e, 'ID').text = par[0]
-            ElementTree.SubElement(e, 'value').text = str(par[1])
-            if par[2]:
-                ElementTree.SubElement(e, 'units').text = par[2]
-
-        if len(parameters_details) == 0:
-            details.remove(parameters_details)
-        if len(statistics_details) == 0:
-            details.remove(statistics_details)
-        if len(details) == 0:
-            performance.remove(details)
-
-        exit_status = ElementTree.SubElement(root, 'exitStatus')
-        completed = ElementTree.SubElement(exit_status, 'completed')
-        completed.text = str(self.is_successfully_completed()).lower()
-        return xml.dom.minidom.parseString(ElementTree.tostring(root)).toprettyxml(indent="  ")
+    def get_xml(self):
+        """return report XML, structured result is attached as result attribute"""
+        result = self.get_result()
+        report = AppKerResultXML(result.get_xml())
+        report.result = result
+        return report
 
     def get_json(self):
         results = {
@@ -447,36 +659,36 @@ class AppKerOutputParser:
 
         pars = self.get_unique_parameters()
         for par in pars:
-            r = {'name': par[0]}
-            if par[AppKerOutputParser.METRIC_TYPE] is not None:
-                r['value'] = par[AppKerOutputParser.METRIC_TYPE](par[1])
+            r = {'name': par.name}
+            if par.metric_type is not None:
+                r['value'] = par.metric_type(par.val)
             else:
-                r['value'] = par[1]
-            if par[2] is not None:
-                r['units'] = par[2]
-            if par[AppKerOutputParser.METRIC_BETTER] is not None:
-                r['better'] = par[AppKerOutputParser.METRIC_BETTER]
+                r['value'] = par.val
+            if par.units is not None:
+                r['units'] = par.units
+            if par.better is not None:
+                r['better'] = par.better
 
-            if par[AppKerOutputParser.METRIC_GROUP] == "details":
+            if par.group == "details":
                 results['details']['parameters'].append(r)
             else:
                 results['parameters'].append(r)
 
         pars = self.get_unique_statistic()
         for par in pars:
-            r = {'name': par[0], 'value': (par[1])}
-            if par[AppKerOutputParser.METRIC_TYPE] is not None:
-                r['value'] = par[AppKerOutputParser.METRIC_TYPE](par[1])
-            elif isinstance(par[1], str):
-                r['value'] = get_float_or_int(par[1])
+            r = {'name': par.name, 'value': (par.val)}
+            if par.metric_type is not None:
+                r['value'] = par.metric_type(par.val)
+            elif isinstance(par.val, str):
+                r['value'] = get_float_or_int(par.val)
             else:
-                r['value'] = par[1]
-            if par[2] is not None:
-                r['units'] = par[2]
-            if par[AppKerOutputParser.METRIC_BETTER] is not None:
-                r['better'] = par[AppKerOutputParser.METRIC_BETTER]
+                r['value'] = par.val
+            if par.units is not None:
+                r['units'] = par.units
+            if par.better is not None:
+                r['better'] = par.better
 
-            if par[AppKerOutputParser.METRIC_GROUP] == "details":
+            if par.group == "details":
                 results['details']['statistics'].append(r)
             else:
                 results['statistics'].append(r)
@@ -486,11 +698,11 @@ class AppKerOutputParser:
         """print set parameters and statistics as part of code to set them as must have"""
         pars = self.get_unique_parameters()
         for par in pars:
-            print(("parser.add_must_have_parameter('%s')" % (par[0],)))
+            print(("parser.add_must_have_parameter('%s')" % (par.name,)))
         print()
         pars = self.get_unique_statistic()
         for par in pars:
-            print(("parser.add_must_have_statistic('%s')" % (par[0],)))
+            print(("parser.add_must_have_statistic('%s')" % (par.name,)))
 
     def print_template_for_pytest(self):
         """
@@ -499,21 +711,21 @@ class AppKerOutputParser:
         from akrr.util import is_int, is_float
         pars = self.get_unique_parameters()
         for par in pars:
-            if is_int(par[1]):
-                print('assert parstat_val_i(params, "%s") == %s' % (par[0], str(par[1])))
-            elif is_float(par[1]):
-                print('assert floats_are_close(parstat_val_f(params, "%s"), %s)' % (par[0], str(par[1])))
+            if is_int(par.val):
+                print('assert parstat_val_i(params, "%s") == %s' % (par.name, str(par.val)))
+            elif is_float(par.val):
+                print('assert floats_are_close(parstat_val_f(params, "%s"), %s)' % (par.name, str(par.val)))
             else:
-                print('assert parstat_val(params, "%s") == "%s"' % (par[0], str(par[1])))
+                print('assert parstat_val(params, "%s") == "%s"' % (par.name, str(par.val)))
         print()
         pars = self.get_unique_statistic()
         for par in pars:
-            if is_int(par[1]):
-                print('assert parstat_val_i(stats, "%s") == %s' % (par[0], str(par[1])))
-            elif is_float(par[1]):
-                print('assert floats_are_close(parstat_val_f(stats, "%s"), %s)' % (par[0], str(par[1])))
+            if is_int(par.val):
+                print('assert parstat_val_i(stats, "%s") == %s' % (par.name, str(par.val)))
+            elif is_float(par.val):
+                print('assert floats_are_close(parstat_val_f(stats, "%s"), %s)' % (par.name, str(par.val)))
             else:
-                print('assert parstat_val(stats, "%s") == "%s"' % (par[0], str(par[1])))
+                print('assert parstat_val(stats, "%s") == "%s"' % (par.name, str(par.val)))
         print()
 
     @staticmethod
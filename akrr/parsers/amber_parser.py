@@ -34,139 +34,93 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Time Spent in Reciprocal Force Calculation')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     parser.successfulRun = False
     num_steps = 0
     step_size = 0
-    j = 0
-    while j < len(lines):
 
-        m = re.search(r'Amber\s+([0-9a-zA-Z]+)\s+SANDER\s+20[0-9]+', lines[j])
-        if m:
-            parser.set_parameter("App:Version", "SANDER " + m.group(1))
+    parser.add_appstdout_handler(
+        r'Amber\s+([0-9a-zA-Z]+)\s+SANDER\s+20[0-9]+',
+        lambda m: parser.set_parameter("App:Version", "SANDER " + m.group(1)), search=True)
+    parser.add_appstdout_handler(
+        r'^\|\s+PMEMD implementation of SANDER, Release\s+([0-9.]+)',
+        lambda m: parser.set_parameter("App:Version", "PMEMD " + m.group(1)))
+    parser.add_appstdout_parameter("Input:Coordinate File", r'^\|\s+INPCRD:\s+(\S+)')
+    parser.add_appstdout_parameter("Input:Structure File", r'^\|\s+PARM:\s+(\S+)')
 
-        m = re.match(r'^\|\s+PMEMD implementation of SANDER, Release\s+([0-9.]+)', lines[j])
-        if m:
-            parser.set_parameter("App:Version", "PMEMD " + m.group(1))
+    section_end = r'^-----------------------------'
 
-        m = re.match(r'^\|\s+INPCRD:\s+(\S+)', lines[j])
+    nstlim_pattern = re.compile(r'nstlim\s+=\s+([0-9]+)')
+    dt_pattern = re.compile(r'dt\s+=\s+([0-9.]+)')
+
+    def control_data_line(line):
+        nonlocal num_steps, step_size
+        m = nstlim_pattern.search(line)
         if m:
-            parser.set_parameter("Input:Coordinate File", m.group(1))
+            num_steps = int(m.group(1).strip())
+            parser.set_parameter("Input:Number of Steps", num_steps)
 
-        m = re.match(r'^\|\s+PARM:\s+(\S+)', lines[j])
+        m = dt_pattern.search(line)
         if m:
-            parser.set_parameter("Input:Structure File", m.group(1))
-
-        if re.search(r'CONTROL\s+DATA\s+FOR\s+THE\s+RUN', lines[j]):
-            j += 2
-            for k in range(256):
-                if re.match(r'^-----------------------------', lines[j]):
-                    break
-
-                m = re.search(r'nstlim\s+=\s+([0-9]+)', lines[j])
-                if m:
-                    num_steps = int(m.group(1).strip())
-                    parser.set_parameter("Input:Number of Steps", num_steps)
-
-                m = re.search(r'dt\s+=\s+([0-9.]+)', lines[j])
-                if m:
-                    step_size = 1000.0 * float(m.group(1).strip())
-                    parser.set_parameter("Input:Timestep", step_size * 1e-15, "Second per Step")
-
-                j += 1
-
-        if re.search(r'RESOURCE\s+USE', lines[j]):
-            j += 2
-            num_bonds = 0
-            num_angles = 0
-            num_dihedrals = 0
-            for k in range(256):
-                if re.match(r'^-----------------------------', lines[j]):
-                    break
-
-                m = re.search(r'NATOM\s+=\s+([0-9]+)', lines[j])
-                if m:
-                    parser.set_parameter("Input:Number of Atoms", m.group(1).strip())
-
-                m = re.search(r'NBONH\s+=\s+([0-9]+)', lines[j])
-                if m:
-                    num_bonds += int(m.group(1).strip())
-
-                m = re.search(r'NBONA\s+=\s+([0-9]+)', lines[j])
-                if m:
-                    num_bonds += int(m.group(1).strip())
-
-                m = re.search(r'NTHETH\s+=\s+([0-9]+)', lines[j])
-                if m:
-                    num_angles += int(m.group(1).strip())
-
-                m = re.search(r'NTHETA\s+=\s+([0-9]+)', lines[j])
-                if m:
-                    num_angles += int(m.group(1).strip())
-
-                m = re.search(r'NPHIH\s+=\s+([0-9]+)', lines[j])
-                if m:
-                    num_dihedrals += int(m.group(1).strip())
-
-                m = re.search(r'NPHIA\s+=\s+([0-9]+)', lines[j])
-                if m:
-                    num_dihedrals += int(m.group(1).strip())
-
-                j += 1
-
-            if num_bonds > 0:
-                parser.set_parameter("Input:Number of Bonds", num_bonds)
-            if num_angles > 0:
-                parser.set_parameter("Input:Number of Angles", num_angles)
-            if num_dihedrals > 0:
-                parser.set_parameter("Input:Number of Dihedrals", num_dihedrals)
-
-        if re.search(r'PME Nonbond Pairlist CPU Time', lines[j]):
-            j += 2
-            for k in range(20):
-                m = re.search(r'Total\s+([\d.]+)', lines[j])
-                if m:
-                    parser.set_statistic("Time Spent in Non-Bond List Regeneration", m.group(1), "Second")
-                    break
-                j += 1
-        if re.search(r'PME Direct Force CPU Time', lines[j]):
-            j += 2
-            for k in range(20):
-                m = re.search(r'Total\s+([\d.]+)', lines[j])
-                if m:
-                    parser.set_statistic("Time Spent in Direct Force Calculation", m.group(1), "Second")
-                    break
-                j += 1
-        if re.search(r'PME Reciprocal Force CPU Time', lines[j]):
-            j += 2
-            for k in range(20):
-                m = re.search(r'Total\s+([\d.]+)', lines[j])
-                if m:
-                    parser.set_statistic("Time Spent in Reciprocal Force Calculation", m.group(1), "Second")
-                    break
-                j += 1
-        m = re.match(r'^\|\s+Master Total wall time:\s+([0-9.]+)\s+seconds', lines[j])
+            step_size = 1000.0 * float(m.group(1).strip())
+            parser.set_parameter("Input:Timestep", step_size * 1e-15, "Second per Step")
+    parser.add_appstdout_section(
+        r'CONTROL\s+DATA\s+FOR\s+THE\s+RUN', control_data_line, skip=1, max_lines=256, end_pattern=section_end,
+        search=True)
+
+    resource_use = {}
+    resource_use_patterns = (
+        (re.compile(r'NBONH\s+=\s+([0-9]+)'), "Input:Number of Bonds"),
+        (re.compile(r'NBONA\s+=\s+([0-9]+)'), "Input:Number of Bonds"),
+        (re.compile(r'NTHETH\s+=\s+([0-9]+)'), "Input:Number of Angles"),
+        (re.compile(r'NTHETA\s+=\s+([0-9]+)'), "Input:Number of Angles"),
+        (re.compile(r'NPHIH\s+=\s+([0-9]+)'), "Input:Number of Dihedrals"),
+        (re.compile(r'NPHIA\s+=\s+([0-9]+)'), "Input:Number of Dihedrals"))
+    natom_pattern = re.compile(r'NATOM\s+=\s+([0-9]+)')
+
+    def resource_use_line(line):
+        m = natom_pattern.search(line)
         if m:
-            parser.set_statistic("Wall Clock Time", m.group(1), "Second")
-            parser.successfulRun = True
-
-            # calculate the performance
-            simulation_time = step_size * num_steps * 0.000001  # measured in nanoseconds
-            if simulation_time > 0.0:
-                parser.set_statistic("Molecular Dynamics Simulation Performance",
-                                     1.e-9 * simulation_time / (float(m.group(1)) / 86400.0), "Second per Day")
-
-        j += 1
+            parser.set_parameter("Input:Number of Atoms", m.group(1).strip())
+        for pattern, name in resource_use_patterns:
+            m = pattern.search(line)
+            if m:
+                resource_use[name] = resource_use.get(name, 0) + int(m.group(1).strip())
+
+    def resource_use_end():
+        for name in ("Input:Number of Bonds", "Input:Number of Angles", "Input:Number of Dihedrals"):
+            if resource_use.get(name, 0) > 0:
+                parser.set_parameter(name, resource_use[name])
+        resource_use.clear()
+    parser.add_appstdout_section(
+        r'RESOURCE\s+USE', resource_use_line, skip=1, max_lines=256, end_pattern=section_end,
+        on_end=resource_use_end, search=True)
+
+    total_pattern = re.compile(r'Total\s+([\d.]+)')
+    for pattern, name in (
+            (r'PME Nonbond Pairlist CPU Time', "Time Spent in Non-Bond List Regeneration"),
+            (r'PME Direct Force CPU Time', "Time Spent in Direct Force Calculation"),
+            (r'PME Reciprocal Force CPU Time', "Time Spent in Reciprocal Force Calculation")):
+        def total_line(line, name=name):
+            m = total_pattern.search(line)
+            if m:
+                parser.set_statistic(name, m.group(1), "Second")
+                return True
+        parser.add_appstdout_section(pattern, total_line, skip=1, max_lines=20, search=True)
+
+    def master_total_wall_time(m):
+        parser.set_statistic("Wall Clock Time", m.group(1), "Second")
+        parser.successfulRun = True
+
+        # calculate the performance
+        simulation_time = step_size * num_steps * 0.000001  # measured in nanoseconds
+        if simulation_time > 0.0:
+            parser.set_statistic("Molecular Dynamics Simulation Performance",
+                                 1.e-9 * simulation_time / (float(m.group(1)) / 86400.0), "Second per Day")
+    parser.add_appstdout_handler(r'^\|\s+Master Total wall time:\s+([0-9.]+)\s+seconds', master_total_wall_time)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if __name__ == "__main__":
         # output for testing purpose
@@ -35,148 +35,133 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('User Time')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     parser.successfulRun = False
     wall_clock_time = 0.0
     num_steps = 0
     step_size = 0.0
     time_breakdown_columns = None
-    num_atoms = 0
-    num_bonds = 0
-    num_angles = 0
-    num_dihedrals = 0
-
-    j = 0
-    while j < len(lines):
-
-        m0 = re.search(r'\s+Chemistry at HARvard Macromolecular Mechanics', lines[j])
-        m1 = re.search(r'\sVersion\s+([\da-zA-Z]+)', lines[j + 1])
-        if m0 and m1:
-            parser.set_parameter("App:Version", m1.group(1).strip())
-
-        if re.search(r'Summary of the structure file counters', lines[j]):
-            j += 1
-            for k in range(256):
-                if re.search(r'CHARMM>', lines[j]):
-                    break
-
-                m = re.search(r'Number of atoms\s+=\s+(\d+)', lines[j])
-                if m:
-                    num_atoms += int(m.group(1).strip())
-
-                m = re.search(r'Number of bonds\s+=\s+(\d+)', lines[j])
-                if m:
-                    num_bonds += int(m.group(1).strip())
-
-                m = re.search(r'Number of angles\s+=\s+(\d+)', lines[j])
-                if m:
-                    num_angles += int(m.group(1).strip())
-
-                m = re.search(r'Number of dihedrals\s+=\s+(\d+)', lines[j])
-                if m:
-                    num_dihedrals += int(m.group(1).strip())
-
-                j += 1
-
-        if re.search(r'<MAKGRP> found', lines[j]):
-            j += 1
-            for k in range(256):
-                if re.search(r'NUMBER OF DEGREES OF FREEDOM', lines[j]):
-                    break
-
-                m = re.search(r'NSTEP\s+=\s+(\d+)', lines[j])
-                if m:
-                    num_steps = int(m.group(1).strip())
-                    parser.set_parameter("Input:Number of Steps", num_steps)
-
-                if re.search(r'TIME STEP\s+=', lines[j]):
-                    m = re.search(r'([\d\-Ee.]+)\s+PS', lines[j])
-                    if m:
-                        step_size = 1000.0 * float(m.group(1).strip())
-                        parser.set_parameter("Input:Timestep", step_size * 1e-15, "Second per Step")
-                j += 1
-
-        if re.search(r'NORMAL TERMINATION BY NORMAL STOP', lines[j]):
-            parser.successfulRun = True
-
-        if re.search(r'JOB ACCOUNTING INFORMATION', lines[j]):
-            parser.successfulRun = True
-
-            j += 1
-            for k in range(256):
-                if j > len(lines) - 1:
-                    break
-                m = re.search(r'ELAPSED TIME:\s*([\d.]+)\s*MINUTES', lines[j])
-                if m:
-                    wall_clock_time = 60.0 * float(m.group(1).strip())
-                    parser.set_statistic("Wall Clock Time", wall_clock_time, "Second")
-
-                m = re.search(r'CPU TIME:\s*([\d.]+)\s*MINUTES', lines[j])
-                if m:
-                    parser.set_statistic("User Time", 60.0 * float(m.group(1).strip()), "Second")
-
-                m = re.search(r'ELAPSED TIME:\s*([\d.]+)\s*SECONDS', lines[j])
-                if m:
-                    wall_clock_time = float(m.group(1).strip())
-                    parser.set_statistic("Wall Clock Time", wall_clock_time, "Second")
-
-                m = re.search(r'CPU TIME:\s*([\d.]+)\s*SECONDS', lines[j])
-                if m:
-                    parser.set_statistic("User Time", m.group(1).strip(), "Second")
-
-                j += 1
-            if j > len(lines) - 1:
-                break
-
-        if re.search(r'Parallel load balance \(sec', lines[j]):
-            j += 1
-            # grab the column headers from the output, e.g.
-            #
-            # Parallel load balance (sec.):
-            # Node Eext      Eint   Wait    Comm    List   Integ   Total
-            #   0   205.5     6.4     1.2    31.2    23.2     2.8   270.4
-            #   1   205.2     7.3     1.1    31.2    23.3     3.2   271.2
-            #   2   205.2     7.7     0.6    32.3    23.3     3.2   272.3
-            #   3   205.2     7.8     0.6    32.1    23.3     3.3   272.3
-            # PARALLEL> Average timing for all nodes:
-            #   4   205.3     7.3     0.9    31.7    23.3     3.1   271.6
-            time_breakdown_columns = lines[j].strip().split()
-
-        if re.search(r'PARALLEL>\s*Average timing for all nodes', lines[j]) and time_breakdown_columns:
-            j += 1
-            time_breakdown = lines[j].strip().split()
-            if len(time_breakdown_columns) == len(time_breakdown):
-                for k in range(len(time_breakdown)):
-                    if time_breakdown_columns[k] == "Eext":
-                        parser.set_statistic("Time Spent in External Energy Calculation", time_breakdown[k], "Second")
-                    if time_breakdown_columns[k] == "Eint":
-                        parser.set_statistic("Time Spent in Internal Energy Calculation", time_breakdown[k], "Second")
-                    if time_breakdown_columns[k] == "Wait":
-                        parser.set_statistic("Time Spent in Waiting (Load Unbalance-ness)", time_breakdown[k], "Second")
-                    if time_breakdown_columns[k] == "List":
-                        parser.set_statistic("Time Spent in Non-Bond List Generation", time_breakdown[k], "Second")
-                    if time_breakdown_columns[k] == "Integ":
-                        parser.set_statistic("Time Spent in Integration", time_breakdown[k], "Second")
-
-        j += 1
-    if num_atoms > 0:
-        parser.set_parameter("Input:Number of Atoms", num_atoms)
-    if num_bonds > 0:
-        parser.set_parameter("Input:Number of Bonds", num_bonds)
-    if num_angles > 0:
-        parser.set_parameter("Input:Number of Angles", num_angles)
-    if num_dihedrals > 0:
-        parser.set_parameter("Input:Number of Dihedrals", num_dihedrals)
+    counters = {"Input:Number of Atoms": 0, "Input:Number of Bonds": 0, "Input:Number of Angles": 0,
+                "Input:Number of Dihedrals": 0}
+
+    # version is on the line following the title
+    version_pattern = re.compile(r'\sVersion\s+([\da-zA-Z]+)')
+
+    def version_line(line):
+        m = version_pattern.search(line)
+        if m:
+            parser.set_parameter("App:Version", m.group(1).strip())
+    parser.add_appstdout_section(
+        r'\s+Chemistry at HARvard Macromolecular Mechanics', version_line, max_lines=1, search=True)
+
+    counters_patterns = (
+        (re.compile(r'Number of atoms\s+=\s+(\d+)'), "Input:Number of Atoms"),
+        (re.compile(r'Number of bonds\s+=\s+(\d+)'), "Input:Number of Bonds"),
+        (re.compile(r'Number of angles\s+=\s+(\d+)'), "Input:Number of Angles"),
+        (re.compile(r'Number of dihedrals\s+=\s+(\d+)'), "Input:Number of Dihedrals"))
+
+    def counters_line(line):
+        if 'CHARMM>' in line:
+            return True
+        for pattern, name in counters_patterns:
+            m = pattern.search(line)
+            if m:
+                counters[name] += int(m.group(1).strip())
+    parser.add_appstdout_section(
+        r'Summary of the structure file counters', counters_line, max_lines=256, search=True)
+
+    nstep_pattern = re.compile(r'NSTEP\s+=\s+(\d+)')
+    time_step_label_pattern = re.compile(r'TIME STEP\s+=')
+    time_step_pattern = re.compile(r'([\d\-Ee.]+)\s+PS')
+
+    def makgrp_line(line):
+        nonlocal num_steps, step_size
+        if 'NUMBER OF DEGREES OF FREEDOM' in line:
+            return True
+        m = nstep_pattern.search(line)
+        if m:
+            num_steps = int(m.group(1).strip())
+            parser.set_parameter("Input:Number of Steps", num_steps)
+
+        if time_step_label_pattern.search(line):
+            m = time_step_pattern.search(line)
+            if m:
+                step_size = 1000.0 * float(m.group(1).strip())
+                parser.set_parameter("Input:Timestep", step_size * 1e-15, "Second per Step")
+    parser.add_appstdout_section(r'<MAKGRP> found', makgrp_line, max_lines=256, search=True)
+
+    def normal_termination(_):
+        parser.successfulRun = True
+    parser.add_appstdout_handler(r'NORMAL TERMINATION BY NORMAL STOP', normal_termination, search=True)
+
+    elapsed_minutes_pattern = re.compile(r'ELAPSED TIME:\s*([\d.]+)\s*MINUTES')
+    cpu_minutes_pattern = re.compile(r'CPU TIME:\s*([\d.]+)\s*MINUTES')
+    elapsed_seconds_pattern = re.compile(r'ELAPSED TIME:\s*([\d.]+)\s*SECONDS')
+    cpu_seconds_pattern = re.compile(r'CPU TIME:\s*([\d.]+)\s*SECONDS')
+
+    def job_accounting_line(line):
+        nonlocal wall_clock_time
+        m = elapsed_minutes_pattern.search(line)
+        if m:
+            wall_clock_time = 60.0 * float(m.group(1).strip())
+            parser.set_statistic("Wall Clock Time", wall_clock_time, "Second")
+
+        m = cpu_minutes_pattern.search(line)
+        if m:
+            parser.set_statistic("User Time", 60.0 * float(m.group(1).strip()), "Second")
+
+        m = elapsed_seconds_pattern.search(line)
+        if m:
+            wall_clock_time = float(m.group(1).strip())
+            parser.set_statistic("Wall Clock Time", wall_clock_time, "Second")
+
+        m = cpu_seconds_pattern.search(line)
+        if m:
+            parser.set_statistic("User Time", m.group(1).strip(), "Second")
+    parser.add_appstdout_handler(r'JOB ACCOUNTING INFORMATION', normal_termination, search=True)
+    parser.add_appstdout_section(r'JOB ACCOUNTING INFORMATION', job_accounting_line, max_lines=256, search=True)
+
+    # grab the column headers from the output, e.g.
+    #
+    # Parallel load balance (sec.):
+    # Node Eext      Eint   Wait    Comm    List   Integ   Total
+    #   0   205.5     6.4     1.2    31.2    23.2     2.8   270.4
+    #   1   205.2     7.3     1.1    31.2    23.3     3.2   271.2
+    #   2   205.2     7.7     0.6    32.3    23.3     3.2   272.3
+    #   3   205.2     7.8     0.6    32.1    23.3     3.3   272.3
+    # PARALLEL> Average timing for all nodes:
+    #   4   205.3     7.3     0.9    31.7    23.3     3.1   271.6
+    def time_breakdown_columns_line(line):
+        nonlocal time_breakdown_columns
+        time_breakdown_columns = line.strip().split()
+    parser.add_appstdout_section(
+        r'Parallel load balance \(sec', time_breakdown_columns_line, max_lines=1, search=True)
+
+    time_breakdown_names = {
+        "Eext": "Time Spent in External Energy Calculation",
+        "Eint": "Time Spent in Internal Energy Calculation",
+        "Wait": "Time Spent in Waiting (Load Unbalance-ness)",
+        "List": "Time Spent in Non-Bond List Generation",
+        "Integ": "Time Spent in Integration"}
+
+    def time_breakdown_line(line):
+        if not time_breakdown_columns:
+            return
+        time_breakdown = line.strip().split()
+        if len(time_breakdown_columns) == len(time_breakdown):
+            for column, value in zip(time_breakdown_columns, time_breakdown):
+                if column in time_breakdown_names:
+                    parser.set_statistic(time_breakdown_names[column], value, "Second")
+    parser.add_appstdout_section(
+        r'PARALLEL>\s*Average timing for all nodes', time_breakdown_line, max_lines=1, search=True)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
+
+    for name in ("Input:Number of Atoms", "Input:Number of Bonds", "Input:Number of Angles",
+                 "Input:Number of Dihedrals"):
+        if counters[name] > 0:
+            parser.set_parameter(name, counters[name])
 
     if wall_clock_time > 0.0 and num_steps > 0 and step_size > 0.0:
         # $stepSize is in femtoseconds
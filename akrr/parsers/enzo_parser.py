@@ -21,115 +21,94 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_parameter('App:Version')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
+    # set app kernel output handlers
     parser.set_parameter("App:Version", "unknown")
-    # process the output
-    successful_run = False
-    j = 0
-    while j < len(lines):
-        m = re.match(r'^Mercurial Branch\s+(\S+)', lines[j])
-        if m:
-            branch = m.group(1)
-            revision = ""
-            if j + 1 < len(lines):
-                m = re.match(r'^Mercurial Revision\s+(\S+)', lines[j + 1])
-                if m:
-                    revision = m.group(1)
-            parser.set_parameter("App:Version", "Branch:" + branch + " Revision:" + revision)
-
-        m = re.match(r'^Time\s*=\s*([0-9.]+)\s+CycleNumber\s*=\s*([0-9]+)\s+Wallclock\s*=\s*([0-9.]+)', lines[j])
-        if m:
-            parser.set_statistic("Final Simulation Time", m.group(1), "Enzo Time Unit")
-            parser.set_statistic("Total Cycles", m.group(2))
-            parser.set_statistic("Wall Clock Time", m.group(3), "Second")
-            successful_run = True
-
-        m = re.match(r'^Successful run, exiting.', lines[j])
-        if m:
-            successful_run = True
-
-        # performance
-        m = re.match(r'^Cycle_Number\s+([0-9]+)', lines[j])
-        if m:
-            j += 1
-            performance_metrics = {}
-            while j < len(lines):
-                if lines[j].strip() != "":
-                    v = lines[j].strip().split()
-                    if v[0] not in performance_metrics:
-                        performance_metrics[v[0]] = float(v[1])
-                    else:
-                        performance_metrics[v[0]] += float(v[1])
-                else:
-                    if j + 1 < len(lines):
-                        m = re.match(r'^Cycle_Number\s+([0-9]+)', lines[j + 1])
-                        if m:
-                            pass
-                        else:
-                            break
-                    else:
-                        break
-                j += 1
-
-            metric = "CommunicationTranspose"
-            if metric in performance_metrics:
-                parser.set_statistic("Communication Transpose Time", performance_metrics[metric], "Second")
-
-            metric = "ComputePotentialFieldLevelZero"
-            if metric in performance_metrics:
-                parser.set_statistic("Gravitational Potential Field Computing Time", performance_metrics[metric],
-                                     "Second")
-
-            metric = "EvolvePhotons"
-            if metric in performance_metrics:
-                parser.set_statistic("Radiative Transfer Calculation Time", performance_metrics[metric], "Second")
-
-            metric = "Group_WriteAllData"
-            if metric in performance_metrics:
-                parser.set_statistic("All Data Group Write Time", performance_metrics[metric], "Second")
-
-            metric = "Level_00"
+    # state of the processing, performance block spans over several cycles separated by empty lines
+    state = {'successful_run': False, 'branch': None, 'performance_metrics': None, 'empty_line': False}
+    cycle_number_pattern = re.compile(r'^Cycle_Number\s+([0-9]+)')
+    revision_pattern = re.compile(r'^Mercurial Revision\s+(\S+)')
+
+    def set_performance_statistics(performance_metrics):
+        for metric, name in (
+                ("CommunicationTranspose", "Communication Transpose Time"),
+                ("ComputePotentialFieldLevelZero", "Gravitational Potential Field Computing Time"),
+                ("EvolvePhotons", "Radiative Transfer Calculation Time"),
+                ("Group_WriteAllData", "All Data Group Write Time"),
+                ("Level_00", "All Grid Level 00 Calculation Time"),
+                ("Level_01", "All Grid Level 01 Calculation Time"),
+                ("Level_02", "All Grid Level 02 Calculation Time"),
+                ("RebuildHierarchy", "Grid Hierarchy Rebuilding Time"),
+                ("SetBoundaryConditions", "Boundary Conditions Setting Time"),
+                ("SolveForPotential", "Poisson Equation Solving Time"),
+                ("SolveHydroEquations", "Hydro Equations Solving Time"),
+                ("Total", "Total Time Spent in Cycles")):
             if metric in performance_metrics:
-                parser.set_statistic("All Grid Level 00 Calculation Time", performance_metrics[metric], "Second")
-
-            metric = "Level_01"
-            if metric in performance_metrics:
-                parser.set_statistic("All Grid Level 01 Calculation Time", performance_metrics[metric], "Second")
-
-            metric = "Level_02"
-            if metric in performance_metrics:
-                parser.set_statistic("All Grid Level 02 Calculation Time", performance_metrics[metric], "Second")
-
-            metric = "RebuildHierarchy"
-            if metric in performance_metrics:
-                parser.set_statistic("Grid Hierarchy Rebuilding Time", performance_metrics[metric], "Second")
-
-            metric = "SetBoundaryConditions"
-            if metric in performance_metrics:
-                parser.set_statistic("Boundary Conditions Setting Time", performance_metrics[metric], "Second")
-
-            metric = "SolveForPotential"
-            if metric in performance_metrics:
-                parser.set_statistic("Poisson Equation Solving Time", performance_metrics[metric], "Second")
-
-            metric = "SolveHydroEquations"
-            if metric in performance_metrics:
-                parser.set_statistic("Hydro Equations Solving Time", performance_metrics[metric], "Second")
+                parser.set_statistic(name, performance_metrics[metric], "Second")
+
+    def performance_line(line):
+        performance_metrics = state['performance_metrics']
+        if performance_metrics is None:
+            return False
+        if state['empty_line']:
+            state['empty_line'] = False
+            if cycle_number_pattern.match(line) is None:
+                # end of performance block, line is processed as usual
+                state['performance_metrics'] = None
+                set_performance_statistics(performance_metrics)
+                return False
+        if line.strip() != "":
+            v = line.strip().split()
+            if v[0] not in performance_metrics:
+                performance_metrics[v[0]] = float(v[1])
+            else:
+                performance_metrics[v[0]] += float(v[1])
+        else:
+            state['empty_line'] = True
+        return True
+
+    def mercurial_revision(line):
+        branch = state['branch']
+        if branch is None:
+            return False
+        state['branch'] = None
+        m = revision_pattern.match(line)
+        if m:
+            parser.set_parameter("App:Version", "Branch:" + branch + " Revision:" + m.group(1))
+        return False
+
+    def mercurial_branch(m):
+        state['branch'] = m.group(1)
+        parser.set_parameter("App:Version", "Branch:" + state['branch'] + " Revision:")
+
+    def timing(m):
+        parser.set_statistic("Final Simulation Time", m.group(1), "Enzo Time Unit")
+        parser.set_statistic("Total Cycles", m.group(2))
+        parser.set_statistic("Wall Clock Time", m.group(3), "Second")
+        state['successful_run'] = True
+
+    def successful_run(m):
+        state['successful_run'] = True
+
+    def cycle_number(m):
+        state['performance_metrics'] = {}
+        state['empty_line'] = False
+
+    parser.add_appstdout_handler(None, performance_line)
+    parser.add_appstdout_handler(None, mercurial_revision)
+    parser.add_appstdout_handler(r'^Mercurial Branch\s+(\S+)', mercurial_branch)
+    parser.add_appstdout_handler(
+        r'^Time\s*=\s*([0-9.]+)\s+CycleNumber\s*=\s*([0-9]+)\s+Wallclock\s*=\s*([0-9.]+)', timing)
+    parser.add_appstdout_handler(r'^Successful run, exiting.', successful_run)
+    parser.add_appstdout_handler(cycle_number_pattern, cycle_number)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
-            metric = "Total"
-            if metric in performance_metrics:
-                parser.set_statistic("Total Time Spent in Cycles", performance_metrics[metric], "Second")
+    # performance block can be terminated by the end of output
+    if state['performance_metrics'] is not None:
+        set_performance_statistics(state['performance_metrics'])
 
-        j += 1
-    parser.successfulRun = successful_run
+    parser.successfulRun = state['successful_run']
 
     if __name__ == "__main__":
         # output for testing purpose
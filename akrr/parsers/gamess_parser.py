@@ -24,59 +24,54 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('User Time')
     parser.add_must_have_statistic('Time Spent in MP2 Energy Calculation')
     parser.add_must_have_statistic('Time Spent in Restricted Hartree-Fock Calculation')
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     start_time = None
     end_time = None
     mp2_energy_calculation_time = 0.0
     rhf_calculation_time = 0.0
     efficiency = None
-    j = 0
-    while j < len(lines):
-
-        m = re.search(r'GAMESS VERSION = ([^*]+)', lines[j])
-        if m:
-            parser.set_parameter("App:Version", m.group(1).strip())
-
-        m = re.search(r'PARALLEL VERSION RUNNING ON\s*([\d.]+) PROCESSORS IN\s*([\d.]+) NODE', lines[j])
+    parser.add_appstdout_parameter("App:Version", r'GAMESS VERSION = ([^*]+)', search=True)
+
+    def parallel_version(m):
+        parser.set_parameter("App:NCores", m.group(1).strip())
+        parser.set_parameter("App:NNodes", m.group(2).strip())
+    parser.add_appstdout_handler(
+        r'PARALLEL VERSION RUNNING ON\s*([\d.]+) PROCESSORS IN\s*([\d.]+) NODE', parallel_version, search=True)
+
+    def begun(m):
+        nonlocal start_time
+        start_time = parser.get_datetime_local(m.group(1).strip())
+    parser.add_appstdout_handler(r'EXECUTION OF GAMESS BEGUN (.+)', begun, search=True)
+
+    def terminated(m):
+        nonlocal end_time
+        end_time = parser.get_datetime_local(m.group(1).strip())
+    parser.add_appstdout_handler(r'EXECUTION OF GAMESS TERMINATED NORMALLY (.+)', terminated, search=True)
+
+    # step time is reported on the line following step completion
+    step_cpu_time_pattern = re.compile(r'STEP CPU TIME=\s*([\d.]+)')
+
+    def mp2_step_time(line):
+        nonlocal mp2_energy_calculation_time
+        m = step_cpu_time_pattern.search(line)
         if m:
-            parser.set_parameter("App:NCores", m.group(1).strip())
-            parser.set_parameter("App:NNodes", m.group(2).strip())
+            mp2_energy_calculation_time += float(m.group(1).strip())
+    parser.add_appstdout_section(r'DONE WITH MP2 ENERGY', mp2_step_time, max_lines=1, search=True)
 
-        m = re.search(r'EXECUTION OF GAMESS BEGUN (.+)', lines[j])
+    def rhf_step_time(line):
+        nonlocal rhf_calculation_time
+        m = step_cpu_time_pattern.search(line)
         if m:
-            start_time = parser.get_datetime_local(m.group(1).strip())
+            rhf_calculation_time += float(m.group(1).strip())
+    parser.add_appstdout_section(r'END OF RHF CALCULATION', rhf_step_time, max_lines=1, search=True)
 
-        m = re.search(r'EXECUTION OF GAMESS TERMINATED NORMALLY (.+)', lines[j])
-        if m:
-            end_time = parser.get_datetime_local(m.group(1).strip())
-
-        if re.search(r'DONE WITH MP2 ENERGY', lines[j]):
-            j += 1
-            m = re.search(r'STEP CPU TIME=\s*([\d.]+)', lines[j])
-            if m:
-                mp2_energy_calculation_time += float(m.group(1).strip())
-
-        if re.search(r'END OF RHF CALCULATION', lines[j]):
-            j += 1
-            m = re.search(r'STEP CPU TIME=\s*([\d.]+)', lines[j])
-            if m:
-                rhf_calculation_time += float(m.group(1).strip())
+    def cpu_utilization(m):
+        nonlocal efficiency
+        efficiency = float(m.group(1).strip())
+    parser.add_appstdout_handler(r'TOTAL WALL CLOCK TIME.+CPU UTILIZATION IS\s+([\d.]+)', cpu_utilization, search=True)
 
-        m = re.search(r'TOTAL WALL CLOCK TIME.+CPU UTILIZATION IS\s+([\d.]+)', lines[j])
-        if m:
-            efficiency = float(m.group(1).strip())
-
-        j += 1
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if start_time and end_time:
         walltime = total_seconds(end_time - start_time)
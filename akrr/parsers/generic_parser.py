@@ -23,35 +23,22 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     # parser.add_must_have_parameter('App:Version')
 
     parser.add_must_have_statistic('Wall Clock Time')
+
+    # Here can be custom output parsing, handlers are called during the single pass over appstdout
+    #     parser.successfulRun = False
+    #     parser.add_appstdout_parameter("mega parameter", r'My mega parameter\s+(\d+)', search=True)
+    #     parser.add_appstdout_statistic("mega statistics", r'My mega parameter\s+(\d+)', "Seconds", search=True)
+    #
+    #     def done(m):
+    #         parser.successfulRun = True
+    #     parser.add_appstdout_handler(r'Done', done, search=True)
+
     # parse common parameters and statistics
     parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if hasattr(parser, 'appKerWallClockTime'):
         parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
 
-    # Here can be custom output parsing
-    #     #read output
-    #     lines=[]
-    #     if os.path.isfile(appstdout):
-    #         fin=open(appstdout,"rt")
-    #         lines=fin.readlines()
-    #         fin.close()
-    #
-    #     #process the output
-    #     parser.successfulRun=False
-    #     j=0
-    #     while j<len(lines):
-    #         m=re.search(r'My mega parameter\s+(\d+)',lines[j])
-    #         if m:parser.set_parameter("mega parameter",m.group(1))
-    #
-    #         m=re.search(r'My mega parameter\s+(\d+)',lines[j])
-    #         if m:parser.set_statistic("mega statistics",m.group(1),"Seconds")
-    #
-    #         m=re.search(r'Done',lines[j])
-    #         if m:parser.successfulRun=True
-    #
-    #         j+=1
-
     if __name__ == "__main__":
         # output for testing purpose
         print("Parsing complete:", parser.parsing_complete(verbose=True))
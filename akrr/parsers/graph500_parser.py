@@ -32,7 +32,47 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Median TEPS')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
+    # set app kernel output handlers
+    parser.successfulRun = True
+    num_of_errors = 0
+
+    parser.add_appstdout_parameter("App:Version", r'^Graph500 version:\s+(.+)')
+
+    def error(_):
+        nonlocal num_of_errors
+        num_of_errors += 1
+    parser.add_appstdout_handler(r'ERROR:\s+(.+)', error)
+
+    parser.add_appstdout_parameter("Input File", r'^Reading input from\s+(.+)')
+    parser.add_appstdout_parameter("Scale", r'^SCALE:\s+(\d+)')
+    parser.add_appstdout_parameter("Edge Factor", r'^edgefactor:\s+(\d+)')
+    parser.add_appstdout_parameter("Number of Roots to Check", r'^NBFS:\s+(\d+)')
+
+    teps = "Traversed Edges Per Second"
+    for name, pattern, units in (
+            # old format
+            ("Median TEPS", r'^median_TEPS:\s+(\d[0-9.e+]+)', teps),
+            ("Harmonic Mean TEPS", r'^harmonic_mean_TEPS:\s+(\d[0-9.e+]+)', teps),
+            ("Harmonic Standard Deviation TEPS", r'^harmonic_stddev_TEPS:\s+(\d[0-9.e+]+)', teps),
+            ("Median Validation Time", r'^median_validate:\s+([\d.]+)\s+s', "Second"),
+            ("Mean Validation Time", r'^mean_validate:\s+([\d.]+)\s+s', "Second"),
+            ("Standard Deviation Validation Time", r'^stddev_validate:\s+([\d.]+)\s+s', "Second"),
+            # Graph500 v3.0.0 format
+            # BFS
+            ("Median TEPS", r'^bfs\s+median_TEPS:\s+(\d[0-9.e+]+)', teps),
+            ("Harmonic Mean TEPS", r'^bfs\s+harmonic_mean_TEPS:[ !]+(\d[0-9.e+]+)', teps),
+            ("Harmonic Standard Deviation TEPS", r'^bfs\s+harmonic_stddev_TEPS:\s+(\d[0-9.e+]+)', teps),
+            ("Median Validation Time", r'^bfs\s+median_validate:\s+([\d.]+)', "Second"),
+            ("Mean Validation Time", r'^bfs\s+mean_validate:\s+([\d.]+)', "Second"),
+            ("Standard Deviation Validation Time", r'^bfs\s+stddev_validate:\s+([\d.]+)', "Second"),
+            # SSSP
+            ("SSSP Median TEPS", r'^sssp\s+median_TEPS:\s+(\d[0-9.e+]+)', teps),
+            ("SSSP Harmonic Mean TEPS", r'^sssp\s+harmonic_mean_TEPS:[ !]+(\d[0-9.e+]+)', teps),
+            ("SSSP Harmonic Standard Deviation TEPS", r'^sssp\s+harmonic_stddev_TEPS:\s+(\d[0-9.e+]+)', teps),
+            ("SSSP Mean Validation Time", r'^sssp\s+mean_validate:\s+([\d.]+)', "Second")):
+        parser.add_appstdout_statistic(name, pattern, units)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
     parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if parser.appKerWallClockTime is not None:
@@ -40,114 +80,6 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     elif parser.wallClockTime is not None:
         parser.set_statistic("Wall Clock Time", total_seconds(parser.wallClockTime), "Second")
 
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
-    parser.successfulRun = True
-    num_of_errors = 0
-    j = 0
-    while j < len(lines):
-        m = re.match(r'^Graph500 version:\s+(.+)', lines[j])
-        if m:
-            parser.set_parameter("App:Version", m.group(1).strip())
-
-        m = re.match(r'ERROR:\s+(.+)', lines[j])
-        if m:
-            num_of_errors += 1
-
-        m = re.match(r'^Reading input from\s+(.+)', lines[j])
-        if m:
-            parser.set_parameter("Input File", m.group(1))
-
-        m = re.match(r'^SCALE:\s+(\d+)', lines[j])
-        if m:
-            parser.set_parameter("Scale", m.group(1))
-
-        m = re.match(r'^edgefactor:\s+(\d+)', lines[j])
-        if m:
-            parser.set_parameter("Edge Factor", m.group(1))
-
-        m = re.match(r'^NBFS:\s+(\d+)', lines[j])
-        if m:
-            parser.set_parameter("Number of Roots to Check", m.group(1))
-
-        # old format
-        m = re.match(r'^median_TEPS:\s+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.set_statistic("Median TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^harmonic_mean_TEPS:\s+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.successfulRun = True
-            parser.set_statistic("Harmonic Mean TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^harmonic_stddev_TEPS:\s+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.set_statistic("Harmonic Standard Deviation TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^median_validate:\s+([\d.]+)\s+s', lines[j])
-        if m:
-            parser.set_statistic("Median Validation Time", m.group(1), "Second")
-
-        m = re.match(r'^mean_validate:\s+([\d.]+)\s+s', lines[j])
-        if m:
-            parser.set_statistic("Mean Validation Time", m.group(1), "Second")
-
-        m = re.match(r'^stddev_validate:\s+([\d.]+)\s+s', lines[j])
-        if m:
-            parser.set_statistic("Standard Deviation Validation Time", m.group(1), "Second")
-
-        # Graph500 v3.0.0 format
-        # BFS
-        m = re.match(r'^bfs\s+median_TEPS:\s+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.set_statistic("Median TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^bfs\s+harmonic_mean_TEPS:[ !]+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.successfulRun = True
-            parser.set_statistic("Harmonic Mean TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^bfs\s+harmonic_stddev_TEPS:\s+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.set_statistic("Harmonic Standard Deviation TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^bfs\s+median_validate:\s+([\d.]+)', lines[j])
-        if m:
-            parser.set_statistic("Median Validation Time", m.group(1), "Second")
-
-        m = re.match(r'^bfs\s+mean_validate:\s+([\d.]+)', lines[j])
-        if m:
-            parser.set_statistic("Mean Validation Time", m.group(1), "Second")
-
-        m = re.match(r'^bfs\s+stddev_validate:\s+([\d.]+)', lines[j])
-        if m:
-            parser.set_statistic("Standard Deviation Validation Time", m.group(1), "Second")
-        # SSSP
-        m = re.match(r'^sssp\s+median_TEPS:\s+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.set_statistic("SSSP Median TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^sssp\s+harmonic_mean_TEPS:[ !]+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.successfulRun = True
-            parser.set_statistic("SSSP Harmonic Mean TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^sssp\s+harmonic_stddev_TEPS:\s+(\d[0-9.e+]+)', lines[j])
-        if m:
-            parser.set_statistic("SSSP Harmonic Standard Deviation TEPS", m.group(1), "Traversed Edges Per Second")
-
-        m = re.match(r'^sssp\s+mean_validate:\s+([\d.]+)', lines[j])
-        if m:
-            parser.set_statistic("SSSP Mean Validation Time", m.group(1), "Second")
-
-        j += 1
-
     if num_of_errors > 0:
         parser.successfulRun = False
 
@@ -24,38 +24,26 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Simulation Speed')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     successful_run = False
-    j = 0
-    while j < len(lines):
-        m = re.search(r'^GROMACS:\s+ gmx mdrun, version\s+(\S+)$', lines[j])
-        if m:
-            parser.set_parameter("App:Version", m.group(1))
 
-        m = re.search(r'^Performance: \s+([0-9.]+)', lines[j])
-        if m:
-            parser.set_statistic("Simulation Speed", float(m.group(1)), "ns/day")
+    parser.add_appstdout_parameter("App:Version", r'^GROMACS:\s+ gmx mdrun, version\s+(\S+)$', search=True)
+    parser.add_appstdout_handler(
+        r'^Performance: \s+([0-9.]+)',
+        lambda m: parser.set_statistic("Simulation Speed", float(m.group(1)), "ns/day"), search=True)
 
-        m = re.search(r'^ \s+Time: \s+([0-9.]+) \s+([0-9.]+)', lines[j])
-        if m:
-            parser.set_statistic("Wall Clock Time", m.group(2), "Second")
-            parser.set_statistic("Core Clock Time", m.group(1), "Second")
+    def time_line(m):
+        parser.set_statistic("Wall Clock Time", m.group(2), "Second")
+        parser.set_statistic("Core Clock Time", m.group(1), "Second")
+    parser.add_appstdout_handler(r'^ \s+Time: \s+([0-9.]+) \s+([0-9.]+)', time_line, search=True)
 
-        m = re.match(r'^GROMACS reminds you', lines[j])
-        if m:
-            successful_run = True
+    def reminds(_):
+        nonlocal successful_run
+        successful_run = True
+    parser.add_appstdout_handler(r'^GROMACS reminds you', reminds)
 
-        j += 1
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     parser.successfulRun = successful_run
 
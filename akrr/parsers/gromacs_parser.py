@@ -24,67 +24,55 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Simulation Speed')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     successful_run = False
     gflops = None
     wall_clock = None
-    j = 0
-    while j < len(lines):
-        m = re.search(r'^GROMACS:\s+ gmx mdrun, version\s+(\S+)$', lines[j])
+    parser.add_appstdout_parameter("App:Version", r'^GROMACS:\s+ gmx mdrun, version\s+(\S+)$', search=True)
+    parser.add_appstdout_parameter("Input:nsteps", r'gmx_mpi mdrun -v -nsteps ([0-9]+)$', search=True)
+    parser.add_appstdout_parameter("Input:nsteps", r'gmx_mpi mdrun -nsteps ([0-9]+)$', search=True)
+    parser.add_appstdout_handler(
+        r'^Performance: \s+([0-9.]+)',
+        lambda m: parser.set_statistic("Simulation Speed", float(m.group(1)), "ns/day"), search=True)
+
+    def time_line(m):
+        nonlocal wall_clock
+        wall_clock = float(m.group(2))
+        parser.set_statistic("Wall Clock Time", m.group(2), "Second")
+        parser.set_statistic("Core Clock Time", m.group(1), "Second")
+    parser.add_appstdout_handler(r'^ \s+Time: \s+([0-9.]+) \s+([0-9.]+)', time_line, search=True)
+
+    def reminds(_):
+        nonlocal successful_run
+        successful_run = True
+    parser.add_appstdout_handler(r'^GROMACS reminds you', reminds)
+
+    total_pattern = re.compile(r'Total\s+([0-9.]+)')
+
+    def flops_accounting_line(line):
+        nonlocal gflops
+        m = total_pattern.search(line)
         if m:
-            parser.set_parameter("App:Version", m.group(1))
+            gflops = (float(m.group(1))/1000)
+            return True
+    parser.add_appstdout_section(r'M E G A - F L O P S   A C C O U N T I N G', flops_accounting_line, search=True)
 
-        m = re.search(r'gmx_mpi mdrun -v -nsteps ([0-9]+)$', lines[j])
-        if m:
-            parser.set_parameter("Input:nsteps", m.group(1))
-        m = re.search(r'gmx_mpi mdrun -nsteps ([0-9]+)$', lines[j])
-        if m:
-            parser.set_parameter("Input:nsteps", m.group(1))
+    force_pattern = re.compile(r'Force\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+([0-9.]+)')
+    pme_mesh_pattern = re.compile(r'PME mesh\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+([0-9.]+)')
 
-        m = re.search(r'^Performance: \s+([0-9.]+)', lines[j])
+    def time_accounting_line(line):
+        m = force_pattern.search(line)
         if m:
-            parser.set_statistic("Simulation Speed", float(m.group(1)), "ns/day")
-
-        m = re.search(r'^ \s+Time: \s+([0-9.]+) \s+([0-9.]+)', lines[j])
+            parser.set_statistic("Force Calculation Percentage", m.group(1), "%")
+        m = pme_mesh_pattern.search(line)
         if m:
-            wall_clock = float(m.group(2))
-            parser.set_statistic("Wall Clock Time", m.group(2), "Second")
-            parser.set_statistic("Core Clock Time", m.group(1), "Second")
+            parser.set_statistic("PME Mesh Calculation Percentage", m.group(1), "%")
+            return True
+    parser.add_appstdout_section(
+        r'R E A L   C Y C L E   A N D   T I M E   A C C O U N T I N G', time_accounting_line, search=True)
 
-        m = re.match(r'^GROMACS reminds you', lines[j])
-        if m:
-            successful_run = True
-
-        m = re.search(r'M E G A - F L O P S   A C C O U N T I N G', lines[j])
-        if m:
-            while j < len(lines):
-                m = re.search(r'Total\s+([0-9.]+)', lines[j])
-                if m:
-                    gflops = (float(m.group(1))/1000)
-                    break
-                j += 1
-        m = re.search(r'R E A L   C Y C L E   A N D   T I M E   A C C O U N T I N G', lines[j])
-        if m:
-            while j < len(lines):
-                m = re.search(r'Force\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+([0-9.]+)', lines[j])
-                if m:
-                    parser.set_statistic("Force Calculation Percentage", m.group(1), "%")
-                m = re.search(r'PME mesh\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+[0-9.]+\s+([0-9.]+)', lines[j])
-                if m:
-                    parser.set_statistic("PME Mesh Calculation Percentage", m.group(1), "%")
-                    break
-                j += 1
-        j += 1
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if gflops is not None and wall_clock is not None:
         parser.set_statistic("Total GFLOP/S", gflops/wall_clock, "GFLOP/S")
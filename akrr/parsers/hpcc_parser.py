@@ -46,7 +46,36 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('MPI Random Access')
     parser.add_must_have_statistic('Parallel Matrix Transpose (PTRANS)')
     parser.add_must_have_statistic('Wall Clock Time')
-    # parse common parameters and statistics
+    # set app kernel output handlers
+    parser.successfulRun = False
+    state = {'result_begin': None, 'hpl_tflops': None, 'num_cores': None}
+    values = {}
+
+    def end_of_tests(_):
+        parser.successfulRun = True
+    parser.add_appstdout_handler(r'End of HPC Challenge tests', end_of_tests, search=True)
+
+    def begin_of_summary(_):
+        state['result_begin'] = 1
+        return True
+    parser.add_appstdout_handler(r'^Begin of Summary section', begin_of_summary)
+
+    def summary_value(m):
+        if not state['result_begin']:
+            return
+        metric_name = m.group(1).strip()
+        values[metric_name] = m.group(2).strip()
+        if metric_name == "HPL_Tflops":
+            state['hpl_tflops'] = float(values[metric_name])
+        if metric_name == "CommWorldProcs":
+            state['num_cores'] = int(values[metric_name])
+    parser.add_appstdout_handler(r'^(\w+)=([\w.]+)', summary_value)
+
+    def running_on(m):
+        state['num_cores'] = int(m.group(1).strip())
+    parser.add_appstdout_handler(r'^Running on ([0-9.]+) processors', running_on)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
     parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if parser.appKerWallClockTime is not None:
@@ -96,43 +125,8 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
                              "MByte per Second", "val*1024"]
     }
 
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
-    parser.successfulRun = False
-    result_begin = None
-    hpl_tflops = None
-    num_cores = None
-
-    values = {}
-    j = -1
-    while j < len(lines) - 1:
-        j += 1
-        m = re.search(r'End of HPC Challenge tests', lines[j])
-        if m:
-            parser.successfulRun = True
-
-        m = re.match(r'^Begin of Summary section', lines[j])
-        if m:
-            result_begin = 1
-            continue
-
-        m = re.match(r'^(\w+)=([\w.]+)', lines[j])
-        if m and result_begin:
-            metric_name = m.group(1).strip()
-            values[metric_name] = m.group(2).strip()
-            if metric_name == "HPL_Tflops":
-                hpl_tflops = float(values[metric_name])
-            if metric_name == "CommWorldProcs":
-                num_cores = int(values[metric_name])
-        m = re.match(r'^Running on ([0-9.]+) processors', lines[j])
-        if m:
-            num_cores = int(m.group(1).strip())
+    hpl_tflops = state['hpl_tflops']
+    num_cores = state['num_cores']
 
     if hpl_tflops is None or num_cores is None:
         parser.successfulRun = False
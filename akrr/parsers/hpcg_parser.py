@@ -242,47 +242,44 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Setup Time')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-    
-    if hasattr(parser, 'appKerWallClockTime') and getattr(parser, 'appKerWallClockTime') is not None:
-        parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
-
-    # get path to YAML file
-    # read data
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
+    # set app kernel output handlers
     # older version stores results in yaml
     # Parse YAML lines because YAML is often malformed
     yaml_lines = []
-    # get yaml lines from appstdout
-    bool_in_yaml_section = False
-    for line in lines:
-        if re.match(r"^====== .+\.yaml End   ======", line):
-            break
-
-        if bool_in_yaml_section:
-            yaml_lines.append(line)
-
-        if re.match(r"^====== .+\.yaml Start ======", line):
-            bool_in_yaml_section = True
     # newer in summary txt
     # txt "====== HPCG-Benchmark_3.1_2020-09-23_17-54-20.txt Start ======"
     txt_lines = []
-    bool_in_txt_section = False
-    for line in lines:
-        if re.match(r"^====== .*\.txt End   ======", line):
-            bool_in_txt_section = False
-
-        if bool_in_txt_section:
+    yaml_start = re.compile(r"^====== .+\.yaml Start ======")
+    yaml_end = re.compile(r"^====== .+\.yaml End   ======")
+    txt_start = re.compile(r"^====== .*\.txt Start ======")
+    txt_end = re.compile(r"^====== .*\.txt End   ======")
+    section = {'in_yaml': False, 'yaml_done': False, 'in_txt': False}
+
+    def section_line(line):
+        is_marker = line.startswith("====== ")
+        # only first yaml section is used
+        if not section['yaml_done']:
+            if is_marker and yaml_end.match(line):
+                section['yaml_done'] = True
+            else:
+                if section['in_yaml']:
+                    yaml_lines.append(line)
+                if is_marker and yaml_start.match(line):
+                    section['in_yaml'] = True
+
+        if is_marker and txt_end.match(line):
+            section['in_txt'] = False
+        if section['in_txt']:
             txt_lines.append(line)
+        if is_marker and txt_start.match(line):
+            section['in_txt'] = True
+    parser.add_appstdout_handler(None, section_line)
 
-        if re.match(r"^====== .*\.txt Start ======", line):
-            bool_in_txt_section = True
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
+    
+    if hasattr(parser, 'appKerWallClockTime') and getattr(parser, 'appKerWallClockTime') is not None:
+        parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
 
     if len(yaml_lines) > 5:
         process_yaml(yaml_lines, parser)
@@ -59,12 +59,6 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Min ScatterV Latency')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    if hasattr(parser, 'appKerWallClockTime'):
-        parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
-
     # Intel MPI benchmark suite contains three classes of benchmarks:
     #
     #  Single-transfer, which needs only 2 processes
@@ -111,77 +105,85 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
         "Accumulate": ["MPI-2 'Accumulate' Latency", "us", "min"]
     }
 
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     parser.successfulRun = False
-    aggregate_mode = None
-    metric = None
-    j = -1
-    while j < len(lines) - 1:
-        j += 1
-        m = re.search(r'All processes entering MPI_Finalize', lines[j])
-        if m:
-            parser.successfulRun = True
-
-        m = re.match(r'^# Benchmarking\s+(\S+)', lines[j])
-        if m:
-            if m.group(1) in metrics:
-                metric = m.group(1)
-                continue
-
-        m = re.match(r'^#\s+MODE:\s+(\S+)', lines[j])
-        if m and metric and aggregate_mode is None:
-            aggregate_mode = m.group(1)
-            continue
-
-        m = re.match(r'^# (.+): (.+)', lines[j])
-        if m:  # benchmark parameters
-            param = m.group(1).strip()
-            if param in params:
-                val = m.group(2).strip()
-                v = params[param][2]
-                if v.find('<val>') >= 0:
-                    val = get_float_or_int(val)
-                    val = eval(v.replace('<val>', 'val'))
-                parser.set_parameter("App:" + params[param][0], str(val) + " ", params[param][1])
-            continue
-
-        m = re.match(r'^\s+([1-9]\d*)\s+\d+', lines[j])
-        if m and metric:  # this effectively skips the first line of result, which has #bytes = 0
-            results = []
-
-            while m:
-                numbers = lines[j].split()
-                results.append(float(numbers[-1]))  # tokenize the line, and extract the last column
-
-                j += 1
-                if j < len(lines):
-                    m = re.match(r'^\s+([1-9]\d*)\s+\d+', lines[j])
-                    if lines[j].count('IMB_init_buffers_iter') > 0:
-                        break
-                else:
-                    break
-            metric_name = metrics[metric][0]
-            if aggregate_mode:
-                metric_name += " (" + aggregate_mode.lower() + ")"
-            if len(results) > 0:
-                if metrics[metric][1] == 'us':
-                    statname = metrics[metric][2][0].upper() + metrics[metric][2][1:] + " " + metric_name
-                    statval = eval(metrics[metric][2] + "(results)")
-                    parser.set_statistic(statname, statval * 1e-6, "Second")
-                else:
-                    statname = metrics[metric][2][0].upper() + metrics[metric][2][1:] + " " + metric_name
-                    statval = eval(metrics[metric][2] + "(results)")
-                    parser.set_statistic(statname, statval, metrics[metric][1])
-
-            aggregate_mode = None
-            metric = None
+    state = {'aggregate_mode': None, 'metric': None, 'results': None}
+    result_row_pattern = re.compile(r'^\s+([1-9]\d*)\s+\d+')
+
+    def set_results():
+        metric = state['metric']
+        results = state['results']
+        metric_name = metrics[metric][0]
+        if state['aggregate_mode']:
+            metric_name += " (" + state['aggregate_mode'].lower() + ")"
+        if len(results) > 0:
+            if metrics[metric][1] == 'us':
+                statname = metrics[metric][2][0].upper() + metrics[metric][2][1:] + " " + metric_name
+                statval = eval(metrics[metric][2] + "(results)")
+                parser.set_statistic(statname, statval * 1e-6, "Second")
+            else:
+                statname = metrics[metric][2][0].upper() + metrics[metric][2][1:] + " " + metric_name
+                statval = eval(metrics[metric][2] + "(results)")
+                parser.set_statistic(statname, statval, metrics[metric][1])
+
+        state['aggregate_mode'] = None
+        state['metric'] = None
+        state['results'] = None
+
+    def results_line(line):
+        # results table, line following the table is skipped
+        if state['results'] is None:
+            return
+        if line.count('IMB_init_buffers_iter') == 0 and result_row_pattern.match(line):
+            state['results'].append(float(line.split()[-1]))  # tokenize the line, and extract the last column
+        else:
+            set_results()
+        return True
+    parser.add_appstdout_handler(None, results_line)
+
+    def finalize(_):
+        parser.successfulRun = True
+    parser.add_appstdout_handler(r'All processes entering MPI_Finalize', finalize, search=True)
+
+    def benchmarking(m):
+        if m.group(1) in metrics:
+            state['metric'] = m.group(1)
+            return True
+    parser.add_appstdout_handler(r'^# Benchmarking\s+(\S+)', benchmarking)
+
+    def mode(m):
+        if state['metric'] and state['aggregate_mode'] is None:
+            state['aggregate_mode'] = m.group(1)
+            return True
+    parser.add_appstdout_handler(r'^#\s+MODE:\s+(\S+)', mode)
+
+    def benchmark_parameter(m):
+        param = m.group(1).strip()
+        if param in params:
+            val = m.group(2).strip()
+            v = params[param][2]
+            if v.find('<val>') >= 0:
+                val = get_float_or_int(val)
+                val = eval(v.replace('<val>', 'val'))
+            parser.set_parameter("App:" + params[param][0], str(val) + " ", params[param][1])
+        return True
+    parser.add_appstdout_handler(r'^# (.+): (.+)', benchmark_parameter)
+
+    def results_begin(m):
+        # this effectively skips the first line of result, which has #bytes = 0
+        if state['metric']:
+            state['results'] = [float(m.string.split()[-1])]
+    parser.add_appstdout_handler(result_row_pattern, results_begin)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
+
+    if state['results'] is not None:
+        set_results()
+
+    if hasattr(parser, 'appKerWallClockTime'):
+        parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
+
     if parser.get_parameter("App:MPI Thread Environment") is None:
         parser.set_parameter("App:MPI Thread Environment", "")
 
@@ -20,6 +20,41 @@ def get_MiB(val, units):
         return val * 1024
 
 
+def add_ior_result_lines_handlers(parser, lines):
+    """
+    register appstdout handlers which append to lines only the lines used by process_ior_output_v*:
+    "#" lines, version and file system lines, input summary sections and results tables
+    (verbose output in between is not kept). Summary sections and tables are kept with their
+    terminating line, as version specific processing skips it.
+    """
+    def keep_line(m):
+        lines.append(m.string)
+
+    def section_line_handler(item_pattern):
+        item_matcher = re.compile(item_pattern).match
+
+        def handler(line):
+            lines.append(line)
+            return item_matcher(line) is None
+        return handler
+
+    table_row_matcher = re.compile(r'^(write|read)\s').match
+    table_end_matcher = re.compile(r'^Summary of all tests:').match
+
+    def table_line(line):
+        if table_row_matcher(line):
+            lines.append(line)
+        elif table_end_matcher(line):
+            lines.append(line)
+            return True
+
+    parser.add_appstdout_handler(
+        r'^(#|IOR-|File System To Test:|\s*Summary:\s*$|\s*Options:\s*$|access\s+bw\(MiB/s\))', keep_line)
+    parser.add_appstdout_section(r'^\s*Summary:\s*$', section_line_handler(r'^\t([^=\n\r\f\v]+)=(.+)'))
+    parser.add_appstdout_section(r'^\s*Options:\s*$', section_line_handler(r'^([^=\n\r\f\v]+):(.+)'))
+    parser.add_appstdout_section(r'^access\s+bw\(MiB/s\)', table_line)
+
+
 def process_ior_output_v20(parser, lines):
     """
     Process IOR output of version 2.0
@@ -740,44 +775,45 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Wall Clock Time')
 
     parser.completeOnPartialMustHaveStatistics = True
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    if hasattr(parser, 'appKerWallClockTime'):
-        parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
 
-    # read output
+    # set app kernel output handlers
+    # version specific processing needs lookahead, so result lines are kept from the same pass
     lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
-
     # find which version of IOR was used
-    ior_output_version = None
-    j = 0
-    while j < len(lines) - 1:
+    ior = {'output_version': None}
+
+    def ior_release(m):
         # IOR RELEASE: IOR-2.10.3
-        m = re.match(r'^#\s+IOR RELEASE:\s(.+)', lines[j])
-        if m:
-            ior_output_version = 20
+        ior['output_version'] = 20
+
+    def ior_version(m):
         # IOR-3.2.0: MPI Coordinated Test of Parallel I/O
         # IOR-3.3.0+dev: MPI Coordinated Test of Parallel I/O
-        m = re.match(r'^IOR-([3-9])\.([0-9])+\.[0-9]\S*: MPI Coordinated Test of Parallel I/O', lines[j])
-        if m:
-            ior_major = int(m.group(1))
-            ior_minor = int(m.group(2))
-            if ior_major >=3:
-                if ior_minor >= 3:
-                    ior_output_version = 33
-                elif ior_minor >= 2:
-                    ior_output_version = 32
-                else:
-                    ior_output_version = 30
+        ior_major = int(m.group(1))
+        ior_minor = int(m.group(2))
+        if ior_major >= 3:
+            if ior_minor >= 3:
+                ior['output_version'] = 33
+            elif ior_minor >= 2:
+                ior['output_version'] = 32
+            else:
+                ior['output_version'] = 30
 
-        j += 1
+    parser.add_appstdout_handler(r'^#\s+IOR RELEASE:\s(.+)', ior_release)
+    parser.add_appstdout_handler(
+        r'^IOR-([3-9])\.([0-9])+\.[0-9]\S*: MPI Coordinated Test of Parallel I/O', ior_version)
+    add_ior_result_lines_handlers(parser, lines)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
+    # version specific processing skips the last line
+    lines.append("")
+
+    if hasattr(parser, 'appKerWallClockTime'):
+        parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
+
+    # process the output
+    ior_output_version = ior['output_version']
 
     if ior_output_version is None:
         print("ERROR: unknown version of IOR output!!!")
@@ -32,77 +32,56 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Time Spent in Pairwise Potential Calculation')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
+    # set app kernel output handlers
+    parser.successfulRun = False
+    state = {'wall_clock_time': None, 'simulation_units': None, 'num_steps': None, 'step_size': None}
+
+    parser.add_appstdout_parameter("App:Version", r'^LAMMPS\s+\(([\w ]+)\)')
+    parser.add_appstdout_statistic("Per-Process Memory", r'^Memory usage per processor = ([\d.]+) Mbyte', "MByte")
+
+    number_of_atoms = re.compile(r'(\d+) atoms')
+
+    def loop_time(m):
+        parser.successfulRun = True
+        state['wall_clock_time'] = float(m.group(1).strip())
+        parser.set_statistic("Wall Clock Time", state['wall_clock_time'], "Second")
+        m1 = number_of_atoms.search(m.string)
+        if m1:
+            parser.set_parameter("Input:Number of Atoms", m1.group(1).strip())
+    parser.add_appstdout_handler(r'^Loop time of ([\d.]+) on', loop_time)
+
+    def units(m):
+        state['simulation_units'] = m.group(1).strip().lower()
+    parser.add_appstdout_handler(r'^units\s+(\w+)', units)
+
+    def run(m):
+        state['num_steps'] = int(m.group(1).strip())
+        parser.set_parameter("Input:Number of Steps", state['num_steps'])
+    parser.add_appstdout_handler(r'^run\s+(\d+)', run)
+
+    def timestep(m):
+        state['step_size'] = float(m.group(1).strip())
+    parser.add_appstdout_handler(r'^timestep\s+([\d.]+)', timestep)
+
+    # timings breakdown, reported after loop time
+    for pattern, name in (
+            (r'^Pair\s+time.+= ([\d.]+)', "Time Spent in Pairwise Potential Calculation"),
+            (r'^Bond\s+time.+= ([\d.]+)', "Time Spent in Bond Potential Calculation"),
+            (r'^Kspce\s+time.+= ([\d.]+)', "Time Spent in Long-Range Coulomb Potential (K-Space) Calculation"),
+            (r'^Neigh\s+time.+= ([\d.]+)', "Time Spent in Neighbor List Regeneration"),
+            (r'^Comm\s+time.+= ([\d.]+)', "Time Spent in Communication")):
+        def timing(m, name=name):
+            if parser.successfulRun:
+                parser.set_statistic(name, m.group(1).strip(), "Second")
+        parser.add_appstdout_handler(pattern, timing)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
     parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
-    parser.successfulRun = False
-    wall_clock_time = None
-    simulation_units = None
-    num_steps = None
-    step_size = None
-    j = 0
-    while j < len(lines):
-
-        m = re.match(r'^LAMMPS\s+\(([\w ]+)\)', lines[j])
-        if m:
-            parser.set_parameter("App:Version", m.group(1).strip())
-
-        m = re.match(r'^Memory usage per processor = ([\d.]+) Mbyte', lines[j])
-        if m:
-            parser.set_statistic("Per-Process Memory", m.group(1).strip(), "MByte")
-
-        m = re.match(r'^Loop time of ([\d.]+) on', lines[j])
-        if m:
-            parser.successfulRun = True
-            wall_clock_time = float(m.group(1).strip())
-            parser.set_statistic("Wall Clock Time", wall_clock_time, "Second")
-            m1 = re.search(r'(\d+) atoms', lines[j])
-            if m1:
-                parser.set_parameter("Input:Number of Atoms", m1.group(1).strip())
-
-        m = re.match(r'^units\s+(\w+)', lines[j])
-        if m:
-            simulation_units = m.group(1).strip().lower()
-
-        m = re.match(r'^run\s+(\d+)', lines[j])
-        if m:
-            num_steps = int(m.group(1).strip())
-            parser.set_parameter("Input:Number of Steps", num_steps)
-
-        m = re.match(r'^timestep\s+([\d.]+)', lines[j])
-        if m:
-            step_size = float(m.group(1).strip())
-
-        m = re.match(r'^Pair\s+time.+= ([\d.]+)', lines[j])
-        if parser.successfulRun and m:
-            parser.set_statistic("Time Spent in Pairwise Potential Calculation", m.group(1).strip(), "Second")
-
-        m = re.match(r'^Bond\s+time.+= ([\d.]+)', lines[j])
-        if parser.successfulRun and m:
-            parser.set_statistic("Time Spent in Bond Potential Calculation", m.group(1).strip(), "Second")
-
-        m = re.match(r'^Kspce\s+time.+= ([\d.]+)', lines[j])
-        if parser.successfulRun and m:
-            parser.set_statistic("Time Spent in Long-Range Coulomb Potential (K-Space) Calculation", m.group(1).strip(),
-                                 "Second")
-
-        m = re.match(r'^Neigh\s+time.+= ([\d.]+)', lines[j])
-        if parser.successfulRun and m:
-            parser.set_statistic("Time Spent in Neighbor List Regeneration", m.group(1).strip(), "Second")
-
-        m = re.match(r'^Comm\s+time.+= ([\d.]+)', lines[j])
-        if parser.successfulRun and m:
-            parser.set_statistic("Time Spent in Communication", m.group(1).strip(), "Second")
-
-        j += 1
+    wall_clock_time = state['wall_clock_time']
+    simulation_units = state['simulation_units']
+    num_steps = state['num_steps']
+    step_size = state['step_size']
 
     if parser.successfulRun and num_steps and simulation_units != "lj":
         # The default value for $stepSize is (see http://lammps.sandia.gov/doc/units.html):
@@ -69,70 +69,74 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
 
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
+    # set app kernel output handlers
+    parser.successfulRun = False
+    state = {
+        'testname': "",
+        # lines to skip after SUMMARY header
+        'summary_skip': 0,
+        'in_summary': False,
+        # first line after summary table is checked only for test completion and arguments
+        'summary_end_line': False
+    }
+    summary_pattern = re.compile(r'([A-Za-z0-9 ]+):\s+[0-9.]+\s+[0-9.]+\s+([0-9.]+)\s+([0-9.]+)')
+
+    def summary_line(line):
+        state['summary_end_line'] = False
+        if state['summary_skip'] > 0:
+            state['summary_skip'] -= 1
+            return True
+        if state['in_summary']:
+            m = summary_pattern.match(line)
+            if m:
+                parser.set_statistic(m.group(1).strip() + state['testname'], m.group(2), "Operations/Second")
+                return True
+            state['in_summary'] = False
+            state['summary_end_line'] = True
+    parser.add_appstdout_handler(None, summary_line)
+
+    def launched(m):
+        if state['summary_end_line']:
+            return
+        if parser.get_parameter("Nodes") is None:
+            parser.set_parameter("Nodes", m.group(2))
+        if parser.get_parameter("Tasks") is None:
+            parser.set_parameter("Tasks", m.group(1))
+    parser.add_appstdout_handler(r'mdtest.* was launched with ([0-9]*) total task\(s\) on ([0-9]*) node', launched)
+
+    def testing(m):
+        if state['summary_end_line']:
+            return
+        state['testname'] = " (" + m.group(1).strip() + ")"
+    parser.add_appstdout_handler(r'^#Testing (.+)', testing)
+
+    def summary(_):
+        if state['summary_end_line']:
+            return
+        state['summary_skip'] = 2
+        state['in_summary'] = True
+        return True
+    parser.add_appstdout_handler(r'^SUMMARY.*:', summary)
+
+    def finished(_):
+        parser.successfulRun = True
+    parser.add_appstdout_handler(r'finished at', finished, search=True)
+
+    def command_line(m):
+        parser.set_parameter("Arguments" + state['testname'], m.group(1).strip())
+    parser.add_appstdout_handler(r'^Command line used:.+mdtest\s+(.+)', command_line)
+
+    def tasks(m):
+        parser.set_parameter("tasks" + state['testname'], m.group(1).strip())
+        parser.set_parameter("files/directories" + state['testname'], m.group(2).strip())
+    parser.add_appstdout_handler(r'([0-9]+) tasks, ([0-9]+) files/directories', tasks, search=True)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
     parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if hasattr(parser, 'appKerWallClockTime'):
         parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
 
-    # Here can be custom output parsing
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
-    testname = ""
-    parser.successfulRun = False
-    j = 0
-    while j < len(lines):
-        m = re.match(r'mdtest.* was launched with ([0-9]*) total task\(s\) on ([0-9]*) node', lines[j])
-        if m:
-            if parser.get_parameter("Nodes") is None:
-                parser.set_parameter("Nodes",m.group(2))
-            if parser.get_parameter("Tasks") is None:
-                parser.set_parameter("Tasks",m.group(1))
-
-        m = re.match(r'^#Testing (.+)', lines[j])
-        if m:
-            testname = " (" + m.group(1).strip() + ")"
-
-        m = re.match(r'^SUMMARY.*:', lines[j])
-        if m:
-            j = j + 3
-            while j < len(lines):
-                m = re.match(r'([A-Za-z0-9 ]+):\s+[0-9.]+\s+[0-9.]+\s+([0-9.]+)\s+([0-9.]+)', lines[j])
-                if m:
-                    parser.set_statistic(m.group(1).strip() + testname, m.group(2), "Operations/Second")
-                else:
-                    break
-                j = j + 1
-        m = re.search(r'finished at', lines[j])
-        if m:
-            parser.successfulRun = True
-
-        m = re.match(r'^Command line used:.+mdtest\s+(.+)', lines[j])
-
-        if m:
-            parser.set_parameter("Arguments" + testname, m.group(1).strip())
-        m = re.search(r'([0-9]+) tasks, ([0-9]+) files/directories', lines[j])
-        if m:
-            parser.set_parameter("tasks" + testname, m.group(1).strip())
-            parser.set_parameter("files/directories" + testname, m.group(2).strip())
-        j = j + 1
-
-        # parser.set_parameter("mega parameter",m.group(1))
-    #
-    #         m=re.search(r'My mega parameter\s+(\d+)',lines[j])
-    #         if m:parser.set_statistic("mega statistics",m.group(1),"Seconds")
-    #
-    #         m=re.search(r'Done',lines[j])
-    #         if m:parser.successfulRun=True
-    #
-    #         j+=1
-
     if __name__ == "__main__":
         # output for testing purpose
         print("Parsing complete:", parser.parsing_complete(verbose=True))
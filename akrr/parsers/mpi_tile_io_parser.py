@@ -87,20 +87,7 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('File Open Time (3D Data Independent Write)')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    if hasattr(parser, 'appKerWallClockTime'):
-        parser.set_statistic("Wall Clock Time", parser.appKerWallClockTime.total_seconds(), "Second")
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     # The parameters mapping table
     # The result mapping table
     pm = {
@@ -150,86 +137,93 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
             'val': None},
     }
 
-    parser.successfulRun = False
-    j = -1
-    while j < len(lines) - 1:
-        for k, v in pm.items():
-            m = v['refun'](v['re'], lines[j])
+    def set_pm_value(v):
+        def handler(m):
+            v['val'] = m.group(1).strip()
+        return handler
+
+    for v in pm.values():
+        parser.add_appstdout_handler(v['re'], set_pm_value(v), search=v['refun'] is re.search)
+
+    def bandwidth(m):
+        read_or_write = m.group(1).strip()
+        io_bandwidth = m.group(2).strip()
+
+        # can output data ?
+        if pm['processesTopology']['val'] and pm['collectiveIO']['val']:
+            # construct the label
+            label = ''
+            dim = '2D'
+            m = re.search(r'\d+x\d+x\d', pm['processesTopology']['val'])
             if m:
-                v['val'] = m.group(1).strip()
-
-        m = re.match(r'^# (.+?)bandwidth:(.+)bytes', lines[j])
-        if m:
-            read_or_write = m.group(1).strip()
-            io_bandwidth = m.group(2).strip()
-
-            # can output data ?
-            if pm['processesTopology']['val'] and pm['collectiveIO']['val']:
-                # construct the label
-                label = ''
-                dim = '2D'
-                m = re.search(r'\d+x\d+x\d', pm['processesTopology']['val'])
-                if m:
-                    dim = '3D'
-
-                if pm['hdf5Version']['val']:
-                    label += 'HDF5 '
-                    parser.set_parameter("HDF Version", pm['hdf5Version']['val'])
-
-                m = re.search(r'yes', pm['collectiveIO']['val'], re.I)
-                if m:
-                    label += 'Collective '
-                else:
-                    label += 'Independent '
-
-                m0 = re.search(r'read', read_or_write, re.I)
-                m1 = re.search(r'write', read_or_write, re.I)
-                if m0:
-                    label += 'Read'
-                elif m1:
-                    label += 'Write'
-                else:
-                    label += read_or_write[0].upper() + read_or_write[1:]
-
-                parser.set_statistic("%s Array %s Aggregate Throughput" % (dim, label),
-                                     "%.2f" % (float(io_bandwidth) / 1024.0 / 1024.0), "MByte per Second")
-                if pm["maxFileOpenTime"]['val']:
-                    parser.set_statistic("File Open Time (%s Data %s)" % (dim, label), pm["maxFileOpenTime"]['val'],
-                                         "Second")
-                if pm["maxFileCloseTime"]['val']:
-                    parser.set_statistic("File Close Time (%s Data %s)" % (dim, label), pm["maxFileCloseTime"]['val'],
-                                         "Second")
-
-                parser.set_parameter("%s Process Topology" % (dim,), pm["processesTopology"]['val'])
-                if pm["localMemoryUsage"]['val']:
-                    parser.set_parameter("%s Per-Process Memory" % (dim,),
-                                         float(pm["localMemoryUsage"]['val']) / 1024.0 / 1024.0, "MByte")
-                if pm["localDatasetTopology"]['val']:
-                    parser.set_parameter("%s Per-Process Data Topology" % (dim,), pm["localDatasetTopology"]['val'],
-                                         "Element")
-                if pm["datasetGhostZone"]['val']:
-                    parser.set_parameter("%s Per-Process Ghost Zone" % (dim,), pm["datasetGhostZone"]['val'])
-                if pm["mpiIOhints"]['val']:
-                    parser.set_parameter("MPI-IO Hints", pm["mpiIOhints"]['val'])
-                # $benchmark->set_parameter( "${dim} ${label} Test File", $testFileName ) if( defined($testFileName) )
-                if pm["fileSystem"]['val']:
-                    parser.set_parameter("%s %s Test File System" % (dim, label), pm["fileSystem"]['val'])
-                parser.successfulRun = True
-
-                pm["processesTopology"]['val'] = None
-                pm["localDatasetTopology"]['val'] = None
-                pm["localMemoryUsage"]['val'] = None
-                pm["datasetGhostZone"]['val'] = None
-                pm["mpiIOhints"]['val'] = None
-                # pm["readOrWrite"]['val']=None
-                pm["collectiveIO"]['val'] = None
-                # pm["IObandwidth"]['val']=None
-                pm["maxFileOpenTime"]['val'] = None
-                pm["maxFileCloseTime"]['val'] = None
-                pm["testFileName"]['val'] = None
-                pm["fileSystem"]['val'] = None
-                pm["hdf5Version"]['val'] = None
-        j += 1
+                dim = '3D'
+
+            if pm['hdf5Version']['val']:
+                label += 'HDF5 '
+                parser.set_parameter("HDF Version", pm['hdf5Version']['val'])
+
+            m = re.search(r'yes', pm['collectiveIO']['val'], re.I)
+            if m:
+                label += 'Collective '
+            else:
+                label += 'Independent '
+
+            m0 = re.search(r'read', read_or_write, re.I)
+            m1 = re.search(r'write', read_or_write, re.I)
+            if m0:
+                label += 'Read'
+            elif m1:
+                label += 'Write'
+            else:
+                label += read_or_write[0].upper() + read_or_write[1:]
+
+            parser.set_statistic("%s Array %s Aggregate Throughput" % (dim, label),
+                                 "%.2f" % (float(io_bandwidth) / 1024.0 / 1024.0), "MByte per Second")
+            if pm["maxFileOpenTime"]['val']:
+                parser.set_statistic("File Open Time (%s Data %s)" % (dim, label), pm["maxFileOpenTime"]['val'],
+                                     "Second")
+            if pm["maxFileCloseTime"]['val']:
+                parser.set_statistic("File Close Time (%s Data %s)" % (dim, label), pm["maxFileCloseTime"]['val'],
+                                     "Second")
+
+            parser.set_parameter("%s Process Topology" % (dim,), pm["processesTopology"]['val'])
+            if pm["localMemoryUsage"]['val']:
+                parser.set_parameter("%s Per-Process Memory" % (dim,),
+                                     float(pm["localMemoryUsage"]['val']) / 1024.0 / 1024.0, "MByte")
+            if pm["localDatasetTopology"]['val']:
+                parser.set_parameter("%s Per-Process Data Topology" % (dim,), pm["localDatasetTopology"]['val'],
+                                     "Element")
+            if pm["datasetGhostZone"]['val']:
+                parser.set_parameter("%s Per-Process Ghost Zone" % (dim,), pm["datasetGhostZone"]['val'])
+            if pm["mpiIOhints"]['val']:
+                parser.set_parameter("MPI-IO Hints", pm["mpiIOhints"]['val'])
+            # $benchmark->set_parameter( "${dim} ${label} Test File", $testFileName ) if( defined($testFileName) )
+            if pm["fileSystem"]['val']:
+                parser.set_parameter("%s %s Test File System" % (dim, label), pm["fileSystem"]['val'])
+            parser.successfulRun = True
+
+            pm["processesTopology"]['val'] = None
+            pm["localDatasetTopology"]['val'] = None
+            pm["localMemoryUsage"]['val'] = None
+            pm["datasetGhostZone"]['val'] = None
+            pm["mpiIOhints"]['val'] = None
+            # pm["readOrWrite"]['val']=None
+            pm["collectiveIO"]['val'] = None
+            # pm["IObandwidth"]['val']=None
+            pm["maxFileOpenTime"]['val'] = None
+            pm["maxFileCloseTime"]['val'] = None
+            pm["testFileName"]['val'] = None
+            pm["fileSystem"]['val'] = None
+            pm["hdf5Version"]['val'] = None
+
+    parser.add_appstdout_handler(r'^# (.+?)bandwidth:(.+)bytes', bandwidth)
+
+    parser.successfulRun = False
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
+
+    if hasattr(parser, 'appKerWallClockTime'):
+        parser.set_statistic("Wall Clock Time", parser.appKerWallClockTime.total_seconds(), "Second")
 
     if __name__ == "__main__":
         # output for testing purpose
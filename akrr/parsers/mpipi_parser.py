@@ -31,50 +31,38 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Time for PI Calculation')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
+    # set app kernel output handlers
+    def set_parameter(name):
+        def handler(m):
+            parser.set_parameter(name, m.group(1))
+        return handler
+
+    def set_statistic(name, units):
+        def handler(m):
+            parser.set_statistic(name, m.group(1), units)
+        return handler
+
+    def successful_run(m):
+        parser.successfulRun = True
+
+    parser.add_appstdout_handler(r'version:\s+(.+)', set_parameter('App:Version'), search=True)
+    parser.add_appstdout_handler(r'number of throws at dartboard:\s+(\d+)',
+                                 set_parameter('Number of Darts Throws'), search=True)
+    parser.add_appstdout_handler(r'number of rounds for dartz throwing\s+(\d+)',
+                                 set_parameter('Number of Rounds'), search=True)
+    parser.add_appstdout_handler(r'Time for PI calculation:\s+([0-9.]+)',
+                                 set_statistic("Time for PI Calculation", "Seconds"), search=True)
+    parser.add_appstdout_handler(r'Giga Darts Throws per Second \(GDaPS\):\s+([0-9.]+)',
+                                 set_statistic("Darts Throws per Second", "GDaPS"), search=True)
+    parser.add_appstdout_handler(r'Giga Darts Throws per Second', successful_run, search=True)
+
+    parser.successfulRun = False
+    # parse common parameters and statistics, app kernel output is processed in same pass
     parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo)
 
     if hasattr(parser, 'appKerWallClockTime'):
         parser.set_statistic("Wall Clock Time", parser.appKerWallClockTime.total_seconds(), "Second")
 
-    # Here can be custom output parsing
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
-    parser.successfulRun = False
-    j = 0
-    while j < len(lines):
-        m = re.search(r'version:\s+(.+)', lines[j])
-        if m:
-            parser.set_parameter('App:Version', m.group(1))
-
-        m = re.search(r'number of throws at dartboard:\s+(\d+)', lines[j])
-        if m:
-            parser.set_parameter('Number of Darts Throws', m.group(1))
-
-        m = re.search(r'number of rounds for dartz throwing\s+(\d+)', lines[j])
-        if m:
-            parser.set_parameter('Number of Rounds', m.group(1))
-
-        m = re.search(r'Time for PI calculation:\s+([0-9.]+)', lines[j])
-        if m:
-            parser.set_statistic("Time for PI Calculation", m.group(1), "Seconds")
-
-        m = re.search(r'Giga Darts Throws per Second \(GDaPS\):\s+([0-9.]+)', lines[j])
-        if m:
-            parser.set_statistic("Darts Throws per Second", m.group(1), "GDaPS")
-
-        m = re.search(r'Giga Darts Throws per Second', lines[j])
-        if m:
-            parser.successfulRun = True
-
-        j += 1
-
     if __name__ == "__main__":
         # output for testing purpose
         print(("Parsing complete:", parser.parsing_complete(verbose=True)))
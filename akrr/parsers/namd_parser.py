@@ -32,87 +32,63 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Molecular Dynamics Simulation Performance')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
-    successful_run = False
-    j = 0
-    while j < len(lines):
-
-        m = re.match(r'^Info: NAMD ([0-9a-zA-Z.]+)', lines[j])
-        if m:
-            parser.set_parameter("App:Version", m.group(1))
-
-        m = re.match(r'^Info: TIMESTEP\s+([0-9.]+)', lines[j])
-        if m:
-            parser.set_parameter("Input:Timestep", m.group(1) + "e-15", "Second per Step")
+    # set app kernel output handlers
+    parser.add_appstdout_parameter("App:Version", r'^Info: NAMD ([0-9a-zA-Z.]+)')
+    parser.add_appstdout_handler(
+        r'^Info: TIMESTEP\s+([0-9.]+)',
+        lambda m: parser.set_parameter("Input:Timestep", m.group(1) + "e-15", "Second per Step"))
+    parser.add_appstdout_parameter("Input:Number of Steps", r'^Info: NUMBER OF STEPS\s+([0-9.]+)')
+    parser.add_appstdout_parameter("Input:Coordinate File", r'^Info: COORDINATE PDB\s+(.+)')
+    parser.add_appstdout_parameter("Input:Structure File", r'^Info: STRUCTURE FILE\s+(.+)')
+
+    def running_on(m):
+        parser.set_parameter("App:NCores", m.group(1).strip())
+        parser.set_parameter("App:NNodes", m.group(3).strip())
+    parser.add_appstdout_handler(
+        r'^Info: Running on ([0-9.]+) processors, ([0-9.]+) nodes, ([0-9.]+) physical nodes.', running_on)
+
+    # structure summary section, up to 25 lines after header
+    structure_summary_patterns = (
+        (re.compile(r'^Info:\s+([0-9]+)\s+ATOMS\n'), "Input:Number of Atoms"),
+        (re.compile(r'^Info:\s+([0-9]+)\s+BONDS\n'), "Input:Number of Bonds"),
+        (re.compile(r'^Info:\s+([0-9]+)\s+ANGLES\n'), "Input:Number of Angles"),
+        (re.compile(r'^Info:\s+([0-9]+)\s+DIHEDRALS\n'), "Input:Number of Dihedrals"),
+    )
 
-        m = re.match(r'^Info: NUMBER OF STEPS\s+([0-9.]+)', lines[j])
-        if m:
-            parser.set_parameter("Input:Number of Steps", m.group(1))
+    def structure_summary_line(line):
+        for pattern, name in structure_summary_patterns:
+            m = pattern.match(line)
+            if m:
+                parser.set_parameter(name, m.group(1))
+    parser.add_appstdout_section(
+        r'^Info: STRUCTURE SUMMARY', structure_summary_line, max_lines=25, end_pattern=r'^Info: \*\*\*\*\*')
 
-        m = re.match(r'^Info: COORDINATE PDB\s+(.+)', lines[j])
-        if m:
-            parser.set_parameter("Input:Coordinate File", m.group(1))
+    days_per_ns = re.compile(r' ([0-9.]+) days/ns')
 
-        m = re.match(r'^Info: STRUCTURE FILE\s+(.+)', lines[j])
+    def benchmark_time(m):
+        m = days_per_ns.search(m.string)
         if m:
-            parser.set_parameter("Input:Structure File", m.group(1))
+            parser.set_statistic("Molecular Dynamics Simulation Performance", str(1.0e-9 / float(m.group(1))),
+                                 "Second per Day")
+    parser.add_appstdout_handler(r'Info: Benchmark time:', benchmark_time, search=True)
 
-        m = re.match(r'^Info: Running on ([0-9.]+) processors, ([0-9.]+) nodes, ([0-9.]+) physical nodes.', lines[j])
-        if m:
-            parser.set_parameter("App:NCores", m.group(1).strip())
-            parser.set_parameter("App:NNodes", m.group(3).strip())
-
-        if re.match(r'^Info: STRUCTURE SUMMARY', lines[j]):
-            j += 1
-            for k in range(25):
-                if re.match(r'^Info: \*\*\*\*\*', lines[j]):
-                    break
-
-                m = re.match(r'^Info:\s+([0-9]+)\s+ATOMS\n', lines[j])
-                if m:
-                    parser.set_parameter("Input:Number of Atoms", m.group(1))
-
-                m = re.match(r'^Info:\s+([0-9]+)\s+BONDS\n', lines[j])
-                if m:
-                    parser.set_parameter("Input:Number of Bonds", m.group(1))
-
-                m = re.match(r'^Info:\s+([0-9]+)\s+ANGLES\n', lines[j])
-                if m:
-                    parser.set_parameter("Input:Number of Angles", m.group(1))
-
-                m = re.match(r'^Info:\s+([0-9]+)\s+DIHEDRALS\n', lines[j])
-                if m:
-                    parser.set_parameter("Input:Number of Dihedrals", m.group(1))
-
-                j += 1
-
-        if re.search(r'Info: Benchmark time:', lines[j]):
-            m = re.search(r' ([0-9.]+) days/ns', lines[j])
-            if m:
-                parser.set_statistic("Molecular Dynamics Simulation Performance", str(1.0e-9 / float(m.group(1))),
-                                     "Second per Day")
+    successful_run = False
 
-        m = re.match(r'^WallClock:\s+([0-9.]+)\s+CPUTime:\s+([0-9.]+)\s+Memory:\s+([0-9.]+)', lines[j])
-        if m:
-            parser.set_statistic("Wall Clock Time", m.group(1), "Second")
-            parser.set_statistic("Memory", m.group(3), "MByte")
-            successful_run = True
+    def wall_clock(m):
+        nonlocal successful_run
+        parser.set_statistic("Wall Clock Time", m.group(1), "Second")
+        parser.set_statistic("Memory", m.group(3), "MByte")
+        successful_run = True
+    parser.add_appstdout_handler(
+        r'^WallClock:\s+([0-9.]+)\s+CPUTime:\s+([0-9.]+)\s+Memory:\s+([0-9.]+)', wall_clock)
 
-        m = re.match(r'^End of program', lines[j])
-        if m:
-            successful_run = True
+    def end_of_program(_):
+        nonlocal successful_run
+        successful_run = True
+    parser.add_appstdout_handler(r'^End of program', end_of_program)
 
-        j += 1
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     parser.successfulRun = successful_run
 
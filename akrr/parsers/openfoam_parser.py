@@ -30,11 +30,54 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Solver run-time')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
+    # set app kernel output handlers
+    # state of the processing, everything after simpleFoam log header is used only to check the run
+    state = {'in_simple_foam': False, 'time_more_than_zero': False, 'reach_end_allrun': 0,
+             'wall_clock_time': None}
+    simple_foam_time_pattern = re.compile(r'^Time = (\d+)')
+
+    def simple_foam_line(line):
+        if not state['in_simple_foam']:
+            return False
+        m = simple_foam_time_pattern.match(line)
+        if m and int(m.group(1)) > 0:
+            state['time_more_than_zero'] = True
+        if line.strip() == "Finalising parallel run" or line.strip() == "End Allrun":
+            state['reach_end_allrun'] += 1
+        return True
+
+    def mesh_stats_line(line):
+        if line.strip() == "":
+            return True
+        parser.match_set_parameter("Mesh stats: points", r'\s*points:\s*(\d+)$', line)
+        parser.match_set_parameter("Mesh stats: faces", r'\s*faces:\s*(\d+)$', line)
+        parser.match_set_parameter("Mesh stats: cells", r'\s*cells:\s*(\d+)$', line)
+
+    def total_run_time(m):
+        state['wall_clock_time'] = m.group(1).strip()
+
+    def simple_foam(m):
+        state['in_simple_foam'] = True
+
+    parser.add_appstdout_handler(None, simple_foam_line)
+    # Global parameters
+    parser.add_appstdout_parameter("App:Version", r'Build\s+:\s+(.+)$')
+    parser.add_appstdout_section(r'^Mesh stats', mesh_stats_line)
+    # Summary statistics
+    parser.add_appstdout_statistic("Snappy run-time", r'Snappy run-time: ([0-9.]+)$', units="Seconds")
+    parser.add_appstdout_statistic("Solver run-time", r'Solver run-time: ([0-9.]+)$', units="Seconds")
+    parser.add_appstdout_handler(r'Total run-time: ([0-9.]+)$', total_run_time)
+    # This for determining is it a good run
+    parser.add_appstdout_handler(r'^# log.simpleFoam #', simple_foam)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
     parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if parser.appKerWallClockTime is not None:
         parser.set_statistic("Wall Clock Time", total_seconds(parser.appKerWallClockTime), "Second")
+    # total run-time reported by application takes precedence
+    if state['wall_clock_time'] is not None:
+        parser.set_statistic("Wall Clock Time", state['wall_clock_time'], "Second")
 
     if "input_param" in parser.geninfo:
         input_param = parser.geninfo['input_param']
@@ -42,53 +85,7 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
             input_param = input_param.replace("inputs/openfoam/", "", 1)
             parser.set_parameter("Input", input_param.strip())
 
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-
-
-    # process the output
-    time_more_than_zero = False
-    reach_end_allrun = 0
-    j = 0
-
-    while j < len(lines):
-        # Global parameters
-        parser.match_set_parameter("App:Version", r'Build\s+:\s+(.+)$', lines[j])
-        m = re.match(r'^Mesh stats', lines[j])
-        if m:
-            j += 1
-            while j < len(lines) and lines[j].strip() != "":
-                parser.match_set_parameter("Mesh stats: points", r'\s*points:\s*(\d+)$', lines[j])
-                parser.match_set_parameter("Mesh stats: faces", r'\s*faces:\s*(\d+)$', lines[j])
-                parser.match_set_parameter("Mesh stats: cells", r'\s*cells:\s*(\d+)$', lines[j])
-                j += 1
-
-        # Summary statistics
-        parser.match_set_statistic("Snappy run-time", r'Snappy run-time: ([0-9.]+)$', lines[j], units="Seconds")
-        parser.match_set_statistic("Solver run-time", r'Solver run-time: ([0-9.]+)$', lines[j], units="Seconds")
-        parser.match_set_statistic("Wall Clock Time", r'Total run-time: ([0-9.]+)$', lines[j], units="Second")
-
-        # This for determining is it a good run
-
-        m = re.match(r'^# log.simpleFoam #', lines[j])
-        if m:
-            j += 1
-            while j < len(lines):
-                m = re.match(r'^Time = (\d+)', lines[j])
-                if m and int(m.group(1)) > 0:
-                    time_more_than_zero = True
-                if lines[j].strip()=="Finalising parallel run" or \
-                        lines[j].strip()=="End Allrun":
-                    reach_end_allrun += 1
-                j += 1
-        j += 1
-
-    parser.successfulRun = (reach_end_allrun == 2) and time_more_than_zero
+    parser.successfulRun = (state['reach_end_allrun'] == 2) and state['time_more_than_zero']
 
     # return
     if __name__ == "__main__":
@@ -35,82 +35,54 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     # parser.add_must_have_statistic("Time Spent in Potential Updates "\
     # "(Charge Density and Wavefunctions Extrapolations)")
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     parser.successfulRun = False
-    j = 0
-    while j < len(lines):
-
-        m = re.match(r'^\s+Program PWSCF\s+([\w.]+)\s+starts', lines[j])
-        if m:
-            parser.set_parameter("App:Version", m.group(1).strip())
-
-        m = re.match(r'^\s+number of atoms/cell\s*=\s*([\d.]+)', lines[j])
-        if m:
-            parser.set_parameter("Input:Number of Atoms per Cell", m.group(1).strip())
-
-        m = re.match(r'^\s+number of atomic types\s*=\s*([\d.]+)', lines[j])
-        if m:
-            parser.set_parameter("Input:Number of Atomic Types", m.group(1).strip())
-
-        m = re.match(r'^\s+number of electrons\s*=\s*([\d.]+)', lines[j])
-        if m:
-            parser.set_parameter("Input:Number of Electrons", m.group(1).strip())
 
-        m = re.match(r'^\s+per-process dynamical memory:\s*([\d.]+)\s*Mb', lines[j])
-        if m:
-            parser.set_statistic("Per-Process Dynamical Memory", (m.group(1).strip()), "MByte")
-
-        m = re.match(r'^\s+init_run\s+:\s*([\d.]+)s CPU', lines[j])
-        if m:
-            parser.set_statistic("Time Spent in Program Initialization", (m.group(1).strip()), "Second")
-
-        m = re.match(r'^\s+electrons\s+:\s*([\d.]+)s CPU', lines[j])
-        if m:
-            parser.set_statistic("Time Spent in Electron Energy Calculation", (m.group(1).strip()), "Second")
-
-        m = re.match(r'^\s+forces\s+:\s*([\d.]+)s CPU', lines[j])
-        if m:
-            parser.set_statistic("Time Spent in Force Calculation", (m.group(1).strip()), "Second")
-
-        m = re.match(r'^\s+stress\s+:\s*([\d.]+)s CPU', lines[j])
-        if m:
-            parser.set_statistic("Time Spent in Stress Calculation", (m.group(1).strip()), "Second")
-
-        m = re.match(r'^\s+update_pot\s+:\s*([\d.]+)s CPU', lines[j])
-        if m:
-            parser.set_statistic("Time Spent in Potential Updates (Charge Density and Wavefunctions Extrapolations)",
-                                 float(m.group(1).strip()), "Second")
-
-        m = re.match(r'^\s+PWSCF\s+:(.+CPU.+)', lines[j])
-        if m:
-            run_times = m.group(1).strip().split(',')
-            for run_time in run_times:
-                v = run_time.split()
-                if len(v) > 1:
-                    if v[0].lower().find("m") >= 0:
-                        m = re.match(r'^([0-9]+)m([0-9.]+)s', v[0])
-                        sec = float(m.group(1)) * 60.0 + float(m.group(2))
-                    else:
-                        m = re.match(r'^([0-9.]+)s', v[0])
-                        sec = float(m.group(1))
-                    if v[1].upper().find("CPU") >= 0:
-                        parser.set_statistic("User Time", sec, "Second")
-                    if v[1].upper().find("WALL") >= 0:
-                        parser.set_statistic("Wall Clock Time", sec, "Second")
+    parser.add_appstdout_parameter("App:Version", r'^\s+Program PWSCF\s+([\w.]+)\s+starts')
+    parser.add_appstdout_parameter("Input:Number of Atoms per Cell", r'^\s+number of atoms/cell\s*=\s*([\d.]+)')
+    parser.add_appstdout_parameter("Input:Number of Atomic Types", r'^\s+number of atomic types\s*=\s*([\d.]+)')
+    parser.add_appstdout_parameter("Input:Number of Electrons", r'^\s+number of electrons\s*=\s*([\d.]+)')
+
+    parser.add_appstdout_statistic(
+        "Per-Process Dynamical Memory", r'^\s+per-process dynamical memory:\s*([\d.]+)\s*Mb', "MByte")
+    parser.add_appstdout_statistic(
+        "Time Spent in Program Initialization", r'^\s+init_run\s+:\s*([\d.]+)s CPU', "Second")
+    parser.add_appstdout_statistic(
+        "Time Spent in Electron Energy Calculation", r'^\s+electrons\s+:\s*([\d.]+)s CPU', "Second")
+    parser.add_appstdout_statistic(
+        "Time Spent in Force Calculation", r'^\s+forces\s+:\s*([\d.]+)s CPU', "Second")
+    parser.add_appstdout_statistic(
+        "Time Spent in Stress Calculation", r'^\s+stress\s+:\s*([\d.]+)s CPU', "Second")
+    parser.add_appstdout_handler(
+        r'^\s+update_pot\s+:\s*([\d.]+)s CPU',
+        lambda m: parser.set_statistic(
+            "Time Spent in Potential Updates (Charge Density and Wavefunctions Extrapolations)",
+            float(m.group(1).strip()), "Second"))
+
+    def pwscf_times(m):
+        run_times = m.group(1).strip().split(',')
+        for run_time in run_times:
+            v = run_time.split()
+            if len(v) > 1:
+                if v[0].lower().find("m") >= 0:
+                    m = re.match(r'^([0-9]+)m([0-9.]+)s', v[0])
+                    sec = float(m.group(1)) * 60.0 + float(m.group(2))
+                else:
+                    m = re.match(r'^([0-9.]+)s', v[0])
+                    sec = float(m.group(1))
+                if v[1].upper().find("CPU") >= 0:
+                    parser.set_statistic("User Time", sec, "Second")
+                if v[1].upper().find("WALL") >= 0:
+                    parser.set_statistic("Wall Clock Time", sec, "Second")
+    parser.add_appstdout_handler(r'^\s+PWSCF\s+:(.+CPU.+)', pwscf_times)
+
+    def job_done(_):
+        parser.successfulRun = True
+    parser.add_appstdout_handler(r'^\s+JOB DONE', job_done)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
-        if re.match(r'^\s+JOB DONE', lines[j]):
-            parser.successfulRun = True
-        j += 1
     if __name__ == "__main__":
         # output for testing purpose
         print("parsing complete:", parser.parsing_complete(True))
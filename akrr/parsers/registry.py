@@ -0,0 +1,107 @@
+"""
+Registry of app kernel output parsers.
+
+Parser modules are imported once per process as akrr.parsers.<module name> and re-imported
+only when their file is modified. Parsing time is accumulated per app kernel.
+"""
+import os
+import sys
+import time
+import importlib.util
+from typing import Dict, Any
+
+from akrr.util import log
+
+parsers_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class ParserRegistry:
+    """
+    Cache of imported parsers modules, key is full path to parser file
+    """
+    def __init__(self, parsers_dir: str = parsers_dir):
+        self.parsers_dir = parsers_dir
+        # full path to parser file -> (modification time, module)
+        self._modules = {}
+        # app kernel name -> parsing statistics
+        self.stats = {}
+
+    def get_parser_path(self, parser_filename: str) -> str:
+        """return full path to parser, parser_filename is relative to parsers directory"""
+        return os.path.abspath(os.path.join(self.parsers_dir, parser_filename))
+
+    def get_module(self, parser_filename: str):
+        """
+        return parser module, module is imported on first request and re-imported if parser file
+        was modified since then
+        """
+        parser_path = self.get_parser_path(parser_filename)
+        mtime = os.stat(parser_path).st_mtime_ns
+
+        cached = self._modules.get(parser_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        module_name = "akrr.parsers." + os.path.splitext(os.path.basename(parser_path))[0]
+        module = sys.modules.get(module_name)
+        if cached is not None or module is None or \
+                os.path.abspath(getattr(module, "__file__", "")) != parser_path:
+            log.debug("Loading parser %s from %s", module_name, parser_path)
+            spec = importlib.util.spec_from_file_location(module_name, parser_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[module_name] = module
+
+        self._modules[parser_path] = (mtime, module)
+        return module
+
+    def process_appker_output(self, app_name: str, parser_filename: str, **kwargs) -> Any:
+        """
+        process app kernel output with parser and account parsing time to app_name
+        """
+        module = self.get_module(parser_filename)
+        start = time.perf_counter()
+        failed = True
+        try:
+            performance = module.process_appker_output(**kwargs)
+            failed = False
+            return performance
+        finally:
+            parse_time = time.perf_counter() - start
+            stats = self._account(app_name, parse_time, failed)
+            log.info("%s output was parsed in %.3f seconds (mean %.3f seconds over %d results in this process)",
+                     app_name, parse_time, stats['time'] / stats['count'], stats['count'])
+
+    def _account(self, app_name: str, parse_time: float, failed: bool) -> Dict[str, float]:
+        stats = self.stats.setdefault(app_name, {'count': 0, 'failed': 0, 'time': 0.0, 'max_time': 0.0})
+        stats['count'] += 1
+        if failed:
+            stats['failed'] += 1
+        stats['time'] += parse_time
+        stats['max_time'] = max(stats['max_time'], parse_time)
+        return stats
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """return parsing statistics per app kernel with mean parsing time"""
+        return {
+            app_name: dict(stats, mean_time=stats['time'] / stats['count'] if stats['count'] > 0 else 0.0)
+            for app_name, stats in self.stats.items()}
+
+
+# Per-process registry
+_registry = None
+
+
+def get_registry() -> ParserRegistry:
+    """return parser registry of this process"""
+    global _registry
+    if _registry is None:
+        _registry = ParserRegistry()
+    return _registry
+
+
+def process_appker_output(app_name: str, parser_filename: str, **kwargs) -> Any:
+    """
+    process app kernel output with parser from per-process registry
+    """
+    return get_registry().process_appker_output(app_name, parser_filename, **kwargs)
@@ -35,17 +35,7 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     parser.add_must_have_statistic('Time Spent on I/O')
     parser.add_must_have_statistic('Wall Clock Time')
 
-    # parse common parameters and statistics
-    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
-
-    # read output
-    lines = []
-    if os.path.isfile(appstdout):
-        fin = open(appstdout, "rt")
-        lines = fin.readlines()
-        fin.close()
-
-    # process the output
+    # set app kernel output handlers
     io_size = None
     wall_clock_time = None
     iteration_wall_clock_time = []
@@ -53,124 +43,134 @@ def process_appker_output(appstdout=None, stdout=None, stderr=None, geninfo=None
     dx = None
     dy = None
     flops_conversion = None
+    io_time = None
 
-    j = 0
-    while j < len(lines):
-        m = re.search(r'XDMOD\*\*\*SIZE OF CURRENT DIR BEFORE WRF RUN\s*(\d+)', lines[j])
-        if m:
-            io_size = int(m.group(1).strip())
+    def size_before(m):
+        nonlocal io_size
+        io_size = int(m.group(1).strip())
+    parser.add_appstdout_handler(r'XDMOD\*\*\*SIZE OF CURRENT DIR BEFORE WRF RUN\s*(\d+)', size_before, search=True)
 
-        m = re.search(r'XDMOD\*\*\*SIZE OF CURRENT DIR AFTER WRF RUN\s*(\d+)', lines[j])
-        if m and io_size:
+    def size_after(m):
+        if io_size:
             parser.set_statistic("Output Data Size", (int(m.group(1).strip()) - io_size) / 1024.0 / 1024.0, "MByte")
+    parser.add_appstdout_handler(r'XDMOD\*\*\*SIZE OF CURRENT DIR AFTER WRF RUN\s*(\d+)', size_after, search=True)
 
-        m = re.search(r'XDMOD\*\*\*WRF RUN BEGINS HERE --(.+)', lines[j])
-        if m:
-            wall_clock_time = parser.get_datetime_local(m.group(1).strip())
+    def run_begins(m):
+        nonlocal wall_clock_time
+        wall_clock_time = parser.get_datetime_local(m.group(1).strip())
+    parser.add_appstdout_handler(r'XDMOD\*\*\*WRF RUN BEGINS HERE --(.+)', run_begins, search=True)
 
-        m = re.search(r'XDMOD\*\*\*WRF RUN HAS FINISHED --(.+)', lines[j])
-        if m and wall_clock_time:
+    def run_finished(m):
+        nonlocal wall_clock_time
+        if wall_clock_time:
             wall_clock_time = parser.get_datetime_local(m.group(1).strip()) - wall_clock_time
             parser.set_statistic("Wall Clock Time", wall_clock_time.total_seconds(), "Second")
+    parser.add_appstdout_handler(r'XDMOD\*\*\*WRF RUN HAS FINISHED --(.+)', run_finished, search=True)
+
+    restart_timing_pattern = re.compile(r'Timing for processing restart file.+?:\s+(\d\S+)', re.I)
+    writing_timing_pattern = re.compile(r'Timing for Writing.+?:\s+(\d\S+)', re.I)
+    main_timing_pattern = re.compile(r'Timing for main: time.+?on domain.+?:\s+(\d\S+)', re.I)
+    tiles_pattern = re.compile(r'WRF NUMBER OF TILES.+?(\d+)')
+    version_pattern = re.compile(r'^\s+WRF V(\S+) MODEL')
+
+    def timing_and_version_line(line):
+        """process lines common for rsl.out.0000 and wrfout sections"""
+        nonlocal io_time
+        m = writing_timing_pattern.search(line)
+        if m:
+            if io_time is None:
+                io_time = 0.0
+            io_time += float(m.group(1).strip())
+
+        m = main_timing_pattern.search(line)
+        if m:
+            iteration_wall_clock_time.append(float(m.group(1).strip()))
+
+        m = tiles_pattern.search(line)
+        if m:
+            omp_threads = int(m.group(1).strip())
+            if omp_threads > 1:
+                parser.set_parameter("Number of OpenMP Threads", omp_threads)
+
+        m = version_pattern.match(line)
+        if m:
+            parser.set_parameter("App:Version", m.group(1).strip())
+
+    # the output from MPI rank #0
+    def rsl_out_line(line):
+        nonlocal io_time
+        m = restart_timing_pattern.search(line)
+        if m:
+            if io_time is None:
+                io_time = 0.0
+            io_time += float(m.group(1).strip())
+        timing_and_version_line(line)
+
+    def rsl_out_end():
+        nonlocal io_time
+        parser.set_statistic("Time Spent on I/O", io_time, "Second")
+        io_time = None
+    parser.add_appstdout_section(
+        r'XDMOD\*\*\*RESULT OF rsl\.out\.0000 BEGINS', rsl_out_line,
+        end_pattern=r'.*XDMOD\*\*\*RESULT OF rsl\.out\.0000 ENDS', on_end=rsl_out_end, search=True)
+
+    # the output file's header (netCDF dump)
+    dx_pattern = re.compile(r':DX = (\d+)', re.I)
+    dy_pattern = re.compile(r':DY = (\d+)', re.I)
+    dt_pattern = re.compile(r':DT = (\d+)', re.I)
+    start_date_pattern = re.compile(r':SIMULATION_START_DATE = "(.+?)"', re.I)
+    gridtype_pattern = re.compile(r':GRIDTYPE = "(.+?)"', re.I)
+
+    def wrfout_line(line):
+        nonlocal dx, dy, sim_time_per_iteration
+        m = dx_pattern.search(line)
+        if m:
+            dx = float(m.group(1).strip()) * 0.001  # in meters
+
+        m = dy_pattern.search(line)
+        if m:
+            dy = float(m.group(1).strip()) * 0.001  # in meters
 
-        if lines[j].find('XDMOD***RESULT OF rsl.out.0000 BEGINS') >= 0:
-            # the output from MPI rank #0
-            io_time = None
-            while j < len(lines):
-                if lines[j].find('XDMOD***RESULT OF rsl.out.0000 ENDS') >= 0:
-                    break
-
-                m = re.search(r'Timing for processing restart file.+?:\s+(\d\S+)', lines[j], re.I)
-                if m:
-                    if io_time is None:
-                        io_time = 0.0
-                    io_time += float(m.group(1).strip())
-
-                m = re.search(r'Timing for Writing.+?:\s+(\d\S+)', lines[j], re.I)
-                if m:
-                    if io_time is None:
-                        io_time = 0.0
-                    io_time += float(m.group(1).strip())
-
-                m = re.search(r'Timing for main: time.+?on domain.+?:\s+(\d\S+)', lines[j], re.I)
-                if m:
-                    iteration_wall_clock_time.append(float(m.group(1).strip()))
-
-                m = re.search(r'WRF NUMBER OF TILES.+?(\d+)', lines[j])
-                if m:
-                    omp_threads = int(m.group(1).strip())
-                    if omp_threads > 1:
-                        parser.set_parameter("Number of OpenMP Threads", omp_threads)
-
-                m = re.match(r'^\s+WRF V(\S+) MODEL', lines[j])
-                if m:
-                    parser.set_parameter("App:Version", m.group(1).strip())
-                j += 1
-            parser.set_statistic("Time Spent on I/O", io_time, "Second")
-
-        if re.search('XDMOD\*\*\*RESULT OF wrfout.+?BEGINS', lines[j]) is not None:
-            # the output file's header (netCDF dump)
-            io_time = None
-            while j < len(lines):
-                if re.search('XDMOD\*\*\*RESULT OF wrfout.+?ENDS', lines[j]) is not None:
-                    break
-
-                m = re.search(r':DX = (\d+)', lines[j], re.I)
-                if m:
-                    dx = float(m.group(1).strip()) * 0.001  # in meters
-
-                m = re.search(r':DY = (\d+)', lines[j], re.I)
-                if m:
-                    dy = float(m.group(1).strip()) * 0.001  # in meters
-
-                m = re.search(r':DT = (\d+)', lines[j], re.I)
-                if m:
-                    sim_time_per_iteration = float(m.group(1).strip())  # in seconds
-                    parser.set_parameter("Input:Timestep", sim_time_per_iteration, "Second per Step")
-
-                m = re.search(r':SIMULATION_START_DATE = "(.+?)"', lines[j], re.I)
-                if m:
-                    parser.set_parameter("Input:Simulation Start Date", (m.group(1).strip()))
-
-                m = re.search(r':GRIDTYPE = "(.+?)"', lines[j], re.I)
-                if m:
-                    solver = m.group(1).strip()
-                    if solver == 'C':
-                        solver = 'Advanced Research WRF (ARW)'
-                    if solver == 'E':
-                        solver = 'Nonhydrostatic Mesoscale Model (NMM)'
-                    parser.set_parameter("WRF Dynamical Solver", solver)
-
-                m = re.search(r'Timing for Writing.+?:\s+(\d\S+)', lines[j], re.I)
-                if m:
-                    if io_time is None:
-                        io_time = 0.0
-                    io_time += float(m.group(1).strip())
-
-                m = re.search(r'Timing for main: time.+?on domain.+?:\s+(\d\S+)', lines[j], re.I)
-                if m:
-                    iteration_wall_clock_time.append(float(m.group(1).strip()))
-
-                m = re.search(r'WRF NUMBER OF TILES.+?(\d+)', lines[j])
-                if m:
-                    omp_threads = int(m.group(1).strip())
-                    if omp_threads > 1:
-                        parser.set_parameter("Number of OpenMP Threads", omp_threads)
-
-                m = re.match(r'^\s+WRF V(\S+) MODEL', lines[j])
-                if m:
-                    parser.set_parameter("App:Version", m.group(1).strip())
-                j += 1
-            if dx and dy:
-                if (dx - int(dx)) * 1000 < 0.1 and (dy - int(dy)) * 1000 < 0.1:  # back compatibility with output format
-                    parser.set_parameter("Input:Grid Resolution", "%.0f x %.0f" % (dx, dy), "km^2")
-                else:
-                    parser.set_parameter("Input:Grid Resolution", str(dx) + " x " + str(dy), "km^2")
-
-        m = re.search(r'XDMOD\*\*\*FLOATING-POINT PERFORMANCE CONVERSION', lines[j])
+        m = dt_pattern.search(line)
         if m:
-            flops_conversion = lines[j + 1].strip()
-        j += 1
+            sim_time_per_iteration = float(m.group(1).strip())  # in seconds
+            parser.set_parameter("Input:Timestep", sim_time_per_iteration, "Second per Step")
+
+        m = start_date_pattern.search(line)
+        if m:
+            parser.set_parameter("Input:Simulation Start Date", (m.group(1).strip()))
+
+        m = gridtype_pattern.search(line)
+        if m:
+            solver = m.group(1).strip()
+            if solver == 'C':
+                solver = 'Advanced Research WRF (ARW)'
+            if solver == 'E':
+                solver = 'Nonhydrostatic Mesoscale Model (NMM)'
+            parser.set_parameter("WRF Dynamical Solver", solver)
+
+        timing_and_version_line(line)
+
+    def wrfout_end():
+        nonlocal io_time
+        io_time = None
+        if dx and dy:
+            if (dx - int(dx)) * 1000 < 0.1 and (dy - int(dy)) * 1000 < 0.1:  # back compatibility with output format
+                parser.set_parameter("Input:Grid Resolution", "%.0f x %.0f" % (dx, dy), "km^2")
+            else:
+                parser.set_parameter("Input:Grid Resolution", str(dx) + " x " + str(dy), "km^2")
+    parser.add_appstdout_section(
+        r'XDMOD\*\*\*RESULT OF wrfout.+?BEGINS', wrfout_line,
+        end_pattern=r'.*XDMOD\*\*\*RESULT OF wrfout.+?ENDS', on_end=wrfout_end, search=True)
+
+    def flops_conversion_line(line):
+        nonlocal flops_conversion
+        flops_conversion = line.strip()
+    parser.add_appstdout_section(
+        r'XDMOD\*\*\*FLOATING-POINT PERFORMANCE CONVERSION', flops_conversion_line, max_lines=1, search=True)
+
+    # parse common parameters and statistics, app kernel output is processed in same pass
+    parser.parse_common_params_and_stats(appstdout, stdout, stderr, geninfo, resource_appker_vars)
 
     if wall_clock_time:
         parser.successfulRun = True
@@ -1,4 +1,6 @@
 # CLI for performance monitoring routines
+from akrr.util.time import get_datetime_time_to_start
+
 
 def add_command_ingestor(parent_parser):
     """
@@ -8,6 +10,8 @@ def add_command_ingestor(parent_parser):
     subparsers = parser.add_subparsers(title='commands')
 
     cli_ingestor_single_task(subparsers)
+    cli_ingestor_new(subparsers)
+    cli_ingestor_backfill(subparsers)
 
 
 def cli_ingestor_single_task(parent_parser):
@@ -16,9 +20,114 @@ def cli_ingestor_single_task(parent_parser):
     """
     parser = parent_parser.add_parser('single-task', description=cli_ingestor_single_task.__doc__)
     parser.add_argument('task_id', metavar='task-id', type=int, help='task id of task to ingest')
+    parser.add_argument('-d', '--dry-run', action='store_true', help="dry run")
 
     def handler(args):
         from akrr.perf.ingestor import ingest_single_task
-        return ingest_single_task(args.task_id)
+        return ingest_single_task(args.task_id, dry_run=args.dry_run)
+
+    parser.set_defaults(func=handler)
+
+
+def cli_ingestor_new(parent_parser):
+    """
+    Ingest tasks committed since last ingestion
+    """
+    parser = parent_parser.add_parser('new', description=cli_ingestor_new.__doc__)
+    parser.add_argument(
+        '--batch-size', type=int, default=500,
+        help="number of tasks ingested in single transaction. Default: 500.")
+    parser.add_argument('-d', '--dry-run', action='store_true', help="dry run")
+
+    def handler(args):
+        from akrr.perf.ingestor import ingest_new
+        return ingest_new(batch_size=args.batch_size, dry_run=args.dry_run)
+
+    parser.set_defaults(func=handler)
+
+
+def cli_ingestor_backfill(parent_parser):
+    """
+    Ingest historical tasks in parallel, last ingestion time used by new command is not changed
+    """
+    parser = parent_parser.add_parser('backfill', description=cli_ingestor_backfill.__doc__)
+    parser.add_argument(
+        '-t0', '--time-start', type=get_datetime_time_to_start,
+        help="ingest tasks committed after that time (YYYY-MM-DD[ HH:MM:SS]). Default: first task.")
+    parser.add_argument(
+        '-t1', '--time-end', type=get_datetime_time_to_start,
+        help="ingest tasks committed before that time (YYYY-MM-DD[ HH:MM:SS]). Default: last task.")
+    parser.add_argument(
+        '-p', '--processes', type=int,
+        help="number of worker processes. Default: number of CPUs.")
+    parser.add_argument(
+        '--interval-days', type=int, default=7,
+        help="length of time interval ingested by single worker in days. Default: 7.")
+    parser.add_argument(
+        '--batch-size', type=int, default=500,
+        help="number of tasks ingested in single transaction. Default: 500.")
+    parser.add_argument('-d', '--dry-run', action='store_true', help="dry run")
+
+    def handler(args):
+        from akrr.perf.ingestor import backfill
+        return backfill(
+            time_from=args.time_start, time_to=args.time_end, processes=args.processes,
+            interval_days=args.interval_days, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    parser.set_defaults(func=handler)
+
+
+def add_command_control(parent_parser):
+    """
+    Control regions of app kernels performance
+    """
+    parser = parent_parser.add_parser('control', description=add_command_control.__doc__)
+    subparsers = parser.add_subparsers(title='commands')
+
+    cli_control_recalculate(subparsers)
+    cli_control_add_region(subparsers)
+
+
+def cli_control_recalculate(parent_parser):
+    """
+    Recalculate control regions and control values of ingested results
+    """
+    parser = parent_parser.add_parser('recalculate', description=cli_control_recalculate.__doc__)
+    parser.add_argument('-r', '--resource', help="resource (SQL LIKE pattern)")
+    parser.add_argument('-a', '--appkernel', help="app kernel (SQL LIKE pattern)")
+    parser.add_argument('-d', '--dry-run', action='store_true', help="dry run")
+
+    def handler(args):
+        from akrr.perf.control import recalculate
+        return recalculate(resource=args.resource, appkernel=args.appkernel, dry_run=args.dry_run)
+
+    parser.set_defaults(func=handler)
+
+
+def cli_control_add_region(parent_parser):
+    """
+    Add control region for app kernel on resource and recalculate its control values
+    """
+    parser = parent_parser.add_parser('add-region', description=cli_control_add_region.__doc__)
+    parser.add_argument('-r', '--resource', required=True, help="resource")
+    parser.add_argument('-a', '--appkernel', required=True, help="app kernel")
+    parser.add_argument(
+        '-t0', '--time-start', required=True, type=get_datetime_time_to_start,
+        help="start of control region (YYYY-MM-DD[ HH:MM:SS])")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        '-t1', '--time-end', type=get_datetime_time_to_start,
+        help="end of control region (YYYY-MM-DD[ HH:MM:SS]), region is date range")
+    group.add_argument(
+        '-n', '--points', type=int,
+        help="number of data points in control region. Default: control_region_default_points from akrr.conf")
+    parser.add_argument('--comment', help="comment")
+    parser.add_argument('-d', '--dry-run', action='store_true', help="dry run")
+
+    def handler(args):
+        from akrr.perf.control import add_control_region
+        return add_control_region(
+            args.resource, args.appkernel, args.time_start, ends=args.time_end, points=args.points,
+            comment=args.comment, dry_run=args.dry_run)
 
-    parser.set_defaults(func=handler)
\ No newline at end of file
+    parser.set_defaults(func=handler)
@@ -0,0 +1,552 @@
+"""
+Control regions of app kernels metrics and detection of out of control runs in mod_appkernel.
+
+Control region is the period of normal performance of app kernel on resource, it is set in
+control_region_def as date range or as number of data points starting from control_region_starts.
+For each series (resource, app kernel with number of units, metric) mean and variance of control
+region are accumulated with Welford algorithm, mean -/+ criteria*std gives control band
+(controlStart, controlEnd), controlMin and controlMax are extremes of control region.
+
+Results are pushed in order of collection and classified against the band of their series
+without rescanning history. Series are recalculated from stored data if control region
+definitions are changed or results come out of order.
+"""
+import math
+import time
+import bisect
+import datetime
+from collections import deque, namedtuple
+from typing import Optional, List, Tuple, Iterable
+
+from akrr.util import log
+
+# values of controlStatus (note in_contol spelling in mod_appkernel enum)
+undefined = "undefined"
+control_region_time_interval = "control_region_time_interval"
+in_control = "in_contol"
+under_performing = "under_performing"
+over_performing = "over_performing"
+failed = "failed"
+
+# control columns of metric_data and a_data2
+ControlValues = namedtuple(
+    "ControlValues", ("running_average", "control", "controlStart", "controlEnd", "controlMin", "controlMax",
+                      "controlStatus"))
+
+no_control = ControlValues(None, None, None, None, None, None, undefined)
+
+ControlRegionDef = namedtuple(
+    "ControlRegionDef", ("control_region_def_id", "control_region_type", "starts", "ends", "points"))
+
+# units of metrics for which smaller is better if metric is not in metric_attribute
+_smaller_is_better_units = {"second", "seconds", "sec", "s", "minute", "minutes", "hour", "hours"}
+
+_control_columns = "running_average,control,controlStart,controlEnd,controlMin,controlMax,controlStatus"
+
+
+def to_float(value: Optional[str]) -> Optional[float]:
+    """return finite float value of metric or None"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+class RunningStats:
+    """count, mean, variance and extremes of values accumulated with Welford algorithm"""
+    __slots__ = ("n", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def push(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def variance(self) -> float:
+        """sample variance"""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class RollingMedian:
+    """median of last window values"""
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.sorted = []
+
+    def push(self, value: float) -> None:
+        self.values.append(value)
+        bisect.insort(self.sorted, value)
+        if len(self.values) > self.window:
+            del self.sorted[bisect.bisect_left(self.sorted, self.values.popleft())]
+
+    @property
+    def median(self) -> Optional[float]:
+        n = len(self.sorted)
+        if n == 0:
+            return None
+        if n % 2 == 1:
+            return self.sorted[n // 2]
+        return 0.5 * (self.sorted[n // 2 - 1] + self.sorted[n // 2])
+
+
+def get_region(regions: List[ControlRegionDef], collected: datetime.datetime) -> Optional[ControlRegionDef]:
+    """return control region definition in effect at collected time, regions are sorted by starts"""
+    i = bisect.bisect_right([r.starts for r in regions], collected)
+    return regions[i - 1] if i > 0 else None
+
+
+def get_instance_control_status(statuses: Iterable[str], success: bool) -> str:
+    """return controlStatus of ak_instance from statuses of its metrics"""
+    if not success:
+        return failed
+    statuses = set(statuses)
+    for status in (under_performing, over_performing, in_control, control_region_time_interval):
+        if status in statuses:
+            return status
+    return undefined
+
+
+class SeriesState:
+    """
+    Control state of single series. Statistics of control region are accumulated till region
+    is completed, after that control band is fixed.
+    """
+    def __init__(self, criteria: float, larger: bool, window: int):
+        self.criteria = criteria
+        self.larger = larger
+        self.region = None
+        self.stats = RunningStats()
+        self.completed = False
+        # (controlStart, controlEnd, controlMin, controlMax) of completed region loaded from db
+        self.limits = None
+        self.rolling = RollingMedian(window)
+        # (collected, ControlValues) of last pushed point
+        self.last = None
+        # control region is changed since last get_region_row
+        self.changed = False
+
+    def set_region(self, region: ControlRegionDef) -> None:
+        if self.region is not None and self.region.control_region_def_id == region.control_region_def_id:
+            return
+        self.region = region
+        self.stats = RunningStats()
+        self.completed = False
+        self.limits = None
+
+    def in_region(self, collected: datetime.datetime) -> bool:
+        if self.completed:
+            return False
+        if self.region.control_region_type == "data_points":
+            return self.stats.n < self.region.points
+        return self.region.ends is None or collected < self.region.ends
+
+    def push_to_region(self, value: float) -> None:
+        """add value to control region statistics"""
+        self.stats.push(value)
+        if self.region.control_region_type == "data_points" and self.stats.n >= self.region.points:
+            self.completed = True
+        self.changed = True
+
+    def get_limits(self) -> Optional[Tuple[float, float, float, float]]:
+        if self.limits is not None:
+            return self.limits
+        if self.stats.n < 2:
+            return None
+        half_width = self.criteria * self.stats.std
+        return self.stats.mean - half_width, self.stats.mean + half_width, self.stats.min, self.stats.max
+
+    def get_control(self, value: float, limits) -> Optional[float]:
+        """deviation from the band center in band half-widths, positive is better performance"""
+        half_width = 0.5 * (limits[1] - limits[0])
+        if half_width <= 0.0:
+            return None
+        control = (value - 0.5 * (limits[0] + limits[1])) / half_width
+        return control if self.larger else -control
+
+    def get_status(self, value: float, limits) -> str:
+        if limits[0] <= value <= limits[1]:
+            return in_control
+        return over_performing if (value > limits[1]) == self.larger else under_performing
+
+    def push(self, collected: datetime.datetime, value: Optional[float],
+             region: Optional[ControlRegionDef]) -> ControlValues:
+        """push value collected in successful run, None value is for failed run"""
+        if self.last is not None and self.last[0] == collected:
+            return self.last[1]
+
+        if value is None:
+            result = no_control._replace(controlStatus=failed)
+        elif region is None:
+            self.rolling.push(value)
+            result = no_control._replace(running_average=self.rolling.median)
+        else:
+            self.set_region(region)
+            if self.in_region(collected):
+                self.push_to_region(value)
+                status = control_region_time_interval
+            else:
+                if not self.completed:
+                    self.completed = True
+                    self.changed = True
+                status = None
+            self.rolling.push(value)
+            limits = self.get_limits()
+            if limits is None:
+                result = no_control._replace(running_average=self.rolling.median,
+                                             controlStatus=status or undefined)
+            else:
+                result = ControlValues(self.rolling.median, self.get_control(value, limits), *limits,
+                                       status or self.get_status(value, limits))
+        self.last = (collected, result)
+        return result
+
+    def get_region_row(self, ak_id: int, metric_id: int) -> Optional[tuple]:
+        """return control_regions row if region is changed"""
+        if not self.changed or self.region is None:
+            return None
+        self.changed = False
+        return (self.region.control_region_def_id, ak_id, metric_id, 1 if self.completed else 0) + tuple(
+            self.get_limits() or (None, None, None, None))
+
+
+class ControlEngine:
+    """
+    Control regions calculation for results in mod_appkernel. Series states are primed from stored
+    data of control region on first push, later results update them incrementally.
+    """
+    def __init__(self, con, cur, dry_run: bool = False, default_points: Optional[int] = None,
+                 criteria: Optional[float] = None, window: Optional[int] = None):
+        if default_points is None or criteria is None or window is None:
+            from akrr import cfg
+            default_points = cfg.control_region_default_points if default_points is None else default_points
+            criteria = cfg.control_criteria if criteria is None else criteria
+            window = cfg.control_running_window if window is None else window
+        self.con = con
+        self.cur = cur
+        self.dry_run = dry_run
+        self.default_points = default_points
+        self.default_criteria = criteria
+        self.window = window
+        # (resource_id, ak_def_id) -> control regions definitions sorted by starts
+        self.regions = {}
+        # ak_def_id -> control criteria
+        self.criteria = {}
+        # metric_id -> larger is better
+        self.larger = {}
+        # (resource_id, ak_id, metric_id) -> SeriesState
+        self.series = {}
+        # (control_region_def_id, ak_id, metric_id) -> control_regions row
+        self.region_rows = {}
+        # (resource_id, ak_def_id) which should be recalculated
+        self.dirty = set()
+        # stored results of last out of order instance
+        self.stored = {}
+        self.load()
+
+    def load(self) -> None:
+        cur = self.cur
+        cur.execute("SELECT control_region_def_id,resource_id,ak_def_id,control_region_type,control_region_starts,"
+                    "control_region_ends,control_region_points FROM control_region_def "
+                    "ORDER BY control_region_starts")
+        self.regions = {}
+        for def_id, resource_id, ak_def_id, region_type, starts, ends, points in cur.fetchall():
+            self.regions.setdefault((resource_id, ak_def_id), []).append(ControlRegionDef(
+                def_id, region_type, starts, ends, points or self.default_points))
+        cur.execute("SELECT ak_def_id,control_criteria FROM app_kernel_def")
+        self.criteria = {ak_def_id: criteria for ak_def_id, criteria in cur.fetchall() if criteria is not None}
+        cur.execute("SELECT metric_id,larger FROM metric_attribute")
+        self.larger = {metric_id: bool(larger) for metric_id, larger in cur.fetchall()}
+
+    def reset(self) -> None:
+        """drop series states, they will be primed again from stored data"""
+        self.series = {}
+        self.region_rows = {}
+        self.stored = {}
+
+    def is_larger_better(self, metric_id: int, unit: Optional[str]) -> bool:
+        if metric_id in self.larger:
+            return self.larger[metric_id]
+        return unit is None or unit.strip().lower() not in _smaller_is_better_units
+
+    def get_regions(self, resource_id: int, ak_def_id: int, collected: datetime.datetime) -> List[ControlRegionDef]:
+        """return control regions definitions, default one is added if there is none"""
+        key = (resource_id, ak_def_id)
+        if key in self.regions:
+            return self.regions[key]
+        self.cur.execute("SELECT MIN(collected) FROM ak_instance WHERE resource_id=%s AND ak_def_id=%s", key)
+        row = self.cur.fetchone()
+        starts = min(row[0], collected) if row is not None and row[0] is not None else collected
+        if self.dry_run:
+            def_id = -1 - len(self.regions)
+        else:
+            self.cur.execute(
+                "INSERT IGNORE INTO control_region_def (resource_id,ak_def_id,control_region_type,"
+                "control_region_starts,control_region_points,comment) VALUES (%s,%s,'data_points',%s,%s,%s)",
+                (resource_id, ak_def_id, starts, self.default_points, "default control region"))
+            self.cur.execute(
+                "SELECT control_region_def_id FROM control_region_def "
+                "WHERE resource_id=%s AND ak_def_id=%s AND control_region_starts=%s", (resource_id, ak_def_id, starts))
+            def_id = self.cur.fetchone()[0]
+            self.con.commit()
+        self.regions[key] = [ControlRegionDef(def_id, "data_points", starts, None, self.default_points)]
+        return self.regions[key]
+
+    def _new_state(self, ak_def_id: int, metric_id: int, unit: Optional[str]) -> SeriesState:
+        return SeriesState(self.criteria.get(ak_def_id, self.default_criteria),
+                           self.is_larger_better(metric_id, unit), self.window)
+
+    def _get_values(self, series_key, time_from, time_to, order="ASC", limit=None) -> List[float]:
+        """return values of successful runs of series collected within [time_from, time_to)"""
+        resource_id, ak_id, metric_id = series_key
+        cond = ""
+        args = [metric_id, ak_id, resource_id, time_to]
+        if time_from is not None:
+            cond = " AND md.collected>=%s"
+            args.append(time_from)
+        self.cur.execute(
+            "SELECT md.value_string FROM metric_data md JOIN ak_instance ai ON ai.ak_id=md.ak_id AND "
+            "ai.collected=md.collected AND ai.resource_id=md.resource_id "
+            "WHERE md.metric_id=%s AND md.ak_id=%s AND md.resource_id=%s AND ai.status='success' AND "
+            "md.collected<%s" + cond + " ORDER BY md.collected " + order +
+            (" LIMIT %d" % limit if limit is not None else ""), args)
+        values = [to_float(row[0]) for row in self.cur.fetchall()]
+        return [v for v in values if v is not None]
+
+    def _prime(self, series_key, ak_def_id, unit, region, collected) -> SeriesState:
+        """create series state from stored data collected before collected time"""
+        resource_id, ak_id, metric_id = series_key
+        state = self._new_state(ak_def_id, metric_id, unit)
+
+        self.cur.execute("SELECT MAX(collected) FROM metric_data WHERE metric_id=%s AND ak_id=%s AND resource_id=%s",
+                         (metric_id, ak_id, resource_id))
+        row = self.cur.fetchone()
+        if row is not None and row[0] is not None and row[0] > collected:
+            # newer results are already stored, next pushes will mark series for recalculation
+            state.last = (row[0], None)
+
+        if region is not None:
+            state.set_region(region)
+            self.cur.execute(
+                "SELECT completed,controlStart,controlEnd,controlMin,controlMax FROM control_regions "
+                "WHERE control_region_def_id=%s AND ak_id=%s AND metric_id=%s",
+                (region.control_region_def_id, ak_id, metric_id))
+            row = self.cur.fetchone()
+            if row is not None and row[0] and None not in row[1:]:
+                state.completed = True
+                state.limits = tuple(row[1:])
+            else:
+                time_to = collected if region.ends is None else min(collected, region.ends)
+                limit = region.points if region.control_region_type == "data_points" else None
+                for value in self._get_values(series_key, region.starts, time_to, limit=limit):
+                    state.push_to_region(value)
+                state.changed = False
+
+        for value in reversed(self._get_values(series_key, None, collected, order="DESC", limit=self.window)):
+            state.rolling.push(value)
+        return state
+
+    def push(self, resource_id: int, ak_def_id: int, ak_id: int, metric_id: int, unit: Optional[str],
+             collected: datetime.datetime, value_string: str, success: bool) -> Optional[ControlValues]:
+        """
+        return control values for new result, None if result is out of order and its
+        resource and app kernel are marked for recalculation
+        """
+        value = to_float(value_string) if success else None
+        if success and value is None:
+            return no_control
+        region = get_region(self.get_regions(resource_id, ak_def_id, collected), collected)
+        series_key = (resource_id, ak_id, metric_id)
+        state = self.series.get(series_key)
+        if state is None:
+            state = self._prime(series_key, ak_def_id, unit, region, collected)
+            self.series[series_key] = state
+        if state.last is not None and collected < state.last[0]:
+            if value is None:
+                return no_control._replace(controlStatus=failed)
+            # result which is already stored with same value (i.e. ingested again) keeps its control values
+            stored = self._get_stored(resource_id, ak_id, collected).get(metric_id)
+            if stored is not None and stored[0] == value_string:
+                return stored[1]
+            self.dirty.add((resource_id, ak_def_id))
+            return None
+        result = state.push(collected, value, region)
+        row = state.get_region_row(ak_id, metric_id)
+        if row is not None:
+            self.region_rows[row[:3]] = row
+        return result
+
+    def _get_stored(self, resource_id: int, ak_id: int, collected: datetime.datetime) -> dict:
+        """return metric_id -> (value_string, ControlValues) of stored results of ak_instance"""
+        key = (resource_id, ak_id, collected)
+        if key not in self.stored:
+            self.cur.execute(
+                "SELECT metric_id,value_string," + _control_columns + " FROM metric_data "
+                "WHERE ak_id=%s AND collected=%s AND resource_id=%s", (ak_id, collected, resource_id))
+            # results of single instance are pushed together, so only the last one is kept
+            self.stored = {key: {row[0]: (row[1], ControlValues(*row[2:])) for row in self.cur.fetchall()}}
+        return self.stored[key]
+
+    def pop_region_rows(self) -> List[tuple]:
+        """return changed control_regions rows"""
+        rows = list(self.region_rows.values())
+        self.region_rows = {}
+        return rows
+
+    def recalculate(self, resource_id: int, ak_def_id: int) -> int:
+        """recalculate control values of all results of app kernel on resource, return number of values"""
+        from akrr.perf.ingestor import insert_rows
+        cur = self.cur
+        cur.execute(
+            "SELECT md.ak_id,md.metric_id,m.unit,md.collected,md.value_string,ai.status,ak.num_units "
+            "FROM metric_data md "
+            "JOIN ak_instance ai ON ai.ak_id=md.ak_id AND ai.collected=md.collected AND ai.resource_id=md.resource_id "
+            "JOIN app_kernel ak ON ak.ak_id=md.ak_id JOIN metric m ON m.metric_id=md.metric_id "
+            "WHERE ai.resource_id=%s AND ai.ak_def_id=%s ORDER BY md.collected,md.ak_id,md.metric_id",
+            (resource_id, ak_def_id))
+        rows = cur.fetchall()
+        self.dirty.discard((resource_id, ak_def_id))
+        if len(rows) == 0:
+            return 0
+        regions = self.get_regions(resource_id, ak_def_id, rows[0][3])
+
+        states = {}
+        metric_rows = []
+        a_data2_rows = []
+        instances = {}
+        for ak_id, metric_id, unit, collected, value, status, num_units in rows:
+            state = states.get((ak_id, metric_id))
+            if state is None:
+                state = states[(ak_id, metric_id)] = self._new_state(ak_def_id, metric_id, unit)
+            success = status == "success"
+            value = to_float(value) if success else None
+            if success and value is None:
+                v = no_control
+            else:
+                v = state.push(collected, value, get_region(regions, collected))
+            metric_rows.append((metric_id, ak_id, collected, resource_id) + tuple(v))
+            a_data2_rows.append(tuple(v) + (ak_def_id, resource_id, metric_id, num_units,
+                                            int(time.mktime(collected.timetuple()))))
+            instances.setdefault((ak_id, collected), (success, []))[1].append(v.controlStatus)
+
+        region_rows = [state.get_region_row(ak_id, metric_id) for (ak_id, metric_id), state in states.items()]
+        region_rows = [row for row in region_rows if row is not None]
+        instance_rows = [(get_instance_control_status(statuses, success), ak_id, collected, resource_id)
+                         for (ak_id, collected), (success, statuses) in instances.items()]
+        # drop incremental states, they will be primed from recalculated data
+        ak_ids = {ak_id for ak_id, _ in states}
+        for series_key in [k for k in self.series if k[0] == resource_id and k[1] in ak_ids]:
+            del self.series[series_key]
+
+        if self.dry_run:
+            log.dry_run("Would update control values of %d metrics values and %d control regions" % (
+                len(metric_rows), len(region_rows)))
+            return len(metric_rows)
+
+        insert_rows(cur, "INSERT INTO metric_data (metric_id,ak_id,collected,resource_id," + _control_columns + ")",
+                    metric_rows, on_duplicate=" ON DUPLICATE KEY UPDATE " + ",".join(
+                        "%s=VALUES(%s)" % (c, c) for c in _control_columns.split(",")))
+        cur.executemany(
+            "UPDATE a_data2 SET " + ",".join("%s=%%s" % c for c in _control_columns.split(",")) +
+            " WHERE ak_def_id=%s AND resource_id=%s AND metric_id=%s AND num_units=%s AND collected=%s",
+            a_data2_rows)
+        cur.executemany(
+            "UPDATE ak_instance SET controlStatus=%s WHERE ak_id=%s AND collected=%s AND resource_id=%s",
+            instance_rows)
+        cur.execute(
+            "DELETE FROM control_regions WHERE control_region_def_id IN (%s)" % ",".join(["%s"] * len(regions)),
+            [r.control_region_def_id for r in regions])
+        write_region_rows(cur, region_rows)
+        self.con.commit()
+        return len(metric_rows)
+
+    def recalculate_dirty(self) -> None:
+        for resource_id, ak_def_id in sorted(self.dirty):
+            log.info("Recalculating control regions of ak_def_id %s on resource_id %s", ak_def_id, resource_id)
+            self.recalculate(resource_id, ak_def_id)
+
+
+def write_region_rows(cur, rows: List[tuple]) -> None:
+    """insert or update control_regions rows"""
+    from akrr.perf.ingestor import insert_rows
+    insert_rows(cur, "INSERT INTO control_regions (control_region_def_id,ak_id,metric_id,completed,"
+                     "controlStart,controlEnd,controlMin,controlMax)", rows,
+                on_duplicate=" ON DUPLICATE KEY UPDATE completed=VALUES(completed),"
+                             "controlStart=VALUES(controlStart),controlEnd=VALUES(controlEnd),"
+                             "controlMin=VALUES(controlMin),controlMax=VALUES(controlMax)")
+
+
+def _get_ids(ak_cur, resource: Optional[str], appkernel: Optional[str]) -> List[Tuple[int, int]]:
+    """return (resource_id, ak_def_id) of results for resource and app kernel (SQL LIKE patterns)"""
+    ak_cur.execute(
+        "SELECT DISTINCT ai.resource_id,ai.ak_def_id FROM ak_instance ai "
+        "JOIN resource r ON r.resource_id=ai.resource_id JOIN app_kernel_def d ON d.ak_def_id=ai.ak_def_id "
+        "WHERE r.nickname LIKE %s AND d.ak_base_name LIKE %s", (resource or "%", appkernel or "%"))
+    return list(ak_cur.fetchall())
+
+
+def recalculate(resource: Optional[str] = None, appkernel: Optional[str] = None, dry_run: bool = False) -> None:
+    """recalculate control regions and control values for resource and app kernel (SQL LIKE patterns)"""
+    import akrr.db
+    ak_con, ak_cur = akrr.db.get_ak_db()
+    engine = ControlEngine(ak_con, ak_cur, dry_run=dry_run)
+    n = 0
+    for resource_id, ak_def_id in _get_ids(ak_cur, resource, appkernel):
+        n += engine.recalculate(resource_id, ak_def_id)
+    log.info("Recalculated control values of %d metrics values", n)
+
+
+def add_control_region(resource: str, appkernel: str, starts: datetime.datetime,
+                       ends: Optional[datetime.datetime] = None, points: Optional[int] = None,
+                       comment: Optional[str] = None, dry_run: bool = False) -> None:
+    """
+    add control region definition for resource and app kernel and recalculate their control values,
+    region is date range if ends is set otherwise it is number of data points
+    """
+    import akrr.db
+    from akrr.akrrerror import AkrrError
+    ak_con, ak_cur = akrr.db.get_ak_db()
+    ak_cur.execute("SELECT resource_id FROM resource WHERE nickname=%s", (resource,))
+    row = ak_cur.fetchone()
+    if row is None:
+        raise AkrrError("Resource %s is not in mod_appkernel" % resource)
+    resource_id = row[0]
+    ak_cur.execute("SELECT ak_def_id FROM app_kernel_def WHERE ak_base_name=%s", (appkernel,))
+    row = ak_cur.fetchone()
+    if row is None:
+        raise AkrrError("App kernel %s is not in mod_appkernel" % appkernel)
+    ak_def_id = row[0]
+    if ends is not None and ends <= starts:
+        raise AkrrError("End of control region should be after its start")
+
+    region_type = "date_range" if ends is not None else "data_points"
+    if dry_run:
+        log.dry_run("Would add %s control region for %s on %s starting at %s" % (
+            region_type, appkernel, resource, starts))
+        return
+    ak_cur.execute(
+        "INSERT INTO control_region_def (resource_id,ak_def_id,control_region_type,control_region_starts,"
+        "control_region_ends,control_region_points,comment) VALUES (%s,%s,%s,%s,%s,%s,%s) "
+        "ON DUPLICATE KEY UPDATE control_region_type=VALUES(control_region_type),"
+        "control_region_ends=VALUES(control_region_ends),control_region_points=VALUES(control_region_points),"
+        "comment=VALUES(comment)",
+        (resource_id, ak_def_id, region_type, starts, ends, points, comment))
+    ak_con.commit()
+    engine = ControlEngine(ak_con, ak_cur)
+    n = engine.recalculate(resource_id, ak_def_id)
+    log.info("Added control region, recalculated control values of %d metrics values", n)
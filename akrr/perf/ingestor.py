@@ -1,5 +1,534 @@
-def ingest_single_task(task_id):
+"""
+Ingestion of app kernels results from mod_akrr.akrr_xdmod_instanceinfo to mod_appkernel
+(ak_instance, metric_data, parameter_data and a_data2).
+
+metric, parameter, resource and app kernel ids are resolved through in-memory cache, rows are
+written with multi-row INSERTs. Incremental runs process instances committed since the watermark
+stored in ingester_log, backfill processes historical data in parallel by time intervals.
+Control values of results are calculated on ingestion by akrr.perf.control.
+"""
+import time
+import hashlib
+import datetime
+import multiprocessing
+from collections import OrderedDict
+import xml.etree.ElementTree as ElementTree
+from typing import List, Tuple, Optional, Dict, Sequence
+
+from akrr.util import log
+from akrr.perf import control as ak_control
+
+# ingester_log source of incremental runs and backfills
+ingestor_source = "akrr_ingestor"
+backfill_source = "akrr_ingestor_backfill"
+
+# number of rows in single multi-row INSERT
+insert_rows_per_statement = 1000
+
+_instance_columns = ("instance_id,collected,committed,resource,reporter,reporternickname,status,body,"
+                     "job_id,internal_failure,ncores,nnodes")
+
+
+def parse_body(body: Optional[str]) -> Tuple[List[Tuple[str, str, Optional[str]]], List[Tuple[str, str, Optional[str]]]]:
+    """
+    return parameters and statistics from performance XML stored in body as lists of (name, value, units),
+    details section is not ingested
+    """
+    if body is None or body.strip() == "":
+        return [], []
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        return [], []
+    performance = root if root.tag == "performance" else root.find(".//performance")
+    if performance is None:
+        return [], []
+    benchmark = performance.find("benchmark")
+    if benchmark is None:
+        return [], []
+
+    results = []
+    for path in ("parameters/parameter", "statistics/statistic"):
+        values = []
+        for e in benchmark.findall(path):
+            name = e.findtext("ID")
+            if name is None:
+                continue
+            units = e.findtext("units")
+            values.append((name.strip(), (e.findtext("value") or "").strip(), units.strip() if units else None))
+        results.append(values)
+    return results[0], results[1]
+
+
+def get_guid(*values: Optional[str]) -> str:
+    """return guid for metric or parameter"""
+    return hashlib.md5("".join(v or "" for v in values).encode("utf-8")).hexdigest()
+
+
+def get_env_version(parameters: Sequence[Tuple[str, str, Optional[str]]]) -> Optional[str]:
+    """environment version is md5 of executable signature"""
+    for name, value, _ in parameters:
+        if name == "App:ExeBinSignature":
+            return hashlib.md5(value.encode("utf-8")).hexdigest()
+    return None
+
+
+def get_num_units(reporternickname: str, processor_unit: Optional[str],
+                  nnodes: Optional[int], ncores: Optional[int]) -> int:
+    """return number of processing units from app kernel nickname (e.g. namd.2) or instance info"""
+    suffix = reporternickname.rsplit(".", 1)[-1]
+    if suffix.isdigit():
+        return int(suffix)
+    if processor_unit == "core" and ncores:
+        return int(ncores)
+    return int(nnodes) if nnodes else 1
+
+
+def get_status(status: Optional[int], internal_failure: Optional[int]) -> str:
+    """return ak_instance status"""
+    if status == 1:
+        return "success"
+    if internal_failure:
+        return "error"
+    return "failure"
+
+
+def insert_rows(cur, query: str, rows: List[Sequence], on_duplicate: str = "",
+                rows_per_statement: int = insert_rows_per_statement) -> None:
+    """execute multi-row INSERT query (without VALUES part) for rows"""
+    if len(rows) == 0:
+        return
+    values = "(" + ",".join(["%s"] * len(rows[0])) + ")"
+    for i in range(0, len(rows), rows_per_statement):
+        chunk = rows[i:i + rows_per_statement]
+        cur.execute(query + " VALUES " + ",".join([values] * len(chunk)) + on_duplicate,
+                    [v for row in chunk for v in row])
+
+
+class AkDbCache:
+    """
+    In-memory cache of mod_appkernel ids, new metrics, parameters and app kernels are added on demand
+    and committed right away. INSERT IGNORE with following lookup keeps it safe for concurrent ingestors.
+    On dry run new ids are not added to db, temporary negative ids are used instead.
+    """
+    def __init__(self, con, cur, dry_run: bool = False):
+        self.con = con
+        self.cur = cur
+        self.dry_run = dry_run
+        self.metrics = {}
+        self.parameters = {}
+        self.resources = {}
+        self.ak_defs = {}
+        self.app_kernels = {}
+        self.ak_has_metric = set()
+        self.ak_has_parameter = set()
+        self.load()
+
+    def load(self):
+        cur = self.cur
+        cur.execute("SELECT metric_id,name,unit FROM metric")
+        self.metrics = {(name, unit): metric_id for metric_id, name, unit in cur.fetchall()}
+        cur.execute("SELECT parameter_id,name,unit FROM parameter")
+        self.parameters = {(name, unit): parameter_id for parameter_id, name, unit in cur.fetchall()}
+        cur.execute("SELECT resource_id,resource,nickname FROM resource")
+        self.resources = {nickname: (resource_id, resource) for resource_id, resource, nickname in cur.fetchall()}
+        cur.execute("SELECT ak_def_id,name,ak_base_name,processor_unit FROM app_kernel_def")
+        self.ak_defs = {base_name: (ak_def_id, name, processor_unit)
+                        for ak_def_id, name, base_name, processor_unit in cur.fetchall()}
+        cur.execute("SELECT ak_id,ak_def_id,num_units FROM app_kernel")
+        self.app_kernels = {(ak_def_id, num_units): ak_id for ak_id, ak_def_id, num_units in cur.fetchall()}
+        cur.execute("SELECT ak_id,metric_id,num_units FROM ak_has_metric")
+        self.ak_has_metric = set(cur.fetchall())
+        cur.execute("SELECT ak_id,parameter_id FROM ak_has_parameter")
+        self.ak_has_parameter = set(cur.fetchall())
+
+    def _add(self, ids, key, insert, insert_args, select, select_args):
+        if self.dry_run:
+            ids[key] = -1 - len(ids)
+            return
+        self.cur.execute(insert, insert_args)
+        self.cur.execute(select, select_args)
+        ids[key] = self.cur.fetchone()[0]
+        self.con.commit()
+
+    def get_metric_id(self, name: str, unit: Optional[str]) -> int:
+        key = (name, unit)
+        if key not in self.metrics:
+            guid = get_guid(name, unit)
+            self._add(self.metrics, key,
+                      "INSERT IGNORE INTO metric (short_name,name,unit,guid) VALUES (%s,%s,%s,%s)",
+                      (name[:32], name, unit, guid),
+                      "SELECT metric_id FROM metric WHERE guid=%s", (guid,))
+        return self.metrics[key]
+
+    def get_parameter_id(self, name: str, unit: Optional[str]) -> int:
+        key = (name, unit)
+        if key not in self.parameters:
+            guid = get_guid(name, unit)
+            self._add(self.parameters, key,
+                      "INSERT IGNORE INTO parameter (tag,name,unit,guid) VALUES (%s,%s,%s,%s)",
+                      (name.split(":", 1)[0] if ":" in name else None, name, unit, guid),
+                      "SELECT parameter_id FROM parameter WHERE guid=%s", (guid,))
+        return self.parameters[key]
+
+    def get_ak_id(self, ak_def_id: int, num_units: int, name: str) -> int:
+        key = (ak_def_id, num_units)
+        if key not in self.app_kernels:
+            self._add(self.app_kernels, key,
+                      "INSERT IGNORE INTO app_kernel (num_units,ak_def_id,name) VALUES (%s,%s,%s)",
+                      (num_units, ak_def_id, name),
+                      "SELECT ak_id FROM app_kernel WHERE ak_def_id=%s AND num_units=%s", key)
+        return self.app_kernels[key]
+
+
+class Ingestor:
+    """
+    Ingest instances from akrr_xdmod_instanceinfo into mod_appkernel
+    """
+    def __init__(self, akrr_cur, ak_con, ak_cur, batch_size: int = 500, dry_run: bool = False,
+                 control: Optional[ak_control.ControlEngine] = None, akrr_con=None):
+        self.akrr_con = akrr_con
+        self.akrr_cur = akrr_cur
+        self.ak_con = ak_con
+        self.ak_cur = ak_cur
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.cache = AkDbCache(ak_con, ak_cur, dry_run=dry_run)
+        # control values are not calculated without control engine
+        self.control = control
+        self.ingested = 0
+        self.skipped = 0
+        # resources and app kernels which are not in mod_appkernel
+        self.unknown = set()
+        # (resource_id, ak_def_id) of ingested instances
+        self.ingested_ids = set()
+
+    def _get_instance_rows(self, instances):
+        """
+        convert instances to rows of mod_appkernel tables, if several instances map to same ak_instance
+        the last one is used
+        """
+        cache = self.cache
+        instance_rows = OrderedDict()
+        # control values are calculated in order of collection
+        for (instance_id, collected, _, resource, reporter, reporternickname, status, body, job_id,
+             internal_failure, ncores, nnodes) in sorted(instances, key=lambda instance: instance[1]):
+            if resource not in cache.resources or reporter not in cache.ak_defs:
+                self.unknown.add((resource, reporter))
+                self.skipped += 1
+                continue
+            resource_id, resource_name = cache.resources[resource]
+            ak_def_id, ak_name, processor_unit = cache.ak_defs[reporter]
+            num_units = get_num_units(reporternickname, processor_unit, nnodes, ncores)
+            ak_id = cache.get_ak_id(ak_def_id, num_units, reporter)
+
+            parameters, statistics = parse_body(body)
+            env_version = get_env_version(parameters)
+            ak_status = get_status(status, internal_failure)
+            collected_ts = int(time.mktime(collected.timetuple()))
+
+            # metrics and parameters by id, repeated names are set by last value
+            metrics = OrderedDict()
+            for name, value, unit in statistics:
+                metrics[cache.get_metric_id(name, unit)] = (name, value[:255], unit)
+            parameters_values = OrderedDict()
+            for name, value, unit in parameters:
+                parameters_values[cache.get_parameter_id(name, unit)] = value
+
+            # results out of order get control values on recalculation after the batch
+            controls = OrderedDict()
+            for metric_id, (_, value, unit) in metrics.items():
+                values = None
+                if self.control is not None:
+                    values = self.control.push(resource_id, ak_def_id, ak_id, metric_id, unit, collected, value,
+                                               ak_status == "success")
+                controls[metric_id] = values or ak_control.no_control
+            control_status = ak_control.get_instance_control_status(
+                [v.controlStatus for v in controls.values()], ak_status == "success")
+
+            rows = {
+                "a_data2_key": (ak_def_id, resource_id, num_units, collected_ts),
+                "ak_instance": [(ak_id, collected, resource_id, instance_id, job_id, ak_status, ak_def_id,
+                                 env_version, control_status)],
+                "metric_data": [(metric_id, ak_id, collected, resource_id, value) + tuple(controls[metric_id])
+                                for metric_id, (_, value, _) in metrics.items()],
+                "a_data2": [(ak_name, resource_name, name, num_units, processor_unit, collected_ts, env_version,
+                             unit, value, ak_def_id, resource_id, metric_id, ak_status) + tuple(controls[metric_id])
+                            for metric_id, (name, value, unit) in metrics.items()],
+                "parameter_data": [(ak_id, collected, resource_id, parameter_id, value,
+                                    hashlib.md5(value.encode("utf-8")).hexdigest())
+                                   for parameter_id, value in parameters_values.items()],
+                "ak_has_metric": [(ak_id, metric_id, num_units) for metric_id in metrics],
+                "ak_has_parameter": [(ak_id, parameter_id) for parameter_id in parameters_values],
+            }
+            instance_key = (ak_id, collected, resource_id)
+            if instance_key in instance_rows:
+                self.skipped += 1
+                del instance_rows[instance_key]
+            instance_rows[instance_key] = rows
+            self.ingested_ids.add((resource_id, ak_def_id))
+        self.ingested += len(instance_rows)
+
+        batch_rows = {"instance_keys": list(instance_rows.keys()),
+                      "a_data2_keys": [rows["a_data2_key"] for rows in instance_rows.values()]}
+        for table in ("ak_instance", "metric_data", "a_data2", "parameter_data"):
+            batch_rows[table] = [row for rows in instance_rows.values() for row in rows[table]]
+        # associations which are not yet in db
+        batch_rows["control_regions"] = self.control.pop_region_rows() if self.control is not None else []
+        for table, known in (("ak_has_metric", cache.ak_has_metric), ("ak_has_parameter", cache.ak_has_parameter)):
+            batch_rows[table] = []
+            for rows in instance_rows.values():
+                for row in rows[table]:
+                    if row not in known:
+                        known.add(row)
+                        batch_rows[table].append(row)
+        return batch_rows
+
+    def _write_rows(self, rows):
+        """write rows of batch, previously ingested data of same instances is replaced"""
+        cur = self.ak_cur
+        if len(rows["instance_keys"]) == 0:
+            return
+        instance_keys = ",".join(["(%s,%s,%s)"] * len(rows["instance_keys"]))
+        instance_keys_values = [v for key in rows["instance_keys"] for v in key]
+        for table in ("metric_data", "parameter_data"):
+            cur.execute("DELETE FROM %s WHERE (ak_id,collected,resource_id) IN (%s)" % (table, instance_keys),
+                        instance_keys_values)
+        cur.execute("DELETE FROM a_data2 WHERE (ak_def_id,resource_id,num_units,collected) IN (%s)" %
+                    ",".join(["(%s,%s,%s,%s)"] * len(rows["a_data2_keys"])),
+                    [v for key in rows["a_data2_keys"] for v in key])
+
+        insert_rows(cur, "INSERT INTO ak_instance (ak_id,collected,resource_id,instance_id,job_id,status,ak_def_id,"
+                         "env_version,controlStatus)", rows["ak_instance"],
+                    on_duplicate=" ON DUPLICATE KEY UPDATE instance_id=VALUES(instance_id),job_id=VALUES(job_id),"
+                                 "status=VALUES(status),env_version=VALUES(env_version),"
+                                 "controlStatus=VALUES(controlStatus)")
+        insert_rows(cur, "INSERT IGNORE INTO ak_has_metric (ak_id,metric_id,num_units)", rows["ak_has_metric"])
+        insert_rows(cur, "INSERT IGNORE INTO ak_has_parameter (ak_id,parameter_id)", rows["ak_has_parameter"])
+        insert_rows(cur, "INSERT INTO metric_data (metric_id,ak_id,collected,resource_id,value_string," +
+                    ak_control._control_columns + ")", rows["metric_data"])
+        insert_rows(cur, "INSERT INTO parameter_data (ak_id,collected,resource_id,parameter_id,value_string,"
+                         "value_md5)", rows["parameter_data"])
+        insert_rows(cur, "INSERT INTO a_data2 (ak_name,resource,metric,num_units,processor_unit,collected,"
+                         "env_version,unit,metric_value,ak_def_id,resource_id,metric_id,status," +
+                    ak_control._control_columns + ")", rows["a_data2"])
+        ak_control.write_region_rows(cur, rows["control_regions"])
+
+    def ingest_instances(self, instances) -> None:
+        """ingest instances (rows of akrr_xdmod_instanceinfo with _instance_columns) in one transaction"""
+        rows = self._get_instance_rows(instances)
+        if self.dry_run:
+            log.dry_run("Would ingest %d instances, %d metrics values and %d parameters values" % (
+                len(rows["ak_instance"]), len(rows["metric_data"]), len(rows["parameter_data"])))
+            self.ak_con.rollback()
+            return
+        try:
+            self._write_rows(rows)
+            self.ak_con.commit()
+        except Exception:
+            self.ak_con.rollback()
+            # new ids might be rolled back
+            self.cache.load()
+            if self.control is not None:
+                self.control.reset()
+            raise
+        if self.control is not None and len(self.control.dirty) > 0:
+            self.control.recalculate_dirty()
+
+    def ingest_range(self, committed_from: Optional[datetime.datetime] = None,
+                     committed_to: Optional[datetime.datetime] = None) -> Optional[datetime.datetime]:
+        """
+        ingest instances committed within [committed_from, committed_to) in batches,
+        return last committed time
+        """
+        last_committed = None
+        last_instance_id = -1
+        while True:
+            cond = ["(committed>%s OR (committed=%s AND instance_id>%s))"]
+            args = [last_committed, last_committed, last_instance_id]
+            if last_committed is None:
+                cond = ["committed>=%s"] if committed_from is not None else []
+                args = [committed_from] if committed_from is not None else []
+            if committed_to is not None:
+                cond.append("committed<%s")
+                args.append(committed_to)
+            self.akrr_cur.execute(
+                "SELECT " + _instance_columns + " FROM akrr_xdmod_instanceinfo" +
+                (" WHERE " + " AND ".join(cond) if cond else "") +
+                " ORDER BY committed,instance_id LIMIT %d" % self.batch_size, args)
+            instances = self.akrr_cur.fetchall()
+            if len(instances) == 0:
+                break
+            self.ingest_instances(instances)
+            last_committed, last_instance_id = instances[-1][2], instances[-1][0]
+            log.debug("Ingested instances up to %s", last_committed)
+        return last_committed
+
+    def ingest_task(self, task_id: int) -> None:
+        """ingest single task"""
+        self.akrr_cur.execute(
+            "SELECT " + _instance_columns + " FROM akrr_xdmod_instanceinfo WHERE instance_id=%s", (task_id,))
+        instances = self.akrr_cur.fetchall()
+        if len(instances) == 0:
+            from akrr.akrrerror import AkrrError
+            raise AkrrError("Task %d is not in akrr_xdmod_instanceinfo" % task_id)
+        self.ingest_instances(instances)
+
+    def close(self) -> None:
+        """return connections to the pool"""
+        for con in (self.akrr_con, self.ak_con):
+            if con is not None:
+                con.close()
+        self.akrr_con = self.ak_con = None
+
+    def get_summary(self) -> str:
+        msg = "Ingested %d instances, skipped %d" % (self.ingested, self.skipped)
+        if len(self.unknown) > 0:
+            msg += ", resource or app kernel is not in mod_appkernel for: " + ", ".join(
+                "%s/%s" % v for v in sorted(self.unknown))
+        return msg
+
+
+def get_watermark(ak_cur, source: str = ingestor_source) -> Optional[datetime.datetime]:
+    """return last committed time of successful incremental ingestion"""
+    ak_cur.execute("SELECT MAX(last_update) FROM ingester_log WHERE source=%s AND success=1", (source,))
+    row = ak_cur.fetchone()
+    return row[0] if row is not None else None
+
+
+def log_ingestion(ak_con, ak_cur, source, num, last_update, start_time, end_time, success, message) -> None:
+    """record ingestion run to ingester_log"""
+    ak_cur.execute(
+        "INSERT INTO ingester_log (source,url,num,last_update,start_time,end_time,success,message) "
+        "VALUES (%s,NULL,%s,%s,%s,%s,%s,%s)",
+        (source, num, last_update, start_time, end_time, success, message[:2048]))
+    ak_con.commit()
+
+
+def _get_ingestor(batch_size: int, dry_run: bool, control: bool = True) -> Ingestor:
+    """return ingestor, it should be closed after use"""
+    import akrr.db
+    akrr_con, akrr_cur = akrr.db.get_akrr_db()
+    ak_con, ak_cur = akrr.db.get_ak_db()
+    return Ingestor(akrr_cur, ak_con, ak_cur, batch_size=batch_size, dry_run=dry_run,
+                    control=ak_control.ControlEngine(ak_con, ak_cur, dry_run=dry_run) if control else None,
+                    akrr_con=akrr_con)
+
+
+def ingest_single_task(task_id: int, dry_run: bool = False) -> None:
     """
     Ingest single task
     """
-    print(task_id,type(task_id))
\ No newline at end of file
+    ingestor = _get_ingestor(1, dry_run)
+    try:
+        ingestor.ingest_task(task_id)
+        log.info(ingestor.get_summary())
+    finally:
+        ingestor.close()
+
+
+def ingest_new(batch_size: int = 500, dry_run: bool = False, lag: Optional[datetime.timedelta] = None) -> None:
+    """
+    ingest instances committed since last watermark in ingester_log. Instances committed within lag
+    before watermark are ingested again, as transaction which set their committed time might be finished
+    after previous run. Re-ingestion of unchanged instances does not change ingested data.
+    """
+    if lag is None:
+        from akrr import cfg
+        lag = cfg.ingestor_watermark_lag
+    ingestor = _get_ingestor(batch_size, dry_run)
+    try:
+        watermark = get_watermark(ingestor.ak_cur)
+        committed_from = watermark - lag if watermark is not None else None
+        log.info("Ingesting instances committed since %s", committed_from)
+        start_time = datetime.datetime.now()
+        try:
+            last_committed = ingestor.ingest_range(committed_from=committed_from)
+        except Exception as e:
+            if not dry_run:
+                log_ingestion(ingestor.ak_con, ingestor.ak_cur, ingestor_source, ingestor.ingested,
+                              watermark or start_time, start_time, datetime.datetime.now(), 0, str(e))
+            raise
+        summary = ingestor.get_summary()
+        log.info(summary)
+        if not dry_run and last_committed is not None:
+            log_ingestion(ingestor.ak_con, ingestor.ak_cur, ingestor_source, ingestor.ingested,
+                          max(last_committed, watermark or last_committed), start_time, datetime.datetime.now(), 1,
+                          summary)
+    finally:
+        ingestor.close()
+
+
+def _backfill_worker(args):
+    """
+    ingest single interval of backfill in worker process, control values are calculated
+    after all intervals are ingested
+    """
+    committed_from, committed_to, batch_size, dry_run = args
+    ingestor = _get_ingestor(batch_size, dry_run, control=False)
+    try:
+        ingestor.ingest_range(committed_from, committed_to)
+    finally:
+        ingestor.close()
+    return committed_from, ingestor.ingested, ingestor.skipped, ingestor.unknown, ingestor.ingested_ids
+
+
+def get_intervals(time_from: datetime.datetime, time_to: datetime.datetime,
+                  interval: datetime.timedelta) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """split [time_from, time_to) to intervals"""
+    intervals = []
+    while time_from < time_to:
+        intervals.append((time_from, min(time_from + interval, time_to)))
+        time_from += interval
+    return intervals
+
+
+def backfill(time_from: Optional[datetime.datetime] = None, time_to: Optional[datetime.datetime] = None,
+             processes: Optional[int] = None, interval_days: int = 7, batch_size: int = 500,
+             dry_run: bool = False) -> None:
+    """
+    ingest historical instances committed within [time_from, time_to) in parallel, each worker
+    process ingests its own time interval. Incremental ingestion watermark is not changed.
+    Control values of backfilled resources and app kernels are recalculated at the end.
+    """
+    import akrr.db
+    akrr_con, akrr_cur = akrr.db.get_akrr_db()
+    akrr_cur.execute("SELECT MIN(committed),MAX(committed) FROM akrr_xdmod_instanceinfo")
+    committed_min, committed_max = akrr_cur.fetchone()
+    akrr_con.close()
+    if committed_min is None:
+        log.info("Nothing to backfill")
+        return
+    time_from = time_from or committed_min
+    time_to = time_to or committed_max + datetime.timedelta(seconds=1)
+    intervals = get_intervals(time_from, time_to, datetime.timedelta(days=interval_days))
+    log.info("Backfilling instances committed from %s to %s, %d intervals", time_from, time_to, len(intervals))
+
+    start_time = datetime.datetime.now()
+    ingested = skipped = 0
+    unknown = set()
+    ingested_ids = set()
+    with multiprocessing.Pool(processes) as pool:
+        for committed_from, n_ingested, n_skipped, n_unknown, n_ingested_ids in pool.imap_unordered(
+                _backfill_worker, [(t0, t1, batch_size, dry_run) for t0, t1 in intervals]):
+            ingested += n_ingested
+            skipped += n_skipped
+            unknown |= n_unknown
+            ingested_ids |= n_ingested_ids
+            log.info("Interval from %s is done, ingested %d instances", committed_from, n_ingested)
+
+    ak_con, ak_cur = akrr.db.get_ak_db()
+    if not dry_run:
+        control = ak_control.ControlEngine(ak_con, ak_cur)
+        for resource_id, ak_def_id in sorted(ingested_ids):
+            control.recalculate(resource_id, ak_def_id)
+
+    summary = "Backfill: ingested %d instances, skipped %d" % (ingested, skipped)
+    if len(unknown) > 0:
+        summary += ", resource or app kernel is not in mod_appkernel for: " + ", ".join(
+            "%s/%s" % v for v in sorted(unknown))
+    log.info(summary)
+    if not dry_run:
+        log_ingestion(ak_con, ak_cur, backfill_source, ingested, time_to, start_time, datetime.datetime.now(),
+                      1, summary)
+    ak_con.close()
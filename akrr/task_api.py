@@ -17,6 +17,50 @@ def task_new(resource: str, appkernel: str, nodes: str, time_to_start=None, peri
     """
     Handles the appropriate execution of a 'New Task' mode request
     given the provided command line arguments.
+    All tasks (for all nodes counts and app kernels) are submitted in one request.
+    """
+    tasks = get_new_tasks_data(
+        resource, appkernel, nodes, time_to_start=time_to_start, periodicity=periodicity,
+        time_window_start=time_window_start, time_window_end=time_window_end, test_run=test_run,
+        dry_run=dry_run, gen_batch_job_only=gen_batch_job_only, app_param=app_param, task_param=task_param,
+        n_runs=n_runs, group_id=group_id)
+
+    if dry_run or gen_batch_job_only or len(tasks) == 0:
+        return
+
+    try:
+        from akrr import akrrrestclient
+        import json
+
+        result = akrrrestclient.post(
+            '/scheduled_tasks/bulk',
+            json={'tasks': tasks})
+
+        if result.status_code == 200:
+            data_out = json.loads(result.text)["data"]["data"]
+            for task_id in data_out["task_ids"]:
+                log.info('Successfully submitted new task. The task id is %s.' % task_id)
+        else:
+            log.error(
+                'something went wrong. %s:%s',
+                result.status_code,
+                result.text)
+
+    except Exception as e:
+        log.error('''
+        An error occured while communicating
+        with the REST API.
+        %s: %s
+        ''', e.args[0] if len(e.args) > 0 else '', e.args[1] if len(e.args) > 1 else '')
+        raise e
+
+
+def get_new_tasks_data(resource: str, appkernel: str, nodes: str, time_to_start=None, periodicity=None,
+                       time_window_start=None, time_window_end=None, test_run=False,
+                       dry_run:bool = False, gen_batch_job_only: bool = False, app_param=None, task_param=None,
+                       n_runs: int = 1, group_id: str = ""):
+    """
+    Return list of new tasks parameters for submission to REST API (POST to scheduled_tasks)
     """
     import pprint
     from akrr.util.time import calculate_random_start_time, get_formatted_time_to_start
@@ -39,13 +83,14 @@ def task_new(resource: str, appkernel: str, nodes: str, time_to_start=None, peri
                 continue
             appkernel_list.append(ak)
 
+        tasks = []
         for ak in appkernel_list:
-            task_new(
+            tasks += get_new_tasks_data(
                 resource, ak, nodes, time_to_start=time_to_start, periodicity=periodicity,
                 time_window_start=time_window_start, time_window_end=time_window_end, test_run=test_run,
                 dry_run=dry_run, gen_batch_job_only=gen_batch_job_only, app_param=app_param, task_param=task_param,
                 n_runs=n_runs, group_id=group_id)
-        return
+        return tasks
 
     if nodes == "all":
         import akrr.cfg
@@ -70,6 +115,7 @@ def task_new(resource: str, appkernel: str, nodes: str, time_to_start=None, peri
     if n_runs > 1 and periodicity:
         raise AkrrValueException("n_runs larger than one can not be set with periodicity")
 
+    tasks = []
     for node in node_list:
         if time_window_start is not None and time_window_end is not None:
             time_to_start = calculate_random_start_time(
@@ -114,30 +160,8 @@ def task_new(resource: str, appkernel: str, nodes: str, time_to_start=None, peri
         if dry_run or gen_batch_job_only:
             continue
 
-        try:
-            from akrr import akrrrestclient
-            import json
-
-            result = akrrrestclient.post(
-                '/scheduled_tasks',
-                data=data)
-
-            if result.status_code == 200:
-                data_out = json.loads(result.text)["data"]["data"]
-                log.info('Successfully submitted new task. The task id is %s.' % data_out["task_id"])
-            else:
-                log.error(
-                    'something went wrong. %s:%s',
-                    result.status_code,
-                    result.text)
-
-        except Exception as e:
-            log.error('''
-            An error occured while communicating
-            with the REST API.
-            %s: %s
-            ''', e.args[0] if len(e.args) > 0 else '', e.args[1] if len(e.args) > 1 else '')
-            raise e
+        tasks.append(data)
+    return tasks
 
 
 def generate_batch_job_for_testing(resource, appkernel, nodes, dry_run=False):
@@ -364,6 +388,8 @@ def task_delete_selection(resource: str = None, appkernel: str = None, nodes: st
     if active_tasks:
         # Now we need to wait till scheduler will be done checking active tasks
         while True:
+            # end transaction to see task_lock changes done by daemon
+            db.commit()
             sql = "SELECT task_id FROM active_tasks WHERE task_lock > 0"
             log.debug(sql)
             cur.execute(sql)
@@ -376,41 +402,33 @@ def task_delete_selection(resource: str = None, appkernel: str = None, nodes: st
 
     # now we can work with db
     where = []
+    args = []
     if resource:
-        where.append("resource='%s'" % resource)
+        where.append("resource=%s")
+        args.append(resource)
     if appkernel:
-        appkernel_list = ["'" + ak.strip() + "'" for ak in appkernel.split(',')] if ',' in appkernel else ["'" + appkernel + "'"]
-        where.append("app IN (" + ",".join(appkernel_list) + ")")
+        appkernel_list = [ak.strip() for ak in appkernel.split(',')]
+        where.append("app IN (" + ",".join(["%s"] * len(appkernel_list)) + ")")
+        args += appkernel_list
     if group_id:
-        where.append("group_id='%s'" % group_id)
+        where.append("group_id=%s")
+        args.append(group_id)
+    if nodes:
+        node_list = [int(node.strip()) for node in nodes.split(',')]
+        where.append("nnodes IN (" + ",".join(["%s"] * len(node_list)) + ")")
+        args += node_list
 
     active_tasks_ids = []
 
-    if nodes:
-        node_list = [int(node.strip()) for node in nodes.split(',')] if ',' in nodes else [int(nodes)]
-        for node in node_list:
-            where_node1 = where + ["resource_param LIKE \"%'nnodes':"+str(node)+"}%\""]
-            where_node2 = where + ["resource_param LIKE \"%'nnodes':"+str(node)+",%\""]
-            for where_node in [where_node1, where_node2]:
-                if scheduled_tasks:
-                    sql = "DELETE FROM scheduled_tasks WHERE " + " AND ".join(where_node)
-                    log.debug(sql)
-                    cur.execute(sql)
-                if active_tasks:
-                    sql = "SELECT task_id FROM active_tasks WHERE " + " AND ".join(where_node)
-                    log.debug(sql)
-                    cur.execute(sql)
-                    active_tasks_ids += [int(t['task_id']) for t in cur.fetchall()]
-    else:
-        if scheduled_tasks:
-            sql = "DELETE FROM scheduled_tasks WHERE " + " AND ".join(where)
-            log.debug(sql)
-            cur.execute(sql)
-        if active_tasks:
-            sql = "SELECT task_id FROM active_tasks WHERE " + " AND ".join(where)
-            log.debug(sql)
-            cur.execute(sql)
-            active_tasks_ids += [int(t['task_id']) for t in cur.fetchall()]
+    if scheduled_tasks:
+        sql = "DELETE FROM scheduled_tasks WHERE " + " AND ".join(where)
+        log.debug("%s %s", sql, args)
+        cur.execute(sql, args)
+    if active_tasks:
+        sql = "SELECT task_id FROM active_tasks WHERE " + " AND ".join(where)
+        log.debug("%s %s", sql, args)
+        cur.execute(sql, args)
+        active_tasks_ids += [int(t['task_id']) for t in cur.fetchall()]
 
     if active_tasks:
         if len(active_tasks_ids)==0:
@@ -489,6 +489,25 @@ class UpdateDataBase:
                 "select_cols_old":
                     "task_id, err_regexp_id, appstdout, stderr, stdout, taskexeclog",
             }
+        ), (
+            # task output storage, absent in older versions
+            "akrr_output_blob", {
+                "select_cols_old":
+                    "id, sha256, size, compressed_size, chunks, complete",
+                "optional": True
+            }
+        ), (
+            "akrr_output_chunk", {
+                "select_cols_old":
+                    "blob_id, seq, data",
+                "optional": True
+            }
+        ), (
+            "akrr_task_output", {
+                "select_cols_old":
+                    "task_id, name, blob_id",
+                "optional": True
+            }
         ), (
             "akrr_err_regexp", {
                 "select_cols_old":
@@ -567,7 +586,7 @@ class UpdateDataBase:
         ("mod_akrr",
          {'tables': [
              'ACTIVETASKS', 'active_tasks', 'ak_on_nodes', 'akrr_default_walllimit', 'akrr_default_walltime_limit',
-             'akrr_errmsg',
+             'akrr_errmsg', 'akrr_output_blob', 'akrr_output_chunk', 'akrr_task_output',
              'akrr_err_regexp', 'akrr_internal_failure_codes', 'akrr_resource_maintenance',
              'akrr_taks_errors', 'akrr_task_errors', 'akrr_xdmod_instanceinfo', 'COMPLETEDTASKS', 'completed_tasks', 'nodes',
              'SCHEDULEDTASKS', "scheduled_tasks", 'resources', 'app_kernels', 'resource_app_kernels'],
@@ -619,6 +638,9 @@ class UpdateDataBase:
             name_old = name_new if "name_old" not in table_info else table_info['name_old']
             name_to_use = name_new if name_new in tables else name_old
             if name_to_use not in tables:
+                if table_info.get("optional", False):
+                    log.debug("Table %s is not present in previous version", name_to_use)
+                    continue
                 raise akrr.akrrerror.AkrrError("Can not find table %s" % name_to_use)
 
             cursor_execute(akrr_cur, "show columns from %s" % name_to_use)
@@ -736,6 +758,10 @@ class UpdateDataBase:
                 populate_col_new = table_info['select_cols_old']
 
             values_in = ", ".join(["%s"] * (populate_col_new.count(",") + 1))
+            if table_info.get("optional", False) and \
+                    not os.path.isfile(self._get_table_pkl_name("mod_akrr", table_name)):
+                log.debug("Table %s was not saved (might not present in previous version)", table_name)
+                continue
             log.debug("Populating: mod_akrr.%s" % table_name)
             with open(self._get_table_pkl_name("mod_akrr", table_name), "rb") as fin:
                 while True:
@@ -761,6 +787,10 @@ class UpdateDataBase:
                        "update completed_tasks set app=CONCAT(app,'.core') where resource_param like '%ncpus%'")
         akrr_con.commit()
 
+        # typed task parameters columns
+        from akrr.db_schema import backfill_param_columns
+        backfill_param_columns(akrr_con, akrr_cur, dry_run=akrr.dry_run)
+
         # add new records if needed
         populate_mod_akrr_appkernels(akrr_con_dict, akrr_cur_dict, dry_run=akrr.dry_run)
 
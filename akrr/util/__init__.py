@@ -301,3 +301,19 @@ def progress_bar(progress: float = None):
         sys.stdout.write("\b" * (bar_width + 2))
 
 
+def indent_xml(elem, space: str = "  ", level: int = 0) -> None:
+    """
+    pretty print xml element in place by setting whitespaces of its text and tails,
+    same as xml.etree.ElementTree.indent (python 3.9+)
+    """
+    indentation = "\n" + level * space
+    if len(elem) > 0:
+        if not elem.text or not elem.text.strip():
+            elem.text = indentation + space
+        child = None
+        for child in elem:
+            indent_xml(child, space, level + 1)
+        if not child.tail or not child.tail.strip():
+            child.tail = indentation
+    if level > 0 and (not elem.tail or not elem.tail.strip()):
+        elem.tail = indentation
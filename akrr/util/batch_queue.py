@@ -0,0 +1,124 @@
+"""
+Resource-level batch queue status poller.
+
+Instead of listing the whole queue for every task, a single listing per resource is done
+and cached for a time, so that all task handlers (including ones in forked workers) can
+check their jobs from it.
+"""
+import fcntl
+import json
+import os
+import re
+import time
+from typing import Dict, Optional
+
+from akrr.util import log
+
+# Command to list all jobs of the user and regular expression to extract job id and state
+queue_listing_expressions = {
+    'pbs': [r"qstat 2>&1", r"^\s*(\d+)\S*\s+\S+\s+\S+\s+\S+\s+(\S+)"],
+    'sge': [r"qstat 2>&1", r"^\s*(\d+)\s+\S+\s+\S+\s+\S+\s+(\S+)"],
+    'slurm': [r"squeue -a -h -u $USER -o '%i %T' 2>&1", r"^\s*(\d+)\s+(\S+)"],
+    'shell': [r"ps -e -o pid=,stat= 2>&1", r"^\s*(\d+)\s+(\S+)"]
+}
+
+_listing_exit_code_echo = "AkrrQueueListingExitCode="
+
+
+def parse_queue_listing(batch_scheduler: str, listing: str) -> Dict[str, str]:
+    """
+    parse queue listing to job id to state dictionary
+    """
+    regex = re.compile(queue_listing_expressions[batch_scheduler][1], re.M)
+    return {m.group(1): m.group(2) for m in regex.finditer(listing)}
+
+
+class QueueStatusCache:
+    """
+    Cache of queue listings per resource stored in cache_dir, so it is shared between processes.
+    Listing is reused for ttl seconds, only one process refresh it at a time.
+    """
+    def __init__(self, cache_dir: str = None, ttl: float = 300.0):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def get_cache_filename(self, resource_name: str) -> str:
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, resource_name + ".json")
+
+    def _read(self, filename: str, not_older_than: float) -> Optional[Dict[str, str]]:
+        """return cached jobs if listing is fresh enough"""
+        try:
+            with open(filename, "rt") as fin:
+                cached = json.load(fin)
+        except (OSError, ValueError):
+            return None
+        listing_time = cached.get("time", 0.0)
+        if listing_time < time.time() - self.ttl or listing_time < not_older_than:
+            return None
+        return cached.get("jobs", None)
+
+    @staticmethod
+    def list_queue(resource) -> Optional[Dict[str, str]]:
+        """list queue on resource, return None if listing failed"""
+        from akrr.util import ssh
+
+        cmd = queue_listing_expressions[resource['batch_scheduler']][0]
+        sh = ssh.ssh_resource(resource)
+        try:
+            msg = ssh.ssh_command(sh, "%s; echo %s$?" % (cmd, _listing_exit_code_echo))
+        finally:
+            sh.sendline("exit")
+            sh.close(force=True)
+
+        m = re.search(_listing_exit_code_echo + r"(\d+)", msg)
+        if m is None or int(m.group(1)) != 0:
+            log.warning("Can not list queue on %s:\n%s", resource['name'], msg)
+            return None
+        return parse_queue_listing(resource['batch_scheduler'], msg[:m.start()])
+
+    def get_jobs(self, resource, not_older_than: float = 0.0) -> Optional[Dict[str, str]]:
+        """
+        return job id to state dictionary for resource.
+        Listing should be done after not_older_than (seconds since epoch), for example after
+        job submission, otherwise it is refreshed.
+        Return None if queue listing is not supported or failed.
+        """
+        if resource.get('batch_scheduler', None) not in queue_listing_expressions or self.cache_dir is None:
+            return None
+
+        filename = self.get_cache_filename(resource['name'])
+        jobs = self._read(filename, not_older_than)
+        if jobs is not None:
+            return jobs
+
+        with open(filename + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # other process might refresh it while we waited
+            jobs = self._read(filename, not_older_than)
+            if jobs is not None:
+                return jobs
+
+            listing_time = time.time()
+            try:
+                jobs = self.list_queue(resource)
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning("Can not list queue on %s: %s", resource['name'], str(e))
+                jobs = None
+            if jobs is None:
+                return None
+
+            with open(filename + ".tmp", "wt") as fout:
+                json.dump({"time": listing_time, "jobs": jobs}, fout)
+            os.replace(filename + ".tmp", filename)
+        return jobs
+
+    def is_job_in_queue(self, resource, job_id, not_older_than: float = 0.0) -> Optional[bool]:
+        """
+        return True if job is in queue, False if it is not and None if it can not be determined
+        """
+        jobs = self.get_jobs(resource, not_older_than)
+        if jobs is None:
+            return None
+        return str(job_id) in jobs
@@ -0,0 +1,144 @@
+"""
+Classification of failed tasks with regular expressions from akrr_err_regexp.
+
+Rules are loaded and compiled once. Rules applicable to a resource are selected in memory and
+literal substrings required by patterns are checked before running regular expression search.
+"""
+import re
+from typing import Iterable, Dict, Optional, Tuple, List, Pattern
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+from akrr.akrrerror import AkrrError
+from akrr.util import log
+
+# err_regexp_id assigned to errors not matched by any rule
+unknown_error_id = 1000
+
+# Task fields examined by rules, in order of examination
+sources = ("appstdout", "stderr", "stdout", "akrr_status_info", "akrr_status")
+
+# Shortest literal worth checking before regular expression search
+min_literal_length = 3
+
+
+def parse_regexp_flags(reg_exp_opt: Optional[str]) -> int:
+    """
+    convert reg_exp_opt from akrr_err_regexp (e.g. "0", "re.M" or "re.M|re.I") to re flags
+    """
+    flags = 0
+    if reg_exp_opt is None:
+        return flags
+    for opt in re.split(r"[|+]", str(reg_exp_opt)):
+        opt = opt.strip()
+        if opt == "":
+            continue
+        if opt.isdigit():
+            flags |= int(opt)
+            continue
+        flag = getattr(re, opt[3:] if opt.startswith("re.") else opt, None)
+        if not isinstance(flag, re.RegexFlag):
+            raise AkrrError("Unknown regular expression option %s in %s" % (opt, reg_exp_opt))
+        flags |= flag
+    return flags
+
+
+def get_required_literal(regexp: Pattern) -> Optional[str]:
+    """
+    return the longest literal which must be present in string for regexp to match,
+    None if there is no such literal (or it is too short to be useful)
+    """
+    if regexp.flags & re.IGNORECASE:
+        return None
+    try:
+        parsed = sre_parse.parse(regexp.pattern, regexp.flags)
+    except Exception:
+        return None
+
+    longest = ""
+    run = []
+    for op, av in list(parsed) + [(None, None)]:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if len(run) > len(longest):
+            longest = "".join(run)
+        run = []
+    return longest if len(longest) >= min_literal_length else None
+
+
+class ErrorRule:
+    """
+    Compiled rule from akrr_err_regexp
+    """
+    __slots__ = ('id', 'resources', 'sources', 'regexp', 'literal')
+
+    def __init__(self, rule_id: int, resource: str, reg_exp: str, reg_exp_opt: str, source: str):
+        self.id = rule_id
+        # None stands for any
+        self.resources = None if resource.strip() == "*" else \
+            {r.strip().lower() for r in resource.split(',')}
+        self.sources = None if source.strip() == "*" else \
+            {s.strip() for s in source.split(',')}
+        self.regexp = re.compile(reg_exp, parse_regexp_flags(reg_exp_opt))
+        self.literal = get_required_literal(self.regexp)
+
+    def applies_to_resource(self, resource: str) -> bool:
+        return self.resources is None or resource.lower() in self.resources
+
+    def applies_to_source(self, source: str) -> bool:
+        return self.sources is None or source in self.sources
+
+    def search(self, text: str) -> bool:
+        if self.literal is not None and self.literal not in text:
+            return False
+        return self.regexp.search(text) is not None
+
+
+class ErrorClassifier:
+    """
+    Set of compiled error rules ordered by id, the first matching rule classifies the error
+    """
+    def __init__(self, rules: Iterable[Tuple[int, str, str, str, str]]):
+        """rules are (id, resource, reg_exp, reg_exp_opt, source)"""
+        self.rules = []  # type: List[ErrorRule]
+        for rule_id, resource, reg_exp, reg_exp_opt, source in sorted(rules, key=lambda r: r[0]):
+            try:
+                self.rules.append(ErrorRule(rule_id, resource, reg_exp, reg_exp_opt, source))
+            except (re.error, AkrrError) as e:
+                log.warning("Skipping error rule %s: %s", rule_id, e)
+        # resource -> rules applicable to it
+        self._resource_rules = {}
+
+    @classmethod
+    def from_db(cls, cur) -> "ErrorClassifier":
+        """load active rules from akrr_err_regexp"""
+        cur.execute('''SELECT id,resource,reg_exp,reg_exp_opt,source
+            FROM akrr_err_regexp
+            WHERE active=1
+            ORDER BY id ASC;''')
+        rows = cur.fetchall()
+        return cls([tuple(row.values()) if isinstance(row, dict) else row for row in rows])
+
+    def get_rules(self, resource: str) -> List[ErrorRule]:
+        """return rules applicable to resource"""
+        rules = self._resource_rules.get(resource)
+        if rules is None:
+            rules = [rule for rule in self.rules if rule.applies_to_resource(resource)]
+            self._resource_rules[resource] = rules
+        return rules
+
+    def classify(self, resource: str, fields: Dict[str, Optional[str]]) -> Optional[Tuple[int, str]]:
+        """
+        return (err_regexp_id, source) of the first matching rule or None if nothing matches,
+        fields maps source name to its text
+        """
+        for rule in self.get_rules(resource):
+            for source in sources:
+                text = fields.get(source)
+                if text is not None and rule.applies_to_source(source) and rule.search(text):
+                    return rule.id, source
+        return None
@@ -0,0 +1,112 @@
+"""
+Checkpoint of long running batch operations over tasks (reprocessing, archiving).
+
+Tasks are processed in order of task_id, checkpoint holds the last task_id which is done, so that
+interrupted run can continue from the next one, and task_ids of failed tasks, so that they can be
+retried. It also accumulates summary of status changes.
+"""
+import os
+import json
+from collections import Counter
+from typing import Optional, Any, List, Tuple
+
+# Maximal length of status in summary
+status_summary_length = 60
+
+
+def get_status_summary(status: Optional[str]) -> str:
+    """return first line of status shortened for summary"""
+    if status is None:
+        return "None"
+    status = str(status).strip().split("\n")[0]
+    if len(status) > status_summary_length:
+        status = status[:status_summary_length - 3] + "..."
+    return status
+
+
+class ProgressCheckpoint:
+    """
+    Progress of operation over tasks stored in json file. selection identifies the set of tasks,
+    checkpoint with different selection is not resumed.
+    """
+    def __init__(self, filename: str, selection: Any, restart: bool = False):
+        self.filename = filename
+        self.selection = json.loads(json.dumps(selection))
+        self.last_task_id = None
+        self.processed = 0
+        self.failed = 0
+        # task_ids of tasks failed to process
+        self.failed_task_ids = []
+        # "old status -> new status" -> number of tasks
+        self.changes = Counter()
+        # (task_id, old status, new status) of last changed tasks
+        self.changed_tasks = []
+        self.resumed = False
+
+        if not restart and os.path.isfile(filename):
+            with open(filename, "rt") as fin:
+                state = json.load(fin)
+            if state.get("selection") == self.selection:
+                self.last_task_id = state["last_task_id"]
+                self.processed = state["processed"]
+                self.failed = state["failed"]
+                self.failed_task_ids = state.get("failed_task_ids", [])
+                self.changes.update(state["changes"])
+                self.changed_tasks = [tuple(v) for v in state["changed_tasks"]]
+                self.resumed = True
+
+    def record(self, task_id: int, old_status: Optional[str], new_status: Optional[str],
+               failed: bool = False, max_changed_tasks: int = 1000) -> bool:
+        """record processed task, return True if status was changed. Task can be retried after failure."""
+        if task_id in self.failed_task_ids:
+            self.failed_task_ids.remove(task_id)
+            self.processed -= 1
+            self.failed -= 1
+        if self.last_task_id is None or task_id > self.last_task_id:
+            self.last_task_id = task_id
+        self.processed += 1
+        if failed:
+            self.failed += 1
+            self.failed_task_ids.append(task_id)
+            return False
+        old_status = get_status_summary(old_status)
+        new_status = get_status_summary(new_status)
+        if old_status == new_status:
+            return False
+        self.changes[old_status + " -> " + new_status] += 1
+        self.changed_tasks.append((task_id, old_status, new_status))
+        if len(self.changed_tasks) > max_changed_tasks:
+            del self.changed_tasks[:-max_changed_tasks]
+        return True
+
+    def save(self) -> None:
+        """write checkpoint atomically"""
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, "wt") as fout:
+            json.dump({
+                "selection": self.selection,
+                "last_task_id": self.last_task_id,
+                "processed": self.processed,
+                "failed": self.failed,
+                "failed_task_ids": self.failed_task_ids,
+                "changes": dict(self.changes),
+                "changed_tasks": self.changed_tasks
+            }, fout, indent=1)
+        os.replace(tmp_filename, self.filename)
+
+    def remove(self) -> None:
+        """remove checkpoint file once operation is complete"""
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def get_changes(self) -> List[Tuple[str, int]]:
+        """return status changes and number of tasks, most common first"""
+        return self.changes.most_common()
+
+    def get_summary(self) -> str:
+        """return summary of status changes"""
+        lines = ["Processed tasks: %d, failed to process: %d, status changed: %d" % (
+            self.processed, self.failed, sum(self.changes.values()))]
+        for change, count in self.get_changes():
+            lines.append("%8d  %s" % (count, change))
+        return "\n".join(lines)
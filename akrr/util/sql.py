@@ -171,6 +171,239 @@ def get_con_to_db2(user_password_host_port_db, dict_cursor=True, raise_exception
                          raise_exception=raise_exception)
 
 
+def _is_write_query(query) -> bool:
+    """return True if query changes data, i.e. it should be committed"""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    words = query.split(None, 1)
+    return len(words) > 0 and words[0].upper() in ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class PooledCursor:
+    """
+    Cursor of PooledConnection, behaves as MySQLdb cursor
+    and marks connection as having uncommitted changes on data modifications.
+    """
+    def __init__(self, con: "PooledConnection", cur):
+        import weakref
+        # weak reference, so that connection is still returned to the pool when it is deleted
+        self._pooled_con = weakref.ref(con)
+        self._cur = cur
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def _track(self, query):
+        con = self._pooled_con()
+        if con is not None and _is_write_query(query):
+            con.uncommitted = True
+
+    def execute(self, query, args=None):
+        self._track(query)
+        return self._cur.execute(query, args)
+
+    def executemany(self, query, args):
+        self._track(query)
+        return self._cur.executemany(query, args)
+
+
+class PooledConnection:
+    """
+    Connection checked out from ConnectionPool, behaves as MySQLdb connection
+    but close() returns it to the pool.
+    """
+    def __init__(self, pool: "ConnectionPool", con):
+        import os
+        self._pool = pool
+        self._con = con
+        self._pid = os.getpid()
+        # set by PooledCursor on data modification, reset on commit or rollback
+        self.uncommitted = False
+
+    def __getattr__(self, name):
+        if self._con is None:
+            raise AttributeError("Connection is already returned to the pool")
+        return getattr(self._con, name)
+
+    def commit(self):
+        self.__getattr__("commit")()
+        self.uncommitted = False
+
+    def rollback(self):
+        self.__getattr__("rollback")()
+        self.uncommitted = False
+
+    def close(self):
+        """return connection to the pool"""
+        if self._con is not None:
+            con = self._con
+            self._con = None
+            self._pool.release(con, pid=self._pid, uncommitted=self.uncommitted)
+
+    def discard(self):
+        """close connection without returning it to the pool, e.g. if it is broken"""
+        if self._con is not None:
+            con = self._con
+            self._con = None
+            self._pool.release(con, discard=True, pid=self._pid)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+class ConnectionPool:
+    """
+    Per-process pool of connections to MySQL database.
+    Connections are checked with ping before reuse if they were idle for more than check_interval seconds.
+    """
+    def __init__(self, user: str, password: str, host: str = 'localhost', port: int = 3306, db_name: str = None,
+                 max_idle: int = 4, check_interval: float = 30.0):
+        import os
+        import threading
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.db_name = db_name
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        # list of (connection, time when it was returned)
+        self._idle = []
+        # connections inherited from parent process, they can not be used or closed in this process
+        self._inherited = []
+        self.stats = {"created": 0, "reused": 0, "in_use": 0, "idle": 0, "discarded": 0, "failed_checks": 0}
+
+    def _check_pid(self):
+        """drop connections inherited from parent process after fork"""
+        import os
+        if self._pid != os.getpid():
+            self._inherited.extend(self._idle)
+            self._idle = []
+            self._pid = os.getpid()
+            for k in self.stats:
+                self.stats[k] = 0
+
+    @staticmethod
+    def _is_alive(con) -> bool:
+        try:
+            con.ping()
+            return True
+        except Exception:  # pylint: disable=broad-except
+            return False
+
+    def get_con(self, dict_cursor: bool = True, raise_exception: bool = True):
+        """return pooled connection and cursor"""
+        import time
+
+        con = None
+        with self._lock:
+            self._check_pid()
+            while len(self._idle) > 0:
+                con, released_time = self._idle.pop()
+                if time.time() - released_time < self.check_interval or self._is_alive(con):
+                    self.stats["reused"] += 1
+                    break
+                self.stats["failed_checks"] += 1
+                self._close(con)
+                con = None
+        if con is None:
+            con, _ = get_con_to_db(
+                self.user, self.password, self.host, self.port, self.db_name,
+                dict_cursor=False, raise_exception=raise_exception)
+            if con is None:
+                return None, None
+            with self._lock:
+                self.stats["created"] += 1
+        with self._lock:
+            self.stats["in_use"] += 1
+            self.stats["idle"] = len(self._idle)
+
+        if dict_cursor:
+            import MySQLdb.cursors
+            cur = con.cursor(MySQLdb.cursors.DictCursor)
+        else:
+            cur = con.cursor()
+        pooled_con = PooledConnection(self, con)
+        return pooled_con, PooledCursor(pooled_con, cur)
+
+    @staticmethod
+    def _close(con):
+        try:
+            con.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def release(self, con, discard: bool = False, pid: int = None, uncommitted: bool = False):
+        """
+        return connection to pool, uncommitted changes are rolled back.
+        pid is process id where connection was checked out,
+        uncommitted is set if connection has not committed data modifications.
+        """
+        import os
+        import time
+
+        if pid is not None and pid != os.getpid():
+            # connection from parent process
+            self._inherited.append((con, 0.0))
+            return
+        if uncommitted and not discard:
+            log.warning("Connection to %s database is returned to the pool with uncommitted changes, "
+                        "they are rolled back", self.db_name)
+        if not discard:
+            try:
+                con.rollback()
+            except Exception:  # pylint: disable=broad-except
+                discard = True
+        with self._lock:
+            self.stats["in_use"] -= 1
+            if discard or len(self._idle) >= self.max_idle:
+                self.stats["discarded"] += 1
+                self._close(con)
+            else:
+                self._idle.append((con, time.time()))
+            self.stats["idle"] = len(self._idle)
+
+    def transaction(self, dict_cursor: bool = True):
+        """
+        context manager returning cursor within transaction,
+        commits on success, rolls back on exception and returns connection to the pool
+        """
+        from contextlib import contextmanager
+
+        @contextmanager
+        def _transaction():
+            con, cur = self.get_con(dict_cursor=dict_cursor)
+            try:
+                yield cur
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+            finally:
+                cur.close()
+                con.close()
+
+        return _transaction()
+
+    def clear(self):
+        """close all idle connections"""
+        with self._lock:
+            self._check_pid()
+            for con, _ in self._idle:
+                self._close(con)
+            self._idle = []
+            self.stats["idle"] = 0
+
+
 def db_exist(cur, name):
     """return True if db exists"""
     cur.execute("SHOW databases LIKE %s", (name,))
@@ -254,6 +487,29 @@ def cv(value):
     return value
 
 
+def like_match(value: str, pattern: str) -> bool:
+    """
+    check if value matches SQL LIKE pattern in same way as MySQL with default collation does,
+    i.e. case-insensitive with % and _ wildcards and backslash as escape character
+    """
+    import re
+    regex = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        elif c == "%":
+            regex.append(".*")
+        elif c == "_":
+            regex.append(".")
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return re.fullmatch("".join(regex), value, re.IGNORECASE | re.DOTALL) is not None
+
+
 def cursor_execute(cur, query, args=None, dry_run=None):
     """Execute database affecting command if not in dry run mode"""
     if dry_run is None:
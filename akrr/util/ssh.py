@@ -1,7 +1,11 @@
 import copy
+import fcntl
+import hashlib
 import os
 import re
+import subprocess
 import sys
+import tempfile
 import time
 
 import akrr
@@ -17,10 +21,11 @@ ssh_command_end_echo = "ExeCUTEd_SucCeSsFully"
 
 def ssh_access(remote_machine, ssh='ssh', username=None, password=None,
                private_key_file=None, private_key_password=None,
-               logfile=None, command=None, pwd1=None, pwd2=None):
+               logfile=None, command=None, pwd1=None, pwd2=None, ssh_options=None):
     """
     login to remote machine and return pexpect.spawn instance.
     if command!=None will execute commands and return the output
+    ssh_options are extra options passed to ssh/scp (for example ControlMaster settings)
     """
     # pack command line and arguments
     cmd = ssh
@@ -28,6 +33,9 @@ def ssh_access(remote_machine, ssh='ssh', username=None, password=None,
     if ssh.find('scp') >= 0:
         mode = 'scp'
 
+    if ssh_options:
+        cmd += " " + ssh_options
+
     if logfile is None:
         logfile = sys.stdout
 
@@ -225,21 +233,221 @@ def ssh_access_multytry(remote_machine, ssh='ssh', username=None, password=None,
             time.sleep(sleep_time)
 
 
-def ssh_resource(resource, command=None):
+class SSHSessionLease:
+    """
+    Session slot borrowed from SSHConnectionPool, the slot is a locked file so
+    it is freed by OS if the process holding it dies.
+    """
+    def __init__(self, lock_file=None):
+        self._lock_file = lock_file
+
+    def release(self):
+        """return slot to the pool, safe to call several times"""
+        if self._lock_file is None:
+            return
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        finally:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class SSHConnectionPool:
+    """
+    Pool of persistent multiplexed ssh connections to resources.
+
+    Uses OpenSSH ControlMaster sockets: first ssh/scp to resource becomes a master connection
+    which stays in background for persist seconds after last session is closed (idle expiry).
+    Following ssh/scp calls, including ones from forked task handlers, go through the master
+    socket and skip login handshake. Master is health-checked before use and dropped if it is
+    stale, so that the next call reconnects. Number of simultaneous sessions per resource
+    is capped by max_sessions.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.persist = 600
+        self.max_sessions = 8
+        self.control_dir = None
+        # time to wait for free session slot, after that direct connection is used
+        self.lease_timeout = 60.0
+        self.check_timeout = 10.0
+
+    def configure(self, enabled=True, persist=None, max_sessions=None, control_dir=None):
+        """set pool parameters"""
+        self.enabled = enabled
+        if persist is not None:
+            self.persist = int(persist)
+        if max_sessions is not None:
+            self.max_sessions = max(int(max_sessions), 1)
+        if control_dir is not None:
+            self.control_dir = control_dir
+
+    def get_control_dir(self):
+        """return directory for control sockets and lock files, create it if needed"""
+        if self.control_dir is None:
+            # unix socket path length is limited so keep it short
+            self.control_dir = os.path.join(tempfile.gettempdir(), "akrr-ssh-%d" % os.getuid())
+        if not os.path.isdir(self.control_dir):
+            os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+        return self.control_dir
+
+    @staticmethod
+    def get_key(resource):
+        """return short unique key for resource connection"""
+        name = resource['name']
+        key = "%s@%s" % (resource.get('ssh_username', None), resource.get('remote_access_node', name))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    def is_applicable(self, method):
+        """return True if remote access method can be multiplexed"""
+        if not self.enabled:
+            return False
+        method = method.split()
+        return len(method) > 0 and os.path.basename(method[0]) in ("ssh", "scp")
+
+    def get_control_path(self, resource):
+        return os.path.join(self.get_control_dir(), self.get_key(resource) + ".sock")
+
+    def get_ssh_options(self, resource):
+        """return ssh/scp options for multiplexed connection to resource"""
+        return "-o ControlMaster=auto -o ControlPath=%s -o ControlPersist=%d" % (
+            self.get_control_path(resource), self.persist)
+
+    def _control_command(self, resource, operation):
+        """send control command (check, exit) to master connection, return True on success"""
+        headnode = resource.get('remote_access_node', resource['name'])
+        try:
+            r = subprocess.run(
+                ["ssh", "-O", operation, "-o", "ControlPath=" + self.get_control_path(resource), headnode],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.check_timeout)
+            return r.returncode == 0
+        except (OSError, subprocess.SubprocessError):
+            return False
+
+    def check_master(self, resource):
+        """return True if master connection to resource is alive"""
+        if not os.path.exists(self.get_control_path(resource)):
+            return False
+        return self._control_command(resource, "check")
+
+    def drop_master(self, resource):
+        """close master connection to resource and remove its socket"""
+        control_path = self.get_control_path(resource)
+        if not os.path.exists(control_path):
+            return
+        self._control_command(resource, "exit")
+        if os.path.exists(control_path):
+            try:
+                os.remove(control_path)
+            except OSError:
+                pass
+
+    def acquire(self, resource, timeout=None):
+        """
+        borrow session slot for resource, return SSHSessionLease or None if no slot was
+        freed within timeout
+        """
+        if timeout is None:
+            timeout = self.lease_timeout
+        control_dir = self.get_control_dir()
+        key = self.get_key(resource)
+        time_limit = time.time() + timeout
+        while True:
+            for i in range(self.max_sessions):
+                lock_file = open(os.path.join(control_dir, "%s.slot%d" % (key, i)), "a")
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return SSHSessionLease(lock_file)
+                except OSError:
+                    lock_file.close()
+            if time.time() >= time_limit:
+                return None
+            time.sleep(ssh_time_sleep)
+
+    def shutdown(self):
+        """close all master connections"""
+        if self.control_dir is None or not os.path.isdir(self.control_dir):
+            return
+        for filename in os.listdir(self.control_dir):
+            if filename.endswith(".sock"):
+                try:
+                    subprocess.run(
+                        ["ssh", "-O", "exit", "-o", "ControlPath=" + os.path.join(self.control_dir, filename),
+                         "localhost"],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.check_timeout)
+                except (OSError, subprocess.SubprocessError):
+                    pass
+
+
+# connection pool shared by all ssh/scp calls to resources, configured by akrr.cfg
+ssh_pool = SSHConnectionPool()
+
+
+def _release_on_close(rsh, lease):
+    """release lease when session is closed"""
+    close = rsh.close
+
+    def close_and_release(force=True):
+        try:
+            close(force=force)
+        finally:
+            lease.release()
+
+    rsh.close = close_and_release
+    rsh.ssh_pool_lease = lease
+
+
+def _access_resource(resource, method, logfile=None, command=None, pwd1=None, pwd2=None):
+    """
+    access resource through the connection pool if it is applicable,
+    reconnects once if multiplexed connection has failed
+    """
     name = resource['name']
     headnode = resource.get('remote_access_node', name)
+    kwargs = {
+        'ssh': method,
+        'username': resource.get('ssh_username', None),
+        'password': resource.get('ssh_password', None),
+        'private_key_file': resource.get('ssh_private_key_file', None),
+        'private_key_password': resource.get('ssh_private_key_password', None),
+        'logfile': logfile, 'command': command, 'pwd1': pwd1, 'pwd2': pwd2
+    }
+
+    lease = ssh_pool.acquire(resource) if ssh_pool.is_applicable(method) else None
+    if lease is None:
+        if ssh_pool.is_applicable(method):
+            log.warning("All %d ssh sessions to %s are busy, using direct connection",
+                        ssh_pool.max_sessions, name)
+        return ssh_access(headnode, **kwargs)
+
+    try:
+        if os.path.exists(ssh_pool.get_control_path(resource)) and not ssh_pool.check_master(resource):
+            log.debug("Master ssh connection to %s is stale, reconnecting", name)
+            ssh_pool.drop_master(resource)
+        try:
+            rsh = ssh_access(headnode, ssh_options=ssh_pool.get_ssh_options(resource), **kwargs)
+        except AkrrError:
+            log.debug("Multiplexed ssh connection to %s failed, reconnecting", name)
+            ssh_pool.drop_master(resource)
+            rsh = ssh_access(headnode, ssh_options=ssh_pool.get_ssh_options(resource), **kwargs)
+    except Exception:
+        lease.release()
+        raise
+
+    if isinstance(rsh, str):
+        lease.release()
+    else:
+        _release_on_close(rsh, lease)
+    return rsh
+
+
+def ssh_resource(resource, command=None):
     remote_access_method = resource.get('remote_access_method', 'ssh')
-    username = resource.get('ssh_username', None)
-    ssh_password = resource.get('ssh_password', None)
-    ssh_private_key_file = resource.get('ssh_private_key_file', None)
-    ssh_private_key_password = resource.get('ssh_private_key_password', None)
 
     logfile = sys.stdout
     # logfile=None
 
-    rsh = ssh_access(headnode, ssh=remote_access_method, username=username, password=ssh_password,
-                     private_key_file=ssh_private_key_file, private_key_password=ssh_private_key_password,
-                     logfile=logfile, command=command)
+    rsh = _access_resource(resource, remote_access_method, logfile=logfile, command=command)
     return rsh
 
 
@@ -248,9 +456,6 @@ def scp_from_resource(resource, pwd1, pwd2, opt=""):
     remote_machine = resource.get('remote_access_node', name)
     remote_invocation_method = resource.get('remote_copy_method', 'scp') + " " + opt + " "
     username = resource.get('ssh_username', None)
-    ssh_password = resource.get('ssh_password', None)
-    ssh_private_key_file = resource.get('ssh_private_key_file', None)
-    ssh_private_key_password = resource.get('ssh_private_key_password', None)
 
     logfile = sys.stdout
     # logfile=None
@@ -260,10 +465,7 @@ def scp_from_resource(resource, pwd1, pwd2, opt=""):
     else:
         pwd1fin += " %s:%s" % (remote_machine, pwd1)
 
-    rsh = ssh_access(remote_machine, ssh=remote_invocation_method, username=username, password=ssh_password,
-                     private_key_file=ssh_private_key_file, private_key_password=ssh_private_key_password,
-                     logfile=logfile,
-                     pwd1=pwd1fin, pwd2=pwd2)
+    rsh = _access_resource(resource, remote_invocation_method, logfile=logfile, pwd1=pwd1fin, pwd2=pwd2)
     return rsh
 
 
@@ -274,9 +476,6 @@ def scp_to_resource(resource, pwd1, pwd2, opt="", logfile=None):
     remote_machine = resource.get('remote_access_node', name)
     remote_invocation_method = resource.get('remote_copy_method', 'scp') + " " + opt + " "
     username = resource.get('ssh_username', None)
-    ssh_password = resource.get('ssh_password', None)
-    ssh_private_key_file = resource.get('ssh_private_key_file', None)
-    ssh_private_key_password = resource.get('ssh_private_key_password', None)
 
     # logfile = sys.stdout
     # logfile=None
@@ -286,10 +485,7 @@ def scp_to_resource(resource, pwd1, pwd2, opt="", logfile=None):
     else:
         pwd2fin += " %s:%s" % (remote_machine, pwd2)
 
-    rsh = ssh_access(remote_machine, ssh=remote_invocation_method, username=username, password=ssh_password,
-                     private_key_file=ssh_private_key_file, private_key_password=ssh_private_key_password,
-                     logfile=logfile,
-                     pwd1=pwd1, pwd2=pwd2fin)
+    rsh = _access_resource(resource, remote_invocation_method, logfile=logfile, pwd1=pwd1, pwd2=pwd2fin)
     return rsh
 
 
@@ -0,0 +1,113 @@
+"""
+Task handler state store.
+
+Every state change is saved as numbered snapshot (proc/NNNNNN.st), earlier snapshots are
+kept as history. The "latest" pointer file holds the name of the most recent snapshot,
+so that the current state can be loaded without listing proc directory.
+"""
+import os
+import re
+import pickle
+from typing import List, Optional, Any
+
+# Protocol used by default, binary and much more compact than protocol 0
+default_protocol = 4
+
+state_filename_format = "%06d.st"
+latest_pointer_filename = "latest"
+
+_state_filename = re.compile(r"^(\d+)\.st$")
+
+
+def get_state_filename(proc_dir: str, i_state: int) -> str:
+    """return full path to snapshot number i_state"""
+    return os.path.join(proc_dir, state_filename_format % i_state)
+
+
+def _write_atomically(filename: str, data: bytes) -> None:
+    """write data to temporary file and move it in place"""
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as fout:
+        fout.write(data)
+    os.replace(tmp_filename, filename)
+
+
+def list_states(proc_dir: str) -> List[str]:
+    """return full paths to all snapshots in proc_dir ordered from first to last"""
+    states = []
+    for filename in os.listdir(proc_dir):
+        m = _state_filename.match(filename)
+        if m is not None:
+            states.append((int(m.group(1)), filename))
+    return [os.path.join(proc_dir, filename) for _, filename in sorted(states)]
+
+
+def get_latest_state(proc_dir: str) -> Optional[str]:
+    """
+    return full path to the most recent snapshot or None if there is no snapshots.
+    Uses latest pointer and falls back to directory listing if pointer is missing or stale.
+    """
+    try:
+        with open(os.path.join(proc_dir, latest_pointer_filename), "rt") as fin:
+            filename = fin.read().strip()
+        if _state_filename.match(filename) is not None and os.path.isfile(os.path.join(proc_dir, filename)):
+            return os.path.join(proc_dir, filename)
+    except OSError:
+        pass
+
+    states = list_states(proc_dir)
+    if len(states) == 0:
+        return None
+    return states[-1]
+
+
+def set_latest_state(proc_dir: str, state_filename: str) -> None:
+    """update latest pointer"""
+    _write_atomically(
+        os.path.join(proc_dir, latest_pointer_filename), os.path.basename(state_filename).encode("utf-8"))
+
+
+def write_state(proc_dir: str, i_state: int, obj: Any, protocol: int = default_protocol) -> str:
+    """
+    save obj as snapshot number i_state and make it the latest one,
+    return full path to snapshot
+    """
+    state_filename = get_state_filename(proc_dir, i_state)
+    _write_atomically(state_filename, pickle.dumps(obj, protocol))
+    set_latest_state(proc_dir, state_filename)
+    return state_filename
+
+
+def read_state(state_filename: str) -> Any:
+    """load snapshot"""
+    with open(state_filename, "rb") as fin:
+        return pickle.load(fin)
+
+
+def get_state_protocol(state_filename: str) -> int:
+    """
+    return pickle protocol of snapshot, protocols 0 and 1 have no header and reported as 0
+    """
+    with open(state_filename, "rb") as fin:
+        header = fin.read(2)
+    if len(header) == 2 and header[0] == 0x80:
+        return header[1]
+    return 0
+
+
+def migrate_states(proc_dir: str, protocol: int = default_protocol, dry_run: bool = False) -> int:
+    """
+    re-save snapshots pickled with older protocol and set latest pointer,
+    return number of converted snapshots
+    """
+    states = list_states(proc_dir)
+    count = 0
+    for state_filename in states:
+        if get_state_protocol(state_filename) >= protocol:
+            continue
+        count += 1
+        if not dry_run:
+            _write_atomically(state_filename, pickle.dumps(read_state(state_filename), protocol))
+    if len(states) > 0 and not dry_run:
+        set_latest_state(proc_dir, states[-1])
+    return count
@@ -10,7 +10,8 @@ def wrap_str_dict(s, width=20):
     if s == "NA":
         return "NA"
     import textwrap
-    return "\n".join(textwrap.wrap(str(eval(s)), width=width))
+    from akrr.util.task_param import parse_param
+    return "\n".join(textwrap.wrap(str(parse_param(s)), width=width))
 
 
 def wrap_text(s, width=20):
@@ -0,0 +1,228 @@
+"""
+Storage of task output files (appstdout, stderr, stdout and task execution log) in DB.
+
+Files are streamed from disk, gzip compressed and split to chunks below max_allowed_packet.
+Identical payloads are stored once, they are found by sha256 of uncompressed content.
+Layout:
+    akrr_output_blob - one row per unique payload
+    akrr_output_chunk - compressed payload chunks ordered by seq
+    akrr_task_output - (task_id, name) -> blob_id
+Tables are InnoDB, output is stored within caller transaction, so that interrupted store leaves no
+partial blobs, blobs are reused only if marked complete.
+Tasks stored before that keep their output in text columns of akrr_errmsg, readers fall back to them.
+For tasks with stored output these columns are NULL, so akrr_erran and akrr_erran2 views show it only
+for older tasks, their output_in_blobs column marks tasks which output should be read with
+load_task_output (or REST API completed_tasks/<task_id>).
+"""
+import os
+import zlib
+import hashlib
+from typing import Iterable, Iterator, Callable, Dict, Optional, Sequence, Tuple
+
+# Names of stored task output files, same as akrr_errmsg columns
+output_names = ("appstdout", "stderr", "stdout", "taskexeclog")
+
+# Content stored for absent files
+not_present = b"Does Not Present"
+
+# Size of blocks in which files are read from disk
+default_block_size = 1024 * 1024
+
+# Maximal size of single compressed chunk
+default_chunk_size = 4 * 1024 * 1024
+
+# Fraction of max_allowed_packet which single chunk should not exceed
+max_allowed_packet_fraction = 0.5
+
+# Compression level for zlib
+default_compression_level = 6
+
+
+def iter_file_blocks(filename: Optional[str], block_size: int = default_block_size) -> Iterator[bytes]:
+    """yield content of file by blocks, for absent file yield not_present"""
+    if filename is None or not os.path.isfile(filename):
+        yield not_present
+        return
+    with open(filename, "rb") as fin:
+        while True:
+            block = fin.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def get_digest(blocks: Iterable[bytes]) -> Tuple[str, int]:
+    """return sha256 hex digest and total size of blocks"""
+    digest = hashlib.sha256()
+    size = 0
+    for block in blocks:
+        digest.update(block)
+        size += len(block)
+    return digest.hexdigest(), size
+
+
+def compress_blocks(blocks: Iterable[bytes], chunk_size: int = default_chunk_size,
+                    level: int = default_compression_level) -> Iterator[bytes]:
+    """
+    gzip compress blocks and yield compressed stream in chunks no larger than chunk_size,
+    concatenated chunks can be decompressed with gzip -d
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    buf = bytearray()
+    for block in blocks:
+        buf += compressor.compress(block)
+        while len(buf) >= chunk_size:
+            yield bytes(buf[:chunk_size])
+            del buf[:chunk_size]
+    buf += compressor.flush()
+    while len(buf) > 0:
+        yield bytes(buf[:chunk_size])
+        del buf[:chunk_size]
+
+
+def decompress_chunks(chunks: Iterable[bytes]) -> bytes:
+    """decompress gzip stream split to chunks"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    out = bytearray()
+    for chunk in chunks:
+        out += decompressor.decompress(chunk)
+    out += decompressor.flush()
+    return bytes(out)
+
+
+def decode_output(content: Optional[bytes], encoding: str = "utf-8") -> Optional[str]:
+    """convert stored output to string, undecodable bytes are dropped"""
+    if content is None:
+        return None
+    if isinstance(content, str):
+        return content
+    return content.decode(encoding, errors="ignore")
+
+
+def get_chunk_size(cur, chunk_size: int = default_chunk_size) -> int:
+    """return chunk size limited by fraction of max_allowed_packet of DB server"""
+    cur.execute("SELECT @@max_allowed_packet AS max_allowed_packet")
+    row = cur.fetchone()
+    max_allowed_packet = int(row["max_allowed_packet"] if isinstance(row, dict) else row[0])
+    return max(1024, min(chunk_size, int(max_allowed_packet_fraction * max_allowed_packet)))
+
+
+def _first_column(rows) -> list:
+    return [list(row.values())[0] if isinstance(row, dict) else row[0] for row in rows]
+
+
+def store_blob(cur, get_blocks: Callable[[], Iterable[bytes]], chunk_size: int = default_chunk_size,
+               level: int = default_compression_level) -> int:
+    """
+    store content produced by get_blocks and return its blob id. If identical content is already
+    stored its blob is reused. get_blocks is called twice: first to find digest, then to compress.
+    Should be called within transaction, blob is marked complete only after all chunks are written
+    and the blob row is locked until commit, so that concurrent writers wait for it
+    and it is not deleted while reused.
+    """
+    digest, size = get_digest(get_blocks())
+
+    # shared lock keeps reused blob from deletion by other transaction
+    cur.execute("SELECT id FROM akrr_output_blob WHERE sha256=%s AND complete=1 LOCK IN SHARE MODE", (digest,))
+    ids = _first_column(cur.fetchall())
+    if len(ids) > 0:
+        return ids[0]
+
+    # concurrent writer of the same content waits here until the first one commits
+    cur.execute("INSERT INTO akrr_output_blob (sha256, size, compressed_size, chunks, complete) "
+                "VALUES (%s,%s,0,0,0) ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id)",
+                (digest, size))
+    blob_id = cur.lastrowid
+    cur.execute("SELECT complete FROM akrr_output_blob WHERE id=%s FOR UPDATE", (blob_id,))
+    if _first_column(cur.fetchall())[0]:
+        return blob_id
+
+    # chunks left by interrupted non-transactional store are rewritten
+    cur.execute("DELETE FROM akrr_output_chunk WHERE blob_id=%s", (blob_id,))
+    compressed_size = 0
+    seq = 0
+    for chunk in compress_blocks(get_blocks(), chunk_size, level):
+        cur.execute("INSERT INTO akrr_output_chunk (blob_id, seq, data) VALUES (%s,%s,%s)",
+                    (blob_id, seq, chunk))
+        compressed_size += len(chunk)
+        seq += 1
+
+    cur.execute("UPDATE akrr_output_blob SET compressed_size=%s, chunks=%s, complete=1 WHERE id=%s",
+                (compressed_size, seq, blob_id))
+    return blob_id
+
+
+def load_blob(cur, blob_id: int) -> bytes:
+    """return uncompressed content of blob"""
+    cur.execute("SELECT data FROM akrr_output_chunk WHERE blob_id=%s ORDER BY seq", (blob_id,))
+    return decompress_chunks(_first_column(cur.fetchall()))
+
+
+def _delete_unreferenced_blobs(cur, blob_ids: Iterable[int]) -> None:
+    for blob_id in sorted(set(blob_ids)):
+        # exclusive lock waits for transactions reusing the blob, locking read sees their references
+        cur.execute("SELECT id FROM akrr_output_blob WHERE id=%s FOR UPDATE", (blob_id,))
+        if len(cur.fetchall()) == 0:
+            continue
+        cur.execute("SELECT COUNT(*) FROM akrr_task_output WHERE blob_id=%s LOCK IN SHARE MODE", (blob_id,))
+        if _first_column(cur.fetchall())[0] == 0:
+            cur.execute("DELETE FROM akrr_output_chunk WHERE blob_id=%s", (blob_id,))
+            cur.execute("DELETE FROM akrr_output_blob WHERE id=%s", (blob_id,))
+
+
+def store_task_output(cur, task_id: int, files: Dict[str, Optional[str]],
+                      chunk_size: int = default_chunk_size, level: int = default_compression_level,
+                      block_size: int = default_block_size) -> Dict[str, int]:
+    """
+    store task output files and return blob ids. files maps output name to file name,
+    file name can be None for absent file. Previously stored output of the task is replaced and
+    akrr_errmsg row is created if needed (it holds error classification).
+    """
+    chunk_size = get_chunk_size(cur, chunk_size)
+
+    cur.execute("SELECT blob_id FROM akrr_task_output WHERE task_id=%s", (task_id,))
+    old_blob_ids = _first_column(cur.fetchall())
+
+    blob_ids = {}
+    for name, filename in files.items():
+        blob_ids[name] = store_blob(
+            cur, lambda: iter_file_blocks(filename, block_size), chunk_size=chunk_size, level=level)
+        cur.execute("REPLACE INTO akrr_task_output (task_id, name, blob_id) VALUES (%s,%s,%s)",
+                    (task_id, name, blob_ids[name]))
+
+    _delete_unreferenced_blobs(cur, old_blob_ids)
+
+    cur.execute("SELECT task_id FROM akrr_errmsg WHERE task_id=%s", (task_id,))
+    if len(cur.fetchall()) > 0:
+        cur.execute("""UPDATE akrr_errmsg
+            SET appstdout=NULL,stderr=NULL,stdout=NULL,taskexeclog=NULL
+            WHERE task_id=%s""", (task_id,))
+    else:
+        cur.execute("INSERT INTO akrr_errmsg (task_id) VALUES (%s)", (task_id,))
+    return blob_ids
+
+
+def load_task_output(cur, task_id: int, names: Sequence[str] = output_names,
+                     encoding: str = "utf-8") -> Dict[str, Optional[str]]:
+    """
+    return task output as strings, output which is not in blob storage is taken from akrr_errmsg
+    (None if it is absent there as well)
+    """
+    output = {name: None for name in names}
+
+    cur.execute("SELECT name, blob_id FROM akrr_task_output WHERE task_id=%s", (task_id,))
+    for row in cur.fetchall():
+        name, blob_id = (row["name"], row["blob_id"]) if isinstance(row, dict) else row
+        if name in output:
+            output[name] = decode_output(load_blob(cur, blob_id), encoding)
+
+    missing = [name for name in names if output[name] is None and name in output_names]
+    if len(missing) > 0:
+        cur.execute("SELECT " + ",".join(missing) + " FROM akrr_errmsg WHERE task_id=%s", (task_id,))
+        rows = cur.fetchall()
+        if len(rows) > 0:
+            row = rows[0]
+            values = [row[name] for name in missing] if isinstance(row, dict) else row
+            for name, value in zip(missing, values):
+                output[name] = decode_output(value, encoding)
+    return output
@@ -0,0 +1,59 @@
+"""
+Parsing of task parameters (resource_param, app_param and task_param), which are stored as
+python dict literals, and extraction of parameters stored in typed columns of task tables.
+"""
+import ast
+import copy
+import functools
+from typing import Optional, Tuple
+
+# Typed columns of scheduled_tasks, active_tasks and completed_tasks filled from task parameters
+param_columns = ("nnodes", "ncores", "test_run", "n_runs", "master_task_id")
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_param(s: str) -> dict:
+    try:
+        v = ast.literal_eval(s.strip())
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        raise ValueError("Can not parse task parameters: %r" % s)
+    if not isinstance(v, dict):
+        raise ValueError("Task parameters should be dict: %r" % s)
+    return v
+
+
+def parse_param(s: Optional[str]) -> dict:
+    """
+    safely parse parameters dict literal (only python literals are allowed),
+    None or empty string is empty dict, raise ValueError on incorrect format
+    """
+    if s is None or s.strip() == "":
+        return {}
+    return copy.deepcopy(_parse_param(s))
+
+
+def _get_int(param, key, default=None):
+    v = param.get(key, default)
+    return int(v) if isinstance(v, (int, float)) else default
+
+
+def get_param_columns(resource_param: Optional[str], task_param: Optional[str]) -> Tuple:
+    """
+    return values of param_columns for task, parameters which can not be parsed are
+    treated as empty
+    """
+    try:
+        resource_param = parse_param(resource_param)
+    except ValueError:
+        resource_param = {}
+    try:
+        task_param = parse_param(task_param)
+    except ValueError:
+        task_param = {}
+    return (
+        _get_int(resource_param, 'nnodes'),
+        _get_int(resource_param, 'ncores'),
+        1 if task_param.get('test_run', False) else 0,
+        _get_int(task_param, 'n_runs', 1),
+        _get_int(task_param, 'masterTaskID', 0)
+    )
@@ -0,0 +1,201 @@
+"""
+Tests for akrr.akrrrestapi
+"""
+import pytest
+
+
+@pytest.fixture
+def restapi(akrr_home, monkeypatch):
+    pytest.importorskip("MySQLdb")
+    import time
+    import akrr.akrrrestapi
+    monkeypatch.setitem(akrr.akrrrestapi.issued_tokens, "token", {
+        'token': "token", 'expiration': int(time.time()) + 3600, 'read': True, 'write': True})
+    return akrr.akrrrestapi
+
+
+def call(restapi, method, path, body=None, query="", form=None):
+    """call REST API WSGI application with JSON body or form, return status and parsed JSON response"""
+    import io
+    import json
+    import base64
+    from urllib.parse import urlencode
+    from wsgiref.util import setup_testing_defaults
+
+    if form is not None:
+        data = urlencode(form).encode()
+    else:
+        data = json.dumps(body).encode() if body is not None else b""
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': restapi.apiroot + path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': "application/x-www-form-urlencoded" if form is not None else "application/json",
+        'CONTENT_LENGTH': str(len(data)),
+        'HTTP_AUTHORIZATION': "Basic " + base64.b64encode(b"token:").decode(),
+        'wsgi.input': io.BytesIO(data)}
+    setup_testing_defaults(environ)
+    status = []
+    out = b"".join(restapi.app(environ, lambda s, headers, exc_info=None: status.append(s)))
+    return int(status[0].split()[0]), json.loads(out.decode()) if out else None
+
+
+def test_create_scheduled_tasks_bulk(restapi, monkeypatch):
+    added = []
+    found = []
+
+    class AkrrDaemon:
+        def __init__(self, adding_new_tasks=False):
+            assert adding_new_tasks
+
+        def add_tasks(self, tasks):
+            added.extend(tasks)
+            return list(range(100, 100 + 2 * len(tasks), 2))
+
+    monkeypatch.setattr(restapi.daemon, "AkrrDaemon", AkrrDaemon)
+    monkeypatch.setattr(restapi.cfg, "find_resource_by_name", lambda name: found.append(name))
+    monkeypatch.setattr(restapi.cfg, "find_app_by_name", lambda name: found.append(name))
+
+    tasks = [{'resource': "alpha", 'app': "test", 'resource_param': "{'nnodes':%d}" % n} for n in (1, 2, 4)]
+    status, r = call(restapi, "POST", "/scheduled_tasks/bulk", {'tasks': tasks})
+    assert status == 200
+    assert r['data']['data']['task_ids'] == [100, 102, 104]
+    assert [t['resource_param'] for t in added] == ["{'nnodes':1}", "{'nnodes':2}", "{'nnodes':4}"]
+    assert added[0]['task_param'] == "{}"
+    # resource and app are validated once
+    assert found == ["alpha", "test"]
+
+    status, _ = call(restapi, "POST", "/scheduled_tasks/bulk", {'tasks': [dict(tasks[0], unknown=1)]})
+    assert status == 400
+    status, _ = call(restapi, "POST", "/scheduled_tasks/bulk", {'tasks': [{'resource': "alpha"}]})
+    assert status == 400
+    status, _ = call(restapi, "POST", "/scheduled_tasks/bulk", {'task': tasks})
+    assert status == 400
+
+
+@pytest.fixture
+def akrr_pool(restapi, monkeypatch, fake_db):
+    """pool of connections to fake mod_akrr used by akrr.db.get_akrr_db"""
+    import akrr.db
+    import akrr.util.sql
+
+    monkeypatch.setattr(akrr.util.sql, "get_con_to_db", lambda *args, **kwargs: fake_db.connect())
+    monkeypatch.setitem(akrr.db._pools, "akrr", akrr.util.sql.ConnectionPool("user", "password"))
+    return akrr.db._pools["akrr"]
+
+
+def test_update_active_tasks(restapi, akrr_pool, fake_db):
+    import akrr.db
+
+    def select_active_task(cur, query, args):
+        """active task 5 with last committed next_check_time"""
+        row = {'task_id': 5, 'task_lock': 0, 'next_check_time': None}
+        for q, a in fake_db.committed:
+            if "SET next_check_time" in q and a[1] == row['task_id']:
+                row['next_check_time'] = a[0]
+        return [row] if args[0] == row['task_id'] else []
+
+    fake_db.results["FROM active_tasks"] = select_active_task
+    status, r = call(restapi, "PUT", "/active_tasks/5", form={'next_check_time': "2030-01-01 10:00:00"})
+    assert status == 200 and r['data']['success']
+
+    # change is seen from another connection
+    con, cur = akrr.db.get_akrr_db(True)
+    cur.execute("SELECT * FROM active_tasks WHERE task_id=%s", (5,))
+    assert str(cur.fetchall()[0]['next_check_time']) == "2030-01-01 10:00:00"
+    con.close()
+    assert all(len(c.pending) == 0 for c in fake_db.connections)
+
+
+@pytest.fixture
+def server(restapi):
+    """start plain HTTP server with REST API threads pool and keep-alive handler, app is set by test"""
+    import threading
+    from wsgiref.simple_server import make_server
+
+    servers = []
+
+    def start(wsgi_app, max_threads, keep_alive_timeout=30.0):
+        handler_class = type("RequestHandler", (restapi._KeepAliveRequestHandler,), {
+            'timeout': keep_alive_timeout, 'quiet': True})
+        server_class = type("Server", (restapi._ThreadPoolWSGIServer,), {'max_threads': max_threads})
+        srv = make_server("127.0.0.1", 0, wsgi_app, server_class=server_class, handler_class=handler_class)
+        threading.Thread(target=srv.serve_forever, kwargs={'poll_interval': 0.1}, daemon=True).start()
+        servers.append(srv)
+        return srv.server_address[1]
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+def get(connection, path="/"):
+    connection.request("GET", path)
+    response = connection.getresponse()
+    return response.status, response.read().decode()
+
+
+def test_keep_alive_concurrent_requests(server):
+    import threading
+    import http.client
+
+    # both connections should be served at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=10)
+
+    def wsgi_app(environ, start_response):
+        if environ['PATH_INFO'] == "/barrier":
+            barrier.wait()
+        body = threading.current_thread().name.encode()
+        start_response("200 OK", [('Content-Type', "text/plain"), ('Content-Length', str(len(body)))])
+        return [body]
+
+    port = server(wsgi_app, max_threads=2)
+    responses = {}
+
+    def client(name):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=20)
+        r = [get(connection, "/barrier")]
+        sock = connection.sock
+        r += [get(connection) for _ in range(3)]
+        # same connection is reused for all requests
+        responses[name] = (r, connection.sock is sock)
+        connection.close()
+
+    clients = [threading.Thread(target=client, args=(name,)) for name in ("a", "b")]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join(30)
+
+    assert sorted(responses) == ["a", "b"]
+    threads = set()
+    for r, same_socket in responses.values():
+        assert same_socket
+        assert all(status == 200 for status, _ in r)
+        # kept alive connection is served by single thread
+        assert len({thread for _, thread in r}) == 1
+        threads.add(r[0][1])
+    assert len(threads) == 2
+
+
+def test_keep_alive_releases_thread(server):
+    import time
+    import http.client
+
+    def wsgi_app(_environ, start_response):
+        start_response("200 OK", [('Content-Type', "text/plain"), ('Content-Length', "2")])
+        return [b"ok"]
+
+    port = server(wsgi_app, max_threads=1, keep_alive_timeout=30.0)
+
+    idle = http.client.HTTPConnection("127.0.0.1", port, timeout=20)
+    assert get(idle) == (200, "ok")
+
+    # idle kept alive connection holds the only thread, it should be given up for waiting connection
+    t0 = time.time()
+    other = http.client.HTTPConnection("127.0.0.1", port, timeout=20)
+    assert get(other) == (200, "ok")
+    assert time.time() - t0 < 10.0
+    other.close()
+    idle.close()
@@ -45,3 +45,110 @@ def test_appkeroutputparser(datadir):
     assert stats.find(".//statistic[ID='Task working directory exists']").find('value').text == '1'
     assert float(xml_out.find(".//statistic[ID='Wall Clock Time']").find('value').text) == 2.0
     assert xml_out.find('./exitStatus/completed').text == "false"
+
+
+def test_line_pipeline():
+    from akrr.parsers.akrrappkeroutputparser import LinePipeline
+
+    lines = [
+        "Version: 1.2\n",
+        "Table\n",
+        "header\n",
+        "a 1\n",
+        "b 2\n",
+        "End\n",
+        "Time: 10.5\n",
+        "Time: 11.5\n",
+    ]
+    found = {'version': None, 'rows': [], 'times': [], 'section_ended': False, 'n_lines': 0}
+
+    def count_line(line):
+        found['n_lines'] += 1
+
+    def set_version(m):
+        found['version'] = m.group(1)
+
+    def add_time(m):
+        found['times'].append(float(m.group(1)))
+        return True
+
+    def section_ended():
+        found['section_ended'] = True
+
+    pipeline = LinePipeline()
+    pipeline.add(None, count_line)
+    pipeline.add(r'^Version:\s+(\S+)', set_version)
+    pipeline.add_section(r'^Table', lambda line: found['rows'].append(line.split()), skip=1,
+                         end_pattern=r'^End', on_end=section_ended)
+    pipeline.add(r'Time:\s+([0-9.]+)', add_time, search=True)
+    # not reached, previous handler stops dispatch
+    pipeline.add(r'Time:', set_version)
+    pipeline.process(lines)
+
+    assert found['version'] == "1.2"
+    assert found['rows'] == [['a', '1'], ['b', '2']]
+    assert found['section_ended'] is True
+    assert found['times'] == [10.5, 11.5]
+    # lines within section are consumed by section
+    assert found['n_lines'] == 4
+
+    # section terminated by max_lines and by the end of input
+    found['rows'] = []
+    pipeline = LinePipeline()
+    pipeline.add_section(r'^Table', lambda line: found['rows'].append(line.strip()), max_lines=2)
+    pipeline.process(lines)
+    assert found['rows'] == ["header", "a 1"]
+
+    found['section_ended'] = False
+    pipeline = LinePipeline()
+    pipeline.add_section(r'^Time', lambda line: None, on_end=section_ended)
+    pipeline.process(lines)
+    assert found['section_ended'] is True
+
+
+def test_metric_store():
+    from akrr.parsers.akrrappkeroutputparser import AppKerOutputParser
+
+    parser = AppKerOutputParser(name='test')
+    parser.set_parameter("b", "1")
+    parser.set_parameter("a", "2", units="MByte")
+    parser.set_parameter("b", "3")
+    parser.set_parameter("c", None)
+    parser.set_statistic("s", "1.5", "Second", group="details")
+
+    # last set value wins
+    assert parser.get_parameter("b") == "3"
+    assert parser.get_parameter("c") is None
+    assert [p.name for p in parser.get_unique_parameters()] == ["a", "b"]
+    assert list(parser.get_unique_parameters()[0]) == ["a", "2", "MByte", None, "summary", None]
+    assert parser.get_unique_statistic()[0][AppKerOutputParser.METRIC_GROUP] == "details"
+    assert "s" in parser.statistics
+    assert len(parser.parameters) == 2
+
+
+def test_appker_result():
+    from akrr.parsers.akrrappkeroutputparser import AppKerOutputParser
+    import xml.etree.ElementTree as ElementTree
+
+    parser = AppKerOutputParser(name='test')
+    parser.add_must_have_statistic("Wall Clock Time")
+    parser.set_parameter("App:Version", "1.0")
+    parser.set_statistic("Wall Clock Time", "12.5", "Second")
+    parser.set_statistic("Detailed Time", "1.5", "Second", group="details")
+
+    xml_text = parser.get_xml()
+    assert xml_text.startswith('<?xml version="1.0" ?>\n<rep:report xmlns:rep="report">\n  <body>\n')
+    result = xml_text.result
+    assert result.completed is True
+    assert result.get_statistic("Wall Clock Time") == "12.5"
+
+    # report and DB body are made from same structured result
+    xml_out = ElementTree.fromstring(xml_text)
+    assert xml_out.find('./exitStatus/completed').text == "true"
+    assert xml_out.find(".//details/statistics/statistic[ID='Detailed Time']/value").text == "1.5"
+    body = result.get_performance_xml()
+    assert body.startswith("<performance>\n    <ID>test</ID>\n")
+    body_out = ElementTree.fromstring(body)
+    performance_out = xml_out.find('./body/performance')
+    assert [(e.tag, (e.text or "").strip()) for e in body_out.iter()] == [
+        (e.tag, (e.text or "").strip()) for e in performance_out.iter()]
@@ -265,3 +265,22 @@ def test_parser_v33(datadir):
     assert len(parstat_val(params, "RunEnv:Nodes")) > 5
     assert parstat_val(params, "App:Version") == "3.3.0+dev"
     assert parstat_val(params, "HDF Version") == "1.10.4 (Parallel)"
+
+
+def test_ior_result_lines(datadir):
+    from akrr.parsers.akrrappkeroutputparser import AppKerOutputParser
+    from akrr.parsers.ior_parser import add_ior_result_lines_handlers
+
+    # only lines used by version specific processing are kept
+    for version in ("v30", "v32", "v33"):
+        appstdout = str(datadir / version / 'appstdout')
+        with open(appstdout) as fin:
+            all_lines = fin.readlines()
+        lines = []
+        parser = AppKerOutputParser()
+        add_ior_result_lines_handlers(parser, lines)
+        parser.appstdout_pipeline.process_file(appstdout)
+        assert len(lines) < 0.6 * len(all_lines)
+        for prefix in ("# Starting Test:", "Summary of all tests:"):
+            assert [line for line in all_lines if line.startswith(prefix)] == \
+                [line for line in lines if line.startswith(prefix)]
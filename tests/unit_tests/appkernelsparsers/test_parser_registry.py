@@ -0,0 +1,38 @@
+def test_parser_registry(tmpdir):
+    import os
+    import sys
+    from akrr.parsers.registry import ParserRegistry
+
+    parser_file = tmpdir / "registry_test_parser.py"
+    parser_file.write("def process_appker_output(**kwargs):\n    return 'v1'\n")
+
+    registry = ParserRegistry(parsers_dir=str(tmpdir))
+    module = registry.get_module("registry_test_parser.py")
+    assert module.__name__ == "akrr.parsers.registry_test_parser"
+    # imported only once
+    assert registry.get_module("registry_test_parser.py") is module
+    assert registry.process_appker_output("test", "registry_test_parser.py", appstdout=None) == "v1"
+    assert registry.process_appker_output("test", "registry_test_parser.py", appstdout=None) == "v1"
+
+    # modified parser is re-imported
+    parser_file.write("def process_appker_output(**kwargs):\n    return 'v2'\n")
+    mtime = os.stat(str(parser_file)).st_mtime
+    os.utime(str(parser_file), (mtime + 10, mtime + 10))
+    assert registry.get_module("registry_test_parser.py") is not module
+    assert registry.process_appker_output("test", "registry_test_parser.py") == "v2"
+
+    stats = registry.get_stats()
+    assert stats["test"]["count"] == 3
+    assert stats["test"]["failed"] == 0
+    assert stats["test"]["mean_time"] <= stats["test"]["max_time"]
+
+    del sys.modules["akrr.parsers.registry_test_parser"]
+
+
+def test_parser_registry_akrr_parsers():
+    from akrr.parsers.registry import ParserRegistry
+    import akrr.parsers.test_parser
+
+    # already imported parsers are reused
+    registry = ParserRegistry()
+    assert registry.get_module("test_parser.py") is akrr.parsers.test_parser
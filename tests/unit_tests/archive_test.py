@@ -0,0 +1,91 @@
+"""
+Tests for akrr.archive
+"""
+
+
+def _make_task(comp_task_dir, resource, app, time_stamp):
+    import os
+    from akrr.util.time import time_stamp_to_datetime
+
+    activate_time = time_stamp_to_datetime(time_stamp)
+    task_dir = os.path.join(comp_task_dir, resource, app, str(activate_time.year), "%02d" % activate_time.month,
+                            time_stamp)
+    os.makedirs(os.path.join(task_dir, "proc"))
+    with open(os.path.join(task_dir, "proc", "log"), "wt") as fout:
+        fout.write("log of %s\n" % time_stamp * 100)
+    return task_dir
+
+
+def test_archive(tmpdir):
+    import os
+    import datetime
+    import shutil
+    import tarfile
+    import pytest
+    from akrr.akrrerror import AkrrError
+    from akrr.archive import Archive, extract_task
+
+    comp_task_dir = str(tmpdir / "comptasks")
+    recent_time_stamp = datetime.datetime.now().strftime("%Y.%m.%d.%H.%M.%S.000004")
+    task_dirs = [_make_task(comp_task_dir, "Alpha", "namd", time_stamp) for time_stamp in (
+        "2019.05.01.10.00.00.000001", "2019.05.02.10.00.00.000002", "2019.06.02.10.00.00.000003",
+        recent_time_stamp)]
+    # old layout
+    os.makedirs(os.path.join(comp_task_dir, "Alpha", "hpcc", "2018.01.01.10.00.00.000005"))
+
+    archive = Archive(comp_task_dir=comp_task_dir, processes=2)
+    assert sorted(archive.get_tasks_dir_list()) == sorted(
+        task_dirs + [os.path.join(comp_task_dir, "Alpha", "hpcc", "2018.01.01.10.00.00.000005")])
+    assert sorted(archive.get_tasks_dir_list(appkernels=["namd"])) == sorted(task_dirs)
+
+    # tar-gzip tasks
+    archive.archive_tasks(days_old=90, appkernels=["namd"])
+    assert archive.get_tasks_dir_list(appkernels=["namd"]) == [task_dirs[3]]
+    assert os.path.isfile(task_dirs[0] + ".tar.gz")
+
+    # pack months
+    archive.archive_tasks_by_months(months_old=6, appkernels=["namd"])
+    year_dir = os.path.join(comp_task_dir, "Alpha", "namd", "2019")
+    assert sorted(os.listdir(year_dir)) == ["05.tar", "05.tar.index", "06.tar", "06.tar.index"]
+
+    # single task lookup
+    task_dir = extract_task(task_dirs[1], str(tmpdir / "out"))
+    assert task_dir == str(tmpdir / "out" / "2019.05.02.10.00.00.000002")
+    with open(os.path.join(task_dir, "proc", "log"), "rt") as fin:
+        assert fin.read().startswith("log of 2019.05.02.10.00.00.000002")
+    assert extract_task(task_dirs[3]) == task_dirs[3]
+
+    # restored in place task is packed again
+    assert extract_task(task_dirs[0]) == task_dirs[0]
+    archive.archive_tasks_by_months(months_old=6, appkernels=["namd"])
+    assert sorted(os.listdir(year_dir)) == ["05.tar", "05.tar.index", "06.tar", "06.tar.index"]
+    task_dir = extract_task(task_dirs[0], str(tmpdir / "out2"))
+    assert os.path.isfile(os.path.join(task_dir, "proc", "log"))
+
+    # month archive made by earlier versions
+    month_dir = os.path.join(comp_task_dir, "Alpha", "lammps", "2019", "05")
+    task_dir = _make_task(comp_task_dir, "Alpha", "lammps", "2019.05.03.10.00.00.000006")
+    with tarfile.open(month_dir + ".tar.gz", "w|gz") as targz:
+        targz.add(month_dir, "05")
+    shutil.rmtree(month_dir)
+    task_dir = extract_task(task_dir, str(tmpdir / "out3"))
+    assert os.path.isfile(os.path.join(task_dir, "proc", "log"))
+
+    with pytest.raises(AkrrError):
+        extract_task(os.path.join(month_dir, "2019.05.04.10.00.00.000007"), str(tmpdir / "out4"))
+
+
+def test_archive_cli():
+    import argparse
+    from akrr.cli.commands import add_command_archive
+
+    parser = argparse.ArgumentParser()
+    add_command_archive(parser.add_subparsers())
+
+    args = parser.parse_args(["archive", "update-state-dumps", "-r", "Alpha", "-p", "4"])
+    assert args.func.__qualname__.startswith("cli_archive_update_state_dumps")
+    assert args.resource == "Alpha" and args.protocol == 4
+
+    args = parser.parse_args(["archive", "-p", "3"])
+    assert args.func.__qualname__.startswith("add_command_archive")
+    assert args.processes == 3
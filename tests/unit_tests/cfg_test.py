@@ -0,0 +1,44 @@
+"""
+Tests for akrr.cfg
+"""
+
+
+def test_invalidate_cfg_cache(akrr_home, monkeypatch):
+    import os
+    import akrr.cfg as cfg
+
+    resource_dir = akrr_home.join("etc", "resources").mkdir("cfg_test_resource")
+    resource_cfg_filename = resource_dir.join("resource.conf")
+    resource_cfg_filename.write("ppn = 8\n")
+    default_resource_cfg_filename = akrr_home.join("default.resource.conf")
+    default_resource_cfg_filename.write("")
+
+    loaded = []
+
+    def load_resource(resource_name):
+        loaded.append(resource_name)
+        return {
+            'name': resource_name,
+            'default_resource_cfg_filename': str(default_resource_cfg_filename),
+            'default_resource_cfg_file_last_mod_time': os.path.getmtime(str(default_resource_cfg_filename)),
+            'resource_cfg_filename': str(resource_cfg_filename),
+            'resource_cfg_file_last_mod_time': os.path.getmtime(str(resource_cfg_filename))}
+
+    monkeypatch.setattr(cfg, "load_resource", load_resource)
+    monkeypatch.setattr(cfg, "cfg_files_check_period", 3600.0)
+
+    cfg.find_resource_by_name("cfg_test_resource")
+    assert loaded == ["cfg_test_resource"]
+
+    resource_cfg_filename.write("ppn = 16\n")
+    os.utime(str(resource_cfg_filename), (0, 0))
+    # files are not checked within cfg_files_check_period
+    cfg.find_resource_by_name("cfg_test_resource")
+    assert len(loaded) == 1
+    # unless cache is invalidated, e.g. after configuration is edited in this process
+    cfg.invalidate_cfg_cache()
+    cfg.find_resource_by_name("cfg_test_resource")
+    assert len(loaded) == 2
+
+    del cfg.resources["cfg_test_resource"]
+    resource_dir.remove()
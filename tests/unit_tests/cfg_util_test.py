@@ -0,0 +1,66 @@
+"""
+Tests for akrr.cfg_util
+"""
+
+
+def test_lazy_cfg_dict():
+    from akrr.cfg_util import LazyCfgDict
+
+    loaded = []
+
+    def load(name):
+        loaded.append(name)
+        if name == "broken":
+            raise ValueError("can not parse")
+        return {"name": name}
+
+    cfgs = LazyCfgDict(lambda: ["alpha", "bravo", "broken"], load)
+    assert cfgs["bravo"] == {"name": "bravo"}
+    assert loaded == ["bravo"]
+    assert "alpha" in cfgs and "charlie" not in cfgs and "broken" not in cfgs
+    assert sorted(cfgs.get_loaded()) == ["alpha", "bravo"]
+
+    # broken configuration is not reloaded
+    assert list(cfgs) == ["alpha", "bravo"]
+    assert loaded == ["bravo", "alpha", "broken"]
+
+    del cfgs["alpha"]
+    cfgs.load_all()
+    assert len(cfgs) == 2 and loaded[-1] == "alpha"
+    cfgs["broken"] = {"name": "broken"}
+    assert dict(cfgs.items()) == {"alpha": {"name": "alpha"}, "bravo": {"name": "bravo"},
+                                  "broken": {"name": "broken"}}
+
+
+def test_cached_cfg(tmpdir, monkeypatch):
+    import os
+    import akrr.cfg_util
+    from akrr.cfg_util import get_files_mtime, load_cached_cfg, save_cached_cfg
+
+    cfg_filename = str(tmpdir / "resource.conf")
+    missing_filename = str(tmpdir / "missing.conf")
+    cache_filename = str(tmpdir / "cache" / "resource.alpha.pickle")
+    with open(cfg_filename, "wt") as fout:
+        fout.write("ppn = 8\n")
+    files = [cfg_filename, missing_filename]
+
+    assert load_cached_cfg(cache_filename, files) is None
+    save_cached_cfg(cache_filename, get_files_mtime(files), {"ppn": 8})
+    assert load_cached_cfg(cache_filename, files) == {"ppn": 8}
+    # other set of files
+    assert load_cached_cfg(cache_filename, [cfg_filename]) is None
+
+    # modified file
+    os.utime(cfg_filename, ns=(0, os.stat(cfg_filename).st_mtime_ns + 1000000))
+    assert load_cached_cfg(cache_filename, files) is None
+
+    # cache made by other akrr version
+    save_cached_cfg(cache_filename, get_files_mtime(files), {"ppn": 8})
+    assert load_cached_cfg(cache_filename, files) == {"ppn": 8}
+    monkeypatch.setattr(akrr.cfg_util, "akrrversion", "0.0.1")
+    assert load_cached_cfg(cache_filename, files) is None
+
+    # configurations which can not be pickled are not cached
+    save_cached_cfg(cache_filename, get_files_mtime(files), {"os": os})
+    assert load_cached_cfg(cache_filename, files) is None
+    assert os.listdir(str(tmpdir / "cache")) == ["resource.alpha.pickle"]
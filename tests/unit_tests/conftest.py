@@ -44,3 +44,133 @@ def testconfig():
 
     __testconfig["loads count"] += 1
     return __testconfig
+
+
+@fixture(scope="session")
+def akrr_home(tmpdir_factory):
+    """
+    minimal AKRR_HOME with empty akrr.conf, so that modules which import akrr.cfg can be loaded.
+    akrr.cfg is loaded once per session so all tests see the same configuration.
+    """
+    home = tmpdir_factory.mktemp("akrr_home")
+    etc = home.mkdir("etc")
+    etc.mkdir("resources")
+    etc.join("akrr.conf").write("")
+    etc.join("server.pem").write("")
+    os.environ["AKRR_HOME"] = str(home)
+    return home
+
+
+class FakeCursor:
+    """
+    MySQLdb cursor substitute, executed queries are recorded in queries as (query, args).
+    Rows of query are taken from results {query substring: rows}, first matching entry is used,
+    rows can be callable(cur, query, args) returning rows, it can also raise or set lastrowid.
+    """
+    def __init__(self, con=None, results=None):
+        self.connection = con
+        self.results = results if results is not None else {}
+        self.queries = []
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+        self.closed = False
+
+    def execute(self, query, args=None):
+        self.queries.append((query, args))
+        self.rows = []
+        for key, rows in self.results.items():
+            if key in query:
+                self.rows = list(rows(self, query, args) if callable(rows) else rows)
+                break
+        self.rowcount = len(self.rows)
+        if self.connection is not None:
+            self.connection.on_execute(query, args)
+
+    def executemany(self, query, args):
+        for a in args:
+            self.execute(query, a)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if len(self.rows) > 0 else None
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """
+    MySQLdb connection substitute, counts commits and rollbacks.
+    Data modifications are kept in pending till commit and then are added to db.committed.
+    """
+    def __init__(self, db=None, results=None, fail_commit=False, alive=True):
+        self.db = db
+        self.results = results
+        self.fail_commit = fail_commit
+        self.alive = alive
+        self.commits = 0
+        self.rollbacks = 0
+        self.pings = 0
+        self.pending = []
+        self.closed = False
+
+    def on_execute(self, query, args):
+        words = query.split(None, 1)
+        if len(words) > 0 and words[0].upper() in ("INSERT", "UPDATE", "DELETE", "REPLACE"):
+            self.pending.append((query, args))
+
+    def cursor(self, *_):
+        return FakeCursor(self, self.results if self.results is not None else getattr(self.db, "results", None))
+
+    def ping(self):
+        self.pings += 1
+        if not self.alive:
+            raise Exception("MySQL server has gone away")
+
+    def commit(self):
+        if self.fail_commit or not self.alive:
+            raise Exception("lost connection")
+        self.commits += 1
+        if self.db is not None:
+            self.db.committed += self.pending
+        self.pending = []
+
+    def rollback(self):
+        if not self.alive:
+            raise Exception("MySQL server has gone away")
+        self.rollbacks += 1
+        self.pending = []
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDB:
+    """
+    Database shared by fake connections, committed data modifications are in committed as (query, args),
+    results are default results of connections cursors
+    """
+    def __init__(self):
+        self.committed = []
+        self.results = {}
+        self.connections = []
+
+    def connect(self, **kwargs):
+        """return new (connection, cursor)"""
+        con = FakeConnection(self, **kwargs)
+        self.connections.append(con)
+        return con, con.cursor()
+
+    def cursor(self, results=None):
+        """return cursor without connection"""
+        return FakeCursor(results=results if results is not None else self.results)
+
+
+@fixture
+def fake_db():
+    """fake MySQL database, see FakeDB"""
+    return FakeDB()
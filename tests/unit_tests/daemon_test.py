@@ -0,0 +1,302 @@
+"""
+Tests for akrr.daemon
+"""
+import pytest
+
+
+@pytest.fixture
+def daemon(akrr_home):
+    pytest.importorskip("MySQLdb")
+    import akrr.daemon
+    return akrr.daemon
+
+
+def test_reprocess_tasks(daemon, monkeypatch, fake_db):
+    def reprocess_task(task, cur):
+        cur.execute("push", (task[0],))
+        return {'task_id': task[0], 'status': task[2], 'status_info': None, 'new_status': "new",
+                'new_status_info': None, 'error': "failed" if task[0] == 2 else None}
+
+    monkeypatch.setattr(daemon, "_reprocess_task", reprocess_task)
+    con, cur = fake_db.connect()
+    monkeypatch.setattr(daemon, "_reprocess_db", con)
+    monkeypatch.setattr(daemon, "_reprocess_cur", cur)
+    monkeypatch.setattr(daemon, "_reprocess_innodb", True)
+
+    tasks = [(task_id, None, "old", None, None, "resource", "app") for task_id in (1, 2, 3)]
+    results = daemon._reprocess_tasks(tasks)
+    assert [r['error'] for r in results] == [None, "failed", None]
+    # single commit per chunk, failed task is rolled back to its savepoint
+    assert con.commits == 1
+    assert [q for q, _ in cur.queries].count("SAVEPOINT reprocess_task") == 3
+    assert cur.queries[2:5] == [("SAVEPOINT reprocess_task", None), ("push", (2,)),
+                                ("ROLLBACK TO SAVEPOINT reprocess_task", None)]
+
+    con, _ = fake_db.connect(fail_commit=True)
+    monkeypatch.setattr(daemon, "_reprocess_db", con)
+    results = daemon._reprocess_tasks(tasks)
+    assert con.rollbacks == 1
+    assert all(r['error'] is not None for r in results)
+
+
+def test_reprocess_tasks_myisam(daemon, monkeypatch, fake_db):
+    # on MyISAM previous results of failed task are restored and output blobs of failed attempt are deleted
+    def reprocess_task(task, cur):
+        cur.execute("UPDATE akrr_xdmod_instanceinfo SET status=0 WHERE instance_id=%s", (task[0],))
+        return {'task_id': task[0], 'status': task[2], 'status_info': None, 'new_status': "new",
+                'new_status_info': None, 'error': "failed"}
+
+    def select(columns, rows):
+        def f(cur, *_):
+            cur.description = [(c,) for c in columns]
+            return rows
+        return f
+
+    monkeypatch.setattr(daemon, "_reprocess_task", reprocess_task)
+    con, cur = fake_db.connect(results={
+        "SELECT * FROM akrr_xdmod_instanceinfo": select(("instance_id", "status"), [(5, 1)]),
+        "SELECT * FROM akrr_errmsg": select(("task_id", "appstdout"), []),
+        "SELECT * FROM akrr_task_output": select(("task_id", "name", "blob_id"), [(5, "appstdout", 3)]),
+        "SELECT blob_id FROM akrr_task_output": [(4,)],
+        "FROM akrr_output_blob WHERE id=": [(4,)],
+        "FROM akrr_task_output WHERE blob_id": [(0,)],
+    })
+    monkeypatch.setattr(daemon, "_reprocess_db", con)
+    monkeypatch.setattr(daemon, "_reprocess_cur", cur)
+    monkeypatch.setattr(daemon, "_reprocess_innodb", False)
+
+    results = daemon._reprocess_tasks([(5, None, "old", None, None, "resource", "app")])
+    assert results[0]['error'] == "failed"
+    assert con.commits == 1
+    assert fake_db.committed == [
+        ("UPDATE akrr_xdmod_instanceinfo SET status=0 WHERE instance_id=%s", (5,)),
+        ("DELETE FROM akrr_xdmod_instanceinfo WHERE instance_id=%s", (5,)),
+        ("INSERT INTO akrr_xdmod_instanceinfo (instance_id,status) VALUES (%s,%s)", [5, 1]),
+        ("DELETE FROM akrr_errmsg WHERE task_id=%s", (5,)),
+        ("DELETE FROM akrr_task_output WHERE task_id=%s", (5,)),
+        ("INSERT INTO akrr_task_output (task_id,name,blob_id) VALUES (%s,%s,%s)", [5, "appstdout", 3]),
+        ("DELETE FROM akrr_output_chunk WHERE blob_id=%s", (4,)),
+        ("DELETE FROM akrr_output_blob WHERE id=%s", (4,))]
+
+
+def get_db_for_add_tasks(fake_db, fail_on_insert=None):
+    """DB with auto increment going in steps of 2, cur.inserts is number of inserts"""
+    con, cur = fake_db.connect()
+    cur.lastrowid = 8
+    cur.inserts = 0
+
+    def insert(cur, *_):
+        cur.inserts += 1
+        if cur.inserts == fail_on_insert:
+            raise Exception("insert failed")
+        cur.lastrowid += 2
+        return []
+
+    cur.results["INSERT INTO scheduled_tasks"] = insert
+    return cur, con
+
+
+def get_daemon_for_add_tasks(daemon, monkeypatch, cur, con):
+    monkeypatch.setattr(daemon.cfg, "find_resource_by_name", lambda name: {'name': name})
+    monkeypatch.setattr(daemon.cfg, "find_app_by_name", lambda name: {'name': name})
+    # daemon without DB connection from __init__
+    d = daemon.AkrrDaemon.__new__(daemon.AkrrDaemon)
+    d.dbCur, d.dbCon = cur, con
+    d.timers = []
+    return d
+
+
+def test_add_tasks(daemon, monkeypatch, fake_db):
+    import datetime
+
+    cur, con = get_db_for_add_tasks(fake_db)
+    d = get_daemon_for_add_tasks(daemon, monkeypatch, cur, con)
+    tasks = [{'resource': "alpha", 'app': "test", 'resource_param': "{'nnodes':%d}" % n,
+              'time_to_start': datetime.datetime(2030, 1, 1)} for n in (1, 2, 4)]
+    tasks[2]['parent_task_id'] = 5
+
+    task_ids = d.add_tasks(tasks)
+    assert task_ids == [10, 12, 14]
+    assert cur.inserts == 3 and con.commits == 1
+    update_query, update_args = cur.queries[-1]
+    assert update_query.strip().startswith("UPDATE scheduled_tasks") and update_args == [10, 12, 14]
+    assert sorted(task_id for _, event_type, task_id in d.timers if event_type == 'scheduled') == [10, 12, 14]
+    # nnodes column
+    assert [args[9] for q, args in cur.queries if q.strip().startswith("INSERT")] == [1, 2, 4]
+
+    assert d.add_tasks(tasks, dry_run=True) == [None] * 3
+    assert d.add_tasks([]) == []
+
+
+def test_add_tasks_rollback(daemon, monkeypatch, fake_db):
+    cur, con = get_db_for_add_tasks(fake_db, fail_on_insert=2)
+    d = get_daemon_for_add_tasks(daemon, monkeypatch, cur, con)
+    with pytest.raises(Exception):
+        d.add_tasks([{'resource': "alpha", 'app': "test", 'resource_param': "{'nnodes':1}"}] * 3)
+    assert con.rollbacks == 1 and con.commits == 0
+    assert d.timers == []
+
+
+def get_daemon_for_timers(daemon, cur=None, con=None):
+    # daemon without DB connection from __init__
+    d = daemon.AkrrDaemon.__new__(daemon.AkrrDaemon)
+    d.dbCur, d.dbCon = cur, con
+    d.timers = []
+    d.timers_seed_time = None
+    d.timers_need_reseed = True
+    d.workers = []
+    d.timer_no_new_tasks = None
+    d.timer_no_active_tasks_check = None
+    d.wakeup_reader, d.wakeup_writer = None, None
+    d.bRunActiveTasks_CheckTheStep = True
+    return d
+
+
+def test_timers(daemon, fake_db):
+    import datetime
+
+    time_now = datetime.datetime.today()
+    past, future = time_now - datetime.timedelta(minutes=1), time_now + datetime.timedelta(days=1)
+    fake_db.results.update({"FROM scheduled_tasks": [(1, future), (2, None)], "FROM active_tasks": [(3, past)]})
+    con, cur = fake_db.connect()
+    d = get_daemon_for_timers(daemon, cur, con)
+
+    d.seed_timers()
+    assert d.timers_need_reseed is False
+    assert len(d.timers) == 3
+    # only due events are popped, the earliest of not due ones stays on top
+    assert d.pop_due_timers() == {'scheduled', 'active'}
+    assert d.timers == [(future, 'scheduled', 1)]
+    assert d.pop_due_timers() == set()
+
+    d.push_timer(future + datetime.timedelta(days=1), 'active', 4)
+    d.push_timer(past, 'active', 5)
+    assert d.timers[0] == (past, 'active', 5)
+    d.push_timer(None, 'scheduled')
+    assert d.pop_due_timers() == {'scheduled', 'active'}
+    assert [task_id for _, _, task_id in d.timers] == [1, 4]
+
+
+def test_time_to_next_event(daemon, monkeypatch):
+    import datetime
+
+    monkeypatch.setattr(daemon.cfg, "scheduled_tasks_resync_period", datetime.timedelta(minutes=5))
+    d = get_daemon_for_timers(daemon)
+    d.timers_seed_time = datetime.datetime.today()
+    # no events, sleep till resync
+    assert 299.0 < d.get_time_to_next_event() <= 300.0
+
+    d.push_timer(datetime.datetime.today() + datetime.timedelta(seconds=60), 'active', 1)
+    assert 59.0 < d.get_time_to_next_event() <= 60.0
+
+    d.push_timer(datetime.datetime.today() - datetime.timedelta(seconds=60), 'scheduled', 2)
+    assert d.get_time_to_next_event() == 0.0
+
+
+def test_wakeup(daemon, monkeypatch):
+    import datetime
+    import multiprocessing
+
+    monkeypatch.setattr(daemon.cfg, "scheduled_tasks_resync_period", datetime.timedelta(minutes=5))
+    d = get_daemon_for_timers(daemon)
+    d.timers_seed_time = datetime.datetime.today()
+    d.timers_need_reseed = False
+    d.wakeup_reader, d.wakeup_writer = multiprocessing.Pipe(duplex=False)
+
+    d.wake_up()
+    d.wake_up()
+    t0 = datetime.datetime.today()
+    d.wait_for_events()
+    # woken up right away, pipe is drained and timers are reloaded on next pass
+    assert datetime.datetime.today() - t0 < datetime.timedelta(seconds=30)
+    assert d.timers_need_reseed is True
+    assert not d.wakeup_reader.poll()
+
+    d.wakeup_writer.close()
+    d.wakeup_reader.close()
+
+
+def run_the_task_step(resource_name, app_name, time_stamp, fatal_errors_count, fails_to_submit_to_the_queue):
+    import os
+    if resource_name == "crash":
+        os._exit(1)
+    return {'resource': resource_name, 'app': app_name, 'pid': os.getpid()}
+
+
+def test_worker_pool_restart(daemon, monkeypatch):
+    # workers are forked, so they get patched step function
+    monkeypatch.setattr(daemon, "_run_the_task_step", run_the_task_step)
+    d = daemon.AkrrDaemon.__new__(daemon.AkrrDaemon)
+    d.worker_pool = []
+    d.maxTaskHandlers = 1
+    try:
+        worker = d.get_free_worker()
+        worker.submit(1, "alpha", "test", "2030.01.01.00.00.00.000000")
+        assert d.get_free_worker() is None
+        assert worker.conn.poll(30) and worker.has_result()
+        result = worker.get_result()
+        assert result['resource'] == "alpha" and result['pid'] == worker.pid
+        # idle worker is reused
+        assert d.get_free_worker() is worker
+
+        # worker crashed during the step, no result and it is replaced by new one
+        worker.submit(2, "crash", "test", "2030.01.01.00.00.00.000000")
+        worker.process.join(30)
+        assert not worker.process.is_alive()
+        assert worker.get_result() is None
+        new_worker = d.get_free_worker()
+        assert new_worker is not worker and new_worker.process.is_alive()
+        assert d.worker_pool == [new_worker]
+        # pipe of dropped worker is closed
+        assert worker.conn.closed
+
+        new_worker.submit(3, "beta", "test", "2030.01.01.00.00.00.000000")
+        assert new_worker.conn.poll(30)
+        assert new_worker.get_result()['resource'] == "beta"
+    finally:
+        d.stop_worker_pool()
+    assert d.worker_pool == []
+
+
+def test_daemon_checks_db_schema(daemon, monkeypatch, fake_db):
+    from akrr.akrrerror import AkrrError
+
+    # tables of older version without typed task parameters columns
+    fake_db.results["FROM information_schema.COLUMNS"] = [
+        (table, "task_id") for table in ("scheduled_tasks", "active_tasks", "completed_tasks")]
+    monkeypatch.setattr(daemon.akrr.db, "get_akrr_db", lambda *args, **kwargs: fake_db.connect())
+    monkeypatch.setattr(daemon, "_db_schema_checked", False)
+    with pytest.raises(AkrrError, match="akrr update db-schema"):
+        daemon.AkrrDaemon()
+    # nothing is changed in old tables
+    assert fake_db.committed == []
+
+
+@pytest.mark.parametrize("innodb", [True, False])
+def test_activate_scheduled_task_failure(daemon, monkeypatch, fake_db, innodb):
+    import datetime
+
+    cur, con = get_db_for_add_tasks(fake_db)
+    d = get_daemon_for_add_tasks(daemon, monkeypatch, cur, con)
+    d.task_tables_innodb = innodb
+    d.scheduled_tasks_blocked = False
+    # termination signal came during activation
+    d.bRunScheduledTasks = False
+
+    time_to_start = datetime.datetime(2030, 1, 1)
+    # bundle on resource under maintenance, its activation is postponed and subtasks are added
+    task = (7, time_to_start, None, "alpha", "bundle", "{}", "{}", "{'AppKers':['a','b']}", None, None)
+    assert d._activate_scheduled_task(task, "2030-01-01 00:00:00", {"alpha": 1}, {"bundle": 1}, {},
+                                      [(1, "*")], {}, {}) is True
+
+    queries = [q.strip() for q, _ in cur.queries]
+    assert "ROLLBACK TO SAVEPOINT activate_task" in queries
+    i_rollback = queries.index("ROLLBACK TO SAVEPOINT activate_task")
+    undo = cur.queries[i_rollback + 1:]
+    if innodb:
+        assert undo == []
+    else:
+        # subtasks are removed and postponement is reverted
+        assert undo[0] == ("DELETE FROM scheduled_tasks WHERE task_id IN (%s,%s)", [10, 12])
+        assert undo[1][0].startswith("UPDATE scheduled_tasks SET time_to_start") and undo[1][1] == (time_to_start, 7)
+        assert len(undo) == 2
@@ -0,0 +1,116 @@
+"""
+Tests for akrr.db_schema
+"""
+
+
+def test_create_statements():
+    import pytest
+    pytest.importorskip("MySQLdb")
+    from akrr.cli.generate_tables import mod_akrr_create_tables_dict
+    from akrr.db_schema import innodb_tables, get_expected_indexes, get_shadow_create_statement
+
+    for table in innodb_tables:
+        create_statement = mod_akrr_create_tables_dict[table]
+        assert "ENGINE=InnoDB" in create_statement
+        shadow_create_statement = get_shadow_create_statement(table, create_statement)
+        assert shadow_create_statement.strip().startswith("CREATE TABLE `%s_innodb`" % table)
+
+    assert get_expected_indexes(mod_akrr_create_tables_dict["active_tasks"]) == {
+        "task_id", "task_lock_next_check_time", "resource_app_nnodes", "nnodes", "master_task_id",
+        "parent_task_id"}
+    assert "PRIMARY" in get_expected_indexes(mod_akrr_create_tables_dict["scheduled_tasks"])
+
+
+def test_format_explain_report(fake_db):
+    from akrr.db_schema import explain_hot_queries, format_explain_report, hot_queries
+
+    cur = fake_db.cursor(results={
+        "ORDER BY": [("t", "ALL", None, 100, "Using where; Using filesort")],
+        "EXPLAIN": [{"table": "t", "type": "ref", "key": "task_id", "rows": 1, "Extra": None}]})
+    cur.description = [("table",), ("type",), ("key",), ("rows",), ("Extra",)]
+    report = explain_hot_queries(cur)
+    assert len(report) == len(hot_queries)
+    assert all(query.startswith("EXPLAIN ") for query, _ in cur.queries)
+    text, n_issues = format_explain_report(report)
+    assert n_issues == sum(1 for _, query, _ in hot_queries if "ORDER BY" in query)
+    assert "full scan, filesort" in text
+
+
+def test_trigger_statements():
+    from akrr.db_schema import get_unique_key_columns, get_trigger_statements
+
+    assert get_unique_key_columns(
+        "CREATE TABLE `t` (`a` INT, `b` INT, PRIMARY KEY (`a`, `b`), UNIQUE KEY `c` (`c`))") == ["a", "b"]
+    assert get_unique_key_columns("CREATE TABLE `t` (`a` INT, UNIQUE KEY `task_id` (`task_id`))") == ["task_id"]
+
+    statements = get_trigger_statements("t", ["a", "b", "c"], ["a", "b"])
+    assert statements == [
+        "CREATE TRIGGER `t_mig_ins` AFTER INSERT ON `t` FOR EACH ROW "
+        "REPLACE INTO `t_innodb` (`a`,`b`,`c`) VALUES (NEW.`a`,NEW.`b`,NEW.`c`)",
+        "CREATE TRIGGER `t_mig_upd` AFTER UPDATE ON `t` FOR EACH ROW "
+        "REPLACE INTO `t_innodb` (`a`,`b`,`c`) VALUES (NEW.`a`,NEW.`b`,NEW.`c`)",
+        "CREATE TRIGGER `t_mig_del` AFTER DELETE ON `t` FOR EACH ROW "
+        "DELETE FROM `t_innodb` WHERE `a`=OLD.`a` AND `b`=OLD.`b`"]
+
+
+def test_migrate_table_triggers(fake_db):
+    import pytest
+    pytest.importorskip("MySQLdb")
+    from akrr.akrrerror import AkrrError
+    from akrr.db_schema import InnoDBMigration
+
+    def get_db(allow_triggers):
+        def create_trigger(*_):
+            if not allow_triggers:
+                raise Exception("TRIGGER command denied")
+            return []
+
+        return fake_db.connect(results={
+            "CREATE TRIGGER": create_trigger,
+            "SELECT ENGINE": lambda cur, query, args: [] if args[0].endswith("_backup") else [("MyISAM",)],
+            "SHOW COLUMNS": [("task_id",), ("err_regexp_id",)],
+            "SELECT COUNT": [(0,)],
+            "SELECT AUTO_INCREMENT": [(0,)]})
+
+    con, cur = get_db(allow_triggers=True)
+    InnoDBMigration(con, cur).migrate_table("akrr_errmsg")
+    queries = [q for q, _ in cur.queries]
+    triggers = [q for q in queries if q.startswith("CREATE TRIGGER")]
+    assert len(triggers) == 3
+    # triggers are dropped under the lock before tables are swapped
+    i_lock = queries.index("LOCK TABLES `akrr_errmsg` WRITE, `akrr_errmsg_innodb` WRITE")
+    i_rename = [i for i, q in enumerate(queries) if q.startswith("RENAME TABLE")][0]
+    assert any(q.startswith("DROP TRIGGER") for q in queries[i_lock:i_rename])
+
+    # without triggers migration runs only if daemon is down
+    class Migration(InnoDBMigration):
+        daemon_is_running = True
+
+        def _daemon_is_running(self):
+            return self.daemon_is_running
+
+    with pytest.raises(AkrrError):
+        Migration(*get_db(allow_triggers=False)).migrate_table("akrr_errmsg")
+    Migration.daemon_is_running = False
+    con, cur = get_db(allow_triggers=False)
+    Migration(con, cur).migrate_table("akrr_errmsg")
+    assert any(q.startswith("RENAME TABLE") for q, _ in cur.queries)
+
+
+def test_check_param_columns(fake_db):
+    import pytest
+    from akrr.akrrerror import AkrrError
+    from akrr.db_schema import get_missing_param_columns, check_param_columns
+    from akrr.util.task_param import param_columns
+
+    columns = [("scheduled_tasks", c) for c in ("task_id",) + param_columns] + \
+              [{"TABLE_NAME": "active_tasks", "COLUMN_NAME": c} for c in ("task_id",) + param_columns] + \
+              [("completed_tasks", "task_id"), ("completed_tasks", "nnodes")]
+    cur = fake_db.cursor(results={"FROM information_schema.COLUMNS": columns})
+    assert get_missing_param_columns(cur) == {"completed_tasks": ["ncores", "test_run", "n_runs", "master_task_id"]}
+    with pytest.raises(AkrrError, match="akrr update db-schema"):
+        check_param_columns(cur)
+
+    cur = fake_db.cursor(results={"FROM information_schema.COLUMNS": columns[:-2] + [
+        ("completed_tasks", c) for c in param_columns]})
+    check_param_columns(cur)
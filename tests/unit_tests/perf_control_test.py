@@ -0,0 +1,103 @@
+"""
+Tests for akrr.perf.control
+"""
+import datetime
+import statistics
+
+
+def test_running_stats():
+    from akrr.perf.control import RunningStats, RollingMedian
+
+    values = [10.0, 12.5, 9.0, 11.0, 30.0, 10.5]
+    stats = RunningStats()
+    rolling = RollingMedian(3)
+    for i, value in enumerate(values):
+        stats.push(value)
+        rolling.push(value)
+        assert rolling.median == statistics.median(values[max(0, i - 2):i + 1])
+    assert stats.n == len(values)
+    assert abs(stats.mean - statistics.mean(values)) < 1e-12
+    assert abs(stats.variance - statistics.variance(values)) < 1e-12
+    assert (stats.min, stats.max) == (9.0, 30.0)
+    assert RollingMedian(3).median is None
+
+
+def test_get_region():
+    from akrr.perf.control import ControlRegionDef, get_region, get_instance_control_status
+
+    t0 = datetime.datetime(2020, 1, 1)
+    regions = [ControlRegionDef(1, "data_points", t0, None, 5),
+               ControlRegionDef(2, "date_range", t0 + datetime.timedelta(days=10),
+                                t0 + datetime.timedelta(days=20), None)]
+    assert get_region(regions, t0 - datetime.timedelta(days=1)) is None
+    assert get_region(regions, t0).control_region_def_id == 1
+    assert get_region(regions, t0 + datetime.timedelta(days=30)).control_region_def_id == 2
+
+    assert get_instance_control_status(["in_contol", "under_performing"], True) == "under_performing"
+    assert get_instance_control_status(["in_contol", "undefined"], True) == "in_contol"
+    assert get_instance_control_status([], True) == "undefined"
+    assert get_instance_control_status([], False) == "failed"
+
+
+def test_series_state():
+    from akrr.perf.control import ControlRegionDef, SeriesState
+
+    t0 = datetime.datetime(2020, 1, 1)
+    region = ControlRegionDef(1, "data_points", t0, None, 4)
+    # wall clock time, smaller is better
+    state = SeriesState(criteria=2.0, larger=False, window=3)
+    values = [10.0, 11.0, 9.0, 10.0]
+    for i, value in enumerate(values):
+        v = state.push(t0 + datetime.timedelta(days=i), value, region)
+        assert v.controlStatus == "control_region_time_interval"
+    assert state.completed
+    row = state.get_region_row(ak_id=10, metric_id=20)
+    assert row[:4] == (1, 10, 20, 1)
+    assert abs(row[4] - (10.0 - 2.0 * statistics.stdev(values))) < 1e-12
+    assert row[6:] == (9.0, 11.0)
+    assert state.get_region_row(ak_id=10, metric_id=20) is None
+
+    v = state.push(t0 + datetime.timedelta(days=4), 10.5, region)
+    assert v.controlStatus == "in_contol"
+    assert v.running_average == 10.0
+    assert v.control < 0.0
+    assert state.push(t0 + datetime.timedelta(days=5), 20.0, region).controlStatus == "under_performing"
+    assert state.push(t0 + datetime.timedelta(days=6), 5.0, region).controlStatus == "over_performing"
+    assert state.push(t0 + datetime.timedelta(days=7), None, region).controlStatus == "failed"
+    # same result pushed again
+    assert state.push(t0 + datetime.timedelta(days=7), 5.0, region).controlStatus == "failed"
+
+    # new control region starts
+    region2 = ControlRegionDef(2, "date_range", t0 + datetime.timedelta(days=8), t0 + datetime.timedelta(days=10),
+                               None)
+    assert state.push(t0 + datetime.timedelta(days=8), 20.0, region2).controlStatus == "control_region_time_interval"
+    assert state.push(t0 + datetime.timedelta(days=9), 21.0, region2).controlStatus == "control_region_time_interval"
+    assert state.push(t0 + datetime.timedelta(days=10), 20.5, region2).controlStatus == "in_contol"
+    assert state.get_region_row(ak_id=10, metric_id=20)[:4] == (2, 10, 20, 1)
+
+
+def test_control_engine(fake_db):
+    from akrr.perf.control import ControlEngine
+
+    t0 = datetime.datetime(2020, 1, 1)
+    fake_db.results.update({
+        "FROM metric_data WHERE ak_id": [
+            (4, "110", 105.0, 0.5, 80.0, 120.0, 90.0, 110.0, "control_region_time_interval")],
+        "control_region_def_id FROM control_region_def": [(1,)]})
+    con, cur = fake_db.connect()
+    engine = ControlEngine(con, cur, default_points=3, criteria=2.0, window=5)
+    for i, value in enumerate(["100", "110", "90", "105"]):
+        v = engine.push(1, 2, 3, 4, "MFLOP per Second", t0 + datetime.timedelta(days=i), value, True)
+    assert v.controlStatus == "in_contol"
+    assert engine.regions[(1, 2)][0].control_region_def_id == 1
+    assert any(query.startswith("INSERT IGNORE INTO control_region_def") for query, _ in cur.queries)
+    assert engine.pop_region_rows() == [(1, 3, 4, 1, 80.0, 120.0, 90.0, 110.0)]
+
+    assert engine.push(1, 2, 3, 4, "Second", t0, "not a number", True).controlStatus == "undefined"
+    # result ingested again keeps stored control values
+    v = engine.push(1, 2, 3, 4, "Second", t0 + datetime.timedelta(days=1), "110", True)
+    assert v.controlStatus == "control_region_time_interval" and v.running_average == 105.0
+    assert engine.dirty == set()
+    # out of order result
+    assert engine.push(1, 2, 3, 4, "Second", t0 + datetime.timedelta(days=1), "100", True) is None
+    assert engine.dirty == {(1, 2)}
@@ -0,0 +1,131 @@
+"""
+Tests for akrr.perf.ingestor
+"""
+import datetime
+
+body = """<rep:report xmlns:rep="report">
+<body>
+<performance>
+<ID>test</ID>
+<benchmark>
+ <ID>test</ID>
+ <parameters>
+  <parameter><ID>App:ExeBinSignature</ID><value>MD5: 123</value></parameter>
+  <parameter><ID>Number of Nodes</ID><value> 2 </value><units>node</units></parameter>
+ </parameters>
+ <statistics>
+  <statistic><ID>Wall Clock Time</ID><value>10.5</value><units>Second</units></statistic>
+  <statistic><ID>Wall Clock Time</ID><value>11.5</value><units>Second</units></statistic>
+ </statistics>
+</benchmark>
+</performance>
+</body>
+</rep:report>"""
+
+
+def test_parse_body():
+    from akrr.perf.ingestor import parse_body, get_env_version
+
+    parameters, statistics = parse_body(body)
+    assert parameters == [("App:ExeBinSignature", "MD5: 123", None), ("Number of Nodes", "2", "node")]
+    assert statistics == [("Wall Clock Time", "10.5", "Second"), ("Wall Clock Time", "11.5", "Second")]
+    assert get_env_version(parameters) is not None
+    assert get_env_version(parameters[1:]) is None
+
+    assert parse_body(None) == ([], [])
+    assert parse_body("<performance>") == ([], [])
+    assert parse_body("<performance></performance>") == ([], [])
+
+
+def test_mappings():
+    from akrr.perf.ingestor import get_num_units, get_status, get_intervals
+
+    assert get_num_units("namd.4", "node", 1, 8) == 4
+    assert get_num_units("namd", "core", 2, 16) == 16
+    assert get_num_units("namd", "node", 2, 16) == 2
+    assert get_num_units("namd", "node", None, None) == 1
+
+    assert get_status(1, 0) == "success"
+    assert get_status(0, 1) == "error"
+    assert get_status(0, 0) == "failure"
+
+    t0 = datetime.datetime(2020, 1, 1)
+    intervals = get_intervals(t0, t0 + datetime.timedelta(days=10), datetime.timedelta(days=7))
+    assert intervals == [(t0, t0 + datetime.timedelta(days=7)),
+                         (t0 + datetime.timedelta(days=7), t0 + datetime.timedelta(days=10))]
+
+
+def get_db(fake_db):
+    """mod_appkernel with single resource, app kernel and metric, new ids start from 200"""
+    import itertools
+    ids = itertools.count(200)
+    fake_db.results.update({
+        "FROM resource": [(1, "Test Resource", "test")],
+        "FROM app_kernel_def": [(10, "NAMD", "namd", "node")],
+        "SELECT metric_id,name,unit FROM metric": [(100, "Wall Clock Time", "Second")],
+        "WHERE guid=": lambda cur, query, args: [(next(ids),)],
+        "WHERE ak_def_id=%s AND num_units=%s": lambda cur, query, args: [(next(ids),)]})
+    return fake_db.connect()
+
+
+def test_insert_rows(fake_db):
+    from akrr.perf.ingestor import insert_rows
+
+    cur = fake_db.cursor()
+    insert_rows(cur, "INSERT INTO t (a,b)", [(i, i) for i in range(5)], rows_per_statement=2)
+    assert len(cur.queries) == 3
+    assert cur.queries[0] == ("INSERT INTO t (a,b) VALUES (%s,%s),(%s,%s)", [0, 0, 1, 1])
+    assert cur.queries[2] == ("INSERT INTO t (a,b) VALUES (%s,%s)", [4, 4])
+    insert_rows(cur, "INSERT INTO t (a,b)", [])
+    assert len(cur.queries) == 3
+
+
+def test_ingest_instances(fake_db):
+    from akrr.perf.ingestor import Ingestor
+    from akrr.perf.control import no_control
+
+    collected = datetime.datetime(2020, 1, 1)
+    instances = [
+        (1, collected, collected, "test", "namd", "namd.2", 1, body, 11, 0, 16, 2),
+        (2, collected, collected, "test", "namd", "namd.2", 0, None, 12, 1, 16, 2),
+        (3, collected, collected, "unknown", "namd", "namd.2", 1, body, 13, 0, 16, 2),
+    ]
+    con, cur = get_db(fake_db)
+    ingestor = Ingestor(cur, con, cur)
+    rows = ingestor._get_instance_rows(instances)
+    # second instance replaces first one, third is from unknown resource
+    assert ingestor.ingested == 1
+    assert ingestor.skipped == 2
+    assert ingestor.unknown == {("unknown", "namd")}
+    assert rows["ak_instance"] == [(200, collected, 1, 2, 12, "error", 10, None, "failed")]
+    assert rows["metric_data"] == []
+
+    con, cur = get_db(fake_db)
+    ingestor = Ingestor(cur, con, cur)
+    rows = ingestor._get_instance_rows(instances[:1])
+    # repeated metric is set once, new parameters ids are looked up
+    assert rows["metric_data"] == [(100, 200, collected, 1, "11.5") + tuple(no_control)]
+    assert len(rows["parameter_data"]) == 2
+    assert rows["ak_has_metric"] == [(200, 100, 2)]
+
+    cur.queries.clear()
+    ingestor.ingest_instances(instances[:1])
+    assert con.rollbacks == 0
+    assert any(q.startswith("INSERT INTO ak_instance") and "ON DUPLICATE KEY UPDATE" in q for q, _ in cur.queries)
+    assert any(q.startswith("INSERT INTO a_data2") for q, _ in cur.queries)
+
+    con, cur = get_db(fake_db)
+    ingestor = Ingestor(cur, con, cur, dry_run=True)
+    ingestor.ingest_instances(instances[:1])
+    assert con.commits == 0
+    assert not any(q.startswith("INSERT") for q, _ in cur.queries)
+
+
+def test_ingestor_close(fake_db):
+    from akrr.perf.ingestor import Ingestor
+
+    (akrr_con, _), (ak_con, cur) = fake_db.connect(), fake_db.connect()
+    ingestor = Ingestor(cur, ak_con, cur, akrr_con=akrr_con)
+    ingestor.close()
+    assert akrr_con.closed and ak_con.closed
+    assert ingestor.akrr_con is None and ingestor.ak_con is None
@@ -0,0 +1,85 @@
+"""
+Tests for akrr.cli.resource_deploy batch helpers
+"""
+import pytest
+
+
+@pytest.fixture
+def resource_deploy(akrr_home):
+    pytest.importorskip("MySQLdb")
+    import akrr.cli.resource_deploy
+    return akrr.cli.resource_deploy
+
+
+def test_run_on_resources(resource_deploy):
+    import threading
+    import time
+
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def func(resource):
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return resource['name']
+
+    resources = [{'name': "r%d" % i} for i in range(6)]
+    assert resource_deploy.run_on_resources(func, resources, max_workers=2) == [r['name'] for r in resources]
+    assert running[1] == 2
+    assert resource_deploy.run_on_resources(func, resources[:1]) == ["r0"]
+
+    def fail(resource):
+        if resource['name'] == "r3":
+            exit(1)
+        return resource['name']
+
+    with pytest.raises(SystemExit):
+        resource_deploy.run_on_resources(fail, resources, max_workers=3)
+
+
+def test_check_private_keys(resource_deploy, tmpdir):
+    key = tmpdir / "id_rsa"
+    key.write("key")
+    resource_deploy.check_private_keys([
+        {'name': "a", 'ssh_private_key_file': None}, {'name': "b", 'ssh_private_key_file': str(key)}])
+    with pytest.raises(SystemExit):
+        resource_deploy.check_private_keys([
+            {'name': "a", 'ssh_private_key_file': str(key)},
+            {'name': "b", 'ssh_private_key_file': str(tmpdir / "missing")}])
+
+
+def test_get_test_job_result(resource_deploy):
+    get_test_job_result = resource_deploy.get_test_job_result
+
+    assert get_test_job_result(None) == (False, "task is not found")
+    assert get_test_job_result({'queue': None, 'data': None}) == (False, "task is not found")
+    assert get_test_job_result({'queue': "active_tasks", 'data': {}}) == (False, "task is not completed")
+
+    def completed(status, instance_info):
+        task = {'queue': "completed_tasks",
+                'data': {'completed_tasks': {'status': status, 'status_info': "info"}}}
+        if instance_info is not None:
+            task['data']['akrr_xdmod_instanceinfo'] = instance_info
+        return task
+
+    assert get_test_job_result(completed("ERROR: can not submit", None)) == (False, "ERROR: can not submit")
+    assert get_test_job_result(completed("Done", None))[0] is False
+    assert get_test_job_result(completed("Done", {'status': 0, 'message': "no output"})) == \
+        (False, "task execution was not successful: no output")
+    assert get_test_job_result(completed("Done", {'status': 1, 'message': None})) == (True, "info")
+
+
+def test_make_test_jobs_report(resource_deploy):
+    report = resource_deploy.make_test_jobs_report([
+        ("alpha", "namd", 2, 11, True, "Task completed successfully"),
+        ("bravo", "namd", 1, 12, False, "first line\nsecond line"),
+        ("bravo", "hpcc", 1, 13, False, "")])
+    lines = report.splitlines()
+    assert len(lines) == 7
+    assert "Task Id" in lines[1] and "Result" in lines[1]
+    assert "alpha" in lines[3] and "OK" in lines[3]
+    assert "FAILED" in lines[4] and "first line" in lines[4] and "second line" not in report
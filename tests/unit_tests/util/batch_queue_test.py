@@ -0,0 +1,64 @@
+"""
+Tests for akrr.util.batch_queue
+"""
+
+
+def test_parse_queue_listing():
+    from akrr.util.batch_queue import parse_queue_listing
+
+    slurm_listing = """
+   1234 PENDING
+   1235 RUNNING
+"""
+    assert parse_queue_listing('slurm', slurm_listing) == {'1234': 'PENDING', '1235': 'RUNNING'}
+
+    pbs_listing = """Job ID                    Name             User            Time Use S Queue
+------------------------- ---------------- --------------- -------- - -----
+1234.headnode              akrr.job         user            00:00:01 R batch
+1235.headnode              akrr.job         user                   0 Q batch
+"""
+    assert parse_queue_listing('pbs', pbs_listing) == {'1234': 'R', '1235': 'Q'}
+
+    sge_listing = """job-ID  prior   name       user         state submit/start at     queue      slots ja-task-ID
+-----------------------------------------------------------------------------------------------------------------
+   1234 0.55500 akrr.job   user         r     05/21/2019 10:00:00 all.q@node1    16
+   1235 0.00000 akrr.job   user         qw    05/21/2019 10:00:01                16
+"""
+    assert parse_queue_listing('sge', sge_listing) == {'1234': 'r', '1235': 'qw'}
+
+    assert parse_queue_listing('shell', "  123 Ss\n  456 R+\n") == {'123': 'Ss', '456': 'R+'}
+
+
+def test_queue_status_cache(tmpdir):
+    import time
+    from akrr.util.batch_queue import QueueStatusCache
+
+    listings = []
+
+    def list_queue(_):
+        listings.append(1)
+        return {'1234': 'RUNNING'}
+
+    cache = QueueStatusCache(cache_dir=str(tmpdir), ttl=60.0)
+    cache.list_queue = list_queue
+    resource = {'name': 'resource1', 'batch_scheduler': 'slurm'}
+
+    assert cache.is_job_in_queue(resource, 1234) is True
+    assert cache.is_job_in_queue(resource, 1235) is False
+    assert len(listings) == 1
+
+    # job submitted after listing, so it should be refreshed
+    assert cache.is_job_in_queue(resource, 1236, time.time() + 1.0) is False
+    assert len(listings) == 2
+
+    # expired listing
+    cache.ttl = 0.0
+    cache.is_job_in_queue(resource, 1234)
+    assert len(listings) == 3
+
+    # not supported
+    assert cache.is_job_in_queue({'name': 'resource2', 'batch_scheduler': 'openstack'}, 1234) is None
+
+    # failed listing
+    cache.list_queue = lambda _: None
+    assert cache.is_job_in_queue(resource, 1234) is None
@@ -0,0 +1,61 @@
+"""
+Tests for akrr.util.error_classifier
+"""
+import re
+
+import pytest
+
+
+def test_parse_regexp_flags():
+    from akrr.util.error_classifier import parse_regexp_flags
+    from akrr.akrrerror import AkrrError
+
+    assert parse_regexp_flags(None) == 0
+    assert parse_regexp_flags("0") == 0
+    assert parse_regexp_flags("re.M") == re.M
+    assert parse_regexp_flags("re.M|re.I") == re.M | re.I
+    assert parse_regexp_flags("re.MULTILINE+re.DOTALL") == re.M | re.S
+    with pytest.raises(AkrrError):
+        parse_regexp_flags("__import__('os')")
+    with pytest.raises(AkrrError):
+        parse_regexp_flags("re.compile")
+
+
+def test_get_required_literal():
+    from akrr.util.error_classifier import get_required_literal
+
+    assert get_required_literal(re.compile(r"ERROR: job (\d+) was killed")) == "ERROR: job "
+    assert get_required_literal(re.compile(r"^\s+Segmentation fault")) == "Segmentation fault"
+    assert get_required_literal(re.compile(r"No such file|Permission denied")) is None
+    assert get_required_literal(re.compile(r"Segmentation fault", re.I)) is None
+    assert get_required_literal(re.compile(r"ab?c")) is None
+
+
+def test_error_classifier():
+    from akrr.util.error_classifier import ErrorClassifier, unknown_error_id
+
+    classifier = ErrorClassifier([
+        (3, "*", r"Segmentation fault", "0", "*"),
+        (1, "*", r"^ERROR: (\w+) was not found", "re.M", "akrr_status_info"),
+        (2, "Alpha,Bravo", r"out of memory", "re.I", "stderr,stdout"),
+        (4, "*", r"unbalanced(", "0", "*"),
+    ])
+    # rule with invalid regexp is skipped, rules are ordered by id
+    assert [rule.id for rule in classifier.rules] == [1, 2, 3]
+    assert [rule.id for rule in classifier.get_rules("alpha")] == [1, 2, 3]
+    assert [rule.id for rule in classifier.get_rules("Charlie")] == [1, 3]
+
+    fields = {
+        "appstdout": "running\nSegmentation fault\n",
+        "stderr": "Process was killed: Out Of Memory",
+        "stdout": None,
+        "akrr_status_info": "some info\nERROR: executable was not found",
+        "akrr_status": "ERROR"
+    }
+    assert classifier.classify("Alpha", fields) == (1, "akrr_status_info")
+    fields["akrr_status_info"] = "some info"
+    assert classifier.classify("Alpha", fields) == (2, "stderr")
+    assert classifier.classify("Charlie", fields) == (3, "appstdout")
+    fields["appstdout"] = "running"
+    assert classifier.classify("Charlie", fields) is None
+    assert unknown_error_id == 1000
@@ -0,0 +1,50 @@
+"""
+Tests for akrr.util.progress_checkpoint
+"""
+
+
+def test_progress_checkpoint(tmpdir):
+    import os
+    from akrr.util.progress_checkpoint import ProgressCheckpoint, get_status_summary
+
+    assert get_status_summary(None) == "None"
+    assert get_status_summary("ERROR: can not parse\nTraceback") == "ERROR: can not parse"
+    assert len(get_status_summary("x" * 100)) == 60
+
+    filename = str(tmpdir / "checkpoint.json")
+    selection = ["Alpha", "namd", None, None]
+
+    checkpoint = ProgressCheckpoint(filename, selection)
+    assert not checkpoint.resumed and checkpoint.last_task_id is None
+    assert checkpoint.record(1, "Done", "Done") is False
+    assert checkpoint.record(2, "ERROR: no output", "Done") is True
+    assert checkpoint.record(3, "Done", None, failed=True) is False
+    checkpoint.save()
+    assert checkpoint.record(4, "ERROR: no output", "Done") is True
+
+    # resume from saved state
+    checkpoint = ProgressCheckpoint(filename, selection)
+    assert checkpoint.resumed
+    assert checkpoint.last_task_id == 3
+    assert (checkpoint.processed, checkpoint.failed) == (3, 1)
+    assert checkpoint.changed_tasks == [(2, "ERROR: no output", "Done")]
+    checkpoint.record(4, "ERROR: no output", "Done")
+    checkpoint.record(5, "Done", "ERROR: no output")
+    assert checkpoint.get_changes() == [("ERROR: no output -> Done", 2), ("Done -> ERROR: no output", 1)]
+    assert checkpoint.get_summary().startswith("Processed tasks: 5, failed to process: 1, status changed: 3")
+
+    # failed task is kept for retry, retried task is counted once
+    assert checkpoint.failed_task_ids == [3]
+    checkpoint.save()
+    checkpoint = ProgressCheckpoint(filename, selection)
+    assert checkpoint.failed_task_ids == [3]
+    assert checkpoint.record(3, "Done", "Done") is False
+    assert checkpoint.failed_task_ids == [] and checkpoint.last_task_id == 5
+    assert (checkpoint.processed, checkpoint.failed) == (5, 0)
+
+    # other selection or restart do not resume
+    assert not ProgressCheckpoint(filename, ["Alpha", "hpcc", None, None]).resumed
+    assert not ProgressCheckpoint(filename, selection, restart=True).resumed
+
+    checkpoint.remove()
+    assert not os.path.exists(filename)
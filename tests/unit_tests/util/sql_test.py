@@ -102,6 +102,151 @@ def test__db_check_priv__identify_priv(db_to_check, priv_to_check, priv_list, ex
     assert f(db_to_check, priv_to_check, priv_list) is expected
 
 
+@pytest.mark.parametrize("value, pattern, expected", [
+    ("ubhpc", "ubhpc", True),
+    ("UBHPC", "ubhpc", True),
+    ("ub_hpc", "ub_hpc", True),
+    ("ubXhpc", "ub_hpc", True),
+    ("ubXhpc", "ub\\_hpc", False),
+    ("ubhpc_2", "ubhpc%", True),
+    ("ubhpc", "ubhp", False),
+    ("a.b", "a.b", True),
+    ("axb", "a.b", False),
+])
+def test_like_match(value, pattern, expected):
+    from akrr.util.sql import like_match
+    assert like_match(value, pattern) == expected
+
+
+@pytest.fixture
+def pool(monkeypatch, fake_db):
+    """ConnectionPool which creates fake connections, created connections are in pool.created"""
+    import akrr.util.sql
+    from akrr.util.sql import ConnectionPool
+
+    pool = ConnectionPool("user", "password", max_idle=2, check_interval=30.0)
+    pool.created = []
+
+    def get_con_to_db(*args, **kwargs):
+        pool.created.append(fake_db.connect()[0])
+        return pool.created[-1], None
+
+    monkeypatch.setattr(akrr.util.sql, "get_con_to_db", get_con_to_db)
+    return pool
+
+
+def test_connection_pool_reuse(pool):
+    con, cur = pool.get_con(dict_cursor=False)
+    assert cur.queries == [] and con.ping() is None
+    con.close()
+    # uncommitted changes are rolled back on release
+    assert pool.created[0].rollbacks == 1
+    assert pool.stats["idle"] == 1 and pool.stats["in_use"] == 0
+
+    con2, _ = pool.get_con(dict_cursor=False)
+    assert len(pool.created) == 1 and pool.stats["reused"] == 1
+    # recently released connection is not pinged
+    assert pool.created[0].pings == 1
+    with pytest.raises(AttributeError):
+        con.ping()
+
+    # idle connections above max_idle are closed
+    cons = [pool.get_con(dict_cursor=False)[0] for _ in range(3)]
+    for c in cons + [con2]:
+        c.close()
+    assert len(pool.created) == 4 and pool.stats["idle"] == 2 and pool.stats["discarded"] == 2
+    assert sum(c.closed for c in pool.created) == 2
+
+    pool.clear()
+    assert all(c.closed for c in pool.created) and pool.stats["idle"] == 0
+
+
+def test_connection_pool_ping(pool):
+    con, _ = pool.get_con(dict_cursor=False)
+    con.close()
+    pool.created[0].alive = False
+    # make connection idle for longer than check_interval
+    pool._idle = [(c, t - 60.0) for c, t in pool._idle]
+
+    con, _ = pool.get_con(dict_cursor=False)
+    assert len(pool.created) == 2 and pool.created[0].closed
+    assert pool.stats["failed_checks"] == 1
+
+    # broken connection is discarded on release
+    pool.created[1].alive = False
+    con.close()
+    assert pool.created[1].closed and pool.stats["idle"] == 0
+
+    con, _ = pool.get_con(dict_cursor=False)
+    con.discard()
+    assert pool.created[2].closed and pool.created[2].rollbacks == 0
+
+
+def test_connection_pool_fork(pool):
+    import os
+
+    con, _ = pool.get_con(dict_cursor=False)
+    con_idle, _ = pool.get_con(dict_cursor=False)
+    con_idle.close()
+
+    # pretend that we are in child process
+    pool._pid = os.getpid() + 1
+    con._pid = os.getpid() + 1
+    con2, _ = pool.get_con(dict_cursor=False)
+    # inherited idle connection is not reused and not closed
+    assert len(pool.created) == 3
+    assert not pool.created[1].closed and pool.created[1].rollbacks == 1
+    assert len(pool._inherited) == 1
+
+    # connection checked out in parent process is not returned to child's pool
+    con.close()
+    assert len(pool._inherited) == 2 and pool.created[0].rollbacks == 0 and not pool.created[0].closed
+    con2.close()
+    assert pool.stats["idle"] == 1
+
+
+def test_pooled_connection_del(pool):
+    con, _ = pool.get_con(dict_cursor=False)
+    del con
+    assert pool.stats["in_use"] == 0 and pool.stats["idle"] == 1
+
+
+def test_connection_pool_uncommitted(pool, caplog):
+    con, cur = pool.get_con(dict_cursor=False)
+    cur.execute("SELECT * FROM active_tasks")
+    con.close()
+    assert "uncommitted" not in caplog.text
+
+    con, cur = pool.get_con(dict_cursor=False)
+    cur.execute("\n  update active_tasks SET status=%s", ("done",))
+    assert con.uncommitted
+    con.commit()
+    assert not con.uncommitted
+    con.close()
+    assert "uncommitted" not in caplog.text
+
+    con, cur = pool.get_con(dict_cursor=False)
+    cur.execute("INSERT INTO active_tasks (task_id) VALUES (%s)", (1,))
+    con.close()
+    assert "uncommitted changes" in caplog.text
+    assert pool.created[0].rollbacks == 3
+
+
+def test_connection_pool_transaction(pool):
+    with pool.transaction(dict_cursor=False) as cur:
+        cur.execute("UPDATE active_tasks SET status=%s", ("done",))
+    assert cur.queries == [("UPDATE active_tasks SET status=%s", ("done",))]
+    assert pool.created[0].commits == 1 and pool.stats["in_use"] == 0
+
+    with pytest.raises(ValueError):
+        with pool.transaction(dict_cursor=False) as cur:
+            cur.execute("UPDATE active_tasks SET status=%s", ("done",))
+            raise ValueError("failed")
+    # rolled back in transaction and on release
+    assert pool.created[0].commits == 1 and pool.created[0].rollbacks == 3
+    assert pool.stats["in_use"] == 0 and pool.stats["idle"] == 1
+
+
 @pytest.mark.sql
 class Test_akrr_util_sql_Functions_with_SQL(unittest.TestCase):
     """this tests require MySQL server"""
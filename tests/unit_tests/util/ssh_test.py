@@ -125,3 +125,59 @@ def test_scp(testconfig, tmpdir):
     ssh.scp_from_resource(resource, os.path.join(pwd, "testfile2.txt"), str(p))
 
     assert p.read_text(encoding='utf8').strip() == content.strip()
+
+
+def test_ssh_pool_options(tmpdir):
+    """
+    tests ssh.SSHConnectionPool options generation
+    """
+    import akrr.util.ssh as ssh
+
+    pool = ssh.SSHConnectionPool()
+    assert pool.is_applicable("ssh") is False
+
+    pool.configure(enabled=True, persist=300, max_sessions=2, control_dir=str(tmpdir))
+    resource = {'name': 'resource1', 'remote_access_node': 'headnode1', 'ssh_username': 'user1'}
+
+    assert pool.is_applicable("ssh") is True
+    assert pool.is_applicable("/usr/bin/scp -r ") is True
+    assert pool.is_applicable("gsissh") is False
+
+    control_path = pool.get_control_path(resource)
+    assert control_path.startswith(str(tmpdir))
+    assert pool.get_ssh_options(resource) == \
+        "-o ControlMaster=auto -o ControlPath=%s -o ControlPersist=300" % control_path
+
+    # different user, different master connection
+    resource2 = dict(resource, ssh_username='user2')
+    assert pool.get_control_path(resource2) != control_path
+    assert pool.check_master(resource) is False
+
+
+def test_ssh_pool_sessions_cap(tmpdir):
+    """
+    tests that ssh.SSHConnectionPool caps number of sessions per resource
+    """
+    import akrr.util.ssh as ssh
+
+    pool = ssh.SSHConnectionPool()
+    pool.configure(enabled=True, max_sessions=2, control_dir=str(tmpdir))
+    resource = {'name': 'resource1', 'remote_access_node': 'headnode1'}
+
+    lease1 = pool.acquire(resource, timeout=0)
+    lease2 = pool.acquire(resource, timeout=0)
+    assert lease1 is not None
+    assert lease2 is not None
+    assert pool.acquire(resource, timeout=0) is None
+
+    # other resource has its own slots
+    lease3 = pool.acquire({'name': 'resource2'}, timeout=0)
+    assert lease3 is not None
+    lease3.release()
+
+    lease1.release()
+    lease1.release()
+    lease4 = pool.acquire(resource, timeout=0)
+    assert lease4 is not None
+    lease2.release()
+    lease4.release()
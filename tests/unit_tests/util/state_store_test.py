@@ -0,0 +1,39 @@
+"""
+Tests for akrr.util.state_store
+"""
+
+
+def test_state_store(tmpdir):
+    import os
+    import pickle
+    from akrr.util import state_store
+
+    proc_dir = str(tmpdir)
+    assert state_store.get_latest_state(proc_dir) is None
+
+    for i in range(11):
+        state_store.write_state(proc_dir, i, {"state": i})
+
+    latest = state_store.get_latest_state(proc_dir)
+    assert os.path.basename(latest) == "000010.st"
+    assert state_store.read_state(latest) == {"state": 10}
+    assert state_store.get_state_protocol(latest) == state_store.default_protocol
+    assert [os.path.basename(f) for f in state_store.list_states(proc_dir)] == ["%06d.st" % i for i in range(11)]
+
+    # stale or missing pointer falls back to listing
+    os.remove(latest)
+    assert os.path.basename(state_store.get_latest_state(proc_dir)) == "000009.st"
+    os.remove(os.path.join(proc_dir, state_store.latest_pointer_filename))
+    assert os.path.basename(state_store.get_latest_state(proc_dir)) == "000009.st"
+
+    # migration of old protocol 0 dumps
+    with open(os.path.join(proc_dir, "000011.st"), "wb") as fout:
+        pickle.dump({"state": 11}, fout, 0)
+    assert state_store.get_state_protocol(os.path.join(proc_dir, "000011.st")) == 0
+    assert state_store.migrate_states(proc_dir, dry_run=True) == 1
+    assert state_store.migrate_states(proc_dir) == 1
+    assert state_store.migrate_states(proc_dir) == 0
+    latest = state_store.get_latest_state(proc_dir)
+    assert os.path.basename(latest) == "000011.st"
+    assert state_store.get_state_protocol(latest) == state_store.default_protocol
+    assert state_store.read_state(latest) == {"state": 11}
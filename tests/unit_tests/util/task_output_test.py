@@ -0,0 +1,110 @@
+"""
+Tests for akrr.util.task_output
+"""
+
+
+def test_compress_blocks(tmpdir):
+    import os
+    import gzip
+    import hashlib
+    from akrr.util import task_output
+
+    content = b"".join(b"line %d of appstdout\n" % (i % 1000) for i in range(20000)) + os.urandom(5000)
+    filename = str(tmpdir / "appstdout")
+    with open(filename, "wb") as fout:
+        fout.write(content)
+
+    blocks = list(task_output.iter_file_blocks(filename, block_size=4096))
+    assert len(blocks) == (len(content) + 4095) // 4096
+    assert b"".join(blocks) == content
+
+    assert task_output.get_digest(task_output.iter_file_blocks(filename, block_size=4096)) == \
+        (hashlib.sha256(content).hexdigest(), len(content))
+
+    chunks = list(task_output.compress_blocks(task_output.iter_file_blocks(filename, block_size=4096),
+                                              chunk_size=1024))
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 1024 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) < len(content)
+    assert task_output.decompress_chunks(chunks) == content
+    # compatible with gzip
+    assert gzip.decompress(b"".join(chunks)) == content
+
+    # absent files
+    assert list(task_output.iter_file_blocks(None)) == [task_output.not_present]
+    assert list(task_output.iter_file_blocks(str(tmpdir / "stderr"))) == [task_output.not_present]
+    assert task_output.decompress_chunks(task_output.compress_blocks([b""])) == b""
+
+    assert task_output.decode_output(None) is None
+    assert task_output.decode_output("text") == "text"
+    assert task_output.decode_output(b"text\xff\n") == "text\n"
+
+
+def get_cursor(fake_db, blobs=None, references=0):
+    """fake cursor with akrr_output_blob rows in cur.blobs as {sha256: (id, complete)}"""
+    cur = fake_db.cursor(results={})
+    cur.blobs = blobs if blobs is not None else {}
+
+    def insert_blob(cur, _, args):
+        cur.blobs.setdefault(args[0], (len(cur.blobs) + 1, 0))
+        cur.lastrowid = cur.blobs[args[0]][0]
+        return []
+
+    def complete_blob(cur, _, args):
+        for k, (i, c) in list(cur.blobs.items()):
+            if i == args[-1]:
+                cur.blobs[k] = (i, 1)
+        return []
+
+    cur.results.update({
+        "SELECT id FROM akrr_output_blob WHERE sha256": lambda cur, _, args: [
+            (i,) for k, (i, c) in cur.blobs.items() if k == args[0] and c],
+        "INSERT INTO akrr_output_blob": insert_blob,
+        "SELECT complete": lambda cur, _, args: [(c,) for i, c in cur.blobs.values() if i == args[0]],
+        "UPDATE akrr_output_blob": complete_blob,
+        "SELECT id FROM akrr_output_blob WHERE id": lambda cur, _, args: [
+            (i,) for i, c in cur.blobs.values() if i == args[0]],
+        "SELECT COUNT(*)": [(references,)]})
+    return cur
+
+
+def queries(cur):
+    return [q for q, _ in cur.queries]
+
+
+def test_store_blob(fake_db):
+    from akrr.util import task_output
+    import hashlib
+
+    digest = hashlib.sha256(b"content").hexdigest()
+
+    # new blob
+    cur = get_cursor(fake_db)
+    assert task_output.store_blob(cur, lambda: [b"content"]) == 1
+    assert cur.blobs[digest] == (1, 1)
+    assert "ON DUPLICATE KEY UPDATE" in queries(cur)[1]
+    assert sum(q.startswith("INSERT INTO akrr_output_chunk") for q in queries(cur)) == 1
+
+    # complete blob is reused under shared lock
+    cur = get_cursor(fake_db, {digest: (5, 1)})
+    assert task_output.store_blob(cur, lambda: [b"content"]) == 5
+    assert len(queries(cur)) == 1 and "LOCK IN SHARE MODE" in queries(cur)[0]
+
+    # incomplete blob is rewritten
+    cur = get_cursor(fake_db, {digest: (5, 0)})
+    assert task_output.store_blob(cur, lambda: [b"content"]) == 5
+    assert cur.blobs[digest] == (5, 1)
+    assert "DELETE FROM akrr_output_chunk WHERE blob_id=%s" in queries(cur)
+
+
+def test_delete_unreferenced_blobs(fake_db):
+    from akrr.util import task_output
+
+    cur = get_cursor(fake_db, {"a": (1, 1)}, references=1)
+    task_output._delete_unreferenced_blobs(cur, [1, 1, 2])
+    assert not any(q.startswith("DELETE") for q in queries(cur))
+    assert "FOR UPDATE" in queries(cur)[0]
+
+    cur = get_cursor(fake_db, {"a": (1, 1)}, references=0)
+    task_output._delete_unreferenced_blobs(cur, [1])
+    assert sum(q.startswith("DELETE") for q in queries(cur)) == 2
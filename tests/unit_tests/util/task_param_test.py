@@ -0,0 +1,36 @@
+"""
+Tests for akrr.util.task_param
+"""
+import pytest
+
+
+def test_parse_param():
+    from akrr.util.task_param import parse_param
+
+    assert parse_param(None) == {}
+    assert parse_param(" ") == {}
+    assert parse_param("{'nnodes':2, 'ncores': 8}") == {'nnodes': 2, 'ncores': 8}
+    assert parse_param("{'AppKers': ['hpcc', 'namd'], 'test_run': True}") == {
+        'AppKers': ['hpcc', 'namd'], 'test_run': True}
+
+    # returned dict is a copy and can be modified
+    param = parse_param("{'AppKers': ['hpcc']}")
+    param['AppKers'].append('namd')
+    assert parse_param("{'AppKers': ['hpcc']}") == {'AppKers': ['hpcc']}
+
+    with pytest.raises(ValueError):
+        parse_param("__import__('os').getcwd()")
+    with pytest.raises(ValueError):
+        parse_param("[1, 2]")
+    with pytest.raises(ValueError):
+        parse_param("{'nnodes':")
+
+
+def test_get_param_columns():
+    from akrr.util.task_param import get_param_columns, param_columns
+
+    assert param_columns == ("nnodes", "ncores", "test_run", "n_runs", "master_task_id")
+    assert get_param_columns("{'nnodes':4}", "{}") == (4, None, 0, 1, 0)
+    assert get_param_columns("{'nnodes':1,'ncores':16}", "{'test_run':True,'n_runs':3}") == (1, 16, 1, 3, 0)
+    assert get_param_columns("{}", "{'masterTaskID':12}") == (None, None, 0, 1, 12)
+    assert get_param_columns("{'nnodes':'two'}", "not a dict") == (None, None, 0, 1, 0)
@@ -148,3 +148,21 @@ def test_get_float_or_int(a, result):
         assert floats_are_close(b, result)
     else:
         assert 0
+
+
+def test_indent_xml():
+    import xml.etree.ElementTree as ElementTree
+    from akrr.util import indent_xml
+
+    xml_text = "<a><b>1</b> <c><d>2</d><e/></c>\n</a>"
+    root = ElementTree.fromstring(xml_text)
+    indent_xml(root, space="  ")
+    assert ElementTree.tostring(root, encoding="unicode") == (
+        "<a>\n  <b>1</b>\n  <c>\n    <d>2</d>\n    <e />\n  </c>\n</a>")
+
+    if hasattr(ElementTree, "indent"):
+        root2 = ElementTree.fromstring(xml_text)
+        ElementTree.indent(root2, space="\t")
+        root = ElementTree.fromstring(xml_text)
+        indent_xml(root, space="\t")
+        assert ElementTree.tostring(root) == ElementTree.tostring(root2)